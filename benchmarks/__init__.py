@@ -0,0 +1,7 @@
+"""
+Benchmarks for SkillSwap.
+
+Every module can be run as a script from the project root, e.g. ``python -m benchmarks.suite``. They use
+skillswap.settings_benchmark unless DJANGO_SETTINGS_MODULE is set: the settings of the project, whose user model
+and unmigrated core app the benchmark databases need.
+"""
@@ -0,0 +1,115 @@
+"""
+Analytics rollups benchmark.
+
+Compares the dashboard series read from the rollups (core.analytics) with grouping the sessions and agreements on
+each load, and times the backfill (with 1 and several workers) and an incremental update after a few changes. Every
+size runs on a fresh test database filled by benchmarks.generators.
+
+Usage:
+    python -m benchmarks.analytics [--sizes 10000 100000 1000000] [--workers 4] [--repeat 20]
+"""
+import argparse
+import json
+import time
+from datetime import timedelta
+
+from benchmarks.common import measure, percentiles, setup_django, test_database
+
+
+def naive_sessions(desde, hasta):
+    """
+    Returns the weekly sessions of a date range, grouping the sessions on each call.
+    """
+    from django.db.models import Count, Q, Sum
+    from django.db.models.functions import TruncWeek
+
+    from core.models import Sesion
+
+    celebrada = Q(asistencia_user_a=True) | Q(asistencia_user_b=True)
+    return list(
+        Sesion.objects.filter(fecha__gte=desde, fecha__lte=hasta)
+        .values(inicio=TruncWeek('fecha'))
+        .annotate(programadas=Count('id'), celebradas=Count('id', filter=celebrada), minutos=Sum('duracion_real', filter=celebrada))
+        .order_by('inicio')
+    )
+
+
+def naive_agreements(desde, hasta):
+    """
+    Returns the monthly agreement funnel of a date range, grouping the agreements on each call.
+    """
+    from django.db.models import Count
+    from django.db.models.functions import TruncMonth
+
+    from core.models import Acuerdo
+
+    return list(
+        Acuerdo.objects.filter(fecha_creacion__date__gte=desde, fecha_creacion__date__lte=hasta)
+        .values('estado', inicio=TruncMonth('fecha_creacion'))
+        .annotate(total=Count('id'))
+        .order_by('inicio')
+    )
+
+
+def run(filas, seed, workers, repeat):
+    """
+    Benchmarks a database size.
+
+    Args:
+        filas (int): Approximate number of rows.
+        seed (int): Random seed of the data.
+        workers (int): Partitions recomputed in parallel by the second backfill.
+        repeat (int): Measured runs of each series.
+
+    Returns:
+        dict: Results of the size.
+    """
+    from django.utils import timezone
+
+    from benchmarks.generators import Escala, populate
+    from core import analytics
+    from core.models import Sesion
+
+    with test_database():
+        creadas = populate(Escala.from_rows(filas), seed, indexes=False)
+        resultado = {'rows': creadas, 'backfill_s': {}}
+        for hilos in sorted({1, workers}):
+            inicio = time.perf_counter()
+            analytics.backfill(workers=hilos)
+            resultado['backfill_s'][hilos] = round(time.perf_counter() - inicio, 3)
+
+        # The rows just generated are all within LAG_SECONDS: move the clock past them, like the next scheduled run.
+        ahora = timezone.now() + timedelta(seconds=analytics.get_setting('LAG_SECONDS'))
+        analytics.update(ahora=ahora)
+        cambiadas = list(Sesion.objects.order_by('?').values_list('pk', flat=True)[:100])
+        Sesion.objects.filter(pk__in=cambiadas).update(asistencia_user_a=True, fecha_modificacion=timezone.now())
+        inicio = time.perf_counter()
+        dias = analytics.update(ahora=timezone.now() + timedelta(seconds=analytics.get_setting('LAG_SECONDS')))
+        resultado['update_100_sessions'] = {'days': dias, 's': round(time.perf_counter() - inicio, 3)}
+
+        hasta = timezone.localdate() + timedelta(days=365)
+        desde = hasta - timedelta(days=730)
+        for nombre, funcion in (
+            ('rollup_sessions_weekly', lambda: analytics.sessions(desde, hasta, 'semana')),
+            ('naive_sessions_weekly', lambda: naive_sessions(desde, hasta)),
+            ('rollup_agreements_monthly', lambda: analytics.agreements(desde, hasta, 'mes')),
+            ('naive_agreements_monthly', lambda: naive_agreements(desde, hasta)),
+        ):
+            resultado[nombre] = percentiles(measure(funcion, repeat))
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000], help='Approximate numbers of rows.')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed of the data.')
+    parser.add_argument('--workers', type=int, default=4, help='Partitions recomputed in parallel by the backfill.')
+    parser.add_argument('--repeat', type=int, default=20, help='Measured runs of each series.')
+    args = parser.parse_args()
+
+    setup_django()
+    print(json.dumps([run(filas, args.seed, args.workers, args.repeat) for filas in args.sizes], indent=2))
+
+
+if __name__ == '__main__':
+    main()
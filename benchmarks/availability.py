@@ -0,0 +1,130 @@
+"""
+Availability matching benchmark.
+
+Compares core.availability.overlapping_users() (range scans over the precomputed UTC intervals) with parsing the
+availability of every profile on each request, over synthetic users in several timezones. Every size runs on a fresh
+test database.
+
+Usage:
+    python -m benchmarks.availability [--sizes 1000 10000 100000] [--minutes 60] [--repeat 20]
+"""
+import argparse
+import json
+import random
+import time
+
+from benchmarks.common import measure, percentiles, setup_django, test_database
+
+DIAS = ('lunes', 'martes', 'miércoles', 'jueves', 'viernes', 'sábados', 'domingos')
+ZONAS = ('UTC', 'Europe/Madrid', 'America/Mexico_City', 'America/Bogota', 'America/New_York', 'Asia/Tokyo')
+
+
+def availability(rnd):
+    """
+    Returns a random availability text, in the styles users write them.
+    """
+    desde = rnd.randint(6, 21)
+    horas = f'{desde}:00-{min(desde + rnd.randint(1, 4), 24)}:00'
+    estilo = rnd.random()
+    if estilo < 0.4:
+        primero = rnd.randint(0, 4)
+        return f'De {DIAS[primero]} a {DIAS[rnd.randint(primero, 6)]}, {horas}'
+    if estilo < 0.8:
+        return ', '.join(f'{dia} {horas}' for dia in rnd.sample(DIAS, rnd.randint(1, 3)))
+    if estilo < 0.9:
+        return f'Todos los días {horas}'
+    return 'Cualquier momento'
+
+
+def populate(total, seed=0):
+    """
+    Creates ``total`` synthetic users with their profile and indexes their availability.
+
+    Args:
+        total (int): Number of users.
+        seed (int): Random seed.
+    """
+    from core import availability as disponibilidad
+    from core.models import Perfil, Usuario
+
+    rnd = random.Random(seed)
+    usuarios = Usuario.objects.bulk_create(
+        (Usuario(username=f'user{i}', nombre=f'Usuario {i}', alias=f'u{i}', email=f'u{i}@example.com') for i in range(total)),
+        batch_size=2000,
+    )
+    Perfil.objects.bulk_create(
+        (Perfil(usuario=usuario, disponibilidad=availability(rnd), zona_horaria=rnd.choice(ZONAS)) for usuario in usuarios),
+        batch_size=2000,
+    )
+    disponibilidad.rebuild()
+    return [usuario.pk for usuario in rnd.sample(usuarios, min(total, 50))]
+
+
+def parse_all(usuario_id, minutos):
+    """
+    The approach the index replaces: parse every profile and compare it with the user's availability.
+    """
+    from core.availability import weekly_intervals
+    from core.models import Perfil
+
+    perfiles = Perfil.objects.values_list('usuario_id', 'disponibilidad', 'zona_horaria')
+    intervalos = {pk: weekly_intervals(texto, zona) for pk, texto, zona in perfiles}
+    propios = [(i + d, f + d) for i, f in intervalos[usuario_id] for d in (-10080, 0)]
+    return [
+        pk for pk, suyos in intervalos.items()
+        if pk != usuario_id and any(
+            min(fin, f + d) - max(inicio, i + d) >= minutos
+            for inicio, fin in propios for i, f in suyos for d in (-10080, 0)
+        )
+    ]
+
+
+def run(total, minutos, repeat):
+    """
+    Benchmarks a database size.
+
+    Args:
+        total (int): Number of users.
+        minutos (int): Minimum overlap.
+        repeat (int): Measured runs per approach.
+
+    Returns:
+        dict: Results of the size.
+    """
+    from core.availability import overlapping_users
+    from core.models import IntervaloDisponibilidad
+
+    with test_database():
+        inicio = time.perf_counter()
+        muestra = populate(total)
+        resultado = {
+            'users': total,
+            'intervals': IntervaloDisponibilidad.objects.count(),
+            'populate_s': time.perf_counter() - inicio,
+        }
+
+        usuarios = iter(muestra * repeat * 2)
+        resultado['index'] = percentiles(measure(lambda: list(overlapping_users(next(usuarios), minutos)), repeat))
+        resultado['index']['matches_mean'] = sum(len(overlapping_users(pk, minutos)) for pk in muestra) / len(muestra)
+
+        if total <= 20000:
+            comprobados = muestra[:5]
+            assert all(sorted(overlapping_users(pk, minutos)) == sorted(parse_all(pk, minutos)) for pk in comprobados)
+            usuarios = iter(muestra * repeat * 2)
+            resultado['parse_all'] = percentiles(measure(lambda: parse_all(next(usuarios), minutos), max(repeat // 4, 1), 1))
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000], help='Numbers of users.')
+    parser.add_argument('--minutes', type=int, default=60, help='Minimum overlap, in minutes.')
+    parser.add_argument('--repeat', type=int, default=20, help='Measured runs per approach.')
+    args = parser.parse_args()
+
+    setup_django()
+    print(json.dumps([run(total, args.minutes, args.repeat) for total in args.sizes], indent=2))
+
+
+if __name__ == '__main__':
+    main()
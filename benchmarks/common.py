@@ -0,0 +1,91 @@
+"""
+Helpers shared by the benchmarks.
+"""
+import os
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+
+
+def setup_django():
+    """
+    Configures Django for a benchmark script (skillswap.settings_benchmark unless DJANGO_SETTINGS_MODULE is set).
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'skillswap.settings_benchmark')
+
+    import django
+    django.setup()
+
+
+@contextmanager
+def test_database(verbosity=0):
+    """
+    Creates a throwaway test database for the default connection and destroys it afterwards.
+
+    SQLite test databases are created as temporary files instead of in memory, so they behave like a real
+    deployment and are really destroyed between runs.
+
+    Args:
+        verbosity (int): Verbosity of the database creation.
+    """
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    nombre = connection.settings_dict['NAME']
+    with tempfile.TemporaryDirectory() as directorio:
+        if connection.vendor == 'sqlite':
+            connection.settings_dict['TEST']['NAME'] = os.path.join(directorio, 'benchmark.sqlite3')
+        connection.creation.create_test_db(verbosity=verbosity, autoclobber=True)
+        try:
+            yield connection
+        finally:
+            connection.creation.destroy_test_db(nombre, verbosity=verbosity)
+            teardown_test_environment()
+
+
+def measure(funcion, repeticiones=20, calentamiento=2):
+    """
+    Runs a function several times and returns how long each run took.
+
+    Args:
+        funcion (callable): Function to measure (no arguments).
+        repeticiones (int): Measured runs.
+        calentamiento (int): Unmeasured runs before measuring (warms up caches).
+
+    Returns:
+        list[float]: Duration of each run in milliseconds.
+    """
+    for _ in range(calentamiento):
+        funcion()
+
+    muestras = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        muestras.append((time.perf_counter() - inicio) * 1000)
+    return muestras
+
+
+def percentiles(muestras):
+    """
+    Summarizes a list of durations.
+
+    Args:
+        muestras (list[float]): Durations in milliseconds.
+
+    Returns:
+        dict: mean, p50, p95 and p99 in milliseconds.
+    """
+    ordenadas = sorted(muestras)
+
+    def percentil(p):
+        return ordenadas[min(len(ordenadas) - 1, int(round(p / 100 * (len(ordenadas) - 1))))]
+
+    return {
+        'mean': statistics.fmean(ordenadas),
+        'p50': percentil(50),
+        'p95': percentil(95),
+        'p99': percentil(99),
+    }
@@ -0,0 +1,267 @@
+"""
+Deterministic synthetic data for the benchmarks.
+
+The same scale and seed always produce the same rows (ids included, on a fresh database; session dates are relative
+to today), so two runs of a benchmark measure the same data. The scale is the approximate total number of rows; per
+user there are:
+
+    Usuario 1, Perfil 1, Publicacion 3, Acuerdo 1 and Sesion about 4 (4 per ongoing agreement, 8 per finished one)
+
+plus a fixed catalogue of 200 skills and 2 to 6 skills per profile (mostly of one category). Rows are generated
+lazily and written with bulk_create() in batches, so memory stays flat from 10k to 1M rows.
+
+bulk_create() doesn't send signals: the precomputed tables (matchmaking, search and availability indexes, user
+counters, recommendations, analytics rollups) are rebuilt afterwards by populate(indexes=True).
+
+Example:
+    >>> from benchmarks.generators import Escala, populate
+    >>> escala = Escala.from_rows(100000)
+    >>> populate(escala, seed=0)
+    {'usuario': 10000, 'perfil': 10000, ...}
+"""
+import random
+from dataclasses import dataclass
+from datetime import date, timedelta
+from itertools import islice
+
+BATCH_SIZE = 5000
+HABILIDADES = 200
+CATEGORIAS = ('Software', 'Idioma', 'Musica', 'Deporte', 'Cocina', 'Ciencia', 'Arte', 'Negocios')
+ZONAS = ('UTC', 'Europe/Madrid', 'America/Mexico_City', 'America/Bogota', 'America/New_York', 'Asia/Tokyo')
+DISPONIBILIDADES = (
+    'From Monday to Friday, 8.00 - 22.00',
+    'De lunes a viernes 18:00-21:00, sábados 10-14',
+    'Fines de semana',
+    'martes y jueves 19:00-21:00',
+    'Cualquier momento',
+)
+PALABRAS = (
+    'clases ingles conversacion python programacion guitarra piano photoshop diseño cocina italiana matematicas '
+    'fisica quimica historia fotografia video edicion marketing excel finanzas yoga running ajedrez frances aleman'
+).split()
+# Agreement states, weighted like a live community: most agreements are finished or cancelled.
+ESTADOS = ('PROPUESTO', 'ACEPTADO', 'EN CURSO', 'FINALIZADO', 'CANCELADO')
+PESOS_ESTADOS = (10, 10, 20, 45, 15)
+SESIONES_POR_ACUERDO = 4
+
+
+@dataclass(frozen=True)
+class Escala:
+    """
+    Number of rows of each model.
+
+    Attributes:
+        usuarios (int): Users, each with a profile.
+        publicaciones (int): Posts.
+        acuerdos (int): Agreements.
+    """
+    usuarios: int
+    publicaciones: int
+    acuerdos: int
+
+    @classmethod
+    def from_rows(cls, filas):
+        """
+        Returns the scale with about ``filas`` rows in total (10 rows per user).
+
+        Args:
+            filas (int): Approximate total number of rows.
+
+        Returns:
+            Escala: Scale.
+        """
+        usuarios = max(filas // 10, 10)
+        return cls(usuarios=usuarios, publicaciones=usuarios * 3, acuerdos=usuarios)
+
+
+def _batches(filas, tamano=BATCH_SIZE):
+    """
+    Splits an iterable into lists of ``tamano`` items.
+    """
+    filas = iter(filas)
+    while lote := list(islice(filas, tamano)):
+        yield lote
+
+
+def _text(rnd, minimo, maximo):
+    return ' '.join(rnd.choices(PALABRAS, k=rnd.randint(minimo, maximo)))
+
+
+def skills():
+    """
+    Yields the skill catalogue.
+    """
+    from core.models import Habilidad
+
+    for i in range(HABILIDADES):
+        yield Habilidad(nombre=f'Habilidad {i}', categoria=CATEGORIAS[i % len(CATEGORIAS)], estado=i % 20 != 0)
+
+
+def users(escala, seed):
+    """
+    Yields the users, with an unusable password (hashing one per user would dominate the load time).
+    """
+    from core.models import Usuario
+
+    rnd = random.Random(f'{seed}-usuarios')
+    for i in range(escala.usuarios):
+        yield Usuario(
+            username=f'user{i}', nombre=f'Usuario {i}', alias=f'u{i}', email=f'u{i}@example.com', password='!',
+            is_active=rnd.random() > 0.02,
+        )
+
+
+def profiles(escala, seed, usuarios):
+    """
+    Yields one profile per user.
+
+    Args:
+        usuarios (list[int]): User ids, in creation order.
+    """
+    from core.models import Perfil
+
+    rnd = random.Random(f'{seed}-perfiles')
+    for usuario_id in usuarios:
+        yield Perfil(
+            usuario_id=usuario_id,
+            biografia=_text(rnd, 5, 40),
+            zona_horaria=rnd.choice(ZONAS),
+            disponibilidad=rnd.choice(DISPONIBILIDADES),
+            preferencias={'theme': rnd.choice(('dark', 'light')), 'language': rnd.choice(('es', 'en'))},
+        )
+
+
+def profile_skills(seed, perfiles, habilidades):
+    """
+    Yields the skills of the profiles (Perfil.habilidades rows): 2 to 6 per profile, most of one category.
+
+    Args:
+        perfiles (list[int]): Profile ids.
+        habilidades (list[int]): Skill ids, in creation order (see skills()).
+    """
+    from core.models import Perfil
+
+    Through = Perfil.habilidades.through
+    rnd = random.Random(f'{seed}-habilidades-perfil')
+    por_categoria = [habilidades[i::len(CATEGORIAS)] for i in range(len(CATEGORIAS))]
+    for perfil_id in perfiles:
+        categoria = rnd.choice(por_categoria)
+        elegidas = {rnd.choice(categoria) if rnd.random() < 0.8 else rnd.choice(habilidades) for _ in range(rnd.randint(2, 6))}
+        for habilidad_id in sorted(elegidas):
+            yield Through(perfil_id=perfil_id, habilidad_id=habilidad_id)
+
+
+def posts(escala, seed, usuarios, habilidades):
+    """
+    Yields the posts, spread over the users and skills (80% active).
+    """
+    from core.models import Publicacion
+
+    rnd = random.Random(f'{seed}-publicaciones')
+    for _ in range(escala.publicaciones):
+        yield Publicacion(
+            tipo=rnd.choice(('OFREZCO', 'BUSCO')),
+            descripcion=_text(rnd, 6, 30),
+            estado=rnd.random() < 0.8,
+            autor_id=rnd.choice(usuarios),
+            habilidad_id=rnd.choice(habilidades),
+        )
+
+
+def agreements(escala, seed, usuarios, habilidades):
+    """
+    Yields the agreements. User A of the i-th agreement is the i-th user, so active agreements never collide.
+    """
+    from core.models import Acuerdo
+
+    rnd = random.Random(f'{seed}-acuerdos')
+    for i in range(escala.acuerdos):
+        usuario_a = usuarios[i % len(usuarios)]
+        usuario_b = usuarios[(i + rnd.randint(1, len(usuarios) - 1)) % len(usuarios)]
+        habilidad_a, habilidad_b = rnd.sample(habilidades, 2)
+        yield Acuerdo(
+            usuario_a_id=usuario_a,
+            usuario_b_id=usuario_b,
+            semanas=rnd.randint(1, 8),
+            mins_sesion=rnd.choice((60, 90, 120)),
+            sesiones_por_semana=rnd.randint(1, 3),
+            estado=rnd.choices(ESTADOS, weights=PESOS_ESTADOS)[0],
+            condiciones=_text(rnd, 3, 15),
+            habilidad_tradea_a_id=habilidad_a,
+            habilidad_tradea_b_id=habilidad_b,
+        )
+
+
+def sessions(seed, acuerdos):
+    """
+    Yields the sessions of the ongoing and finished agreements, around today.
+
+    Args:
+        acuerdos (list[tuple[int, str]]): (id, estado) of the agreements.
+    """
+    from core.models import Sesion
+
+    rnd = random.Random(f'{seed}-sesiones')
+    hoy = date.today()
+    for acuerdo_id, estado in acuerdos:
+        if estado not in ('EN CURSO', 'FINALIZADO'):
+            continue
+        inicio = hoy - timedelta(days=rnd.randint(0, 60) if estado == 'EN CURSO' else rnd.randint(60, 365))
+        for numero in range(SESIONES_POR_ACUERDO * 2 if estado == 'FINALIZADO' else SESIONES_POR_ACUERDO):
+            fecha = inicio + timedelta(weeks=numero)
+            pasada = fecha < hoy
+            yield Sesion(
+                fecha=fecha,
+                duracion_real=rnd.choice((60, 90, 120)),
+                resumen=f'Session {numero + 1}',
+                asistencia_user_a=pasada and rnd.random() < 0.9,
+                asistencia_user_b=pasada and rnd.random() < 0.85,
+                estado=not pasada,
+                acuerdo_id=acuerdo_id,
+            )
+
+
+def populate(escala, seed=0, indexes=True):
+    """
+    Fills an empty database with the synthetic data of a scale.
+
+    Args:
+        escala (Escala): Number of rows.
+        seed (int): Random seed; the same seed gives the same data.
+        indexes (bool): Rebuild the precomputed tables afterwards (needed by matching, search, the counters, the
+            recommendations and the analytics rollups).
+
+    Returns:
+        dict: Rows created per model.
+    """
+    from core.models import Acuerdo, Habilidad, Perfil, Publicacion, Sesion, Usuario
+
+    def bulk(modelo, filas):
+        total = 0
+        for lote in _batches(filas):
+            modelo.objects.bulk_create(lote)
+            total += len(lote)
+        return total
+
+    creadas = {'habilidad': bulk(Habilidad, skills())}
+    habilidades = list(Habilidad.objects.order_by('id').values_list('id', flat=True))
+    creadas['usuario'] = bulk(Usuario, users(escala, seed))
+    usuarios = list(Usuario.objects.order_by('id').values_list('id', flat=True))
+    creadas['perfil'] = bulk(Perfil, profiles(escala, seed, usuarios))
+    perfiles = list(Perfil.objects.order_by('id').values_list('id', flat=True))
+    creadas['perfil_habilidades'] = bulk(Perfil.habilidades.through, profile_skills(seed, perfiles, habilidades))
+    creadas['publicacion'] = bulk(Publicacion, posts(escala, seed, usuarios, habilidades))
+    creadas['acuerdo'] = bulk(Acuerdo, agreements(escala, seed, usuarios, habilidades))
+    acuerdos = list(Acuerdo.objects.order_by('id').values_list('id', 'estado'))
+    creadas['sesion'] = bulk(Sesion, sessions(seed, acuerdos))
+
+    if indexes:
+        from core import analytics, availability, matching, recommendations, search, stats
+
+        matching.rebuild_index()
+        search.rebuild()
+        availability.rebuild()
+        stats.rebuild()
+        recommendations.build()
+        analytics.backfill()
+    return creadas
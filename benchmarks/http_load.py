@@ -0,0 +1,215 @@
+"""
+HTTP load test: WSGI vs ASGI deployments of the JSON API (core.views).
+
+Starts each deployment on a fresh SQLite copy of the same synthetic data, hammers the hot read paths with keep-alive
+connections for a while and reports requests/second and latency percentiles:
+
+    - wsgi: gunicorn with threaded workers forked from a preloaded master (skillswap.wsgi, see skillswap.preload).
+    - asgi: uvicorn workers (skillswap.asgi).
+
+The servers aren't dependencies of the project: ``pip install gunicorn uvicorn`` to run it. The commands can be
+changed with --wsgi-cmd/--asgi-cmd ({port} is replaced by the port).
+
+Usage:
+    python -m benchmarks.http_load [--connections 64] [--duration 10] [--workers 2] [--modes wsgi asgi]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shlex
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.common import percentiles
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+COMANDOS = {
+    'wsgi': 'gunicorn skillswap.wsgi:application --preload --bind 127.0.0.1:{port} --workers {workers} --threads 8 --log-level warning',
+    'asgi': 'uvicorn skillswap.asgi:application --port {port} --workers {workers} --no-access-log --log-level warning',
+}
+
+POPULATE_SNIPPET = """
+import random, django
+django.setup()
+from django.core.management import call_command
+call_command('migrate', run_syncdb=True, verbosity=0)
+from core.models import Habilidad, Perfil, Publicacion, Usuario
+rnd = random.Random(0)
+habilidades = Habilidad.objects.bulk_create(Habilidad(nombre=f'Habilidad {i}', categoria=f'Categoria {i % 5}') for i in range(40))
+usuarios = Usuario.objects.bulk_create(Usuario(username=f'user{i}', nombre=f'Usuario {i}', alias=f'u{i}', email=f'u{i}@example.com') for i in range({usuarios}))
+perfiles = Perfil.objects.bulk_create(Perfil(usuario=usuario, biografia='Bio', disponibilidad='Lunes a viernes') for usuario in usuarios)
+Perfil.habilidades.through.objects.bulk_create(
+    Perfil.habilidades.through(perfil_id=perfil.pk, habilidad_id=habilidad.pk)
+    for perfil in perfiles for habilidad in rnd.sample(habilidades, 3)
+)
+Publicacion.objects.bulk_create(
+    (Publicacion(tipo=rnd.choice(('OFREZCO', 'BUSCO')), descripcion=f'Clases de {rnd.choice(habilidades).nombre}', autor=rnd.choice(usuarios), habilidad=rnd.choice(habilidades)) for _ in range({publicaciones})),
+    batch_size=5000,
+)
+"""
+
+
+def free_port():
+    """
+    Returns a free TCP port of localhost.
+    """
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def populate(ruta, usuarios, publicaciones):
+    """
+    Creates a SQLite database with synthetic users, profiles and posts.
+
+    Args:
+        ruta (str): Database file.
+        usuarios (int): Users (each with a profile and 3 skills).
+        publicaciones (int): Posts.
+    """
+    env = {'DJANGO_SETTINGS_MODULE': 'skillswap.settings_benchmark', **os.environ, 'DB_NAME': ruta}
+    codigo = POPULATE_SNIPPET.replace('{usuarios}', str(usuarios)).replace('{publicaciones}', str(publicaciones))
+    subprocess.run([sys.executable, '-c', codigo], cwd=BASE_DIR, env=env, check=True)
+
+
+async def request(lector, escritor, ruta):
+    """
+    Sends a GET over a keep-alive connection and reads the response.
+
+    Returns:
+        int: HTTP status.
+    """
+    escritor.write(f'GET {ruta} HTTP/1.1\r\nHost: 127.0.0.1\r\nConnection: keep-alive\r\n\r\n'.encode())
+    await escritor.drain()
+    cabeceras = await lector.readuntil(b'\r\n\r\n')
+    lineas = cabeceras.decode('latin-1').split('\r\n')
+    longitud = 0
+    for linea in lineas[1:]:
+        nombre, _, valor = linea.partition(':')
+        if nombre.lower() == 'content-length':
+            longitud = int(valor)
+    await lector.readexactly(longitud)
+    return int(lineas[0].split()[1])
+
+
+async def load(port, rutas, conexiones, duracion):
+    """
+    Runs ``conexiones`` concurrent clients for ``duracion`` seconds.
+
+    Returns:
+        tuple[list[float], int]: Latencies (ms) of the successful requests and number of errors.
+    """
+    latencias, errores = [], 0
+    fin = time.monotonic() + duracion
+
+    async def cliente(semilla):
+        nonlocal errores
+        rnd = random.Random(semilla)
+        lector, escritor = await asyncio.open_connection('127.0.0.1', port)
+        try:
+            while time.monotonic() < fin:
+                inicio = time.perf_counter()
+                try:
+                    estado = await request(lector, escritor, rnd.choice(rutas))
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    errores += 1
+                    escritor.close()
+                    lector, escritor = await asyncio.open_connection('127.0.0.1', port)
+                    continue
+                if estado == 200:
+                    latencias.append((time.perf_counter() - inicio) * 1000)
+                else:
+                    errores += 1
+        finally:
+            escritor.close()
+
+    await asyncio.gather(*(cliente(i) for i in range(conexiones)))
+    return latencias, errores
+
+
+def wait_until_ready(port, proceso, timeout=30):
+    """
+    Waits until a server accepts connections.
+    """
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        if proceso.poll() is not None:
+            raise RuntimeError(f'The server exited with status {proceso.returncode}.')
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError('The server did not start in time.')
+
+
+def run(modo, comando, base, args):
+    """
+    Benchmarks one deployment on its own copy of the database.
+
+    Returns:
+        dict: requests, errors, requests_per_second and latency percentiles (ms).
+    """
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, 'db.sqlite3')
+        shutil.copy(base, ruta)
+        port = free_port()
+        env = {'DJANGO_SETTINGS_MODULE': 'skillswap.settings_benchmark', **os.environ, 'DB_NAME': ruta}
+        partes = shlex.split(comando.format(port=port, workers=args.workers))
+        proceso = subprocess.Popen(partes, cwd=BASE_DIR, env=env)
+        try:
+            wait_until_ready(port, proceso)
+            rutas = ['/api/feed/', '/api/habilidades/'] + [f'/api/perfiles/{i}/' for i in range(1, args.users + 1)]
+            asyncio.run(load(port, rutas, args.connections, args.warmup))
+            inicio = time.perf_counter()
+            latencias, errores = asyncio.run(load(port, rutas, args.connections, args.duration))
+            segundos = time.perf_counter() - inicio
+        finally:
+            proceso.terminate()
+            proceso.wait(timeout=30)
+
+    return {
+        'requests': len(latencias),
+        'errors': errores,
+        'requests_per_second': round(len(latencias) / segundos, 1),
+        **{clave: round(valor, 2) for clave, valor in percentiles(latencias or [0]).items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modes', nargs='+', choices=list(COMANDOS), default=list(COMANDOS), help='Deployments to compare.')
+    parser.add_argument('--connections', type=int, default=64, help='Concurrent keep-alive connections.')
+    parser.add_argument('--duration', type=float, default=10, help='Seconds of measured load per deployment.')
+    parser.add_argument('--warmup', type=float, default=2, help='Seconds of unmeasured load before measuring.')
+    parser.add_argument('--workers', type=int, default=2, help='Server worker processes.')
+    parser.add_argument('--users', type=int, default=500, help='Synthetic users (and profiles).')
+    parser.add_argument('--posts', type=int, default=20000, help='Synthetic posts.')
+    parser.add_argument('--wsgi-cmd', default=COMANDOS['wsgi'], help='WSGI server command.')
+    parser.add_argument('--asgi-cmd', default=COMANDOS['asgi'], help='ASGI server command.')
+    args = parser.parse_args()
+
+    comandos = {'wsgi': args.wsgi_cmd, 'asgi': args.asgi_cmd}
+    with tempfile.TemporaryDirectory() as directorio:
+        base = os.path.join(directorio, 'base.sqlite3')
+        populate(base, args.users, args.posts)
+        resultados = {modo: run(modo, comandos[modo], base, args) for modo in args.modes}
+
+    print(json.dumps({
+        'connections': args.connections,
+        'duration': args.duration,
+        'workers': args.workers,
+        'modes': resultados,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Profile preferences micro-benchmark.
+
+Measures the throughput (operations/second) of:
+
+    - clean: Perfil.clean() with the compiled schema (core.preferences), against the previous implementation, which
+      rebuilt the defaults and the lists of allowed values on every call.
+    - read: getting the typed preferences of a user the way PreferencesMiddleware does once per request, from the
+      database (a query plus JSON decoding, core.cache.load_preferences()) and from the cache (core.cache.preferences(),
+      served from the local tier).
+
+Usage:
+    python -m benchmarks.preferences [--iterations 200000]
+"""
+import argparse
+import json
+import time
+
+from benchmarks.common import setup_django, test_database
+
+MUESTRAS = (
+    {'theme': 'dark', 'language': 'en'},
+    {'theme': 'light'},
+    {},
+    {'language': 'es', 'theme': 'light'},
+)
+
+
+def legacy_clean(perfil):
+    """
+    Perfil.clean() before the preferences schema, kept as the baseline.
+    """
+    from django.core.exceptions import ValidationError
+
+    from core.models import default_preferencias
+
+    theme_values = ["dark", "light"]
+    language_values = ["es", "en"]
+
+    default_preferences = default_preferencias()
+    preferences = perfil.preferencias or {}
+
+    for k, v in preferences.items():
+        if k not in default_preferences.keys():
+            raise ValidationError(f"The key {k} is not valid.")
+        if k == "theme" and v not in theme_values:
+            raise ValidationError(f"The theme must be 'dark' or 'light', not '{v}'")
+        if k == "language" and v not in language_values:
+            raise ValidationError(f"The language must be 'es' or 'en', not '{v}'")
+
+
+def throughput(funcion, argumentos, iteraciones):
+    """
+    Calls a function over a cycle of arguments and returns the calls per second.
+    """
+    total = len(argumentos)
+    inicio = time.perf_counter()
+    for i in range(iteraciones):
+        funcion(argumentos[i % total])
+    return round(iteraciones / (time.perf_counter() - inicio))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=200000, help='Calls per measurement.')
+    args = parser.parse_args()
+
+    setup_django()
+
+    from core import cache
+    from core.models import Perfil, Usuario
+
+    perfiles = [Perfil(preferencias=dict(muestra)) for muestra in MUESTRAS]
+    resultados = {
+        'clean': {
+            'legacy': throughput(legacy_clean, perfiles, args.iterations),
+            'schema': throughput(Perfil.clean, perfiles, args.iterations),
+        },
+    }
+
+    with test_database():
+        usuarios = []
+        for i, muestra in enumerate(MUESTRAS):
+            usuario = Usuario.objects.create(username=f'user{i}', nombre=f'Usuario {i}', alias=f'u{i}', email=f'u{i}@example.com')
+            Perfil.objects.create(usuario=usuario, disponibilidad='-', preferencias=muestra)
+            usuarios.append(usuario.pk)
+        resultados['read'] = {
+            'query': throughput(cache.load_preferences, usuarios, args.iterations // 10),
+            'cached': throughput(cache.preferences, usuarios, args.iterations),
+        }
+
+    for grupo in resultados.values():
+        base = next(iter(grupo.values()))
+        grupo.update({f'{nombre}_speedup': round(valor / base, 2) for nombre, valor in list(grupo.items())[1:]})
+
+    print(json.dumps({'iterations': args.iterations, 'ops_per_second': resultados}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Rate limiting micro-benchmark.
+
+Measures the cost of one core.ratelimit.check() (user and IP limits) in microseconds:
+
+    - allowed: the usual case, far from the limits: two counters increased in the cache (two incr()).
+    - near_limit: allowed, but close enough to the limit that the previous window is read too.
+    - denied_shared: a key over its limit not refused by this process yet (counted, checked, then uncounted).
+    - denied_local: a hot key already refused, rejected by the local LRU without touching the cache.
+    - client_ip_v4, client_ip_v6: getting the limited address of a request (IPv6 is grouped by /64).
+
+The cache is the one in RATE_LIMITS['ALIAS'] (locmem by default; point it at the production cache to include the
+network round trips). The allowed checks cycle over 100 users and 50 addresses, so the counters stay within the
+300 keys locmem keeps by default and every check measures the steady state (an incr() of an existing counter).
+
+Usage:
+    python -m benchmarks.ratelimit [--iterations 100000]
+"""
+import argparse
+import json
+import time
+
+from benchmarks.common import setup_django
+
+
+def microseconds(funcion, iteraciones):
+    """
+    Calls a function with the call number and returns the mean microseconds per call.
+    """
+    inicio = time.perf_counter()
+    for i in range(iteraciones):
+        funcion(i)
+    return round((time.perf_counter() - inicio) / iteraciones * 1e6, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=100000, help='Checks per measurement.')
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.http import HttpRequest
+    from django.test import override_settings
+
+    from core import ratelimit
+
+    limites = {'permitida': {'usuario': (10 ** 9, 3600), 'ip': (10 ** 9, 3600)}, 'limitada': {'usuario': (0, 3600)}}
+    inicio_ventana = 3600 * 500000.0  # At the start of a window, any count is close to the limit.
+
+    def denegada(i):
+        try:
+            ratelimit.check('limitada', usuario_id=i)
+        except ratelimit.RateLimited:
+            pass
+
+    def bloqueada(i):
+        try:
+            ratelimit.check('limitada', usuario_id=0)
+        except ratelimit.RateLimited:
+            pass
+
+    peticiones = {}
+    for version, ip in (('v4', '203.0.113.7'), ('v6', '2001:db8:85a3::8a2e:370:7334')):
+        peticiones[version] = HttpRequest()
+        peticiones[version].META['REMOTE_ADDR'] = ip
+
+    with override_settings(RATE_LIMITS={'ENABLED': True, 'LIMITS': limites}):
+        resultados = {
+            'allowed': microseconds(lambda i: ratelimit.check('permitida', usuario_id=i % 100, ip=f'10.0.0.{i % 50}'), args.iterations),
+            'near_limit': microseconds(
+                lambda i: ratelimit.check('permitida', usuario_id=i % 100, ip=f'10.0.0.{i % 50}', ahora=inicio_ventana), args.iterations,
+            ),
+            'denied_shared': microseconds(denegada, args.iterations // 10),
+            'denied_local': microseconds(bloqueada, args.iterations),
+            'client_ip_v4': microseconds(lambda i: ratelimit.client_ip(peticiones['v4']), args.iterations),
+            'client_ip_v6': microseconds(lambda i: ratelimit.client_ip(peticiones['v6']), args.iterations),
+        }
+
+    print(json.dumps({'iterations': args.iterations, 'microseconds_per_call': resultados}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Skill recommendations benchmark.
+
+Times core.recommendations.build() with every backend (NumPy only if it's installed), checks they write the same
+table, and compares recommend() (one query over the precomputed similarities) with counting the co-occurrences of
+the user's skills on each request. Every size runs on a fresh test database filled by benchmarks.generators.
+
+Usage:
+    python -m benchmarks.recommendations [--sizes 10000 100000 1000000] [--repeat 20]
+"""
+import argparse
+import importlib.util
+import json
+import random
+import time
+
+from benchmarks.common import measure, percentiles, setup_django, test_database
+
+
+def naive(usuario_id, limit=10):
+    """
+    Recommends skills by counting, on each request, the profiles that know each skill and one of the user's.
+    """
+    from django.db.models import Count
+
+    from core.models import Perfil
+
+    Through = Perfil.habilidades.through
+    conocidas = Through.objects.filter(perfil__usuario_id=usuario_id).values('habilidad_id')
+    return list(
+        Through.objects
+        .filter(perfil_id__in=Through.objects.filter(habilidad_id__in=conocidas).values('perfil_id'), habilidad__estado=True)
+        .exclude(habilidad_id__in=conocidas)
+        .values('habilidad_id')
+        .annotate(total=Count('id'))
+        .order_by('-total', 'habilidad_id')[:limit]
+    )
+
+
+def run(filas, seed, repeat):
+    """
+    Benchmarks a database size.
+
+    Args:
+        filas (int): Approximate number of rows.
+        seed (int): Random seed of the data.
+        repeat (int): Measured runs of each recommendation.
+
+    Returns:
+        dict: Results of the size.
+    """
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    from benchmarks.generators import Escala, populate
+    from core import recommendations
+    from core.models import SimilitudHabilidad, Usuario
+
+    with test_database():
+        creadas = populate(Escala.from_rows(filas), seed, indexes=False)
+        resultado = {'rows': creadas, 'build_s': {}}
+
+        tablas = {}
+        for backend in recommendations.BACKENDS:
+            if backend == 'numpy' and not importlib.util.find_spec('numpy'):
+                continue
+            inicio = time.perf_counter()
+            recommendations.build(backend)
+            resultado['build_s'][backend] = round(time.perf_counter() - inicio, 3)
+            tablas[backend] = list(
+                SimilitudHabilidad.objects.order_by('habilidad_id', 'similar_id').values_list('habilidad_id', 'similar_id', 'coocurrencias')
+            )
+        resultado['similarity_rows'] = SimilitudHabilidad.objects.count()
+        resultado['backends_match'] = len({tuple(tabla) for tabla in tablas.values()}) == 1
+
+        usuarios = random.Random(seed).sample(list(Usuario.objects.values_list('id', flat=True)), 50)
+        for nombre, funcion in (('recommend', recommendations.recommend), ('naive', naive)):
+            with CaptureQueriesContext(connection) as consultas:
+                funcion(usuarios[0])
+            usuario = iter(usuarios * (repeat + 2))
+            resultado[nombre] = {
+                'queries': len(consultas),
+                **percentiles(measure(lambda: funcion(next(usuario)), repeat)),
+            }
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000], help='Approximate numbers of rows.')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed of the data.')
+    parser.add_argument('--repeat', type=int, default=20, help='Measured runs of each recommendation.')
+    args = parser.parse_args()
+
+    setup_django()
+    print(json.dumps([run(filas, args.seed, args.repeat) for filas in args.sizes], indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Full-text search benchmark.
+
+Compares core.search (FTS5 and the pure-Python index) with the ``icontains`` scan it replaces, over synthetic posts.
+Every size runs on a fresh test database.
+
+Usage:
+    python -m benchmarks.search [--sizes 10000 100000 1000000] [--backends fts5 python] [--repeat 20]
+"""
+import argparse
+import json
+import random
+import time
+
+from benchmarks.common import measure, percentiles, setup_django, test_database
+
+PALABRAS = (
+    'clases ingles conversacion python programacion guitarra piano photoshop diseño cocina italiana matematicas '
+    'fisica quimica historia fotografia video edicion marketing excel finanzas yoga running ajedrez frances aleman '
+    'japones dibujo acuarela teatro canto baile salsa tango linux redes seguridad javascript django react'
+).split()
+# Synthetic words plus real ones, drawn with a Zipf-like distribution like natural text. The real (searched) words
+# sit after the most frequent ones, like topic words do in real posts.
+VOCABULARIO = [f'palabra{i}' for i in range(200)] + PALABRAS + [f'palabra{i}' for i in range(200, 20000)]
+PESOS = [1 / (rango + 1) for rango in range(len(VOCABULARIO))]
+CONSULTAS = ('ingles', 'programacion python', 'guitarra', 'clases de fotografia', 'djan')
+
+
+def populate(total, seed=0):
+    """
+    Creates ``total`` synthetic posts (and their users and skills) with bulk inserts.
+
+    Args:
+        total (int): Number of posts.
+        seed (int): Random seed.
+    """
+    from core.models import Habilidad, Publicacion, Usuario
+
+    rnd = random.Random(seed)
+    habilidades = Habilidad.objects.bulk_create(Habilidad(nombre=f'Habilidad {i}', categoria=f'Categoria {i % 5}') for i in range(50))
+    usuarios = Usuario.objects.bulk_create(
+        (Usuario(username=f'user{i}', nombre=f'Usuario {i}', alias=f'u{i}', email=f'u{i}@example.com') for i in range(max(total // 10, 1))),
+        batch_size=2000,
+    )
+
+    lote = []
+    for i in range(total):
+        lote.append(Publicacion(
+            tipo=rnd.choice(('OFREZCO', 'BUSCO')),
+            descripcion=' '.join(rnd.choices(VOCABULARIO, weights=PESOS, k=rnd.randint(6, 30))),
+            autor=rnd.choice(usuarios),
+            habilidad=rnd.choice(habilidades),
+        ))
+        if len(lote) == 10000:
+            Publicacion.objects.bulk_create(lote)
+            lote = []
+    Publicacion.objects.bulk_create(lote)
+
+
+def run(total, backends, repeat):
+    """
+    Benchmarks a database size.
+
+    Args:
+        total (int): Number of posts.
+        backends (list[str]): Search backends to benchmark.
+        repeat (int): Measured runs per query.
+
+    Returns:
+        dict: Results of the size.
+    """
+    from django.test import override_settings
+
+    from core import search
+    from core.models import Publicacion
+
+    resultado = {'posts': total, 'icontains': {}}
+    with test_database():
+        populate(total)
+
+        for consulta in CONSULTAS:
+            palabra = consulta.split()[-1]
+            resultado['icontains'][consulta] = percentiles(measure(
+                lambda: list(Publicacion.objects.filter(estado=True, descripcion__icontains=palabra).order_by('-fecha_creacion')[:20]),
+                repeat,
+            ))
+
+        for backend in backends:
+            search.get_backend.cache_clear()
+            with override_settings(SEARCH_BACKEND=backend):
+                inicio = time.perf_counter()
+                search.rebuild()
+                resultado[backend] = {'index_build_s': time.perf_counter() - inicio}
+                for consulta in CONSULTAS:
+                    resultado[backend][consulta] = percentiles(measure(lambda: search.search_posts(consulta), repeat))
+        search.get_backend.cache_clear()
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000], help='Numbers of posts.')
+    parser.add_argument('--backends', nargs='+', default=['fts5', 'python'], help='Search backends to compare.')
+    parser.add_argument('--repeat', type=int, default=20, help='Measured runs per query.')
+    args = parser.parse_args()
+
+    setup_django()
+    print(json.dumps([run(total, args.backends, args.repeat) for total in args.sizes], indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+"""
+SQLite write concurrency benchmark.
+
+Many threads create posts and sessions at the same time (with every signal receiver running, as in production), on
+a fresh SQLite file per mode. They're saved with core.sqlite.save_instance(), the write path of the API views:
+
+    - default: rollback journal and deferred transactions (the settings before core.sqlite).
+    - wal: DB_SQLITE_TUNED (WAL, pragmas and BEGIN IMMEDIATE).
+    - wal+queue: DB_SQLITE_TUNED and DB_SQLITE_WRITE_QUEUE (writes committed in groups by a single writer thread).
+
+Each mode runs in a fresh interpreter and reports throughput, latency percentiles and "database is locked" errors.
+
+Usage:
+    python -m benchmarks.sqlite_concurrency [--threads 16] [--ops 100] [--modes default wal wal+queue]
+"""
+import argparse
+import datetime
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+MODOS = {
+    'default': {'DB_SQLITE_TUNED': '0', 'DB_SQLITE_WRITE_QUEUE': '0'},
+    'wal': {'DB_SQLITE_TUNED': '1', 'DB_SQLITE_WRITE_QUEUE': '0'},
+    'wal+queue': {'DB_SQLITE_TUNED': '1', 'DB_SQLITE_WRITE_QUEUE': '1'},
+}
+
+
+def populate(hilos):
+    """
+    Creates one user, profile and ongoing agreement per thread.
+
+    Args:
+        hilos (int): Number of threads.
+
+    Returns:
+        list[tuple]: (usuario, habilidad, acuerdo) per thread.
+    """
+    from core.models import Acuerdo, Habilidad, Perfil, Usuario
+
+    habilidades = [Habilidad.objects.create(nombre=f'Habilidad {i}', categoria='Software') for i in range(2)]
+    usuarios = [
+        Usuario.objects.create(username=f'user{i}', nombre=f'Usuario {i}', alias=f'u{i}', email=f'u{i}@example.com')
+        for i in range(hilos + 1)
+    ]
+    for usuario in usuarios:
+        Perfil.objects.create(usuario=usuario, disponibilidad='Lunes a viernes')
+
+    return [
+        (usuario, habilidades[0], Acuerdo.objects.create(
+            usuario_a=usuario, usuario_b=usuarios[-1], habilidad_tradea_a=habilidades[0], habilidad_tradea_b=habilidades[1],
+            estado='EN CURSO', condiciones='Benchmark',
+        ))
+        for usuario in usuarios[:-1]
+    ]
+
+
+def worker(hilos, operaciones):
+    """
+    Runs the benchmark in this interpreter, with the mode given by the environment.
+
+    Args:
+        hilos (int): Concurrent threads.
+        operaciones (int): Writes per thread.
+
+    Returns:
+        dict: ops, errors, seconds, ops_per_second and latency percentiles (ms).
+    """
+    from django.db import OperationalError, connections
+
+    from benchmarks.common import percentiles, setup_django, test_database
+
+    setup_django()
+
+    from core.models import Publicacion, Sesion
+    from core.sqlite import save_instance
+
+    # The write path of the API views (core.views._create), which goes through the queue when it's on.
+    def crear_publicacion(usuario, habilidad, i):
+        return save_instance(Publicacion(tipo='OFREZCO', descripcion=f'Clases de programacion {i}', autor=usuario, habilidad=habilidad))
+
+    def crear_sesion(acuerdo, i):
+        return save_instance(Sesion(
+            acuerdo=acuerdo, fecha=datetime.date.today() + datetime.timedelta(days=i), resumen=f'Sesion {i}', asistencia_user_a=True, duracion_real=60,
+        ))
+
+    with test_database():
+        datos = populate(hilos)
+        connections.close_all()  # WAL is set on the connections of the threads.
+
+        muestras, errores, lock = [], [], threading.Lock()
+        barrera = threading.Barrier(hilos + 1)
+
+        def escribir(usuario, habilidad, acuerdo):
+            propias, fallos = [], 0
+            barrera.wait()
+            for i in range(operaciones):
+                inicio = time.perf_counter()
+                try:
+                    if i % 2:
+                        crear_sesion(acuerdo, i)
+                    else:
+                        crear_publicacion(usuario, habilidad, i)
+                except OperationalError:
+                    fallos += 1
+                    continue
+                propias.append((time.perf_counter() - inicio) * 1000)
+            connections.close_all()
+            with lock:
+                muestras.extend(propias)
+                errores.append(fallos)
+
+        hilos_escritores = [threading.Thread(target=escribir, args=fila) for fila in datos]
+        for hilo in hilos_escritores:
+            hilo.start()
+        barrera.wait()
+        inicio = time.perf_counter()
+        for hilo in hilos_escritores:
+            hilo.join()
+        segundos = time.perf_counter() - inicio
+
+    return {
+        'ops': len(muestras),
+        'errors': sum(errores),
+        'seconds': round(segundos, 3),
+        'ops_per_second': round(len(muestras) / segundos, 1),
+        **{clave: round(valor, 2) for clave, valor in percentiles(muestras or [0]).items()},
+    }
+
+
+def run(modo, hilos, operaciones):
+    """
+    Runs one mode in a fresh interpreter.
+
+    Args:
+        modo (str): Key of MODOS.
+        hilos (int): Concurrent threads.
+        operaciones (int): Writes per thread.
+
+    Returns:
+        dict: Results of the mode.
+    """
+    env = dict(os.environ, **MODOS[modo])
+    env.setdefault('DJANGO_SETTINGS_MODULE', 'skillswap.settings_benchmark')
+    comando = [sys.executable, '-m', 'benchmarks.sqlite_concurrency', '--worker', '--threads', str(hilos), '--ops', str(operaciones)]
+    salida = subprocess.run(comando, cwd=BASE_DIR, env=env, check=True, capture_output=True, text=True)
+    return json.loads(salida.stdout.splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=16, help='Concurrent writer threads.')
+    parser.add_argument('--ops', type=int, default=100, help='Writes per thread.')
+    parser.add_argument('--modes', nargs='+', default=list(MODOS), choices=list(MODOS), help='Modes to compare.')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(worker(args.threads, args.ops)))
+        return
+
+    resultados = {modo: run(modo, args.threads, args.ops) for modo in args.modes}
+    print(json.dumps({'threads': args.threads, 'ops_per_thread': args.ops, 'modes': resultados}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,294 @@
+"""
+Startup-time and per-worker memory benchmark.
+
+Everything runs in fresh interpreters, with the settings module given (compare skillswap.settings with the lean
+skillswap.settings_production):
+
+    - setup: how long django.setup() and the import of core.models take, and how long django.setup() took on the old
+      code path, which built the timezone choices (sorting zoneinfo.available_timezones()) while importing
+      core.models.
+    - importtime: ``python -X importtime`` of the WSGI entry point (skillswap.wsgi): its total time, the number of
+      modules imported, the slowest modules (own time, without their imports) and the time per package.
+    - workers: a preforking server in miniature. --workers processes are forked, each one serves --requests requests
+      through the WSGI application and runs a full garbage collection (as a long-running worker eventually does), and
+      then the memory of every worker is read from /proc/<pid>/smaps_rollup: RSS, PSS (shared pages divided among the
+      processes sharing them) and USS (pages only that worker holds). Three ways of loading the application:
+          load_in_worker: every worker imports skillswap.wsgi after the fork (no --preload).
+          preload_unfrozen: the master imports it before forking, but the loaded objects aren't frozen, so the
+              collections of the workers write to (and unshare) the pages holding them.
+          preload: the master imports it before forking, warmed up and frozen (skillswap.preload).
+      The memory figures need Linux; elsewhere only the times (first response after the fork, rest of the requests)
+      are reported.
+
+The requests don't touch the database (--paths defaults to a URL that isn't routed), so no database is needed.
+
+Usage:
+    python -m benchmarks.startup [--runs 10] [--settings skillswap.settings_production] [--workers 4] [--requests 50]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+SETUP_SNIPPET = """
+import time
+t0 = time.perf_counter()
+import django
+django.setup()
+t1 = time.perf_counter()
+from core.timezones import timezone_choices
+timezone_choices()
+t2 = time.perf_counter()
+print((t1 - t0) * 1000, (t2 - t1) * 1000)
+"""
+
+MODELS_SNIPPET = """
+import time
+import django
+from django.apps import config
+
+# AppConfig.import_models() goes through importlib, so wrap it to time core.models alone.
+import_module = config.import_module
+def timed_import_module(name, *args):
+    t0 = time.perf_counter()
+    module = import_module(name, *args)
+    if name == 'core.models':
+        print((time.perf_counter() - t0) * 1000)
+    return module
+config.import_module = timed_import_module
+django.setup()
+"""
+
+EAGER_SNIPPET = """
+import time
+t0 = time.perf_counter()
+import django
+from django.apps import config
+
+# The old code path: core.models built the sorted timezone list at import time, inside django.setup().
+import_module = config.import_module
+eager = []
+def eager_import_module(name, *args):
+    if name == 'core.models':
+        t = time.perf_counter()
+        import zoneinfo
+        [(tz, tz) for tz in sorted(zoneinfo.available_timezones())]
+        eager.append((time.perf_counter() - t) * 1000)
+    return import_module(name, *args)
+config.import_module = eager_import_module
+django.setup()
+print((time.perf_counter() - t0) * 1000, eager[0])
+"""
+
+WORKERS_SNIPPET = """
+import gc, json, os, sys, time
+from wsgiref.util import setup_testing_defaults
+
+modo, workers, peticiones, paths = sys.argv[1], int(sys.argv[2]), int(sys.argv[3]), sys.argv[4:]
+
+if modo != 'load_in_worker':
+    from skillswap.wsgi import application
+    if modo == 'preload_unfrozen':
+        gc.unfreeze()
+
+def serve(application, t0):
+    estados, tiempos = set(), []
+    for i in range(peticiones):
+        environ = {'PATH_INFO': paths[i % len(paths)]}
+        setup_testing_defaults(environ)
+        respuesta = application(environ, lambda status, headers: estados.add(int(status.split()[0])))
+        b''.join(respuesta)
+        respuesta.close()
+        tiempos.append((time.perf_counter() - t0) * 1000)
+    return sorted(estados), tiempos
+
+def memory(pid):
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as fichero:
+            valores = {linea.split(':')[0]: int(linea.split()[1]) for linea in fichero if linea.strip().endswith('kB')}
+    except OSError:
+        return {}
+    return {
+        'rss_kb': valores['Rss'],
+        'pss_kb': valores['Pss'],
+        'uss_kb': valores['Private_Clean'] + valores['Private_Dirty'],
+    }
+
+hijos = []
+for _ in range(workers):
+    lectura, escritura = os.pipe()
+    seguir_lectura, seguir_escritura = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(lectura)
+        os.close(seguir_escritura)
+        for _, otra_lectura, otra_escritura in hijos:  # Inherited ends of the workers forked before.
+            os.close(otra_lectura)
+            os.close(otra_escritura)
+        t0 = time.perf_counter()
+        if modo == 'load_in_worker':
+            from skillswap.wsgi import application
+        estados, tiempos = serve(application, t0)
+        gc.collect()
+        os.write(escritura, json.dumps({
+            'first_response_ms': tiempos[0], 'requests_ms': tiempos[-1] - tiempos[0], 'statuses': estados,
+        }).encode())
+        os.close(escritura)
+        os.read(seguir_lectura, 1)  # Stay alive (sharing pages) until the master has measured every worker.
+        os._exit(0)
+    os.close(escritura)
+    os.close(seguir_lectura)
+    hijos.append((pid, lectura, seguir_escritura))
+
+resultados = []
+for pid, lectura, _ in hijos:
+    with os.fdopen(lectura) as fichero:
+        resultados.append(json.loads(fichero.read()))
+for (pid, _, _), resultado in zip(hijos, resultados):
+    resultado.update(memory(pid))
+for pid, _, seguir in hijos:
+    os.close(seguir)
+    os.waitpid(pid, 0)
+print(json.dumps({'master': memory(os.getpid()), 'workers': resultados}))
+"""
+
+
+def run(snippet, settings, *args):
+    """
+    Runs a snippet in a fresh interpreter and returns the numbers it prints.
+
+    Args:
+        snippet (str): Python code to run.
+        settings (str): DJANGO_SETTINGS_MODULE to use.
+        *args (str): Arguments of the snippet (sys.argv[1:]).
+
+    Returns:
+        list[float]: Printed values (milliseconds).
+    """
+    return [float(valor) for valor in _python(['-c', snippet, *args], settings).stdout.split()]
+
+
+def _python(argumentos, settings):
+    """
+    Runs a fresh interpreter with some arguments, in the project directory.
+
+    Returns:
+        subprocess.CompletedProcess: Finished process, with its output.
+    """
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings, PYTHONDONTWRITEBYTECODE='1')
+    env.setdefault('DJANGO_ALLOWED_HOSTS', '127.0.0.1')  # skillswap.settings_production, for the test requests.
+    return subprocess.run([sys.executable, *argumentos], cwd=BASE_DIR, env=env, check=True, capture_output=True, text=True)
+
+
+def import_times(settings, top):
+    """
+    Imports the WSGI entry point with -X importtime and summarizes where the time goes.
+
+    Args:
+        settings (str): DJANGO_SETTINGS_MODULE to use.
+        top (int): Slowest modules to report.
+
+    Returns:
+        dict: Total milliseconds, modules imported, slowest modules and milliseconds per package.
+    """
+    salida = _python(['-X', 'importtime', '-c', 'import skillswap.wsgi'], settings).stderr
+    modulos = []  # (name, own microseconds, cumulative microseconds)
+    for linea in salida.splitlines():
+        if not linea.startswith('import time:') or 'self [us]' in linea:
+            continue
+        propio, acumulado, nombre = linea[len('import time:'):].split('|')
+        modulos.append((nombre.strip(), int(propio), int(acumulado)))
+
+    paquetes = defaultdict(int)
+    for nombre, propio, _ in modulos:
+        partes = nombre.split('.')
+        paquetes['.'.join(partes[:3] if partes[:2] == ['django', 'contrib'] else partes[:2])] += propio
+    return {
+        'total_ms': round(next(acumulado for nombre, _, acumulado in modulos if nombre == 'skillswap.wsgi') / 1000, 1),
+        'modules': len(modulos),
+        'slowest_modules_ms': {
+            nombre: round(propio / 1000, 1) for nombre, propio, _ in sorted(modulos, key=lambda modulo: -modulo[1])[:top]
+        },
+        'packages_ms': {
+            nombre: round(propio / 1000, 1) for nombre, propio in sorted(paquetes.items(), key=lambda paquete: -paquete[1])[:top]
+        },
+    }
+
+
+def worker_memory(settings, modo, workers, peticiones, paths):
+    """
+    Forks some workers that serve requests, and measures their time to the first response and their memory.
+
+    Args:
+        settings (str): DJANGO_SETTINGS_MODULE to use.
+        modo (str): 'load_in_worker', 'preload_unfrozen' or 'preload'.
+        workers (int): Workers forked.
+        peticiones (int): Requests served by each worker before measuring it.
+        paths (list[str]): Paths requested, in turns.
+
+    Returns:
+        dict: Medians per worker (KiB, and milliseconds from the fork to the first response and for the rest of the
+        requests), total PSS of the master and the workers, and the statuses
+        of the responses.
+    """
+    resultado = json.loads(_python(['-c', WORKERS_SNIPPET, modo, str(workers), str(peticiones), *paths], settings).stdout)
+    procesos = resultado['workers']
+    resumen = {
+        'first_response_ms': round(statistics.median(proceso['first_response_ms'] for proceso in procesos), 1),
+        'other_requests_ms': round(statistics.median(proceso['requests_ms'] for proceso in procesos), 1),
+        'statuses': sorted({estado for proceso in procesos for estado in proceso['statuses']}),
+    }
+    if 'pss_kb' in procesos[0]:
+        for clave in ('rss_kb', 'pss_kb', 'uss_kb'):
+            resumen[f'worker_{clave}'] = statistics.median(proceso[clave] for proceso in procesos)
+        resumen['master_rss_kb'] = resultado['master']['rss_kb']
+        resumen['total_pss_kb'] = resultado['master']['pss_kb'] + sum(proceso['pss_kb'] for proceso in procesos)
+    return resumen
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10, help='Fresh interpreters per measurement.')
+    parser.add_argument('--settings', default='skillswap.settings', help='Settings module to benchmark.')
+    parser.add_argument('--top', type=int, default=15, help='Slowest modules and packages reported by importtime.')
+    parser.add_argument('--workers', type=int, default=4, help='Workers forked per loading mode.')
+    parser.add_argument('--requests', type=int, default=50, help='Requests served by each worker before measuring it.')
+    parser.add_argument('--paths', nargs='+', default=['/api/startup-benchmark/'], help='Paths requested by the workers.')
+    args = parser.parse_args()
+
+    setup, choices, core_models, eager_setup, eager = [], [], [], [], []
+    for _ in range(args.runs):
+        setup_ms, choices_ms = run(SETUP_SNIPPET, args.settings)
+        setup.append(setup_ms)
+        choices.append(choices_ms)
+        core_models.append(run(MODELS_SNIPPET, args.settings)[0])
+        eager_setup_ms, eager_ms = run(EAGER_SNIPPET, args.settings)
+        eager_setup.append(eager_setup_ms)
+        eager.append(eager_ms)
+
+    resultado = {
+        'settings': args.settings,
+        'runs': args.runs,
+        'django_setup_ms': statistics.median(setup),
+        'import_core_models_ms': statistics.median(core_models),
+        'first_timezone_choices_ms': statistics.median(choices),
+        # Before: django.setup() with the timezone list built while importing core.models, as the old code did.
+        'django_setup_before_ms': statistics.median(eager_setup),
+        'eager_timezone_choices_ms': statistics.median(eager),
+        'importtime': import_times(args.settings, args.top),
+        'workers': {
+            modo: worker_memory(args.settings, modo, args.workers, args.requests, args.paths)
+            for modo in ('load_in_worker', 'preload_unfrozen', 'preload')
+        },
+    }
+    print(json.dumps(resultado, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,383 @@
+"""
+Benchmark suite of the hot paths of SkillSwap.
+
+Fills a fresh test database with deterministic synthetic data (benchmarks.generators) and measures every scenario:
+
+    - feed, feed_deep: first page of the feed, and a page 50 pages deep (keyset cursor).
+    - profile, agreement_detail: JSON API pages, through the test client (middleware included).
+    - session_creation: scheduling every session of an ongoing agreement (core.scheduling.schedule_sessions()).
+    - clean_acuerdo, clean_sesion, clean_perfil: the clean() methods of the models, on freshly loaded instances.
+    - admin_changelist:<model>: the admin changelist of every registered core model, as a superuser.
+
+For each one it reports the latency (mean, p50, p95, p99 in milliseconds), the queries per call (max, and the
+repeated query shapes of the slowest call) and the peak Python memory allocated by one call (tracemalloc).
+
+The results are JSON. --compare reads two result files and reports the scenarios that got slower (p95 beyond
+--threshold), run more queries or allocate more memory, and exits with status 1 if any did, so it can gate CI.
+
+Usage:
+    python -m benchmarks.suite [--rows 10000] [--seed 0] [--repeat 50] [--only feed agreement_detail] [--output base.json]
+    python -m benchmarks.suite --compare base.json new.json [--threshold 0.15]
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from itertools import cycle
+from pathlib import Path
+
+from benchmarks.common import percentiles, setup_django, test_database
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+CALENTAMIENTO = 2
+PAGINAS_FEED = 50
+
+ESCENARIOS = {}
+
+
+def scenario(nombre):
+    """
+    Registers a scenario.
+
+    The decorated function receives the Contexto and returns the function to measure (no arguments), so its
+    setup isn't measured. It may return None to skip the scenario (e.g. nothing to measure in this database).
+    """
+    def registrar(funcion):
+        ESCENARIOS[nombre] = funcion
+        return funcion
+    return registrar
+
+
+class Contexto:
+    """
+    Shared state of the scenarios: the test clients and the ids they use.
+
+    Attributes:
+        repeat (int): Measured calls per scenario.
+        llamadas (int): Calls each scenario needs data for (warm-up, measured and memory calls).
+    """
+
+    def __init__(self, repeat):
+        from django.test import Client
+
+        from core.models import Usuario
+
+        self.repeat = repeat
+        self.llamadas = repeat + CALENTAMIENTO + 1
+        self.cliente = Client()
+        self.admin = Client()
+        self.admin.force_login(Usuario.objects.create_superuser(
+            username='benchmark', nombre='Benchmark', alias='benchmark', email='benchmark@example.com', password='!',
+        ))
+
+    def get(self, cliente, url, **parametros):
+        """
+        GETs a URL and returns the response, failing the scenario on anything but 200.
+        """
+        respuesta = cliente.get(url, parametros)
+        if respuesta.status_code != 200:
+            raise RuntimeError(f'GET {url} returned {respuesta.status_code}')
+        return respuesta
+
+
+@scenario('feed')
+def feed(contexto):
+    from django.urls import reverse
+
+    url = reverse('core:feed')
+    return lambda: contexto.get(contexto.cliente, url)
+
+
+@scenario('feed_deep')
+def feed_deep(contexto):
+    from django.urls import reverse
+
+    url = reverse('core:feed')
+    cursor = None
+    for _ in range(PAGINAS_FEED):
+        siguiente = contexto.get(contexto.cliente, url, **({'cursor': cursor} if cursor else {})).json()['siguiente']
+        if siguiente is None:
+            break
+        cursor = siguiente
+    return lambda: contexto.get(contexto.cliente, url, **({'cursor': cursor} if cursor else {}))
+
+
+@scenario('profile')
+def profile(contexto):
+    from django.urls import reverse
+
+    from core.models import Perfil
+
+    urls = cycle([
+        reverse('core:profile', args=[usuario_id])
+        for usuario_id in Perfil.objects.order_by('?').values_list('usuario_id', flat=True)[:contexto.llamadas]
+    ])
+    return lambda: contexto.get(contexto.cliente, next(urls))
+
+
+@scenario('agreement_detail')
+def agreement_detail(contexto):
+    from django.test import Client
+    from django.urls import reverse
+
+    from core.models import Acuerdo
+
+    acuerdo = Acuerdo.objects.filter(estado='EN CURSO', sesion__isnull=False, usuario_a__is_active=True).select_related('usuario_a').order_by('id').first()
+    if acuerdo is None:
+        return None
+    cliente = Client()
+    cliente.force_login(acuerdo.usuario_a)
+    url = reverse('core:agreement_detail', args=[acuerdo.pk])
+    return lambda: contexto.get(cliente, url)
+
+
+@scenario('session_creation')
+def session_creation(contexto):
+    from core.models import Acuerdo, Habilidad, Usuario
+    from core.scheduling import schedule_sessions
+
+    usuario_a, usuario_b = Usuario.objects.filter(perfil__isnull=False).order_by('id')[:2]
+    habilidades = list(Habilidad.objects.order_by('id').values_list('id', flat=True))
+    parejas = ((a, b) for a in habilidades for b in habilidades if a != b)
+    acuerdos = Acuerdo.objects.bulk_create([
+        Acuerdo(
+            usuario_a=usuario_a, usuario_b=usuario_b, semanas=4, mins_sesion=60, sesiones_por_semana=2,
+            estado='EN CURSO', condiciones='Benchmark', habilidad_tradea_a_id=a, habilidad_tradea_b_id=b,
+        )
+        for (a, b), _ in zip(parejas, range(contexto.llamadas))
+    ])
+    pendientes = iter(Acuerdo.objects.filter(pk__in=[acuerdo.pk for acuerdo in acuerdos]).order_by('id'))
+    return lambda: schedule_sessions(next(pendientes))
+
+
+def _clean(modelo, contexto, **filtros):
+    """
+    Returns a function that calls clean() on a different, freshly loaded instance each time, so the lazy loads
+    clean() triggers are measured too.
+    """
+    instancias = iter(modelo.objects.filter(**filtros).order_by('id')[:contexto.llamadas])
+    return lambda: next(instancias).clean()
+
+
+@scenario('clean_acuerdo')
+def clean_acuerdo(contexto):
+    from core.models import Acuerdo
+
+    return _clean(Acuerdo, contexto)
+
+
+@scenario('clean_sesion')
+def clean_sesion(contexto):
+    from core.models import Sesion
+
+    return _clean(Sesion, contexto, acuerdo__estado='EN CURSO')
+
+
+@scenario('clean_perfil')
+def clean_perfil(contexto):
+    from core.models import Perfil
+
+    return _clean(Perfil, contexto)
+
+
+def admin_changelists():
+    """
+    Registers a scenario per core model registered in the admin.
+    """
+    from django.contrib import admin
+    from django.urls import reverse
+
+    for modelo in admin.site._registry:
+        if modelo._meta.app_label != 'core':
+            continue
+        url = reverse(f'admin:core_{modelo._meta.model_name}_changelist')
+        scenario(f'admin_changelist:{modelo._meta.model_name}')(
+            lambda contexto, url=url: lambda: contexto.get(contexto.admin, url)
+        )
+
+
+def measure_scenario(funcion, repeat):
+    """
+    Measures a scenario.
+
+    Args:
+        funcion (callable): Function to measure.
+        repeat (int): Measured calls.
+
+    Returns:
+        dict: Latency percentiles, queries and peak memory.
+    """
+    from core.instrumentation import track_queries
+
+    for _ in range(CALENTAMIENTO):
+        funcion()
+
+    muestras, consultas, peor = [], [], None
+    for _ in range(repeat):
+        with track_queries() as tracker:
+            inicio = time.perf_counter()
+            funcion()
+            muestras.append((time.perf_counter() - inicio) * 1000)
+        consultas.append(tracker.count)
+        if peor is None or muestras[-1] > peor[0]:
+            peor = (muestras[-1], tracker)
+
+    tracemalloc.start()
+    funcion()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        **{clave: round(valor, 3) for clave, valor in percentiles(muestras).items()},
+        'queries': max(consultas),
+        'queries_min': min(consultas),
+        'duplicates': [{'sql': sql[:200], 'count': veces} for sql, veces in peor[1].duplicates[:3]],
+        'peak_kb': round(pico / 1024, 1),
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(filas, seed, repeat, solo):
+    """
+    Populates a fresh database and measures the scenarios.
+
+    Args:
+        filas (int): Approximate number of rows.
+        seed (int): Random seed of the data.
+        repeat (int): Measured calls per scenario.
+        solo (list[str] | None): Scenarios to run (every one if None).
+
+    Returns:
+        dict: 'meta' (environment and data) and 'scenarios' (results by name).
+    """
+    import logging
+
+    import django
+    from django.db import connection
+
+    from benchmarks.generators import Escala, populate
+
+    # One INFO record per request would flood the output; slow or over budget requests are still logged.
+    logging.getLogger('skillswap.instrumentation').setLevel(logging.WARNING)
+    admin_changelists()
+    desconocidos = set(solo or ()) - set(ESCENARIOS)
+    if desconocidos:
+        raise SystemExit(f"Unknown scenarios: {', '.join(sorted(desconocidos))}. Available: {', '.join(ESCENARIOS)}")
+
+    with test_database():
+        inicio = time.perf_counter()
+        creadas = populate(Escala.from_rows(filas), seed)
+        meta = {
+            'rows': creadas,
+            'requested_rows': filas,
+            'seed': seed,
+            'repeat': repeat,
+            'populate_s': round(time.perf_counter() - inicio, 2),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'commit': _git_commit(),
+            'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        }
+
+        contexto = Contexto(repeat)
+        resultados = {}
+        for nombre, preparar in ESCENARIOS.items():
+            if solo and nombre not in solo:
+                continue
+            funcion = preparar(contexto)
+            if funcion is not None:
+                resultados[nombre] = measure_scenario(funcion, repeat)
+    return {'meta': meta, 'scenarios': resultados}
+
+
+def compare(base, nuevo, umbral, umbral_memoria, margen_ms):
+    """
+    Compares two result files.
+
+    A scenario regresses if its p95 grew more than ``umbral`` (and more than ``margen_ms``, so sub-millisecond noise
+    isn't flagged), if it runs more queries, or if its peak memory grew more than ``umbral_memoria``.
+
+    Args:
+        base (dict): Reference results.
+        nuevo (dict): Results to check.
+        umbral (float): Allowed relative p95 growth (0.15 = 15%).
+        umbral_memoria (float): Allowed relative peak memory growth.
+        margen_ms (float): Latency growth always allowed, in milliseconds.
+
+    Returns:
+        dict: 'regressions', 'improvements', 'missing' and 'warnings'.
+    """
+    informe = {'regressions': [], 'improvements': [], 'missing': [], 'warnings': []}
+    for clave in ('rows', 'seed', 'database'):
+        if base['meta'].get(clave) != nuevo['meta'].get(clave):
+            informe['warnings'].append(f"Different {clave}: {base['meta'].get(clave)} vs {nuevo['meta'].get(clave)}")
+
+    for nombre, antes in base['scenarios'].items():
+        despues = nuevo['scenarios'].get(nombre)
+        if despues is None:
+            informe['missing'].append(nombre)
+            continue
+
+        cambios = {
+            'p95': (antes['p95'], despues['p95']),
+            'queries': (antes['queries'], despues['queries']),
+            'peak_kb': (antes['peak_kb'], despues['peak_kb']),
+        }
+        peor = (
+            despues['p95'] > antes['p95'] * (1 + umbral) and despues['p95'] - antes['p95'] > margen_ms
+            or despues['queries'] > antes['queries']
+            or despues['peak_kb'] > antes['peak_kb'] * (1 + umbral_memoria)
+        )
+        mejor = (
+            despues['p95'] < antes['p95'] * (1 - umbral) and antes['p95'] - despues['p95'] > margen_ms
+            or despues['queries'] < antes['queries']
+        )
+        if peor:
+            informe['regressions'].append({'scenario': nombre, **cambios})
+        elif mejor:
+            informe['improvements'].append({'scenario': nombre, **cambios})
+    return informe
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10000, help='Approximate number of rows of synthetic data (10k to 1M).')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed of the synthetic data.')
+    parser.add_argument('--repeat', type=int, default=50, help='Measured calls per scenario.')
+    parser.add_argument('--only', nargs='+', metavar='SCENARIO', help='Scenarios to run (all by default).')
+    parser.add_argument('--output', help='File to write the results to (stdout by default).')
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'NEW'), help='Compare two result files instead of running.')
+    parser.add_argument('--threshold', type=float, default=0.15, help='Allowed p95 latency growth when comparing (0.15 = 15%%).')
+    parser.add_argument('--memory-threshold', type=float, default=0.25, help='Allowed peak memory growth when comparing.')
+    parser.add_argument('--min-delta-ms', type=float, default=0.5, help='Latency growth always allowed when comparing, in ms.')
+    args = parser.parse_args()
+
+    if args.compare:
+        base, nuevo = (json.loads(Path(ruta).read_text()) for ruta in args.compare)
+        informe = compare(base, nuevo, args.threshold, args.memory_threshold, args.min_delta_ms)
+        print(json.dumps(informe, indent=2))
+        sys.exit(1 if informe['regressions'] else 0)
+
+    setup_django()
+    salida = json.dumps(run(args.rows, args.seed, args.repeat, args.only), indent=2)
+    if args.output:
+        Path(args.output).write_text(salida + '\n')
+    else:
+        print(salida)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+"""
+Stress test of the agreement state machine (core.transitions).
+
+Many threads fire conflicting transitions at the same agreements at the same time, all expecting the same current
+state (accept vs cancel a proposal, then start, then finish vs cancel), and the results are checked:
+
+    - Exactly one thread wins each contested step.
+    - The final state of every agreement is one the winners agree on.
+    - Each finished agreement was counted once in the counters of its users.
+    - acuerdo_transitioned was sent once per successful transition.
+
+Exits with status 1 if any check fails.
+
+Usage:
+    python -m benchmarks.transitions_stress [--threads 16] [--agreements 20]
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from collections import Counter
+
+from benchmarks.common import setup_django, test_database
+
+
+def populate(total):
+    """
+    Creates ``total`` proposed agreements between different pairs of users.
+
+    Args:
+        total (int): Number of agreements.
+
+    Returns:
+        list[int]: Agreement ids.
+    """
+    from core.models import Acuerdo, Habilidad, Usuario
+
+    habilidades = [Habilidad.objects.create(nombre=f'Habilidad {i}', categoria='Software') for i in range(2)]
+    usuarios = [
+        Usuario.objects.create(username=f'user{i}', nombre=f'Usuario {i}', alias=f'u{i}', email=f'u{i}@example.com')
+        for i in range(total * 2)
+    ]
+    return [
+        Acuerdo.objects.create(
+            usuario_a=usuarios[2 * i], usuario_b=usuarios[2 * i + 1], habilidad_tradea_a=habilidades[0],
+            habilidad_tradea_b=habilidades[1], condiciones='Stress',
+        ).pk
+        for i in range(total)
+    ]
+
+
+def contend(acuerdo_ids, origen, destinos, hilos):
+    """
+    Makes ``hilos`` threads fire a transition at every agreement at the same time, all of them expecting it to be in
+    the same state (like users clicking on the same page).
+
+    Thread i asks for destinos[i % len(destinos)].
+
+    Args:
+        acuerdo_ids (list[int]): Agreements.
+        origen (str): Expected current state.
+        destinos (tuple[str]): Competing target states.
+        hilos (int): Number of threads.
+
+    Returns:
+        tuple[dict, int]: {acuerdo_id: [winning target states]} and number of database errors.
+    """
+    from django.db import OperationalError, connections
+
+    from core import transitions
+
+    ganadores = {pk: [] for pk in acuerdo_ids}
+    errores = []
+    lock = threading.Lock()
+    barrera = threading.Barrier(hilos)
+
+    def disparar(i):
+        destino = destinos[i % len(destinos)]
+        fallos = 0
+        barrera.wait()
+        for pk in acuerdo_ids:
+            try:
+                if transitions.transition(pk, destino, origen):
+                    with lock:
+                        ganadores[pk].append(destino)
+            except OperationalError:
+                fallos += 1
+        connections.close_all()
+        with lock:
+            errores.append(fallos)
+
+    threads = [threading.Thread(target=disparar, args=(i,)) for i in range(hilos)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return ganadores, sum(errores)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=16, help='Concurrent threads.')
+    parser.add_argument('--agreements', type=int, default=20, help='Contested agreements.')
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.db import connections
+
+    from core.models import Acuerdo, EstadisticasUsuario
+    from core.transitions import acuerdo_transitioned
+
+    eventos = Counter()
+    acuerdo_transitioned.connect(
+        lambda sender, acuerdo_ids, origen, destino, **kwargs: eventos.update({destino: len(acuerdo_ids)}), weak=False,
+    )
+
+    with test_database():
+        ids = populate(args.agreements)
+        connections.close_all()
+
+        inicio = time.perf_counter()
+        pasos = [('PROPUESTO', ('ACEPTADO', 'CANCELADO')), ('ACEPTADO', ('EN CURSO',)), ('EN CURSO', ('FINALIZADO', 'CANCELADO'))]
+        resultados, errores, fallos = [], 0, []
+        for origen, destinos in pasos:
+            ganadores, errores_paso = contend(ids, origen, destinos, args.threads)
+            errores += errores_paso
+            resultados.append(ganadores)
+            repetidos = [pk for pk, ganes in ganadores.items() if len(ganes) > 1]
+            if repetidos:
+                fallos.append(f'{destinos}: more than one winner for {repetidos}')
+        segundos = time.perf_counter() - inicio
+
+        # The last winner of each agreement (if any) is its final state.
+        esperado = {pk: 'PROPUESTO' for pk in ids}
+        for ganadores in resultados:
+            for pk, ganes in ganadores.items():
+                if ganes:
+                    esperado[pk] = ganes[0]
+        finales = dict(Acuerdo.objects.filter(pk__in=ids).values_list('pk', 'estado'))
+        if finales != esperado:
+            fallos.append(f'final states {finales} != winners {esperado}')
+
+        finalizados = sum(estado == 'FINALIZADO' for estado in finales.values())
+        contados = sum(EstadisticasUsuario.objects.values_list('acuerdos_finalizados', flat=True))
+        if contados != finalizados * 2:
+            fallos.append(f'{contados} finished agreements counted for {finalizados * 2} user slots')
+
+        transiciones = sum(len(ganes) for ganadores in resultados for ganes in ganadores.values())
+        if sum(eventos.values()) != transiciones:
+            fallos.append(f'{sum(eventos.values())} events for {transiciones} transitions')
+
+    print(json.dumps({
+        'threads': args.threads,
+        'agreements': args.agreements,
+        'transitions': transiciones,
+        'final_states': dict(Counter(finales.values())),
+        'database_errors': errores,
+        'seconds': round(segundos, 3),
+        'failures': fallos,
+    }, indent=2))
+    sys.exit(1 if fallos else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,208 @@
-from django.contrib import admin
+"""
+Admin of SkillSwap.
 
-# Register your models here.
+The changelists are built for tables with millions of rows (ScalableAdminMixin):
+
+    - Pages are numbered without a COUNT(*) of the whole table (EstimatedCountPaginator, show_full_result_count off).
+    - The columns that show related objects are joined (list_select_related), never loaded one per row.
+    - Foreign keys are edited with autocomplete or raw id widgets instead of a dropdown with every row.
+    - Searches are prefix matches written as index range comparisons (alias >= 'pac' AND alias < 'pad'), and posts
+      are searched through the full-text index (core.search).
+    - Date hierarchies and default orderings are backed by indexes (see core.templatetags.core_admin).
+    - Each changelist declares a query budget, checked by QueryInstrumentationMiddleware like the API views.
+
+Agreements change state through core.transitions (the bulk actions run one conditional UPDATE per source state),
+and post actions keep the matchmaking index in sync.
+"""
+from django.contrib import admin, messages
+from django.contrib.auth.admin import UserAdmin
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import matching, search, transitions
+from .models import Acuerdo, Habilidad, Perfil, Publicacion, Sesion, Usuario
+from .pagination import EstimatedCountPaginator
+
+
+def prefix_filter(campos, termino):
+    """
+    Returns the filter of the rows where any of some fields starts with a term, as index range comparisons.
+
+    ``campo >= 'pac' AND campo < 'pad'`` is a B-tree range scan on every database, while LIKE 'pac%' only uses an
+    index with some collations. The term is matched as typed, in lowercase and capitalized.
+
+    Args:
+        campos (Iterable[str]): Field names (lookups through relations allowed, e.g. 'usuario__alias').
+        termino (str): Prefix.
+
+    Returns:
+        Q: Filter.
+
+    Example:
+        >>> Usuario.objects.filter(prefix_filter(['alias', 'nombre'], 'pac'))
+    """
+    filtro = Q()
+    for variante in {termino, termino.lower(), termino.capitalize()}:
+        siguiente = variante[:-1] + chr(ord(variante[-1]) + 1)
+        for campo in campos:
+            filtro |= Q(**{f'{campo}__gte': variante, f'{campo}__lt': siguiente})
+    return filtro
+
+
+class ScalableAdminMixin:
+    """
+    Changelist defaults for big tables. See the module docstring.
+
+    Attributes:
+        changelist_query_budget (int | None): Max queries of a changelist page. 6 by default: the session, the
+            user, their preferences (cold cache), the count (estimate, then bounded count) and the page.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+    ordering = ('-id',)
+    changelist_query_budget = 6
+
+    def get_urls(self):
+        urls = super().get_urls()
+        nombre = f'{self.opts.app_label}_{self.opts.model_name}_changelist'
+        for url in urls:
+            if url.name == nombre:
+                url.callback.query_budget = self.changelist_query_budget  # Read by QueryInstrumentationMiddleware
+        return urls
+
+    def changelist_view(self, request, extra_context=None):
+        tracker = getattr(request, '_query_tracker', None)  # Set by QueryInstrumentationMiddleware
+        if tracker is not None and request.method == 'POST':
+            tracker.budget = None  # The budget is for the page; actions (POST) run their own writes.
+        return super().changelist_view(request, extra_context)
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Matches every word of the search as a prefix of any of the search_fields (see prefix_filter()).
+        """
+        terminos = search_term.split()
+        if not terminos or not self.search_fields:
+            return queryset, False
+        for termino in terminos:
+            queryset = queryset.filter(prefix_filter(self.search_fields, termino))
+        return queryset, False
+
+
+@admin.register(Habilidad)
+class HabilidadAdmin(ScalableAdminMixin, admin.ModelAdmin):
+    list_display = ('nombre', 'categoria', 'estado')
+    list_filter = ('estado',)
+    search_fields = ('nombre',)
+    ordering = ('nombre',)
+
+
+@admin.register(Usuario)
+class UsuarioAdmin(ScalableAdminMixin, UserAdmin):
+    list_display = ('alias', 'nombre', 'email', 'is_active', 'is_staff')
+    list_filter = ('is_active', 'is_staff', 'is_superuser')  # Not groups: its filter lists every group.
+    search_fields = ('alias', 'nombre')  # Backed by the alias unique index and usuario_nombre_idx.
+    ordering = ('alias',)
+    fieldsets = (
+        (None, {'fields': ('username', 'password')}),
+        ('SkillSwap', {'fields': ('nombre', 'alias', 'email')}),
+        ('Permisos', {'fields': ('is_active', 'is_staff', 'is_superuser', 'groups', 'user_permissions')}),
+        ('Fechas', {'fields': ('last_login', 'date_joined')}),
+    )
+    add_fieldsets = (
+        (None, {'classes': ('wide',), 'fields': ('username', 'nombre', 'alias', 'email', 'password1', 'password2')}),
+    )
+
+
+@admin.register(Perfil)
+class PerfilAdmin(ScalableAdminMixin, admin.ModelAdmin):
+    list_display = ('id', 'usuario', 'zona', 'idioma')
+    list_select_related = ('usuario',)
+    search_fields = ('usuario__alias',)
+    autocomplete_fields = ('usuario', 'habilidades')
+    readonly_fields = ('idioma',)
+
+    @admin.display(description='zona horaria', ordering='zona_horaria')
+    def zona(self, perfil):
+        return perfil.zona_horaria  # The stored name: the column would rebuild the ~600 timezone choices per row.
+
+
+@admin.register(Publicacion)
+class PublicacionAdmin(ScalableAdminMixin, admin.ModelAdmin):
+    list_display = ('id', 'tipo', 'autor', 'habilidad', 'estado', 'fecha_creacion')
+    list_select_related = ('autor', 'habilidad')
+    list_filter = ('tipo', 'estado')
+    search_fields = ('descripcion',)
+    date_hierarchy = 'fecha_creacion'
+    ordering = ('-fecha_creacion', '-id')
+    autocomplete_fields = ('autor', 'habilidad')
+    actions = ('deactivate_posts', 'activate_posts')
+    changelist_query_budget = 8  # The default, plus the date hierarchy (2)
+
+    MAX_RESULTADOS = 1000
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Searches the descriptions through the full-text index (core.search), up to MAX_RESULTADOS posts.
+        """
+        if not search_term.strip():
+            return queryset, False
+        filas = search.get_backend().search('publicacion', search_term, queryset, limit=self.MAX_RESULTADOS)
+        return queryset.filter(pk__in=[objeto_id for objeto_id, _ in filas]), False
+
+    def _set_estado(self, request, queryset, estado):
+        """
+        Activates or deactivates some posts with one UPDATE, and refreshes their matchmaking index rows.
+        """
+        cambiar = queryset.exclude(estado=estado)
+        with transaction.atomic():
+            claves = set(cambiar.values_list('autor_id', 'habilidad_id', 'tipo'))
+            total = cambiar.update(estado=estado, fecha_modificacion=timezone.now())
+            for clave in claves:
+                matching.refresh_entry(*clave)
+        self.message_user(request, f"{total} posts {'activated' if estado else 'deactivated'}.", messages.SUCCESS)
+
+    @admin.action(description='Deactivate selected posts')
+    def deactivate_posts(self, request, queryset):
+        self._set_estado(request, queryset, False)
+
+    @admin.action(description='Activate selected posts')
+    def activate_posts(self, request, queryset):
+        self._set_estado(request, queryset, True)
+
+
+@admin.register(Acuerdo)
+class AcuerdoAdmin(ScalableAdminMixin, admin.ModelAdmin):
+    list_display = ('id', 'usuario_a', 'usuario_b', 'habilidad_tradea_a', 'habilidad_tradea_b', 'estado', 'fecha_creacion')
+    list_select_related = ('usuario_a', 'usuario_b', 'habilidad_tradea_a', 'habilidad_tradea_b')
+    list_filter = ('estado',)
+    date_hierarchy = 'fecha_creacion'
+    ordering = ('-fecha_creacion', '-id')
+    autocomplete_fields = ('usuario_a', 'usuario_b', 'habilidad_tradea_a', 'habilidad_tradea_b')
+    readonly_fields = ('estado',)  # Moved by core.transitions (see the actions).
+    actions = ('cancel_agreements',)
+    changelist_query_budget = 8  # The default, plus the date hierarchy (2)
+
+    @admin.action(description='Cancel selected agreements')
+    def cancel_agreements(self, request, queryset):
+        """
+        Cancels the selected agreements that haven't finished, with one conditional UPDATE per source state.
+        """
+        total = transitions.bulk_transition(queryset, 'CANCELADO')
+        self.message_user(request, f'{total} agreements cancelled (finished or cancelled ones are skipped).', messages.SUCCESS)
+
+
+@admin.register(Sesion)
+class SesionAdmin(ScalableAdminMixin, admin.ModelAdmin):
+    list_display = ('id', 'acuerdo', 'usuarios', 'fecha', 'duracion_real', 'asistencia_user_a', 'asistencia_user_b', 'estado')
+    list_select_related = ('acuerdo__usuario_a', 'acuerdo__usuario_b')
+    list_filter = ('estado',)
+    date_hierarchy = 'fecha'
+    ordering = ('-fecha', '-id')
+    raw_id_fields = ('acuerdo',)
+    changelist_query_budget = 8  # The default, plus the date hierarchy (2)
+
+    @admin.display(description='usuarios')
+    def usuarios(self, sesion):
+        return f'{sesion.acuerdo.usuario_a} / {sesion.acuerdo.usuario_b}'
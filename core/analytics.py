@@ -0,0 +1,454 @@
+"""
+Analytics rollups of SkillSwap for the dashboards.
+
+Grouping every session and agreement on each dashboard load doesn't scale with the history, so the aggregates are
+materialized by day and skill category (ResumenSesiones and ResumenAcuerdos, see their docstrings) and dashboard
+ranges are answered from them with a single query, by day, week or month (sessions() and agreements()).
+
+update() keeps the rollups up to date incrementally (update_analytics command, e.g. every few minutes): only the
+days of the rows changed since the last run (fecha_modificacion after the watermark in MarcaAnalitica) and the days
+recorded in DiaPendiente (sessions moved away from a day, deleted rows) are recomputed, whole, from the source
+tables, so running it twice is harmless. The watermark stays LAG_SECONDS behind the clock: a transaction still open
+when a run starts commits rows with an older fecha_modificacion, which the next run would otherwise skip.
+
+backfill() recomputes the whole history (or a date range), split into partitions of BATCH_DAYS days processed in
+parallel, e.g. the first time or after renaming a skill category.
+
+Settings (ANALYTICS): LAG_SECONDS, BATCH_DAYS and WORKERS (see DEFAULTS).
+"""
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .models import Acuerdo, DiaPendiente, MarcaAnalitica, ResumenAcuerdos, ResumenSesiones, Sesion
+
+DEFAULTS = {
+    'LAG_SECONDS': 60,
+    'BATCH_DAYS': 31,
+    'WORKERS': 4,
+}
+
+PERIODOS = {
+    'dia': None,
+    'semana': TruncWeek,  # Weeks start on Monday
+    'mes': TruncMonth,
+}
+
+ESTADOS = {
+    'PROPUESTO': 'propuestos',
+    'ACEPTADO': 'aceptados',
+    'EN CURSO': 'en_curso',
+    'FINALIZADO': 'finalizados',
+    'CANCELADO': 'cancelados',
+}
+
+
+def get_setting(nombre):
+    """
+    Returns an ANALYTICS setting.
+
+    Args:
+        nombre (str): Setting key (e.g. 'LAG_SECONDS').
+
+    Returns:
+        Any: Value from settings.ANALYTICS or its default.
+    """
+    return getattr(settings, 'ANALYTICS', {}).get(nombre, DEFAULTS[nombre])
+
+
+def _categories(categoria_a, categoria_b):
+    """
+    Returns the rollup rows a row of two skills counts for: their categories (once each) and the totals ('').
+    """
+    return {'', categoria_a, categoria_b}
+
+
+def _session_days(desde, hasta):
+    """
+    Returns the days of the sessions changed in (desde, hasta].
+    """
+    return (
+        Sesion.objects.filter(fecha_modificacion__gt=desde, fecha_modificacion__lte=hasta)
+        .values_list('fecha', flat=True).distinct().order_by()
+    )
+
+
+def _session_span():
+    """
+    Returns the first and last days with sessions (None if there are none).
+    """
+    primera = Sesion.objects.order_by('fecha').values_list('fecha', flat=True).first()
+    ultima = Sesion.objects.order_by('-fecha').values_list('fecha', flat=True).first()
+    return (primera, ultima) if primera is not None else None
+
+
+def _session_rollup(dias):
+    """
+    Aggregates the sessions of some days, with one query.
+
+    Args:
+        dias (list[date]): Days.
+
+    Returns:
+        list[ResumenSesiones]: Unsaved rollup rows.
+    """
+    celebrada = Q(asistencia_user_a=True) | Q(asistencia_user_b=True)
+    filas = (
+        Sesion.objects.filter(fecha__in=dias)
+        .values(
+            'fecha',
+            categoria_a=F('acuerdo__habilidad_tradea_a__categoria'),
+            categoria_b=F('acuerdo__habilidad_tradea_b__categoria'),
+        )
+        .annotate(
+            programadas=Count('id'),
+            celebradas=Count('id', filter=celebrada),
+            asistencias_a=Count('id', filter=Q(asistencia_user_a=True)),
+            asistencias_b=Count('id', filter=Q(asistencia_user_b=True)),
+            minutos=Sum('duracion_real', filter=celebrada),
+        )
+        .order_by()
+    )
+    resumen = defaultdict(Counter)
+    for fila in filas:
+        for categoria in _categories(fila['categoria_a'], fila['categoria_b']):
+            contador = resumen[fila['fecha'], categoria]
+            contador['programadas'] += fila['programadas']
+            contador['celebradas'] += fila['celebradas']
+            contador['asistencias'] += fila['asistencias_a'] + fila['asistencias_b']
+            contador['minutos'] += fila['minutos'] or 0
+    return [ResumenSesiones(fecha=fecha, categoria=categoria, **contador) for (fecha, categoria), contador in resumen.items()]
+
+
+def _agreement_days(desde, hasta):
+    """
+    Returns the days (in the current timezone) the agreements changed in (desde, hasta] were proposed.
+    """
+    return (
+        Acuerdo.objects.filter(fecha_modificacion__gt=desde, fecha_modificacion__lte=hasta)
+        .values_list(TruncDate('fecha_creacion'), flat=True).distinct().order_by()
+    )
+
+
+def _agreement_span():
+    """
+    Returns the first and last days agreements were proposed (None if there are none).
+    """
+    primera = Acuerdo.objects.order_by('fecha_creacion').values_list('fecha_creacion', flat=True).first()
+    ultima = Acuerdo.objects.order_by('-fecha_creacion').values_list('fecha_creacion', flat=True).first()
+    return (timezone.localdate(primera), timezone.localdate(ultima)) if primera is not None else None
+
+
+def _agreement_rollup(dias):
+    """
+    Aggregates the agreements proposed on some days, with one query.
+
+    Args:
+        dias (list[date]): Days.
+
+    Returns:
+        list[ResumenAcuerdos]: Unsaved rollup rows.
+    """
+    inicio = timezone.make_aware(datetime.combine(min(dias), time.min))
+    fin = timezone.make_aware(datetime.combine(max(dias) + timedelta(days=1), time.min))
+    filas = (
+        Acuerdo.objects
+        .filter(fecha_creacion__gte=inicio, fecha_creacion__lt=fin)  # Range scan of acuerdo_fecha_idx
+        .filter(fecha_creacion__date__in=dias)
+        .values(
+            'estado',
+            fecha=TruncDate('fecha_creacion'),
+            categoria_a=F('habilidad_tradea_a__categoria'),
+            categoria_b=F('habilidad_tradea_b__categoria'),
+        )
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+    resumen = defaultdict(Counter)
+    for fila in filas:
+        for categoria in _categories(fila['categoria_a'], fila['categoria_b']):
+            resumen[fila['fecha'], categoria][ESTADOS[fila['estado']]] += fila['total']
+    return [ResumenAcuerdos(fecha=fecha, categoria=categoria, **contador) for (fecha, categoria), contador in resumen.items()]
+
+
+@dataclass(frozen=True)
+class Rollup:
+    """
+    A rollup table and how it's computed.
+
+    Attributes:
+        modelo (type): Rollup model.
+        dias (callable): Returns the days of the source rows changed in a (desde, hasta] range.
+        periodo (callable): Returns the first and last days of the source rows, or None.
+        calcular (callable): Returns the unsaved rollup rows of some days.
+    """
+    modelo: type
+    dias: object
+    periodo: object
+    calcular: object
+
+
+ROLLUPS = {
+    'sesiones': Rollup(ResumenSesiones, _session_days, _session_span, _session_rollup),
+    'acuerdos': Rollup(ResumenAcuerdos, _agreement_days, _agreement_span, _agreement_rollup),
+}
+
+
+def mark_stale(tabla, dias):
+    """
+    Records days whose rollup must be recomputed by the next update() (see DiaPendiente).
+
+    Args:
+        tabla (str): Rollup ('sesiones' or 'acuerdos').
+        dias (Iterable[date]): Days.
+    """
+    DiaPendiente.objects.bulk_create([DiaPendiente(tabla=tabla, fecha=dia) for dia in set(dias)])
+
+
+def _recompute(nombre, dias, pendientes=()):
+    """
+    Replaces the rollup rows of some days with fresh ones.
+
+    The source rows are read before the transaction, which only deletes and inserts rollup rows (and the pending
+    days that were read before, see DiaPendiente).
+
+    Args:
+        nombre (str): Rollup (see ROLLUPS).
+        dias (list[date]): Days.
+        pendientes (Iterable[int]): DiaPendiente rows to delete with them.
+
+    Returns:
+        int: Rollup rows written.
+    """
+    rollup = ROLLUPS[nombre]
+    filas = rollup.calcular(dias)
+    with transaction.atomic():
+        rollup.modelo.objects.filter(fecha__in=dias).delete()
+        rollup.modelo.objects.bulk_create(filas)
+        DiaPendiente.objects.filter(pk__in=list(pendientes)).delete()
+    return len(filas)
+
+
+def _batches(dias, tamano):
+    """
+    Splits a list of days into lists of ``tamano`` days.
+    """
+    dias = iter(dias)
+    while lote := list(islice(dias, tamano)):
+        yield lote
+
+
+def _set_watermark(nombre, marca):
+    MarcaAnalitica.objects.update_or_create(tabla=nombre, defaults={'marca': marca})
+
+
+def update(ahora=None):
+    """
+    Rolls up the rows changed since the last run, and the pending days (see the module docstring).
+
+    A rollup that has never run is backfilled.
+
+    Args:
+        ahora (datetime | None): Current date and time (now by default).
+
+    Returns:
+        dict: Days recomputed per rollup.
+
+    Example:
+        >>> update()
+        {'sesiones': 12, 'acuerdos': 3}
+    """
+    hasta = (ahora or timezone.now()) - timedelta(seconds=get_setting('LAG_SECONDS'))
+    resultado = {}
+    for nombre, rollup in ROLLUPS.items():
+        marca = MarcaAnalitica.objects.filter(tabla=nombre).values_list('marca', flat=True).first()
+        if marca is None:
+            resultado[nombre] = backfill([nombre], ahora=ahora)[nombre]
+            continue
+
+        pendientes = defaultdict(list)
+        for pk, dia in DiaPendiente.objects.filter(tabla=nombre).values_list('pk', 'fecha'):
+            pendientes[dia].append(pk)
+        dias = sorted(set(rollup.dias(marca, hasta)) | pendientes.keys())
+        for lote in _batches(dias, get_setting('BATCH_DAYS')):
+            _recompute(nombre, lote, [pk for dia in lote for pk in pendientes.get(dia, ())])
+        _set_watermark(nombre, hasta)
+        resultado[nombre] = len(dias)
+    return resultado
+
+
+def _recompute_partition(nombre, dias):
+    try:
+        return _recompute(nombre, dias)
+    finally:
+        connections.close_all()  # Each worker thread has its own connections.
+
+
+def backfill(tablas=None, desde=None, hasta=None, workers=None, ahora=None):
+    """
+    Recomputes the rollups of the whole history, or of a date range, in parallel partitions of BATCH_DAYS days.
+
+    A full backfill also deletes the rollup rows outside the history, and sets the watermark, so update() goes on
+    from there. A range backfill leaves the watermark alone.
+
+    Args:
+        tablas (list[str] | None): Rollups (every one by default, see ROLLUPS).
+        desde (date | None): First day (the first day of the history by default).
+        hasta (date | None): Last day (the last day of the history by default).
+        workers (int | None): Partitions processed at the same time (WORKERS by default).
+        ahora (datetime | None): Current date and time (now by default).
+
+    Returns:
+        dict: Days recomputed per rollup.
+    """
+    marca = (ahora or timezone.now()) - timedelta(seconds=get_setting('LAG_SECONDS'))  # Before reading anything
+    completo = desde is None and hasta is None
+    resultado = {}
+    for nombre in tablas or ROLLUPS:
+        rollup = ROLLUPS[nombre]
+        periodo = rollup.periodo()
+        inicio = desde or (periodo[0] if periodo else None)
+        fin = hasta or (periodo[1] if periodo else None)
+
+        dias = [inicio + timedelta(days=n) for n in range((fin - inicio).days + 1)] if inicio and fin else []
+        with ThreadPoolExecutor(max_workers=workers or get_setting('WORKERS')) as pool:
+            list(pool.map(lambda lote: _recompute_partition(nombre, lote), _batches(dias, get_setting('BATCH_DAYS'))))
+
+        if completo:
+            fuera = rollup.modelo.objects.all()
+            if dias:
+                fuera = fuera.exclude(fecha__gte=dias[0], fecha__lte=dias[-1])
+            fuera.delete()
+            _set_watermark(nombre, marca)
+        resultado[nombre] = len(dias)
+    return resultado
+
+
+@dataclass(frozen=True)
+class PuntoSesiones:
+    """
+    Sessions of a period.
+
+    Attributes:
+        inicio (date): First day of the period.
+        programadas (int): Sessions.
+        celebradas (int): Held sessions (at least one user attended).
+        asistencias (int): Attendances (up to 2 per session).
+        minutos (int): Minutes taught.
+    """
+    inicio: object
+    programadas: int
+    celebradas: int
+    asistencias: int
+    minutos: int
+
+    @property
+    def tasa_asistencia(self):
+        """
+        Returns the attendance rate: attendances / places in the sessions (2 each), 0.0 without sessions.
+        """
+        return self.asistencias / (2 * self.programadas) if self.programadas else 0.0
+
+
+@dataclass(frozen=True)
+class PuntoAcuerdos:
+    """
+    Funnel of the agreements proposed in a period, by their current state.
+
+    Attributes:
+        inicio (date): First day of the period.
+        propuestos (int): Still proposed.
+        aceptados (int): Accepted, not started yet.
+        en_curso (int): In progress.
+        finalizados (int): Finished.
+        cancelados (int): Cancelled (at any step).
+    """
+    inicio: object
+    propuestos: int
+    aceptados: int
+    en_curso: int
+    finalizados: int
+    cancelados: int
+
+    @property
+    def total(self):
+        """
+        Returns the number of agreements proposed in the period.
+        """
+        return self.propuestos + self.aceptados + self.en_curso + self.finalizados + self.cancelados
+
+    @property
+    def conversion(self):
+        """
+        Returns the share of the agreements proposed in the period that finished (PROPUESTO → FINALIZADO).
+        """
+        return self.finalizados / self.total if self.total else 0.0
+
+
+def _series(modelo, campos, desde, hasta, periodo, categoria):
+    """
+    Sums some columns of a rollup by period, with one query (a range scan of its unique index).
+    """
+    if periodo not in PERIODOS:
+        raise ValueError(f"Unknown period '{periodo}', choose from: {', '.join(PERIODOS)}")
+    truncar = PERIODOS[periodo]
+    return (
+        modelo.objects.filter(categoria=categoria, fecha__gte=desde, fecha__lte=hasta)
+        .values(inicio=truncar('fecha') if truncar else F('fecha'))
+        .annotate(**{campo: Sum(campo) for campo in campos})
+        .order_by('inicio')
+    )
+
+
+def sessions(desde, hasta, periodo='dia', categoria=''):
+    """
+    Returns the sessions of a date range by period, from the rollup.
+
+    Periods without sessions are left out. The first period may start before ``desde`` (e.g. the Monday of its
+    week), but only the days of the range are counted.
+
+    Args:
+        desde (date): First day.
+        hasta (date): Last day (inclusive).
+        periodo (str): 'dia', 'semana' or 'mes'.
+        categoria (str): Skill category ('' for every category).
+
+    Returns:
+        list[PuntoSesiones]: Periods in date order.
+
+    Raises:
+        ValueError: If the period is unknown.
+
+    Example:
+        >>> [punto.tasa_asistencia for punto in sessions(date(2025, 1, 1), date(2025, 1, 31), 'semana')]
+        [0.81, 0.78, 0.84, 0.8, 0.79]
+    """
+    campos = ('programadas', 'celebradas', 'asistencias', 'minutos')
+    return [PuntoSesiones(**fila) for fila in _series(ResumenSesiones, campos, desde, hasta, periodo, categoria)]
+
+
+def agreements(desde, hasta, periodo='dia', categoria=''):
+    """
+    Returns the funnel of the agreements proposed in a date range by period, from the rollup.
+
+    Args:
+        desde (date): First day.
+        hasta (date): Last day (inclusive).
+        periodo (str): 'dia', 'semana' or 'mes'.
+        categoria (str): Skill category ('' for every category).
+
+    Returns:
+        list[PuntoAcuerdos]: Periods in date order (see sessions()).
+
+    Raises:
+        ValueError: If the period is unknown.
+    """
+    return [PuntoAcuerdos(**fila) for fila in _series(ResumenAcuerdos, ESTADOS.values(), desde, hasta, periodo, categoria)]
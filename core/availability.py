@@ -0,0 +1,296 @@
+"""
+Weekly availability of the users of SkillSwap, as an interval index.
+
+Perfil.disponibilidad is free text ("From Monday to Friday, 8.00 - 22.00", "Mon-Fri 9-17, weekends 10am to 2pm",
+"lunes y miércoles de 18:00 a 21:00, fines de semana 10-14"). It's parsed once, when the profile is saved, into
+weekly intervals in the user's timezone, which are normalized to UTC minutes of the week (0 = Monday 00:00 UTC,
+SEMANA = 7 * 24 * 60), merged, and stored as IntervaloDisponibilidad rows. An interval that crosses the end of the
+week is stored twice, also shifted one week back, so overlaps across Sunday/Monday are found with plain comparisons.
+
+Two intervals overlap by at least ``m`` minutes when min(fin) - max(inicio) >= m, that is, when all four of
+a.fin - a.inicio, a.fin - b.inicio, b.fin - a.inicio and b.fin - b.inicio are >= m. With the user's own intervals
+known, that's an index range scan per interval (overlapping_users()).
+
+The UTC offset of each timezone is the one it has when the profile is saved; after daylight saving time changes,
+run the rebuild_availability_index command to shift the stored intervals.
+
+Example:
+    >>> parse("Lunes a viernes 18:00-21:00, sábados 10-14")
+    [(0, 1080, 1260), (1, 1080, 1260), (2, 1080, 1260), (3, 1080, 1260), (4, 1080, 1260), (5, 600, 840)]
+    >>> overlapping_users(usuario, minutos=60)
+    <QuerySet [12, 57, 301]>
+"""
+import re
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import IntervaloDisponibilidad, Perfil
+from .scheduling import TODOS_LOS_DIAS, DIA_RE, available_weekdays
+from .timezones import get_zone
+
+DIA = 24 * 60
+SEMANA = 7 * DIA
+
+_HORA = r'(\d{1,2})(?:[:.h](\d{2}))?\s*(am|pm|h)?'
+HORAS_RE = re.compile(rf'(?<![\d:.]){_HORA}\s*(?:-|–|to|until|a|hasta)\s*{_HORA}(?![\d:.])', re.IGNORECASE)
+
+
+def _minutes(hora, minuto, sufijo):
+    """
+    Returns the minute of the day of a time, or None if it isn't a valid time.
+    """
+    hora, minuto = int(hora), int(minuto or 0)
+    sufijo = (sufijo or '').lower()
+    if sufijo in ('am', 'pm'):
+        if not 1 <= hora <= 12:
+            return None
+        hora = hora % 12 + (12 if sufijo == 'pm' else 0)
+    if hora > 24 or minuto > 59 or (hora == 24 and minuto):
+        return None
+    return hora * 60 + minuto
+
+
+def parse(disponibilidad):
+    """
+    Parses a free-text availability into weekly intervals, in the user's local time.
+
+    The text is read as a sequence of rules: some days followed by some time ranges ("Monday to Friday, 8.00 -
+    22.00; Saturdays 10-14"). Days without times are whole days, and times without days apply to every day. If
+    nothing is understood, the user is available all week (like scheduling.available_weekdays()).
+
+    Args:
+        disponibilidad (str): Perfil.disponibilidad text.
+
+    Returns:
+        list[tuple[int, int, int]]: (weekday, first minute, last minute) tuples, sorted. The last minute is past 1440
+        for ranges that end after midnight.
+
+    Example:
+        >>> parse("From Monday to Friday, 8.00 - 22.00")
+        [(0, 480, 1320), (1, 480, 1320), (2, 480, 1320), (3, 480, 1320), (4, 480, 1320)]
+    """
+    texto = disponibilidad or ''
+    tokens = sorted(
+        [(m.start(), m.end(), 'dia', None) for m in DIA_RE.finditer(texto)]
+        + [(m.start(), m.end(), 'horas', m.groups()) for m in HORAS_RE.finditer(texto)]
+    )
+
+    # Rules: [first day position, last day position, [(inicio, fin), ...]]
+    reglas = []
+    anterior = None
+    for inicio, fin, tipo, grupos in tokens:
+        if tipo == 'dia':
+            if anterior == 'dia':
+                reglas[-1][1] = fin
+            elif reglas and reglas[-1][0] is None:  # Times written before their days ("9-17 de lunes a viernes").
+                reglas[-1][0:2] = [inicio, fin]
+            else:
+                reglas.append([inicio, fin, []])
+            anterior = tipo
+            continue
+
+        desde, hasta = _minutes(*grupos[:3]), _minutes(*grupos[3:])
+        if desde is None or hasta is None or desde == hasta:
+            continue
+        if hasta < desde:
+            hasta += DIA  # Ends after midnight.
+        if not reglas:
+            reglas.append([None, None, []])
+        reglas[-1][2].append((desde, hasta))
+        anterior = tipo
+
+    intervalos = set()
+    for primero, ultimo, horas in reglas:
+        dias = available_weekdays(texto[primero:ultimo]) if primero is not None else TODOS_LOS_DIAS
+        for dia in dias:
+            intervalos.update((dia, desde, hasta) for desde, hasta in horas or [(0, DIA)])
+    return sorted(intervalos) or [(dia, 0, DIA) for dia in sorted(TODOS_LOS_DIAS)]
+
+
+def _merge(intervalos):
+    """
+    Merges overlapping or touching intervals of the week, including the ones that wrap around its end.
+
+    Args:
+        intervalos (list[tuple[int, int]]): (inicio, fin) with 0 <= inicio < SEMANA and fin > inicio.
+
+    Returns:
+        list[tuple[int, int]]: Disjoint intervals, sorted; the last one may end past SEMANA.
+    """
+    fusionados = []
+    for inicio, fin in sorted(intervalos):
+        if fusionados and inicio <= fusionados[-1][1]:
+            fusionados[-1][1] = max(fusionados[-1][1], fin)
+        else:
+            fusionados.append([inicio, fin])
+
+    # The last interval may run into the next week and over the first ones.
+    while len(fusionados) > 1 and fusionados[-1][1] - SEMANA >= fusionados[0][0]:
+        primero = fusionados.pop(0)
+        fusionados[-1][1] = max(fusionados[-1][1], primero[1] + SEMANA)
+    if fusionados and fusionados[-1][1] - fusionados[-1][0] >= SEMANA:
+        return [(0, 2 * SEMANA)]  # Always available: two weeks, so it contains every interval, wrapping or not.
+    return [tuple(intervalo) for intervalo in fusionados]
+
+
+def weekly_intervals(disponibilidad, zona_horaria, ahora=None):
+    """
+    Returns the availability of a user as merged UTC intervals of the week.
+
+    Args:
+        disponibilidad (str): Perfil.disponibilidad text.
+        zona_horaria (str): Perfil.zona_horaria.
+        ahora (datetime | None): Date whose UTC offset is used, now by default.
+
+    Returns:
+        list[tuple[int, int]]: (inicio, fin) UTC minutes of the week; the last one may end past SEMANA.
+    """
+    offset = get_zone(zona_horaria).utcoffset((ahora or timezone.now()).replace(tzinfo=None))
+    desplazamiento = int(offset.total_seconds() // 60)
+    intervalos = []
+    for dia, desde, hasta in parse(disponibilidad):
+        inicio = (dia * DIA + desde - desplazamiento) % SEMANA
+        intervalos.append((inicio, inicio + hasta - desde))
+    return _merge(intervalos)
+
+
+def _rows(usuario_id, intervalos):
+    """
+    Returns the index rows of some intervals: wrapping ones are stored twice, also one week back.
+    """
+    filas = []
+    for inicio, fin in intervalos:
+        filas.append(IntervaloDisponibilidad(usuario_id=usuario_id, inicio=inicio, fin=fin))
+        if fin > SEMANA:
+            filas.append(IntervaloDisponibilidad(usuario_id=usuario_id, inicio=inicio - SEMANA, fin=fin - SEMANA))
+    return filas
+
+
+def bulk_sync(perfiles, batch_size=1000):
+    """
+    Replaces the indexed availability of some users.
+
+    Args:
+        perfiles (Iterable[tuple[int, str, str]]): (usuario_id, disponibilidad, zona_horaria) tuples.
+        batch_size (int): Rows inserted per query.
+
+    Returns:
+        int: Index rows written.
+    """
+    ahora = timezone.now()
+    usuarios, filas = [], []
+    for usuario_id, disponibilidad, zona_horaria in perfiles:
+        usuarios.append(usuario_id)
+        filas.extend(_rows(usuario_id, weekly_intervals(disponibilidad, zona_horaria, ahora)))
+
+    with transaction.atomic():
+        IntervaloDisponibilidad.objects.filter(usuario_id__in=usuarios).delete()
+        IntervaloDisponibilidad.objects.bulk_create(filas, batch_size=batch_size)
+    return len(filas)
+
+
+def sync(perfil):
+    """
+    Replaces the indexed availability of a profile (called by core.signals when it's saved).
+
+    Args:
+        perfil (Perfil): Saved profile.
+    """
+    bulk_sync([(perfil.usuario_id, perfil.disponibilidad, perfil.zona_horaria)])
+
+
+def rebuild(chunk_size=2000):
+    """
+    Rebuilds the whole availability index from the profiles (after bulk loads or DST changes).
+
+    Args:
+        chunk_size (int): Profiles processed per transaction.
+
+    Returns:
+        int: Index rows written.
+    """
+    perfiles = Perfil.objects.order_by('usuario_id').values_list('usuario_id', 'disponibilidad', 'zona_horaria')
+    IntervaloDisponibilidad.objects.exclude(usuario_id__in=perfiles.values('usuario_id')).delete()
+
+    total, lote = 0, []
+    for perfil in perfiles.iterator(chunk_size=chunk_size):
+        lote.append(perfil)
+        if len(lote) >= chunk_size:
+            total += bulk_sync(lote)
+            lote = []
+    if lote:
+        total += bulk_sync(lote)
+    return total
+
+
+def _overlap_filter(intervalos, minutos):
+    """
+    Returns the filter of the index rows that overlap some intervals by at least ``minutos``.
+
+    Returns:
+        Q | None: Filter, or None if no interval is long enough.
+    """
+    filtro = None
+    for inicio, fin in intervalos:
+        if fin - inicio < minutos:
+            continue
+        condicion = Q(inicio__lte=fin - minutos, fin__gte=inicio + minutos, duracion__gte=minutos)
+        filtro = condicion if filtro is None else filtro | condicion
+    return filtro
+
+
+def overlapping_users(usuario, minutos):
+    """
+    Returns the users whose availability overlaps the availability of a user by at least ``minutos`` in a row.
+
+    Uses two queries (or one, as a subquery): the user's own intervals, then an index range scan per interval.
+
+    Args:
+        usuario (Usuario | int): User (or user id).
+        minutos (int): Minimum common time, e.g. Acuerdo.mins_sesion.
+
+    Returns:
+        QuerySet: User ids (values_list, flat), usable as a subquery (usuario_id__in=...).
+
+    Example:
+        >>> Perfil.objects.filter(usuario_id__in=overlapping_users(usuario, acuerdo.mins_sesion))
+    """
+    usuario_id = getattr(usuario, 'pk', usuario)
+    propios = list(IntervaloDisponibilidad.objects.filter(usuario_id=usuario_id).values_list('inicio', 'fin'))
+    filtro = _overlap_filter(propios, minutos)
+    if filtro is None:
+        return IntervaloDisponibilidad.objects.none().values_list('usuario_id', flat=True)
+    return (
+        IntervaloDisponibilidad.objects
+        .alias(duracion=F('fin') - F('inicio'))
+        .filter(filtro)
+        .exclude(usuario_id=usuario_id)
+        .values_list('usuario_id', flat=True)
+        .distinct()
+    )
+
+
+def overlap(a, b):
+    """
+    Returns the longest stretch of time two users are both available, in minutes.
+
+    Args:
+        a (Usuario | int): User (or user id).
+        b (Usuario | int): User (or user id).
+
+    Returns:
+        int: Minutes of the longest common interval (0 if none).
+    """
+    a, b = getattr(a, 'pk', a), getattr(b, 'pk', b)
+    intervalos = {a: [], b: []}
+    filas = IntervaloDisponibilidad.objects.filter(usuario_id__in=(a, b)).values_list('usuario_id', 'inicio', 'fin')
+    for usuario_id, inicio, fin in filas:
+        intervalos[usuario_id].append((inicio, fin))
+    comunes = (
+        min(fin_a, fin_b) - max(inicio_a, inicio_b)
+        for inicio_a, fin_a in intervalos[a]
+        for inicio_b, fin_b in intervalos[b]
+    )
+    return max(0, max(comunes, default=0))
@@ -0,0 +1,364 @@
+"""
+Read-through cache for SkillSwap.
+
+Two tiers:
+
+    - Local: an in-process LRU with a short TTL, so hot keys don't even leave the process.
+    - Shared: a Django cache (CORE_CACHE['ALIAS']), shared by every worker. It must be a cache server or the
+      database (settings_production); with the per-process LocMemCache of development, invalidations don't reach
+      the other workers, which keep their copy for up to CORE_CACHE['TIMEOUT'] seconds.
+
+Values are loaded on a miss and invalidated by core.signals when the rows they were built from change. Invalidation
+is immediate in the process that made the change and in the shared tier; other processes may keep serving their
+local copy for up to CORE_CACHE['LOCAL_TTL'] seconds. Local values are shared by every caller, so they must be
+treated as read-only.
+
+An invalidation leaves a tombstone in the shared tier for CORE_CACHE['INVALIDATION_TTL'] seconds, and loaded values
+are stored with cache.add(), which doesn't overwrite it. A load that read the rows before the change was committed
+but finishes after the invalidation can't cache its stale value, as long as it takes less than INVALIDATION_TTL.
+
+Cached values:
+    - The catalogue of active skills grouped by category (skill_catalogue()).
+    - Serialized profile bundles: user, profile and skills (profile_bundle()).
+    - Typed preferences of each user (preferences()).
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .models import Habilidad, Perfil
+from .preferences import Preferencias
+from .routers import use_primary
+
+DEFAULTS = {
+    'ALIAS': 'default',
+    'TIMEOUT': 300,
+    'LOCAL_MAX_ENTRIES': 1024,
+    'LOCAL_TTL': 2,
+    'INVALIDATION_TTL': 10,
+}
+
+_MISSING = object()
+_TOMBSTONE = 'core.cache:invalidated'  # Shared value of a key just invalidated (must survive pickling).
+
+
+def get_setting(nombre):
+    """
+    Returns a CORE_CACHE setting.
+
+    Args:
+        nombre (str): Setting key (e.g. 'ALIAS').
+
+    Returns:
+        Any: Value from settings.CORE_CACHE or its default.
+    """
+    return getattr(settings, 'CORE_CACHE', {}).get(nombre, DEFAULTS[nombre])
+
+
+class LocalLRU:
+    """
+    Thread-safe in-process LRU with a time to live.
+    """
+
+    def __init__(self, max_entries, ttl):
+        """
+        Args:
+            max_entries (int): Max number of keys (the least recently used ones are evicted).
+            ttl (float): Seconds a value is kept.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, clave, default=_MISSING):
+        """
+        Returns a value, or ``default`` (_MISSING if not given) if it isn't there or has expired.
+        """
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return default
+            caduca, valor = entrada
+            if caduca < time.monotonic():
+                del self._datos[clave]
+                return default
+            self._datos.move_to_end(clave)
+            return valor
+
+    def set(self, clave, valor):
+        """
+        Stores a value, evicting the least recently used one if it's full.
+        """
+        with self._lock:
+            self._datos[clave] = (time.monotonic() + self.ttl, valor)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_entries:
+                self._datos.popitem(last=False)
+
+    def delete(self, clave):
+        """
+        Removes a value.
+        """
+        with self._lock:
+            self._datos.pop(clave, None)
+
+    def clear(self):
+        """
+        Removes every value.
+        """
+        with self._lock:
+            self._datos.clear()
+
+
+class TieredCache:
+    """
+    Read-through cache with a local LRU tier in front of a shared Django cache.
+
+    Keeps hit/miss counters per tier for monitoring (see counters()).
+
+    Example:
+        >>> cache = TieredCache()
+        >>> cache.get_or_load('habilidades:catalogo', load_skill_catalogue)
+    """
+
+    def __init__(self, alias=None, timeout=None, max_entries=None, ttl=None, invalidation_ttl=None):
+        self.alias = alias or get_setting('ALIAS')
+        self.timeout = timeout if timeout is not None else get_setting('TIMEOUT')
+        self.invalidation_ttl = invalidation_ttl if invalidation_ttl is not None else get_setting('INVALIDATION_TTL')
+        self.local = LocalLRU(max_entries or get_setting('LOCAL_MAX_ENTRIES'), ttl if ttl is not None else get_setting('LOCAL_TTL'))
+        self._contadores = dict.fromkeys(('local_hits', 'shared_hits', 'misses', 'invalidations'), 0)
+        self._lock = threading.Lock()
+
+    @property
+    def shared(self):
+        """
+        Returns the shared tier (Django cache).
+        """
+        return caches[self.alias]
+
+    def _count(self, contador, cantidad=1):
+        with self._lock:
+            self._contadores[contador] += cantidad
+
+    def get_or_load(self, clave, cargar):
+        """
+        Returns a cached value, loading and caching it on a miss.
+
+        A value loaded while the key has a tombstone (it was invalidated less than INVALIDATION_TTL seconds ago) is
+        returned but not cached, as it may have been read before the change.
+
+        Args:
+            clave (str): Cache key.
+            cargar (callable): Function that builds the value (it must be picklable; None is cached too).
+
+        Returns:
+            Any: Cached or freshly loaded value.
+        """
+        valor = self.local.get(clave)
+        if valor is not _MISSING:
+            self._count('local_hits')
+            return valor
+
+        valor = self.shared.get(clave, _MISSING)
+        if valor is not _MISSING and valor != _TOMBSTONE:
+            self._count('shared_hits')
+        else:
+            self._count('misses')
+            recien_invalidado = valor is not _MISSING
+            valor = cargar()
+            if recien_invalidado or not self.shared.add(clave, valor, self.timeout):
+                return valor
+
+        self.local.set(clave, valor)
+        return valor
+
+    def invalidate(self, *claves):
+        """
+        Removes keys from both tiers, leaving a tombstone in the shared one.
+
+        Args:
+            *claves (str): Cache keys.
+        """
+        if not claves:
+            return
+        for clave in claves:
+            self.local.delete(clave)
+        self.shared.set_many(dict.fromkeys(claves, _TOMBSTONE), self.invalidation_ttl)
+        self._count('invalidations', len(claves))
+
+    def counters(self):
+        """
+        Returns the hit/miss counters of this process.
+
+        Returns:
+            dict: local_hits, shared_hits, misses, invalidations and hit_ratio.
+        """
+        with self._lock:
+            contadores = dict(self._contadores)
+        lecturas = contadores['local_hits'] + contadores['shared_hits'] + contadores['misses']
+        contadores['hit_ratio'] = (lecturas - contadores['misses']) / lecturas if lecturas else 0.0
+        return contadores
+
+
+cache = TieredCache()
+
+CATALOGO = 'habilidades:catalogo'
+
+
+def profile_key(usuario_id):
+    """
+    Returns the cache key of the profile bundle of a user.
+
+    Args:
+        usuario_id (int): User id.
+
+    Returns:
+        str: Cache key.
+    """
+    return f'perfil:{usuario_id}'
+
+
+def load_skill_catalogue():
+    """
+    Builds the catalogue of active skills grouped by category.
+
+    Returns:
+        dict[str, list[dict]]: {categoria: [{'id': ..., 'nombre': ...}, ...]}, sorted by category and name.
+    """
+    catalogo = {}
+    with use_primary():  # A lagging replica would get cached until the next change.
+        habilidades = list(Habilidad.objects.filter(estado=True).order_by('categoria', 'nombre').values_list('id', 'nombre', 'categoria'))
+    for habilidad_id, nombre, categoria in habilidades:
+        catalogo.setdefault(categoria, []).append({'id': habilidad_id, 'nombre': nombre})
+    return catalogo
+
+
+def skill_catalogue():
+    """
+    Returns the catalogue of active skills grouped by category.
+
+    Returns:
+        dict[str, list[dict]]: {categoria: [{'id': ..., 'nombre': ...}, ...]}
+
+    Example:
+        >>> skill_catalogue()
+        {'Idioma': [{'id': 2, 'nombre': 'Inglés'}], 'Software': [{'id': 1, 'nombre': 'Photoshop'}]}
+    """
+    return cache.get_or_load(CATALOGO, load_skill_catalogue)
+
+
+def load_profile_bundle(usuario_id):
+    """
+    Builds the serialized profile bundle of a user.
+
+    Args:
+        usuario_id (int): User id.
+
+    Returns:
+        dict | None: User, profile and skills of the user (None if the user has no profile).
+    """
+    with use_primary():  # A lagging replica would get cached until the next change.
+        perfil = Perfil.objects.for_profile_page().filter(usuario_id=usuario_id).first()
+    if perfil is None:
+        return None
+
+    return {
+        'usuario': {'id': perfil.usuario.pk, 'nombre': perfil.usuario.nombre, 'alias': perfil.usuario.alias},
+        'perfil': {
+            'id': perfil.pk,
+            'biografia': perfil.biografia,
+            'zona_horaria': perfil.zona_horaria,
+            'disponibilidad': perfil.disponibilidad,
+            'preferencias': perfil.preferencias,
+        },
+        'habilidades': [
+            {'id': habilidad.pk, 'nombre': habilidad.nombre, 'categoria': habilidad.categoria}
+            for habilidad in perfil.habilidades.all()
+        ],
+    }
+
+
+def profile_bundle(usuario_id):
+    """
+    Returns the serialized profile bundle of a user.
+
+    Args:
+        usuario_id (int): User id.
+
+    Returns:
+        dict | None: User, profile and skills of the user (None if the user has no profile).
+    """
+    return cache.get_or_load(profile_key(usuario_id), lambda: load_profile_bundle(usuario_id))
+
+
+def preferences_key(usuario_id):
+    """
+    Returns the cache key of the preferences of a user.
+
+    Args:
+        usuario_id (int): User id.
+
+    Returns:
+        str: Cache key.
+    """
+    return f'preferencias:{usuario_id}'
+
+
+def load_preferences(usuario_id):
+    """
+    Reads the typed preferences of a user.
+
+    Args:
+        usuario_id (int): User id.
+
+    Returns:
+        Preferencias: Preferences of the user (the defaults if they have no profile).
+    """
+    with use_primary():  # A lagging replica would get cached until the next change.
+        preferencias = Perfil.objects.filter(usuario_id=usuario_id).values_list('preferencias', flat=True).first()
+    return Preferencias.parse(preferencias)
+
+
+def preferences(usuario_id):
+    """
+    Returns the typed preferences of a user.
+
+    Args:
+        usuario_id (int): User id.
+
+    Returns:
+        Preferencias: e.g. Preferencias(theme='dark', language='en').
+    """
+    return cache.get_or_load(preferences_key(usuario_id), lambda: load_preferences(usuario_id))
+
+
+def invalidate_catalogue():
+    """
+    Removes the skill catalogue from the cache.
+    """
+    cache.invalidate(CATALOGO)
+
+
+def invalidate_profiles(usuario_ids):
+    """
+    Removes the profile bundles and preferences of some users from the cache.
+
+    Args:
+        usuario_ids (iterable[int]): User ids.
+    """
+    usuario_ids = set(usuario_ids)
+    cache.invalidate(*(profile_key(usuario_id) for usuario_id in usuario_ids), *(preferences_key(usuario_id) for usuario_id in usuario_ids))
+
+
+def counters():
+    """
+    Returns the hit/miss counters of the cache in this process, for monitoring.
+
+    Returns:
+        dict: local_hits, shared_hits, misses, invalidations and hit_ratio.
+    """
+    return cache.counters()
@@ -0,0 +1,41 @@
+"""
+System checks of the core app (run by manage.py check and on startup).
+"""
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+from . import cache, ratelimit
+
+LOCMEM = 'django.core.cache.backends.locmem.LocMemCache'
+
+
+def _shared_aliases():
+    """
+    Returns the cache aliases that must be shared by every worker.
+
+    Returns:
+        list[tuple]: (setting, alias) pairs.
+    """
+    return [('CORE_CACHE', cache.get_setting('ALIAS')), ('RATE_LIMITS', ratelimit.get_setting('ALIAS'))]
+
+
+@register(Tags.caches)
+def check_shared_caches(app_configs, **kwargs):
+    """
+    Warns when a cache that must be shared by every worker is the per-process LocMemCache outside development.
+
+    With LocMemCache, each worker has its own copy: invalidations of core.cache don't reach the other workers, and
+    each worker counts the rate limits (core.ratelimit) apart, so N workers let N times the limits through.
+    """
+    if settings.DEBUG:
+        return []
+    return [
+        Warning(
+            f"{setting}['ALIAS'] is {alias!r}, a LocMemCache: each worker process has its own copy.",
+            hint='Point it to a cache shared by every worker (e.g. Redis or the database), see settings_production.',
+            obj=setting,
+            id='core.W001',
+        )
+        for setting, alias in _shared_aliases()
+        if settings.CACHES.get(alias, {}).get('BACKEND') == LOCMEM
+    ]
@@ -0,0 +1,235 @@
+"""
+Streaming bulk export of SkillSwap data for analytics (CSV or JSONL, optionally gzipped).
+
+Unlike dumpdata, no model instances are built and nothing is held in memory: rows are read as dictionaries with
+values() (foreign keys flattened into columns, e.g. autor__alias) through a server-side cursor (iterator()), and
+written one by one into output blocks of a fixed size. Memory stays constant no matter how big the table is.
+
+Every dataset has a fecha_modificacion column, so an export can be incremental: only the rows changed after a given
+date and time.
+
+Used by the export_data command and the admin export view (core.views.export_dataset):
+
+    >>> with open('publicaciones.jsonl.gz', 'wb') as fichero:
+    ...     for bloque in export('publicaciones', 'jsonl', comprimir=True):
+    ...         fichero.write(bloque)
+"""
+import csv
+import json
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, time
+
+from django.apps import apps
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+CHUNK_SIZE = 2000
+BLOQUE = 64 * 1024  # Bytes per output block
+
+FORMATOS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+
+@dataclass(frozen=True)
+class Dataset:
+    """
+    A table that can be exported.
+
+    Attributes:
+        modelo (str): Model name in the core app.
+        campos (tuple[str]): Columns, as values() lookups (``relacion__campo`` flattens a foreign key).
+    """
+    modelo: str
+    campos: tuple
+
+    def queryset(self, desde=None):
+        """
+        Returns the rows to export as dictionaries, in primary key order.
+
+        Args:
+            desde (datetime | None): Only the rows changed after this date and time.
+
+        Returns:
+            QuerySet: values() queryset.
+        """
+        filas = apps.get_model('core', self.modelo).objects.all()
+        if desde is not None:
+            filas = filas.filter(fecha_modificacion__gt=desde)
+        return filas.order_by('pk').values(*self.campos)
+
+
+DATASETS = {
+    'usuarios': Dataset('Usuario', (  # No password nor permissions.
+        'id', 'username', 'nombre', 'alias', 'email', 'is_active', 'date_joined', 'last_login', 'fecha_modificacion',
+    )),
+    'perfiles': Dataset('Perfil', (
+        'id', 'usuario_id', 'usuario__alias', 'biografia', 'zona_horaria', 'disponibilidad', 'preferencias',
+        'fecha_modificacion',
+    )),
+    'publicaciones': Dataset('Publicacion', (
+        'id', 'tipo', 'descripcion', 'estado', 'fecha_creacion', 'fecha_modificacion', 'autor_id', 'autor__alias',
+        'habilidad_id', 'habilidad__nombre', 'habilidad__categoria',
+    )),
+    'acuerdos': Dataset('Acuerdo', (
+        'id', 'estado', 'semanas', 'mins_sesion', 'sesiones_por_semana', 'condiciones', 'fecha_creacion',
+        'fecha_modificacion', 'usuario_a_id', 'usuario_a__alias', 'usuario_b_id', 'usuario_b__alias',
+        'habilidad_tradea_a_id', 'habilidad_tradea_a__nombre', 'habilidad_tradea_b_id', 'habilidad_tradea_b__nombre',
+    )),
+    'sesiones': Dataset('Sesion', (
+        'id', 'acuerdo_id', 'acuerdo__estado', 'fecha', 'duracion_real', 'resumen', 'asistencia_user_a',
+        'asistencia_user_b', 'estado', 'fecha_modificacion',
+    )),
+}
+
+
+def parse_since(valor):
+    """
+    Parses the start of an incremental export.
+
+    Args:
+        valor (str): ISO date (midnight) or date and time. Naive values are in the current timezone.
+
+    Returns:
+        datetime: Aware date and time.
+
+    Raises:
+        ValidationError: If the value isn't a valid date.
+    """
+    try:
+        desde = parse_datetime(valor)
+        if desde is None and (dia := parse_date(valor)) is not None:
+            desde = datetime.combine(dia, time.min)
+    except ValueError:
+        desde = None
+    if desde is None:
+        raise ValidationError(f'Invalid date: {valor}')
+    return timezone.make_aware(desde) if timezone.is_naive(desde) else desde
+
+
+def get_dataset(nombre):
+    """
+    Returns an exportable dataset by name.
+
+    Raises:
+        ValidationError: If there's no such dataset.
+    """
+    try:
+        return DATASETS[nombre]
+    except KeyError:
+        raise ValidationError(f"Unknown dataset '{nombre}', choose from: {', '.join(DATASETS)}") from None
+
+
+def rows(nombre, desde=None, chunk_size=CHUNK_SIZE):
+    """
+    Streams the rows of a dataset.
+
+    Args:
+        nombre (str): Dataset name (see DATASETS).
+        desde (datetime | None): Only the rows changed after this date and time.
+        chunk_size (int): Rows fetched from the database cursor at a time.
+
+    Yields:
+        dict: Row, keyed by column.
+    """
+    yield from get_dataset(nombre).queryset(desde).iterator(chunk_size=chunk_size)
+
+
+class _Linea:
+    """
+    File-like object that hands back what csv.writer writes, instead of storing it.
+    """
+
+    def write(self, valor):
+        return valor
+
+
+def _csv(filas, campos):
+    escritor = csv.writer(_Linea())
+    yield escritor.writerow(campos)
+    for fila in filas:
+        yield escritor.writerow([
+            json.dumps(valor, cls=DjangoJSONEncoder) if isinstance(valor, (dict, list))
+            else valor.isoformat() if hasattr(valor, 'isoformat') else valor
+            for valor in fila.values()
+        ])
+
+
+def _jsonl(filas, campos):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for fila in filas:
+        yield encoder.encode(fila) + '\n'
+
+
+def encode(filas, campos, formato='jsonl', comprimir=False):
+    """
+    Writes rows as CSV (with a header) or JSONL, in blocks of about BLOQUE bytes.
+
+    Args:
+        filas (Iterable[dict]): Rows, keyed by column.
+        campos (tuple[str]): Columns, in order.
+        formato (str): 'csv' or 'jsonl'.
+        comprimir (bool): Whether to gzip the output.
+
+    Returns:
+        Iterator[bytes]: Output blocks.
+
+    Raises:
+        ValidationError: If the format isn't supported.
+    """
+    if formato not in FORMATOS:
+        raise ValidationError(f"Unknown format '{formato}', choose from: {', '.join(FORMATOS)}")
+    return _blocks(_csv(filas, campos) if formato == 'csv' else _jsonl(filas, campos), comprimir)
+
+
+def _blocks(lineas, comprimir):
+    compresor = zlib.compressobj(6, zlib.DEFLATED, 31) if comprimir else None  # wbits 31: gzip container
+
+    buffer, tamano = [], 0
+    for linea in lineas:
+        buffer.append(linea)
+        tamano += len(linea)
+        if tamano >= BLOQUE:
+            bloque = ''.join(buffer).encode()
+            buffer, tamano = [], 0
+            bloque = compresor.compress(bloque) if compresor else bloque
+            if bloque:
+                yield bloque
+
+    bloque = ''.join(buffer).encode()
+    if compresor:
+        bloque = compresor.compress(bloque) + compresor.flush()
+    if bloque:
+        yield bloque
+
+
+def export(nombre, formato='jsonl', desde=None, comprimir=False, chunk_size=CHUNK_SIZE):
+    """
+    Streams a whole dataset as CSV or JSONL.
+
+    Args:
+        nombre (str): Dataset name (see DATASETS).
+        formato (str): 'csv' or 'jsonl'.
+        desde (datetime | None): Only the rows changed after this date and time.
+        comprimir (bool): Whether to gzip the output.
+        chunk_size (int): Rows fetched from the database cursor at a time.
+
+    Returns:
+        Iterator[bytes]: Output blocks.
+
+    Raises:
+        ValidationError: If the dataset or the format doesn't exist.
+    """
+    dataset = get_dataset(nombre)
+    return encode(rows(nombre, desde, chunk_size), dataset.campos, formato, comprimir)
+
+
+def filename(nombre, formato='jsonl', comprimir=False):
+    """
+    Returns the file name of an export, e.g. 'publicaciones.csv.gz'.
+    """
+    return f'{nombre}.{formato}{".gz" if comprimir else ""}'
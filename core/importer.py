@@ -0,0 +1,500 @@
+"""
+Bulk import of skills, users (with their profiles) and posts, for onboarding partner communities.
+
+The input is streamed (CSV or JSONL, optionally gzipped) and loaded in batches. Per batch:
+
+    1. Every row is validated with the model field rules (Field.clean(): lengths, choices, emails, timezones...)
+       and Perfil.clean(), without touching the database.
+    2. Unique fields (Habilidad.nombre, Usuario.alias/email/username) are checked for the whole batch with a
+       single query. Skill names are resolved to ids through an in-memory map, and post authors through one query.
+    3. The valid rows are written with bulk_create(), as upserts (update_conflicts) when updating is enabled.
+
+Invalid rows are reported with their line number and skipped, they never abort the load. If a batch hits an
+IntegrityError anyway (e.g. a concurrent signup took an alias), its rows are retried one by one.
+
+bulk_create() doesn't send signals, so the search and availability indexes are updated per batch, and the cache and the
+matchmaking index rows of the imported posts are refreshed when the load ends.
+
+Example:
+    >>> importer = UserImporter(actualizar=True)
+    >>> for lote in importer.run(read_rows('usuarios.csv')):
+    ...     print(lote.creadas, lote.actualizadas, lote.errores)
+"""
+import csv
+import gzip
+import json
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connection, models, transaction
+from django.db.models import Q
+
+from . import availability, cache, matching, search
+from .models import Habilidad, Perfil, Publicacion, Usuario
+from .sqlite import serialized_write
+
+BATCH_SIZE = 1000
+SEPARADOR = '|'  # Separates the skill names of a profile in CSV files.
+BOOLEANOS = {  # Spellings of booleans in CSV files, besides the ones of BooleanField ('True', 't', '1'...).
+    'true': True, 'yes': True, 'y': True, 'si': True, 'sí': True,
+    'false': False, 'no': False, 'n': False,
+}
+
+
+@dataclass
+class ResultadoLote:
+    """
+    Outcome of a batch.
+
+    Attributes:
+        procesadas (int): Rows read.
+        creadas (int): Rows inserted.
+        actualizadas (int): Existing rows updated.
+        errores (list[dict]): Rejected rows, as {'linea': number, 'errores': {field: [messages]}}.
+    """
+    procesadas: int = 0
+    creadas: int = 0
+    actualizadas: int = 0
+    errores: list = field(default_factory=list)
+
+
+def read_rows(ruta):
+    """
+    Streams the rows of a CSV (with a header) or JSONL file, gzipped if its name ends with .gz.
+
+    Args:
+        ruta (str): File path; the format comes from the extension (.csv, .jsonl).
+
+    Yields:
+        tuple[int, dict | ValidationError]: Line number and row, or the error of a line that can't be parsed.
+    """
+    nombre = ruta[:-3] if ruta.endswith('.gz') else ruta
+    abrir = gzip.open if ruta.endswith('.gz') else open
+    with abrir(ruta, 'rt', encoding='utf-8', newline='') as fichero:
+        if nombre.endswith('.csv'):
+            lector = csv.DictReader(fichero)
+            for fila in lector:
+                yield lector.line_num, fila
+            return
+
+        for numero, linea in enumerate(fichero, start=1):
+            if not linea.strip():
+                continue
+            try:
+                yield numero, json.loads(linea)
+            except json.JSONDecodeError as error:
+                yield numero, ValidationError({'__all__': [f'Invalid JSON: {error.msg}']})
+
+
+def _error(mensajes):
+    """
+    Returns the {field: [messages]} dictionary of a ValidationError.
+    """
+    return mensajes.message_dict if hasattr(mensajes, 'error_dict') else {'__all__': mensajes.messages}
+
+
+def clean_fields(modelo, fila, campos):
+    """
+    Validates some fields of a row with the rules of the model fields, without querying the database.
+
+    Missing fields get their default value, and booleans may be spelled as in BOOLEANOS (e.g. 'true', 'FALSE'). Unique
+    checks are left to the caller (they're done per batch).
+
+    Args:
+        modelo (type): Model class.
+        fila (dict): Raw row.
+        campos (tuple[str]): Fields to validate.
+
+    Returns:
+        dict: Cleaned values.
+
+    Raises:
+        ValidationError: With the errors of every invalid field.
+    """
+    limpios, errores = {}, {}
+    for nombre in campos:
+        campo = modelo._meta.get_field(nombre)
+        valor = fila.get(nombre)
+        if valor is None or (valor == '' and campo.has_default()):
+            valor = campo.get_default()
+        elif isinstance(campo, models.BooleanField) and isinstance(valor, str):
+            valor = BOOLEANOS.get(valor.strip().lower(), valor)
+        try:
+            limpios[nombre] = campo.clean(valor, None)
+        except ValidationError as error:
+            errores[nombre] = error.messages
+    if errores:
+        raise ValidationError(errores)
+    return limpios
+
+
+class Importer(ABC):
+    """
+    Base class of the importers: batching, error collection and the IntegrityError fallback.
+
+    Subclasses implement clean_row() (one row, no queries), check_batch() (queries for the whole batch) and
+    write() (bulk writes).
+
+    Attributes:
+        actualizar (bool): Update the rows that already exist instead of rejecting them.
+        batch_size (int): Rows validated and written together.
+    """
+
+    def __init__(self, actualizar=False, batch_size=BATCH_SIZE):
+        self.actualizar = actualizar
+        self.batch_size = batch_size
+        self._habilidades = None
+
+    @property
+    def habilidades(self):
+        """
+        Map of skill names to ids, loaded once per import.
+        """
+        if self._habilidades is None:
+            self._habilidades = dict(Habilidad.objects.values_list('nombre', 'id'))
+        return self._habilidades
+
+    def run(self, filas):
+        """
+        Loads all the rows, a batch at a time.
+
+        Args:
+            filas (Iterable[tuple[int, dict]]): (line number, row) pairs, e.g. from read_rows().
+
+        Yields:
+            ResultadoLote: Outcome of each batch, as it's written.
+        """
+        filas = iter(filas)
+        while lote := list(islice(filas, self.batch_size)):
+            yield self.load_batch(lote)
+        self.finish()
+
+    def load_batch(self, lote):
+        """
+        Validates and writes a batch of rows.
+
+        Args:
+            lote (list[tuple[int, dict]]): (line number, row) pairs.
+
+        Returns:
+            ResultadoLote: Outcome of the batch.
+        """
+        resultado = ResultadoLote(procesadas=len(lote))
+        limpias = []
+        for linea, fila in lote:
+            try:
+                if isinstance(fila, ValidationError):
+                    raise fila
+                limpias.append((linea, self.clean_row(fila)))
+            except ValidationError as error:
+                resultado.errores.append({'linea': linea, 'errores': _error(error)})
+
+        validas = []
+        for linea, datos, error in self.check_batch(limpias):
+            if error:
+                resultado.errores.append({'linea': linea, 'errores': error})
+            else:
+                validas.append((linea, datos))
+
+        try:
+            self._write(validas, resultado)
+        except IntegrityError:
+            for linea, datos in validas:  # Someone else wrote a conflicting row meanwhile: find which ones.
+                try:
+                    self._write([(linea, datos)], resultado)
+                except IntegrityError as error:
+                    resultado.errores.append({'linea': linea, 'errores': {'__all__': [str(error)]}})
+        resultado.errores.sort(key=lambda error: error['linea'])
+        return resultado
+
+    @serialized_write
+    def _write(self, validas, resultado):
+        if not validas:
+            return
+        with transaction.atomic():
+            creadas, actualizadas = self.write([datos for _, datos in validas])
+        resultado.creadas += creadas
+        resultado.actualizadas += actualizadas
+
+    @abstractmethod
+    def clean_row(self, fila):
+        """
+        Validates a single row without querying the database.
+
+        Returns:
+            dict: Cleaned values.
+
+        Raises:
+            ValidationError: If the row is invalid.
+        """
+
+    @abstractmethod
+    def check_batch(self, filas):
+        """
+        Checks the cleaned rows of a batch against the database and each other (unique fields, references).
+
+        Args:
+            filas (list[tuple[int, dict]]): (line number, cleaned values) pairs.
+
+        Yields:
+            tuple[int, dict, dict | None]: Line number, values and errors ({field: [messages]}) or None if valid.
+        """
+
+    @abstractmethod
+    def write(self, filas):
+        """
+        Writes the valid rows of a batch, inside a transaction.
+
+        Args:
+            filas (list[dict]): Cleaned and checked values.
+
+        Returns:
+            tuple[int, int]: Rows created and rows updated.
+        """
+
+    def finish(self):
+        """
+        Refreshes the derived data (indexes, cache) once all the batches are written.
+        """
+
+
+class SkillImporter(Importer):
+    """
+    Imports skills (nombre, categoria, estado). nombre identifies the skill.
+    """
+    CAMPOS = ('nombre', 'categoria', 'estado')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._vistas = set()
+        self._actualizadas = set()
+
+    def clean_row(self, fila):
+        return clean_fields(Habilidad, fila, self.CAMPOS)
+
+    def check_batch(self, filas):
+        existentes = set(Habilidad.objects.filter(nombre__in=[datos['nombre'] for _, datos in filas]).values_list('nombre', flat=True))
+        for linea, datos in filas:
+            if datos['nombre'] in self._vistas:
+                yield linea, datos, {'nombre': ['Repeated in the file.']}
+            elif datos['nombre'] in existentes and not self.actualizar:
+                yield linea, datos, {'nombre': ['A skill with this name already exists.']}
+            else:
+                self._vistas.add(datos['nombre'])
+                datos['_existe'] = datos['nombre'] in existentes
+                yield linea, datos, None
+
+    def write(self, filas):
+        Habilidad.objects.bulk_create(
+            [Habilidad(**{campo: datos[campo] for campo in self.CAMPOS}) for datos in filas],
+            batch_size=self.batch_size,
+            update_conflicts=self.actualizar,
+            unique_fields=['nombre'] if self.actualizar else None,
+            update_fields=['categoria', 'estado'] if self.actualizar else None,
+        )
+        actualizadas = [datos['nombre'] for datos in filas if datos['_existe']]
+        self._actualizadas.update(actualizadas)
+        return len(filas) - len(actualizadas), len(actualizadas)
+
+    def finish(self):
+        usuarios = Perfil.objects.filter(habilidades__nombre__in=self._actualizadas).values_list('usuario_id', flat=True).distinct()
+        cache.invalidate_catalogue()
+        cache.invalidate_profiles(list(usuarios) if self._actualizadas else [])
+
+
+class UserImporter(Importer):
+    """
+    Imports users with their profile.
+
+    Columns: alias (identifies the user), nombre, email, username (the alias by default), and the profile fields
+    biografia, zona_horaria, disponibilidad, preferencias (JSON object) and habilidades (list of skill names, or
+    names separated by '|' in CSV files). When updating, a row replaces every field of the user and profile (missing
+    ones take their default value) except habilidades, which are left as they are if the column is missing.
+
+    New users get an unusable password; they set their own through the password reset flow.
+    """
+    CAMPOS_USUARIO = ('username', 'nombre', 'alias', 'email')
+    CAMPOS_PERFIL = ('biografia', 'zona_horaria', 'disponibilidad', 'preferencias')
+    UNICOS = ('alias', 'email', 'username')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._vistos = {campo: set() for campo in self.UNICOS}
+        self._actualizados = []
+
+    def clean_row(self, fila):
+        fila = dict(fila)
+        if not fila.get('username'):
+            fila['username'] = fila.get('alias')
+        if isinstance(fila.get('preferencias'), str) and fila['preferencias']:
+            try:
+                fila['preferencias'] = json.loads(fila['preferencias'])
+            except json.JSONDecodeError:
+                raise ValidationError({'preferencias': ['It must be a JSON object.']})
+
+        errores = {}
+        try:
+            usuario = clean_fields(Usuario, fila, self.CAMPOS_USUARIO)
+        except ValidationError as error:
+            usuario, errores = {}, error.message_dict
+        try:
+            perfil = clean_fields(Perfil, fila, self.CAMPOS_PERFIL)
+        except ValidationError as error:
+            perfil = {}
+            errores.update(error.message_dict)
+        else:
+            try:
+                Perfil(preferencias=perfil['preferencias']).clean()
+            except ValidationError as error:
+                errores['preferencias'] = error.messages
+
+        habilidades = fila.get('habilidades')
+        if isinstance(habilidades, str):
+            habilidades = [nombre.strip() for nombre in habilidades.split(SEPARADOR) if nombre.strip()]
+        if habilidades is not None:
+            desconocidas = [nombre for nombre in habilidades if nombre not in self.habilidades]
+            if desconocidas:
+                errores['habilidades'] = [f"Unknown skills: {', '.join(desconocidas)}"]
+
+        if errores:
+            raise ValidationError(errores)
+        return {**usuario, **perfil, 'habilidades': habilidades}
+
+    def check_batch(self, filas):
+        filtro = Q()
+        for campo in self.UNICOS:
+            filtro |= Q(**{f'{campo}__in': [datos[campo] for _, datos in filas]})
+        existentes = list(Usuario.objects.filter(filtro).values_list(*self.UNICOS)) if filas else []
+        duenos = {campo: {fila[i]: fila[0] for fila in existentes} for i, campo in enumerate(self.UNICOS)}
+
+        for linea, datos in filas:
+            errores = {}
+            existe = datos['alias'] in duenos['alias']
+            if existe and not self.actualizar:
+                errores['alias'] = ['A user with this alias already exists.']
+            for campo in self.UNICOS:
+                if datos[campo] in self._vistos[campo]:
+                    errores[campo] = ['Repeated in the file.']
+                elif duenos[campo].get(datos[campo], datos['alias']) != datos['alias']:
+                    errores[campo] = [f'Another user already has this {campo}.']
+            if not errores:
+                for campo in self.UNICOS:
+                    self._vistos[campo].add(datos[campo])
+                datos['_existe'] = existe
+            yield linea, datos, errores or None
+
+    def write(self, filas):
+        password = make_password(None)  # Unusable; one per batch, as it's random and costly to generate.
+        Usuario.objects.bulk_create(
+            [Usuario(**{campo: datos[campo] for campo in self.CAMPOS_USUARIO}, password=password) for datos in filas],
+            batch_size=self.batch_size,
+            update_conflicts=self.actualizar,
+            unique_fields=['alias'] if self.actualizar else None,
+            update_fields=['username', 'nombre', 'email', 'fecha_modificacion'] if self.actualizar else None,
+        )
+        usuarios = dict(Usuario.objects.filter(alias__in=[datos['alias'] for datos in filas]).values_list('alias', 'id'))
+
+        Perfil.objects.bulk_create(
+            [Perfil(usuario_id=usuarios[datos['alias']], **{campo: datos[campo] for campo in self.CAMPOS_PERFIL}) for datos in filas],
+            batch_size=self.batch_size,
+            update_conflicts=self.actualizar,
+            unique_fields=['usuario'] if self.actualizar else None,
+            update_fields=[*self.CAMPOS_PERFIL, 'fecha_modificacion'] if self.actualizar else None,
+        )
+        perfiles = dict(Perfil.objects.filter(usuario_id__in=usuarios.values()).values_list('usuario_id', 'id'))
+
+        Relacion = Perfil.habilidades.through
+        con_habilidades = [datos for datos in filas if datos['habilidades'] is not None]
+        Relacion.objects.filter(perfil_id__in=[perfiles[usuarios[datos['alias']]] for datos in con_habilidades if datos['_existe']]).delete()
+        Relacion.objects.bulk_create(
+            [
+                Relacion(perfil_id=perfiles[usuarios[datos['alias']]], habilidad_id=self.habilidades[nombre])
+                for datos in con_habilidades for nombre in set(datos['habilidades'])
+            ],
+            batch_size=self.batch_size,
+            ignore_conflicts=True,
+        )
+
+        search.get_backend().bulk_index('perfil', [
+            (perfiles[usuarios[datos['alias']]], datos['biografia'], search.language_of(datos['preferencias'])) for datos in filas
+        ])
+        availability.bulk_sync(
+            [(usuarios[datos['alias']], datos['disponibilidad'], datos['zona_horaria']) for datos in filas],
+            batch_size=self.batch_size,
+        )
+        actualizados = [usuarios[datos['alias']] for datos in filas if datos['_existe']]
+        self._actualizados.extend(actualizados)
+        return len(filas) - len(actualizados), len(actualizados)
+
+    def finish(self):
+        cache.invalidate_profiles(self._actualizados)
+
+
+class PostImporter(Importer):
+    """
+    Imports posts: tipo, descripcion, estado, autor (alias of the author) and habilidad (skill name).
+
+    Posts have no natural key, so they're always inserted (actualizar doesn't apply).
+    """
+    CAMPOS = ('tipo', 'descripcion', 'estado')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._reindexar = False
+        self._claves = set()  # (autor_id, habilidad_id, tipo) of the matchmaking index rows to refresh
+
+    def clean_row(self, fila):
+        errores = {}
+        try:
+            datos = clean_fields(Publicacion, fila, self.CAMPOS)
+        except ValidationError as error:
+            datos, errores = {}, error.message_dict
+        if not fila.get('autor'):
+            errores['autor'] = ['This field cannot be blank.']
+        if fila.get('habilidad') not in self.habilidades:
+            errores['habilidad'] = [f"Unknown skill: {fila.get('habilidad')}"]
+        if errores:
+            raise ValidationError(errores)
+        return {**datos, 'autor': fila['autor'], 'habilidad_id': self.habilidades[fila['habilidad']]}
+
+    def check_batch(self, filas):
+        autores = {}
+        for alias, usuario_id, preferencias in Usuario.objects.filter(alias__in={datos['autor'] for _, datos in filas}).values_list('alias', 'id', 'perfil__preferencias'):
+            autores[alias] = (usuario_id, search.language_of(preferencias))
+        for linea, datos in filas:
+            if datos['autor'] not in autores:
+                yield linea, datos, {'autor': [f"Unknown user: {datos['autor']}"]}
+            else:
+                datos['autor_id'], datos['_idioma'] = autores[datos['autor']]
+                yield linea, datos, None
+
+    def write(self, filas):
+        publicaciones = Publicacion.objects.bulk_create(
+            [Publicacion(autor_id=datos['autor_id'], habilidad_id=datos['habilidad_id'], **{campo: datos[campo] for campo in self.CAMPOS}) for datos in filas],
+            batch_size=self.batch_size,
+        )
+        if connection.features.can_return_rows_from_bulk_insert:
+            search.get_backend().bulk_index('publicacion', [
+                (publicacion.pk, publicacion.descripcion, datos['_idioma']) for publicacion, datos in zip(publicaciones, filas)
+            ])
+        else:
+            self._reindexar = True  # The new ids aren't known: rebuild the whole search index at the end.
+        self._claves.update((datos['autor_id'], datos['habilidad_id'], datos['tipo']) for datos in filas if datos['estado'])
+        return len(filas), 0
+
+    def finish(self):
+        with transaction.atomic():
+            for clave in self._claves:  # Inactive posts don't count in the index.
+                matching.refresh_entry(*clave)
+        if self._reindexar:
+            search.rebuild()
+
+
+IMPORTERS = {
+    'habilidades': SkillImporter,
+    'usuarios': UserImporter,
+    'publicaciones': PostImporter,
+}
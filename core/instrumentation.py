@@ -0,0 +1,232 @@
+"""
+Query-count and latency instrumentation for SkillSwap.
+
+QueryTracker records every query run on every database connection while it's active: how many, how long they took,
+and which ones were repeated (same SQL shape, e.g. the N+1 query of a lazy foreign key). It's used by
+core.middleware.QueryInstrumentationMiddleware for every request, and can be used directly as a context manager:
+
+    >>> with track_queries(budget=3, label='feed') as tracker:
+    ...     list(Publicacion.objects.select_related('autor', 'habilidad')[:50])
+    >>> tracker.count
+    1
+
+If a budget is given and the block runs more queries, QueryBudgetExceeded (an AssertionError, so it fails tests) is
+raised when the block ends.
+"""
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.db import connections
+
+NUMERO_RE = re.compile(r'\b\d+\b')
+CADENA_RE = re.compile(r"'(?:[^']|'')*'")
+LISTA_RE = re.compile(r'\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)')
+ESPACIOS_RE = re.compile(r'\s+')
+
+
+class QueryBudgetExceeded(AssertionError):
+    """
+    Raised when a block of code or a view runs more queries than its budget.
+    """
+
+
+def fingerprint(sql):
+    """
+    Returns the shape of a query, without its values.
+
+    Queries that only differ in their parameters (e.g. the same lazy foreign key loaded for each row) share a
+    fingerprint.
+
+    Args:
+        sql (str): SQL with placeholders.
+
+    Returns:
+        str: Normalized SQL.
+
+    Example:
+        >>> fingerprint('SELECT * FROM "usuario" WHERE "id" IN (%s, %s, %s) LIMIT 21')
+        'SELECT * FROM "usuario" WHERE "id" IN (...) LIMIT ?'
+    """
+    sql = CADENA_RE.sub('?', sql)
+    sql = NUMERO_RE.sub('?', sql)
+    sql = LISTA_RE.sub('(...)', sql)
+    return ESPACIOS_RE.sub(' ', sql).strip()
+
+
+class QueryTracker:
+    """
+    Records the queries run on every database connection of the current thread.
+
+    Attributes:
+        label (str): Name of the tracked block (e.g. the view name).
+        budget (int | None): Max number of queries allowed.
+        count (int): Number of queries.
+        db_time (float): Total time spent in the database, in milliseconds.
+        wall_time (float): Total time of the block, in milliseconds.
+    """
+
+    def __init__(self, label='', budget=None):
+        self.label = label
+        self.budget = budget
+        self.count = 0
+        self.db_time = 0.0
+        self.wall_time = 0.0
+        self._fingerprints = Counter()
+        self._exactas = Counter()
+        self._inicio = None
+        self._contextos = []
+
+    def __call__(self, execute, sql, params, many, context):
+        """
+        Execute wrapper installed on the database connections (see Django's connection.execute_wrapper()).
+        """
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += (time.perf_counter() - inicio) * 1000
+            self.count += 1
+            self._fingerprints[fingerprint(sql)] += 1
+            self._exactas[sql, repr(params)] += 1
+
+    def start(self):
+        """
+        Starts recording the queries.
+        """
+        self._inicio = time.perf_counter()
+        for conexion in connections.all():
+            contexto = conexion.execute_wrapper(self)
+            contexto.__enter__()
+            self._contextos.append(contexto)
+
+    def stop(self):
+        """
+        Stops recording the queries.
+        """
+        while self._contextos:
+            self._contextos.pop().__exit__(None, None, None)
+        self.wall_time = (time.perf_counter() - self._inicio) * 1000
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        if exc_type is None:
+            self.check_budget()
+        return False
+
+    @property
+    def duplicates(self):
+        """
+        Returns the query shapes that were run more than once, most repeated first.
+
+        Returns:
+            list[tuple]: (fingerprint, times) tuples.
+        """
+        return [(sql, veces) for sql, veces in self._fingerprints.most_common() if veces > 1]
+
+    @property
+    def exact_duplicates(self):
+        """
+        Returns the number of queries that were run more than once with the same parameters.
+
+        Returns:
+            int: Repeated queries (the first run of each one isn't counted).
+        """
+        return sum(veces - 1 for veces in self._exactas.values())
+
+    @property
+    def over_budget(self):
+        """
+        Returns True if the block ran more queries than its budget.
+
+        Returns:
+            bool: True if the budget was exceeded.
+        """
+        return self.budget is not None and self.count > self.budget
+
+    def check_budget(self):
+        """
+        Raises QueryBudgetExceeded if the block ran more queries than its budget.
+
+        Raises:
+            QueryBudgetExceeded: If the budget was exceeded.
+        """
+        if self.over_budget:
+            repetidas = '; '.join(f'{veces}x {sql[:120]}' for sql, veces in self.duplicates[:3])
+            raise QueryBudgetExceeded(
+                f'{self.label or "Block"} ran {self.count} queries, its budget is {self.budget}. Repeated: {repetidas or "none"}'
+            )
+
+    def as_dict(self):
+        """
+        Returns the recorded metrics as a dictionary, for structured logs.
+
+        Returns:
+            dict: label, queries, db_ms, wall_ms, budget, duplicates and exact_duplicates.
+        """
+        return {
+            'label': self.label,
+            'queries': self.count,
+            'db_ms': round(self.db_time, 3),
+            'wall_ms': round(self.wall_time, 3),
+            'budget': self.budget,
+            'duplicates': [{'sql': sql, 'count': veces} for sql, veces in self.duplicates[:10]],
+            'exact_duplicates': self.exact_duplicates,
+        }
+
+    def server_timing(self):
+        """
+        Returns the metrics as a Server-Timing header value.
+
+        Returns:
+            str: e.g. 'db;dur=3.2;desc="5 queries", app;dur=12.0'
+        """
+        return f'db;dur={self.db_time:.1f};desc="{self.count} queries", app;dur={self.wall_time:.1f}'
+
+
+@contextmanager
+def track_queries(budget=None, label=''):
+    """
+    Records the queries run inside a block.
+
+    Args:
+        budget (int | None): Max number of queries allowed.
+        label (str): Name of the block, used in error messages and logs.
+
+    Yields:
+        QueryTracker: Tracker with the recorded metrics.
+
+    Raises:
+        QueryBudgetExceeded: If the block ran more queries than the budget.
+    """
+    with QueryTracker(label, budget) as tracker:
+        yield tracker
+
+
+def query_budget(maximo):
+    """
+    Declares the query budget of a view.
+
+    QueryInstrumentationMiddleware checks it on every request.
+
+    Args:
+        maximo (int): Max number of queries the view may run.
+
+    Returns:
+        callable: Decorator.
+
+    Example:
+        >>> @query_budget(4)
+        ... def feed(request):
+        ...     ...
+    """
+    def decorador(vista):
+        vista.query_budget = maximo  # Not wrapped, so async views stay async.
+        return vista
+
+    return decorador
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.recommendations import BACKENDS, build, default_backend
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuilds the skill recommendation table (SimilitudHabilidad) from the profile skills and the finished '
+        'agreements. Meant to run nightly; finished agreements are added incrementally in between.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--backend', choices=list(BACKENDS), help='How to compute the matrix (numpy if it is installed by default).',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows inserted per query.')
+
+    def handle(self, *args, **options):
+        inicio = time.monotonic()
+        resultado = build(backend=options['backend'] or default_backend(), batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Recommendations rebuilt with {resultado['backend']}: {resultado['habilidades']} skills, "
+            f"{resultado['filas']} rows ({time.monotonic() - inicio:.1f}s)."
+        ))
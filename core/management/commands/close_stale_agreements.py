@@ -0,0 +1,107 @@
+import json
+import os
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from core.transitions import completed, stale_proposals, transition_in_chunks
+
+# Phase: (current state, target state).
+FASES = {
+    'expire': ('PROPUESTO', 'CANCELADO'),
+    'finalize': ('EN CURSO', 'FINALIZADO'),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Cancels the proposals nobody answered and finishes the ongoing agreements whose sessions are all in the past. '
+        'Meant to run nightly from cron; scans in keyset chunks with one short transaction per chunk.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--proposal-days', type=int, default=30, help='Days a proposal may wait for an answer.')
+        parser.add_argument('--today', help='Reference date (YYYY-MM-DD), today by default.')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Agreements scanned per chunk.')
+        parser.add_argument('--pause', type=float, default=0.0, help='Seconds to sleep between chunks.')
+        parser.add_argument('--phases', nargs='+', choices=list(FASES), default=list(FASES), help='Phases to run.')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the agreements that would change.')
+        parser.add_argument('--checkpoint', help='JSON file to resume an interrupted run from (removed when it ends).')
+
+    def handle(self, *args, **options):
+        if options['today']:
+            hoy = parse_date(options['today'])
+            if hoy is None:
+                raise CommandError(f"Invalid date: {options['today']}")
+            # Run as if it were the start of that day, like completed(), which only counts the sessions before it.
+            ahora = timezone.make_aware(datetime.combine(hoy, datetime.min.time()))
+        else:
+            hoy, ahora = timezone.localdate(), timezone.now()
+
+        candidatos = {
+            'expire': stale_proposals(options['proposal_days'], ahora),
+            'finalize': completed(hoy),
+        }
+        checkpoint = self.load_checkpoint(options['checkpoint'])
+        totales = {}
+
+        for fase in options['phases']:
+            origen, destino = FASES[fase]
+            desde = checkpoint.get(fase, 0)
+            if desde == 'done':
+                self.stdout.write(f'[{fase}] already done (checkpoint).')
+                continue
+
+            revisados = cambiados = 0
+            inicio = time.monotonic()
+            lotes = transition_in_chunks(
+                candidatos[fase], origen, destino, chunk_size=options['chunk_size'], desde=desde, dry_run=options['dry_run'],
+            )
+            for lote in lotes:
+                revisados += lote.revisados
+                cambiados += lote.cambiados
+                ritmo = revisados / max(time.monotonic() - inicio, 1e-9)
+                self.stdout.write(
+                    f'[{fase}] up to id {lote.ultimo_id}: {revisados} scanned, {cambiados} '
+                    f'{"would change" if options["dry_run"] else "changed"} ({ritmo:.0f} rows/s)'
+                )
+                if not options['dry_run']:
+                    checkpoint[fase] = lote.ultimo_id
+                    self.save_checkpoint(options['checkpoint'], checkpoint)
+                if options['pause']:
+                    time.sleep(options['pause'])
+
+            totales[fase] = cambiados
+            if not options['dry_run']:
+                checkpoint[fase] = 'done'
+                self.save_checkpoint(options['checkpoint'], checkpoint)
+
+        if options['checkpoint'] and not options['dry_run'] and os.path.exists(options['checkpoint']):
+            os.remove(options['checkpoint'])
+
+        resumen = ', '.join(f'{fase}: {total}' for fase, total in totales.items())
+        prefijo = 'Dry run, agreements that would change' if options['dry_run'] else 'Stale agreements closed'
+        self.stdout.write(self.style.SUCCESS(f'{prefijo} ({resumen}).'))
+
+    def load_checkpoint(self, ruta):
+        """
+        Returns the progress saved by an interrupted run ({phase: last id or 'done'}).
+        """
+        if not ruta or not os.path.exists(ruta):
+            return {}
+        with open(ruta) as fichero:
+            return json.load(fichero)
+
+    def save_checkpoint(self, ruta, checkpoint):
+        """
+        Saves the progress atomically, so a crash never leaves a half-written file.
+        """
+        if not ruta:
+            return
+        temporal = f'{ruta}.tmp'
+        with open(temporal, 'w') as fichero:
+            json.dump(checkpoint, fichero)
+        os.replace(temporal, ruta)
@@ -0,0 +1,60 @@
+import os
+import time
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.export import CHUNK_SIZE, DATASETS, FORMATOS, encode, filename, get_dataset, parse_since, rows
+
+
+class Command(BaseCommand):
+    help = (
+        'Exports users, profiles, posts, agreements and sessions as CSV or JSONL files for analytics. '
+        'Streams every table with constant memory; --since exports only the rows changed after a date.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('datasets', nargs='*', help=f'Datasets to export: {", ".join(DATASETS)} (all by default).')
+        parser.add_argument('--format', choices=list(FORMATOS), default='jsonl', help='Output format.')
+        parser.add_argument('--gzip', action='store_true', help='Compress the files.')
+        parser.add_argument('--since', help='Only the rows changed after this ISO date or date and time.')
+        parser.add_argument('--output-dir', default='.', help='Directory for the files (<dataset>.<format>[.gz]).')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Rows fetched from the database cursor at a time.')
+
+    def handle(self, *args, **options):
+        try:
+            desde = parse_since(options['since']) if options['since'] else None
+            for nombre in options['datasets']:
+                get_dataset(nombre)
+        except ValidationError as error:
+            raise CommandError(error.messages[0])
+
+        # Rows changed while exporting may show up again in the next run, but none is ever missed.
+        inicio_exportacion = timezone.now()
+        os.makedirs(options['output_dir'], exist_ok=True)
+
+        for nombre in options['datasets'] or list(DATASETS):
+            ruta = os.path.join(options['output_dir'], filename(nombre, options['format'], options['gzip']))
+            total = 0
+
+            def contar(filas):
+                nonlocal total
+                for fila in filas:
+                    total += 1
+                    yield fila
+
+            inicio = time.monotonic()
+            filas = contar(rows(nombre, desde, options['chunk_size']))
+            temporal = f'{ruta}.tmp'
+            with open(temporal, 'wb') as fichero:
+                for bloque in encode(filas, DATASETS[nombre].campos, options['format'], options['gzip']):
+                    fichero.write(bloque)
+            os.replace(temporal, ruta)  # A failed export never leaves a half-written file behind.
+
+            segundos = time.monotonic() - inicio
+            self.stdout.write(f'{nombre}: {total} rows in {segundos:.1f}s ({total / max(segundos, 1e-9):.0f} rows/s) -> {ruta}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Export finished. Next incremental export: --since {inicio_exportacion.isoformat()}'
+        ))
@@ -0,0 +1,51 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.importer import BATCH_SIZE, IMPORTERS, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        'Bulk imports skills, users (with their profiles) or posts from a CSV or JSONL file (optionally .gz). '
+        'Rows are validated and written in batches; invalid rows are reported and skipped.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('tipo', choices=list(IMPORTERS), help='What the file contains.')
+        parser.add_argument('ruta', help='CSV or JSONL file, the format comes from the extension.')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Rows validated and written together.')
+        parser.add_argument('--update', action='store_true', help='Update the skills and users that already exist instead of rejecting them.')
+        parser.add_argument('--errors', help='JSONL file to write the rejected rows to (the first ones are printed otherwise).')
+
+    def handle(self, *args, **options):
+        importer = IMPORTERS[options['tipo']](actualizar=options['update'], batch_size=options['batch_size'])
+        procesadas = creadas = actualizadas = 0
+        errores = []
+        inicio = time.monotonic()
+
+        fichero_errores = open(options['errors'], 'w') if options['errors'] else None
+        try:
+            for lote in importer.run(read_rows(options['ruta'])):
+                procesadas += lote.procesadas
+                creadas += lote.creadas
+                actualizadas += lote.actualizadas
+                if fichero_errores:
+                    fichero_errores.writelines(json.dumps(error, ensure_ascii=False) + '\n' for error in lote.errores)
+                errores.extend(lote.errores[:20 - len(errores)])
+                rechazadas = procesadas - creadas - actualizadas
+                ritmo = procesadas / max(time.monotonic() - inicio, 1e-9)
+                self.stdout.write(f'{procesadas} rows: {creadas} created, {actualizadas} updated, {rechazadas} rejected ({ritmo:.0f} rows/s)')
+        finally:
+            if fichero_errores:
+                fichero_errores.close()
+
+        if not fichero_errores:
+            for error in errores:
+                self.stderr.write(f"Line {error['linea']}: {json.dumps(error['errores'], ensure_ascii=False)}")
+
+        rechazadas = procesadas - creadas - actualizadas
+        self.stdout.write(self.style.SUCCESS(
+            f'Import finished: {creadas} created, {actualizadas} updated, {rechazadas} rejected.'
+        ))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from core.availability import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuilds the availability interval index from the profiles. '
+        'Run it after daylight saving time changes, so the intervals follow the new UTC offsets.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Profiles processed per batch.')
+
+    def handle(self, *args, **options):
+        total = rebuild(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Availability index rebuilt: {total} intervals.'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core.matching import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the matchmaking inverted index (IndicePublicacion) from the active posts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows inserted per query.')
+
+    def handle(self, *args, **options):
+        total = rebuild_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Matchmaking index rebuilt: {total} rows.'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core.search import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the full-text search index of post descriptions and profile bios.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Documents indexed per batch.')
+
+    def handle(self, *args, **options):
+        total = rebuild(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Search index rebuilt: {total} documents.'))
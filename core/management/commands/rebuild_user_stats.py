@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from core.stats import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the activity counters (EstadisticasUsuario) of every user from scratch.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=10000, help='Users recomputed per range.')
+        parser.add_argument('--workers', type=int, default=4, help='Ranges recomputed in parallel.')
+
+    def handle(self, *args, **options):
+        total = rebuild(chunk_size=options['chunk_size'], workers=options['workers'])
+        self.stdout.write(self.style.SUCCESS(f'User stats rebuilt: {total} users.'))
@@ -0,0 +1,56 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from core.outbox import SENDERS, Resultado, get_sender, process_batch, purge
+
+
+class Command(BaseCommand):
+    help = (
+        'Sends the notifications of the outbox (core.outbox). Claims batches of due notifications and sends them '
+        'from a thread pool, until stopped (or, with --once, until nothing is due). Run as many workers as needed.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Notifications claimed per batch.')
+        parser.add_argument('--threads', type=int, default=8, help='Notifications sent concurrently.')
+        parser.add_argument('--poll', type=float, default=5.0, help='Seconds to wait when nothing is due.')
+        parser.add_argument('--once', action='store_true', help='Stop when nothing is due.')
+        parser.add_argument(
+            '--sender', help=f'Sender: {", ".join(SENDERS)} or the dotted path of a class (NOTIFICATIONS["SENDER"] by default).',
+        )
+        parser.add_argument('--purge-days', type=int, help='First delete the sent notifications older than these days.')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1 or options['threads'] < 1:
+            raise CommandError('--batch-size and --threads must be positive.')
+        sender = get_sender(options['sender'])
+
+        if options['purge_days'] is not None:
+            self.stdout.write(f'{purge(options["purge_days"])} old notifications deleted.')
+
+        total = Resultado()
+        with ThreadPoolExecutor(max_workers=options['threads'], thread_name_prefix='notifications') as pool:
+            try:
+                while True:
+                    close_old_connections()  # A long-running worker outlives the database connections.
+                    resultado = process_batch(sender, options['batch_size'], pool=pool)
+                    total += resultado
+                    if resultado.total:
+                        self.stdout.write(
+                            f'{resultado.enviadas} sent, {resultado.reintentos} to retry, {resultado.fallidas} failed, '
+                            f'{resultado.descartadas} outdated'
+                        )
+                    if resultado.total < options['batch_size']:
+                        if options['once']:
+                            break
+                        time.sleep(options['poll'])
+            except KeyboardInterrupt:
+                pass  # The batch in flight was recorded (or its lease expires): nothing is lost.
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Notifications sent: {total.enviadas} ({total.reintentos} to retry, {total.fallidas} failed, '
+            f'{total.descartadas} outdated).'
+        ))
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from core.analytics import ROLLUPS, backfill, update
+
+
+class Command(BaseCommand):
+    help = (
+        'Updates the analytics rollups (ResumenSesiones, ResumenAcuerdos) with the rows changed since the last run. '
+        'With --backfill, recomputes the whole history (or --since/--until) in parallel date partitions.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backfill', action='store_true', help='Recompute the history instead of the changes.')
+        parser.add_argument('--since', help='First day of the backfill (ISO date, the first day of the history by default).')
+        parser.add_argument('--until', help='Last day of the backfill (ISO date, the last day of the history by default).')
+        parser.add_argument('--tables', nargs='+', choices=list(ROLLUPS), help='Rollups to backfill (all by default).')
+        parser.add_argument('--workers', type=int, help='Partitions recomputed in parallel (ANALYTICS["WORKERS"] by default).')
+
+    def handle(self, *args, **options):
+        dias = {}
+        for opcion in ('since', 'until'):
+            if options[opcion]:
+                if not options['backfill']:
+                    raise CommandError(f'--{opcion} needs --backfill.')
+                dias[opcion] = parse_date(options[opcion])
+                if dias[opcion] is None:
+                    raise CommandError(f'Invalid date: {options[opcion]}')
+
+        inicio = time.monotonic()
+        if options['backfill']:
+            resultado = backfill(options['tables'], dias.get('since'), dias.get('until'), workers=options['workers'])
+        else:
+            resultado = update()
+        self.stdout.write(self.style.SUCCESS(
+            f"Analytics updated: {', '.join(f'{nombre} {total} days' for nombre, total in resultado.items())} "
+            f'({time.monotonic() - inicio:.1f}s).'
+        ))
@@ -0,0 +1,216 @@
+"""
+QuerySets and managers of the core models.
+
+Each model gets named loading profiles (e.g. Publicacion.objects.for_feed()) that join or prefetch exactly the
+relations a page needs, so callers don't have to remember which foreign keys to follow and lists never fall into
+N+1 queries. Related models are looked up in the app registry instead of being imported, as this module is imported
+by core.models.
+"""
+from django.apps import apps
+from django.db import models
+from django.db.models import Prefetch, Q
+
+from . import preferences
+
+ACUERDO_ACTIVO = ('PROPUESTO', 'ACEPTADO', 'EN CURSO')
+
+
+class PublicacionQuerySet(models.QuerySet):
+    """
+    QuerySet of Publicacion.
+
+    Example:
+        >>> Publicacion.objects.for_feed()[:50]  # 1 query, author and skill included
+    """
+
+    def active(self):
+        """
+        Returns the active posts.
+        """
+        return self.filter(estado=True)
+
+    def with_relations(self):
+        """
+        Joins the author and the skill of the posts.
+        """
+        return self.select_related('autor', 'habilidad')
+
+    def for_feed(self):
+        """
+        Returns the active posts with what a feed card shows, in a single query.
+
+        Only the columns of the card are loaded: the post, the name and alias of the author, and the name and
+        category of the skill.
+        """
+        return self.active().with_relations().only(
+            'id', 'tipo', 'descripcion', 'estado', 'fecha_creacion',
+            'autor__id', 'autor__nombre', 'autor__alias',
+            'habilidad__id', 'habilidad__nombre', 'habilidad__categoria',
+        )
+
+    def by_author(self, usuario):
+        """
+        Returns the posts of a user.
+
+        Args:
+            usuario (Usuario | int): Author (or user id).
+        """
+        return self.filter(autor_id=getattr(usuario, 'pk', usuario))
+
+
+class AcuerdoQuerySet(models.QuerySet):
+    """
+    QuerySet of Acuerdo.
+
+    Example:
+        >>> acuerdos = Acuerdo.objects.for_listing().with_sessions(activas=True)[:50]  # 2 queries
+        >>> acuerdos[0].sesiones_activas
+    """
+
+    def active(self):
+        """
+        Returns the agreements that are still open (proposed, accepted or ongoing).
+        """
+        return self.filter(estado__in=ACUERDO_ACTIVO)
+
+    def for_user(self, usuario):
+        """
+        Returns the agreements where a user takes part, on either side.
+
+        Args:
+            usuario (Usuario | int): User (or user id).
+        """
+        usuario_id = getattr(usuario, 'pk', usuario)
+        return self.filter(Q(usuario_a_id=usuario_id) | Q(usuario_b_id=usuario_id))
+
+    def with_users(self):
+        """
+        Joins both users of the agreements.
+        """
+        return self.select_related('usuario_a', 'usuario_b')
+
+    def with_skills(self):
+        """
+        Joins both traded skills of the agreements.
+        """
+        return self.select_related('habilidad_tradea_a', 'habilidad_tradea_b')
+
+    def with_sessions(self, activas=False):
+        """
+        Prefetches the sessions of the agreements, in chronological order, with one extra query.
+
+        Args:
+            activas (bool): Prefetch only the active sessions, into the ``sesiones_activas`` list attribute, instead
+                of every session into ``sesiones.all()``.
+        """
+        Sesion = apps.get_model('core', 'Sesion')
+        sesiones = Sesion.objects.order_by('fecha', 'id')
+        if activas:
+            return self.prefetch_related(Prefetch('sesiones', queryset=sesiones.filter(estado=True), to_attr='sesiones_activas'))
+        return self.prefetch_related(Prefetch('sesiones', queryset=sesiones))
+
+    def for_listing(self):
+        """
+        Returns the agreements with their users and skills, in a single query.
+        """
+        return self.with_users().with_skills()
+
+    def for_agreement_detail(self):
+        """
+        Returns the agreements with everything their detail page shows, in 3 queries: users, skills and profiles of
+        the users (1), every session (2) and the active sessions in ``sesiones_activas`` (3).
+        """
+        return (
+            self.for_listing()
+            .select_related('usuario_a__perfil', 'usuario_b__perfil')
+            .with_sessions()
+            .with_sessions(activas=True)
+        )
+
+
+class SesionQuerySet(models.QuerySet):
+    """
+    QuerySet of Sesion.
+
+    Example:
+        >>> Sesion.objects.for_agreement(acuerdo).active()
+    """
+
+    def active(self):
+        """
+        Returns the active sessions.
+        """
+        return self.filter(estado=True)
+
+    def held(self):
+        """
+        Returns the sessions at least one user attended.
+        """
+        return self.filter(Q(asistencia_user_a=True) | Q(asistencia_user_b=True))
+
+    def for_agreement(self, acuerdo):
+        """
+        Returns the sessions of an agreement.
+
+        Args:
+            acuerdo (Acuerdo | int): Agreement (or agreement id).
+        """
+        return self.filter(acuerdo_id=getattr(acuerdo, 'pk', acuerdo))
+
+    def with_agreement(self):
+        """
+        Joins the agreement of the sessions with its users and skills, in a single query.
+        """
+        return self.select_related(
+            'acuerdo__usuario_a', 'acuerdo__usuario_b', 'acuerdo__habilidad_tradea_a', 'acuerdo__habilidad_tradea_b',
+        )
+
+
+class PerfilQuerySet(models.QuerySet):
+    """
+    QuerySet of Perfil.
+
+    Example:
+        >>> perfil = Perfil.objects.for_profile_page().get(usuario_id=1)  # 2 queries
+        >>> perfil.habilidades.all()
+    """
+
+    def with_user(self):
+        """
+        Joins the user of the profiles.
+        """
+        return self.select_related('usuario')
+
+    def with_skills(self, activas=False):
+        """
+        Prefetches the skills of the profiles, sorted by name, with one extra query.
+
+        Args:
+            activas (bool): Prefetch only the active skills, into the ``habilidades_activas`` list attribute, instead
+                of every skill into ``habilidades.all()``.
+        """
+        Habilidad = apps.get_model('core', 'Habilidad')
+        habilidades = Habilidad.objects.order_by('nombre', 'id')
+        if activas:
+            return self.prefetch_related(Prefetch('habilidades', queryset=habilidades.filter(estado=True), to_attr='habilidades_activas'))
+        return self.prefetch_related(Prefetch('habilidades', queryset=habilidades))
+
+    def for_profile_page(self):
+        """
+        Returns the profiles with their user and skills, in 2 queries.
+        """
+        return self.with_user().with_skills()
+
+    def by_language(self, idioma):
+        """
+        Filters the profiles by preferred language, through the indexed Perfil.idioma generated column.
+
+        Profiles without the key count as having the default language.
+
+        Args:
+            idioma (str): Language code (e.g. 'en').
+        """
+        filtro = Q(idioma=idioma)
+        if idioma == preferences.SCHEMA['language'].defecto:
+            filtro |= Q(idioma__isnull=True)
+        return self.filter(filtro)
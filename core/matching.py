@@ -0,0 +1,156 @@
+"""
+Matchmaking engine for SkillSwap.
+
+Finds the users whose active posts complement the posts of a given user: what they OFREZCO covers what the user
+BUSCA, and the other way round. Matches are read from the IndicePublicacion inverted index, so the cost of a query
+depends on how many users share the user's skills, not on the total number of posts.
+"""
+from dataclasses import dataclass
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import Least
+
+from .availability import overlapping_users
+from .models import IndicePublicacion, Publicacion
+
+
+@dataclass(frozen=True)
+class Match:
+    """
+    A matchmaking result.
+
+    Attributes:
+        usuario_id (int): Matched user.
+        ofrece (int): Skills the matched user offers that the user is searching for.
+        busca (int): Skills the matched user is searching for that the user offers.
+    """
+    usuario_id: int
+    ofrece: int
+    busca: int
+
+    @property
+    def mutuo(self):
+        """
+        Returns True if both users can teach something to each other.
+
+        Returns:
+            bool: True if it's a two-way match.
+        """
+        return self.ofrece > 0 and self.busca > 0
+
+    @property
+    def puntuacion(self):
+        """
+        Returns the ranking score of the match.
+
+        Two-way matches always rank above one-way matches, then the more skills covered, the better.
+
+        Returns:
+            int: Match score.
+        """
+        return min(self.ofrece, self.busca) * 1000 + self.ofrece + self.busca
+
+
+def find_matches(usuario, limit=20, minutos=None):
+    """
+    Returns the users that best match the posts of a user, ranked by score.
+
+    Uses two queries: one to read the user's own index rows and one to aggregate, rank and cut the candidates that
+    share any of their skills. Both are served by the (tipo, habilidad, usuario) unique index. Filtering by availability adds a
+    query for the user's own intervals.
+
+    Args:
+        usuario (Usuario | int): User (or user id) to find matches for.
+        limit (int): Max number of matches to return.
+        minutos (int | None): If given, only users whose availability overlaps the user's by at least this many
+            minutes in a row (core.availability), e.g. the length of a session.
+
+    Returns:
+        list[Match]: Matches sorted from best to worst.
+
+    Example:
+        >>> for match in find_matches(usuario, limit=5):
+        ...     print(match.usuario_id, match.puntuacion)
+    """
+    usuario_id = getattr(usuario, 'pk', usuario)
+
+    propias = {'OFREZCO': [], 'BUSCO': []}
+    for tipo, habilidad_id in IndicePublicacion.objects.filter(usuario_id=usuario_id).values_list('tipo', 'habilidad_id'):
+        propias[tipo].append(habilidad_id)
+
+    if not propias['OFREZCO'] and not propias['BUSCO']:
+        return []
+
+    # Candidates OFREZCO what the user BUSCA, or BUSCAN what the user OFREZCO.
+    condicion = Q(tipo='OFREZCO', habilidad_id__in=propias['BUSCO']) | Q(tipo='BUSCO', habilidad_id__in=propias['OFREZCO'])
+    filas = (
+        IndicePublicacion.objects
+        .filter(condicion, habilidad__estado=True, usuario__is_active=True)
+        .exclude(usuario_id=usuario_id)
+    )
+    if minutos:
+        filas = filas.filter(usuario_id__in=overlapping_users(usuario_id, minutos))
+    filas = (
+        filas
+        .values('usuario_id')
+        .annotate(
+            ofrece=Count('habilidad_id', filter=Q(tipo='OFREZCO')),
+            busca=Count('habilidad_id', filter=Q(tipo='BUSCO')),
+        )
+        # Match.puntuacion, computed by the database so only the top rows are sent back.
+        .annotate(puntuacion=Least('ofrece', 'busca') * 1000 + F('ofrece') + F('busca'))
+        .order_by('-puntuacion', 'usuario_id')
+    )
+    return [Match(fila['usuario_id'], fila['ofrece'], fila['busca']) for fila in filas[:limit]]
+
+
+def refresh_entry(usuario_id, habilidad_id, tipo):
+    """
+    Recomputes a single row of the inverted index.
+
+    Counts the active posts of the user for the skill and type and stores the result, removing the row when there
+    are none left. The count is served by the (tipo, habilidad, estado) index of Publicacion.
+
+    Args:
+        usuario_id (int): Post author.
+        habilidad_id (int): Post skill.
+        tipo (str): Post type ('OFREZCO' or 'BUSCO').
+    """
+    total = Publicacion.objects.filter(tipo=tipo, habilidad_id=habilidad_id, estado=True, autor_id=usuario_id).count()
+
+    if total:
+        IndicePublicacion.objects.update_or_create(
+            tipo=tipo, habilidad_id=habilidad_id, usuario_id=usuario_id, defaults={'total': total}
+        )
+    else:
+        IndicePublicacion.objects.filter(tipo=tipo, habilidad_id=habilidad_id, usuario_id=usuario_id).delete()
+
+
+def rebuild_index(batch_size=1000):
+    """
+    Rebuilds the whole inverted index from the Publicacion table.
+
+    Used after bulk loads (bulk_create doesn't send signals) or to repair drift.
+
+    Args:
+        batch_size (int): Rows inserted per query.
+
+    Returns:
+        int: Number of index rows written.
+    """
+    filas = (
+        Publicacion.objects
+        .filter(estado=True)
+        .values('tipo', 'habilidad_id', usuario_id=F('autor_id'))
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+
+    with transaction.atomic():
+        IndicePublicacion.objects.all().delete()
+        creadas = IndicePublicacion.objects.bulk_create(
+            (IndicePublicacion(**fila) for fila in filas.iterator()),
+            batch_size=batch_size,
+        )
+    return len(creadas)
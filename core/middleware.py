@@ -0,0 +1,230 @@
+"""
+Middleware for SkillSwap.
+"""
+import json
+import logging
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.utils import translation
+from django.utils.functional import SimpleLazyObject
+
+from . import cache
+from .instrumentation import QueryTracker
+from .preferences import DEFAULT
+from .routers import request_scope
+
+logger = logging.getLogger('skillswap.instrumentation')
+
+DEFAULTS = {
+    'ENABLED': True,
+    'SERVER_TIMING': True,
+    'STRICT_BUDGETS': False,
+    'SLOW_REQUEST_MS': 500,
+}
+
+
+def get_setting(nombre):
+    """
+    Returns an INSTRUMENTATION setting.
+
+    Args:
+        nombre (str): Setting key (e.g. 'STRICT_BUDGETS').
+
+    Returns:
+        Any: Value from settings.INSTRUMENTATION or its default.
+    """
+    return getattr(settings, 'INSTRUMENTATION', {}).get(nombre, DEFAULTS[nombre])
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Measures the queries and latency of every request.
+
+    For each request it:
+        - Adds a Server-Timing header (db time, number of queries and total time), visible in the browser dev tools.
+        - Logs a structured record to the 'skillswap.instrumentation' logger (INFO, or WARNING if the request was
+          slow or went over its query budget), with the repeated query shapes.
+        - Checks the query budget declared with core.instrumentation.query_budget(). With
+          INSTRUMENTATION['STRICT_BUDGETS'] it raises QueryBudgetExceeded instead of logging, so tests fail.
+
+    It should be the first middleware, so the queries of the other middleware (sessions, auth...) are counted too.
+    It supports sync (WSGI) and async (ASGI) requests; in async ones, the queries are recorded in the thread that
+    runs the ORM calls of the request.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not get_setting('ENABLED'):
+            return self.get_response(request)
+
+        tracker = QueryTracker(label=request.path)
+        request._query_tracker = tracker
+        tracker.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            tracker.stop()
+        return self.finish(request, response, tracker)
+
+    async def __acall__(self, request):
+        if not get_setting('ENABLED'):
+            return await self.get_response(request)
+
+        tracker = QueryTracker(label=request.path)
+        request._query_tracker = tracker
+        await sync_to_async(tracker.start)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(tracker.stop)()
+        return self.finish(request, response, tracker)
+
+    def finish(self, request, response, tracker):
+        """
+        Adds the Server-Timing header, logs the metrics and checks the budget of a finished request.
+        """
+        if get_setting('SERVER_TIMING'):
+            response.headers['Server-Timing'] = tracker.server_timing()
+
+        self.log(request, response, tracker)
+        if tracker.over_budget and get_setting('STRICT_BUDGETS'):
+            tracker.check_budget()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        """
+        Takes the label and the query budget of the view that will handle the request.
+        """
+        tracker = getattr(request, '_query_tracker', None)
+        if tracker is not None:
+            tracker.label = getattr(request.resolver_match, 'view_name', None) or request.path
+            tracker.budget = getattr(view_func, 'query_budget', None)
+
+    def log(self, request, response, tracker):
+        """
+        Logs the metrics of a request.
+        """
+        registro = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            **tracker.as_dict(),
+        }
+        lento = tracker.wall_time >= get_setting('SLOW_REQUEST_MS')
+        nivel = logging.WARNING if lento or tracker.over_budget else logging.INFO
+        logger.log(nivel, json.dumps(registro, ensure_ascii=False), extra={'instrumentation': registro})
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Keeps the reads of a client on the primary database for a while after it writes (read-your-writes).
+
+    When a request writes to a model that is read from the replicas (see core.routers), a short-lived cookie is set;
+    while it's there, the reads of that client skip the replicas, which may not have caught up yet.
+    """
+    cookie_name = 'db_primary'
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with request_scope(sticky=self.cookie_name in request.COOKIES) as wrote:
+            response = self.get_response(request)
+            self.stick(response, wrote())
+        return response
+
+    async def __acall__(self, request):
+        # The async ORM runs in another thread, so its writes can't pin this context: async views are read-only.
+        with request_scope(sticky=self.cookie_name in request.COOKIES) as wrote:
+            response = await self.get_response(request)
+            self.stick(response, wrote())
+        return response
+
+    def stick(self, response, escribio):
+        """
+        Sets the cookie that keeps the client on the primary if the request wrote.
+        """
+        if escribio:
+            response.set_cookie(
+                self.cookie_name, '1', max_age=getattr(settings, 'DATABASE_REPLICA_STICKY_SECONDS', 5), httponly=True, samesite='Lax',
+            )
+
+
+class PreferencesMiddleware:
+    """
+    Applies the preferences of the signed-in user to the request.
+
+    They're read once per request, from core.cache (so usually without any query), into request.preferencias: a typed
+    Preferencias object for views and templates (e.g. request.preferencias.theme). The language of the user is
+    active while the view runs and its response is built. Anonymous users get the defaults without touching the
+    database.
+
+    The work is done in process_view, so views that don't use the preferences (marked with
+    core.preferences.without_preferences) skip it, and with it the queries of the session, the user and the
+    preferences. They still get request.preferencias, loaded on first use (in sync code only).
+
+    Goes after AuthenticationMiddleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request.preferencias = SimpleLazyObject(lambda: self.load(request.user))
+        with translation.override(translation.get_language()):  # Restores the language process_view activates.
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        request.preferencias = SimpleLazyObject(lambda: self.load(request.user))
+        with translation.override(translation.get_language()):
+            return await self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        """
+        Loads the user and their preferences and activates their language, unless the view doesn't use them.
+        """
+        if not getattr(view_func, 'uses_preferences', True):
+            return None
+        usuario = request.user
+        self.share_user(request, usuario)
+        request.preferencias = self.load(usuario)
+        if usuario.is_authenticated:
+            translation.activate(request.preferencias.language)
+        return None
+
+    def load(self, usuario):
+        """
+        Returns the preferences of a user, or the defaults for anonymous users.
+        """
+        return cache.preferences(usuario.pk) if usuario.is_authenticated else DEFAULT
+
+    def share_user(self, request, usuario):
+        """
+        Makes request.user and request.auser() return the user already loaded, as each of them caches it separately.
+        """
+        async def auser():
+            return usuario
+
+        request.user = usuario
+        request.auser = auser
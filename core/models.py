@@ -1,10 +1,14 @@
-import zoneinfo
 from django.utils import timezone
 
 from django.contrib.auth.models import AbstractUser
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db import models
+from django.db.models.fields.json import KT
+
+from . import preferences
+from .managers import AcuerdoQuerySet, PerfilQuerySet, PublicacionQuerySet, SesionQuerySet
+from .timezones import TimeZoneField, timezone_choices  # noqa: F401 - timezone_choices is kept importable from here.
 
 # Create your models here.
 
@@ -42,6 +46,7 @@ class Usuario(AbstractUser):
         nombre (str): Username (max 100 characters)
         alias (str): User alias for search (max 16 characters, unique)
         email (str): User email address (Unique)
+        fecha_modificacion (datetime): Date and time of the last change.
 
     Example:
         >>> usuario = Usuario.objects.create(
@@ -54,6 +59,7 @@ class Usuario(AbstractUser):
     nombre = models.CharField(max_length=100)
     alias = models.CharField(max_length=16, unique=True) # Represents a user alias (e.g. @JohnPork)
     email = models.EmailField(unique=True)
+    fecha_modificacion = models.DateTimeField(auto_now=True, db_index=True) # Incremental exports (core.export)
     # is_active - 'Estado' attribute. Python is faster checking for a boolean rather than a string - FROM AbstractUser !!
 
     def __str__(self):
@@ -83,23 +89,10 @@ class Usuario(AbstractUser):
         db_table = 'usuario'
         verbose_name = 'usuario'
         verbose_name_plural = 'usuarios'
-        ordering = ['nombre']
-
-
-def timezone_choices():
-    """
-    Returns a list of available timezones
-
-    Gives a list of available timezones
-    You can see the list of available timezones here: https://en.wikipedia.org/wiki/List_of_tz_database_time_zones
-
-    Returns:
-        list: List of available timezones
-
-    Example:
-    >>> timezone_choices()
-    """
-    return [(tz, tz) for tz in sorted(zoneinfo.available_timezones())]
+        ordering = ['nombre', 'id'] # id makes the ordering unique, so pages never skip or repeat rows.
+        indexes = [
+            models.Index(fields=['nombre', 'id'], name='usuario_nombre_idx'), # Default ordering and name prefix searches (core.admin)
+        ]
 
 
 def default_preferencias():
@@ -114,11 +107,7 @@ def default_preferencias():
    Example:
        >>> default_preferencias()
     """
-    return {
-        "theme": "light",
-        "language": "es",
-        # This will be modified in case of adding a new preference.
-    }
+    return preferences.defaults() # Keys and defaults are in core.preferences.SCHEMA
 
 class Perfil(models.Model):
     """
@@ -132,6 +121,8 @@ class Perfil(models.Model):
         zona_horaria (str): User timezone.
         disponibilidad (str): User availability (e.g. time ranges or anything else)
         preferencias (dict): User preferences (e.g. light/dark mode)
+        idioma (str): preferencias['language'], kept by the database (read-only).
+        fecha_modificacion (datetime): Date and time of the last change.
 
     Example:
         >>> usuario = Usuario.objects.create(
@@ -149,12 +140,16 @@ class Perfil(models.Model):
     """
     usuario = models.OneToOneField(Usuario, on_delete=models.CASCADE, related_name='perfil', related_query_name='perfil')
     biografia = models.CharField(max_length=200, blank=True)
-    zona_horaria = models.CharField(max_length=100, choices=timezone_choices(), default='Europe/Madrid')
+    zona_horaria = TimeZoneField(default='Europe/Madrid') # Choices are lazy and cached, see core.timezones
     disponibilidad = models.TextField()
     preferencias = models.JSONField(default=default_preferencias, blank=True)
+    idioma = models.GeneratedField(expression=KT('preferencias__language'), output_field=models.CharField(max_length=2, null=True), db_persist=True, db_index=True) # Computed by the database from preferencias, indexed to filter users by language (PerfilQuerySet.by_language)
+    fecha_modificacion = models.DateTimeField(auto_now=True, db_index=True) # Incremental exports (core.export)
 
     habilidades = models.ManyToManyField(Habilidad, blank=True, related_name='perfil', related_query_name='perfil')
 
+    objects = PerfilQuerySet.as_manager() # Loading profiles, see core.managers
+
 
     def clean(self):
         """
@@ -166,7 +161,8 @@ class Perfil(models.Model):
             self (Perfil): User profile in SkillSwap
 
         Raises:
-            ValidationError: Raises when validation fails:
+            ValidationError: Raises when validation fails (rules in core.preferences.SCHEMA):
+                - preferencias isn't a JSON object.
                 - Invalid keys in preferencias JSONField. Keys must match default_preferencias keys)
                 - Invalid theme values ("dark" or "light" only).
                 - Invalid language values ("es" or "en" only).
@@ -188,19 +184,17 @@ class Perfil(models.Model):
         """
 
         # Clean Preferencias
-        theme_values = ["dark", "light"]
-        language_values = ["es", "en"]
+        preferences.validate(self.preferencias)
 
-        default_preferences = default_preferencias()
-        preferences = self.preferencias or {}
+    @property
+    def prefs(self):
+        """
+        Returns the preferences of the profile as a typed object.
 
-        for k, v in preferences.items():
-            if k not in default_preferences.keys():
-                raise ValidationError(f"The key {k} is not valid.")
-            if k == "theme" and v not in theme_values:
-                raise ValidationError(f"The theme must be 'dark' or 'light', not '{v}'")
-            if k == "language" and v not in language_values:
-                raise ValidationError(f"The language must be 'es' or 'en', not '{v}'")
+        Returns:
+            Preferencias: e.g. perfil.prefs.theme, perfil.prefs.language (defaults for missing keys).
+        """
+        return preferences.Preferencias.parse(self.preferencias)
 
 class Publicacion(models.Model):
     """
@@ -246,11 +240,120 @@ class Publicacion(models.Model):
     descripcion = models.TextField()
     estado = models.BooleanField(default=True)
     fecha_creacion = models.DateTimeField(auto_now_add=True)
-    fecha_modificacion = models.DateTimeField(auto_now=True)
+    fecha_modificacion = models.DateTimeField(auto_now=True, db_index=True) # Incremental exports (core.export)
 
     autor = models.ForeignKey(Usuario, on_delete=models.CASCADE, related_name='publicaciones', related_query_name='publicacion') # It has no-sense if the post remains when the user closes it's account, as you won't be able to contact him.
     habilidad = models.ForeignKey(Habilidad, on_delete=models.CASCADE, related_name='publicaciones', related_query_name='publicacion') # It has no-sense if the post remains when the skill is removed, as you won't be able to SkillSwap.
 
+    objects = PublicacionQuerySet.as_manager() # Loading profiles, see core.managers
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['tipo', 'habilidad', 'estado'], name='publicacion_tipo_hab_est_idx'), # Matchmaking (core.matching)
+            models.Index(fields=['-fecha_creacion', '-id'], condition=models.Q(estado=True), name='publicacion_feed_idx'), # Feed keyset pagination (core.pagination), active posts only
+            models.Index(fields=['fecha_creacion', 'id'], name='publicacion_fecha_idx'), # Admin date hierarchy and ordering over every post (core.admin)
+        ]
+
+
+class IndicePublicacion(models.Model):
+    """
+    Model for the matchmaking inverted index in SkillSwap
+
+    Precomputed index of active posts per skill, type and user. Each row says "this user has N active posts
+    offering/searching this skill", so the matchmaking engine reads a few rows per skill instead of joining
+    every Publicacion. It's kept up to date by core.signals when posts are saved or deleted.
+
+    Attributes:
+        tipo (str): Post type (choices in Publicacion.TIPO_CHOICES).
+        habilidad (Habilidad): Offered/searched skill.
+        usuario (Usuario): Author of the posts.
+        total (int): Number of active posts of the user for this skill and type.
+
+    Example:
+        >>> from core.matching import rebuild_index
+        >>> rebuild_index()
+        >>> IndicePublicacion.objects.filter(tipo='OFREZCO', habilidad__nombre="Photoshop").count()
+    """
+    tipo = models.CharField(max_length=30, choices=Publicacion.TIPO_CHOICES)
+    total = models.PositiveIntegerField(default=0)
+
+    habilidad = models.ForeignKey(Habilidad, on_delete=models.CASCADE, related_name='indice', related_query_name='indice')
+    usuario = models.ForeignKey(Usuario, on_delete=models.CASCADE, related_name='indice', related_query_name='indice')
+
+    class Meta:
+        db_table = 'indice_publicacion'
+        verbose_name = 'indice de publicaciones'
+        verbose_name_plural = 'indices de publicaciones'
+        constraints = [
+            models.UniqueConstraint(fields=['tipo', 'habilidad', 'usuario'], name='unique_indice_publicacion')
+        ] # The unique index also serves (tipo, habilidad) lookups, so no extra index is needed.
+
+class IntervaloDisponibilidad(models.Model):
+    """
+    Model for the availability interval index in SkillSwap
+
+    Precomputed weekly availability of each user, parsed from Perfil.disponibilidad. Each row is a time interval
+    in UTC minutes of the week (0 is Monday 00:00 UTC), so users whose availability overlaps are found with range
+    comparisons instead of parsing every profile. It's kept up to date by core.signals when profiles are saved.
+
+    Attributes:
+        usuario (Usuario): User who is available.
+        inicio (int): First minute of the interval (negative for the copy of an interval that wraps the week).
+        fin (int): Minute the interval ends (exclusive, may be past the end of the week).
+
+    Example:
+        >>> from core.availability import overlapping_users
+        >>> overlapping_users(usuario, minutos=60)
+    """
+    inicio = models.IntegerField()
+    fin = models.IntegerField()
+
+    usuario = models.ForeignKey(Usuario, on_delete=models.CASCADE, related_name='intervalos', related_query_name='intervalo')
+
+    class Meta:
+        db_table = 'intervalo_disponibilidad'
+        verbose_name = 'intervalo de disponibilidad'
+        verbose_name_plural = 'intervalos de disponibilidad'
+        indexes = [
+            models.Index(fields=['inicio', 'fin'], name='intervalo_disponibilidad_idx'),
+        ]
+
+class SimilitudHabilidad(models.Model):
+    """
+    Model for the skill recommendation table in SkillSwap
+
+    Top-K most similar skills of each skill, by how often they go together: known by the same users
+    (Perfil.habilidades) and traded in the same finished agreements. Built offline by the build_recommendations
+    command and refreshed incrementally as agreements finish (core.recommendations), so a recommendation is a
+    lookup of a few rows per skill the user knows.
+
+    The row of a skill with itself keeps its total occurrences (the diagonal of the co-occurrence matrix), which
+    the incremental refresh needs to score the pairs again.
+
+    Attributes:
+        habilidad (Habilidad): Skill.
+        similar (Habilidad): One of its most similar skills (or itself, see above).
+        coocurrencias (int): Times both skills go together (weighted, see core.recommendations).
+        puntuacion (float): Cosine similarity of both skills, between 0 and 1.
+
+    Example:
+        >>> from core.recommendations import recommend
+        >>> recommend(usuario, limit=5)
+    """
+    coocurrencias = models.PositiveIntegerField()
+    puntuacion = models.FloatField()
+
+    habilidad = models.ForeignKey(Habilidad, on_delete=models.CASCADE, related_name='similitudes', related_query_name='similitud')
+    similar = models.ForeignKey(Habilidad, on_delete=models.CASCADE, related_name='+')
+
+    class Meta:
+        db_table = 'similitud_habilidad'
+        verbose_name = 'similitud de habilidades'
+        verbose_name_plural = 'similitudes de habilidades'
+        constraints = [
+            models.UniqueConstraint(fields=['habilidad', 'similar'], name='unique_similitud_habilidad')
+        ] # The unique index also serves the lookups by habilidad, so no extra index is needed.
+
 class Acuerdo(models.Model):
     """
     Model for an agreement in SkillSwap
@@ -265,6 +368,8 @@ class Acuerdo(models.Model):
         sesiones_por_semana (int): Sessions per week
         estado (str): Agreement's status.(Choices in ESTADO_CHOICES,PROPUESTO by default)
         condiciones (str): Agreement's conditions.
+        fecha_creacion (datetime): Date and time the agreement was proposed.
+        fecha_modificacion (datetime): Date and time of the last change (state transitions included).
         habilidad_tradea_a (Habilidad): Skill from A user
         habilidad_tradea_b (Habilidad): Skill from B user
 
@@ -319,12 +424,16 @@ class Acuerdo(models.Model):
     semanas = models.PositiveIntegerField(default=1) # The user won't be able to use a negative integer.
     mins_sesion = models.PositiveIntegerField(default=60) # The user won't be able to use a negative integer. Default 1 hour
     sesiones_por_semana = models.PositiveIntegerField(default=1) # The user won't be able to use a negative integer. Default 1 session per week.
-    estado = models.CharField(choices=ESTADO_CHOICES, max_length=30, default='PROPUESTO') # Default: Proposal pending owner's approval or denial after responding to their post
+    estado = models.CharField(choices=ESTADO_CHOICES, max_length=30, default='PROPUESTO') # Default: Proposal pending owner's approval or denial after responding to their post. Move it through core.transitions instead of save().
     condiciones = models.TextField()
+    fecha_creacion = models.DateTimeField(auto_now_add=True) # Proposals that get no answer expire after a while (close_stale_agreements command).
+    fecha_modificacion = models.DateTimeField(auto_now=True, db_index=True) # Incremental exports (core.export). Set by core.transitions too, as update() skips auto_now.
 
     habilidad_tradea_a = models.ForeignKey(Habilidad, on_delete=models.CASCADE, related_name='acuerdos_a', related_query_name='acuerdos_a') # It has no-sense if the post remains when the skill is removed, as you won't offer/search for a Null skill.
     habilidad_tradea_b = models.ForeignKey(Habilidad, on_delete=models.CASCADE, related_name='acuerdos_b', related_query_name='acuerdos_b') # It has no-sense if the post remains when the skill is removed, as you won't offer/search for a Null skill.
 
+    objects = AcuerdoQuerySet.as_manager() # Loading profiles, see core.managers
+
     def clean(self):
         """
         Validates the entire model before saving it.
@@ -358,19 +467,23 @@ class Acuerdo(models.Model):
             ValidationError: A SkillSwap cannot be created with two equivalent skills.
         """
 
-        # Clean Habilidades
-        if self.habilidad_tradea_a == self.habilidad_tradea_b:
+        # Clean Habilidades (by id: no queries; a missing one is reported by clean_fields())
+        if self.habilidad_tradea_a_id is not None and self.habilidad_tradea_a_id == self.habilidad_tradea_b_id:
             raise ValidationError('A SkillSwap cannot be created with two equivalent skills.')
 
         # Clean Usuarios
-        if self.usuario_a == self.usuario_b:
+        if self.usuario_a_id is not None and self.usuario_a_id == self.usuario_b_id:
             raise ValidationError('A SkillSwap cannot be created with two equivalent users.')
 
     class Meta:
         db_table = 'acuerdo'
         verbose_name = 'acuerdo'
         verbose_name_plural = 'acuerdos'
-        ordering = ['usuario_a']
+        ordering = ['usuario_a', 'id'] # id makes the ordering unique, so pages never skip or repeat rows.
+        indexes = [
+            models.Index(fields=['estado', 'id'], name='acuerdo_estado_idx'), # Keyset scans by status (close_stale_agreements command)
+            models.Index(fields=['fecha_creacion', 'id'], name='acuerdo_fecha_idx'), # Admin date hierarchy (core.admin)
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=['usuario_a', 'usuario_b', 'habilidad_tradea_a', 'habilidad_tradea_b'],
@@ -423,6 +536,7 @@ class Sesion(models.Model):
         asistencia_user_b (bool): Did the user B attend?
         estado (bool): If the session is active or not
         acuerdo (Acuerdo): The SkillSwap agreement that this session is part of
+        fecha_modificacion (datetime): Date and time of the last change.
 
     Example:
         >>> usuario_a = Usuario.objects.create(nombre="Paco Tester", alias="pacogamer30", email="pacotest@gmail.com")
@@ -460,9 +574,12 @@ class Sesion(models.Model):
     asistencia_user_a = models.BooleanField(default=False)
     asistencia_user_b = models.BooleanField(default=False)
     estado = models.BooleanField(default=False)     # True if Active, otherwise False. Python is faster checking for a boolean rather than a string
+    fecha_modificacion = models.DateTimeField(auto_now=True, db_index=True) # Incremental exports (core.export)
 
     acuerdo = models.ForeignKey(Acuerdo, on_delete=models.CASCADE, related_name='sesiones', related_query_name='sesion')
 
+    objects = SesionQuerySet.as_manager() # Loading profiles, see core.managers
+
     def clean(self):
         """
         Validates the entire model before saving it.
@@ -509,11 +626,279 @@ class Sesion(models.Model):
         ValidationError: The agreement status must be ongoing.
         """
 
-        if self.acuerdo.estado != 'En Curso':
+        if self.acuerdo.estado != 'EN CURSO':
             raise ValidationError('The agreement status must be ongoing.')
 
     class Meta:
         db_table = 'sesion'
         verbose_name = 'sesion'
         verbose_name_plural = 'sesiones'
-        ordering = ('fecha',)
+        ordering = ('fecha', 'id') # id makes the ordering unique, so pages never skip or repeat rows.
+        indexes = [
+            models.Index(fields=['acuerdo', 'fecha', 'id'], name='sesion_historial_idx'), # Session history keyset pagination (core.pagination)
+            models.Index(fields=['fecha', 'id'], name='sesion_fecha_idx'), # Default ordering and admin date hierarchy (core.admin)
+        ]
+
+class EstadisticasUsuario(models.Model):
+    """
+    Model for the activity counters of a user in SkillSwap
+
+    Denormalized reputation and activity counters of a user, so profile pages read them with a single primary-key
+    lookup instead of aggregating every agreement and session. They're kept up to date by core.signals with atomic
+    F() increments, and can be rebuilt from scratch with the ``rebuild_user_stats`` command.
+
+    Attributes:
+        usuario (Usuario): User in SkillSwap (primary key)
+        acuerdos_finalizados (int): Number of finished agreements ('FINALIZADO')
+        sesiones (int): Number of held sessions of the user's agreements (at least one user attended)
+        asistencias (int): Number of held sessions the user attended
+        minutos_impartidos (int): Minutes of the sessions the user attended (from duracion_real)
+
+    Example:
+        >>> estadisticas = EstadisticasUsuario.objects.get(pk=usuario.pk)
+        >>> estadisticas.tasa_asistencia
+        0.75
+    """
+    usuario = models.OneToOneField(Usuario, on_delete=models.CASCADE, primary_key=True, related_name='estadisticas', related_query_name='estadisticas')
+    acuerdos_finalizados = models.PositiveIntegerField(default=0)
+    sesiones = models.PositiveIntegerField(default=0)
+    asistencias = models.PositiveIntegerField(default=0)
+    minutos_impartidos = models.PositiveIntegerField(default=0)
+
+    @property
+    def tasa_asistencia(self):
+        """
+        Returns the attendance rate of the user.
+
+        Returns:
+            float: Attended sessions / held sessions (1.0 if no session has been held yet).
+        """
+        return self.asistencias / self.sesiones if self.sesiones else 1.0
+
+    @property
+    def horas_impartidas(self):
+        """
+        Returns the hours the user has actually taught.
+
+        Returns:
+            float: minutos_impartidos in hours.
+        """
+        return self.minutos_impartidos / 60
+
+    class Meta:
+        db_table = 'estadisticas_usuario'
+        verbose_name = 'estadisticas de usuario'
+        verbose_name_plural = 'estadisticas de usuarios'
+
+
+class TerminoBusqueda(models.Model):
+    """
+    Model for the full-text search index in SkillSwap
+
+    Posting list of the pure-Python search backend (core.search.InvertedIndexBackend): how many times a stemmed
+    term appears in a post description or a profile bio. Used when the database has no native full-text search.
+
+    Attributes:
+        tipo (str): Indexed object type (choices in TIPO_CHOICES).
+        objeto_id (int): Indexed post or profile id.
+        termino (str): Stemmed term.
+        frecuencia (int): Times the term appears in the text.
+    """
+    TIPO_CHOICES = (
+        ('publicacion', 'Publicacion'),
+        ('perfil', 'Perfil'),
+    )
+
+    tipo = models.CharField(max_length=20, choices=TIPO_CHOICES)
+    objeto_id = models.PositiveIntegerField()
+    termino = models.CharField(max_length=50)
+    frecuencia = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        db_table = 'termino_busqueda'
+        verbose_name = 'termino de busqueda'
+        verbose_name_plural = 'terminos de busqueda'
+        indexes = [
+            models.Index(fields=['tipo', 'termino', 'objeto_id'], name='termino_busqueda_idx'), # Searches
+            models.Index(fields=['objeto_id', 'tipo'], name='termino_busqueda_objeto_idx'), # Reindexing (not prefixed by tipo, so searches never pick it)
+        ]
+
+
+class Notificacion(models.Model):
+    """
+    Model for the notification outbox in SkillSwap
+
+    Transactional outbox of the notifications to the users: each row is written in the same transaction as the
+    change it reports (a proposal, an accepted or cancelled agreement, an upcoming session), so a notification is
+    never lost nor sent for a change that was rolled back. The send_notifications worker sends them outside the
+    request, see core.outbox.
+
+    Attributes:
+        clave (str): Idempotency key (e.g. 'acuerdo_aceptado:12:5'). The same event is only stored once, and senders
+            pass the key on so the provider drops repeated deliveries.
+        tipo (str): Event (choices in TIPO_CHOICES).
+        objeto_id (int): Agreement or session the event is about.
+        datos (dict): Extra data of the event (e.g. the session date).
+        estado (str): Delivery status (choices in ESTADO_CHOICES).
+        intentos (int): Delivery attempts so far.
+        disponible_en (datetime): When it can be claimed: when it's due, when to retry it, or when the lease of the
+            worker that claimed it expires.
+        lote (str): Token of the worker batch that claimed it.
+        error (str): Last delivery error.
+        fecha_creacion (datetime): Date and time of the change.
+        fecha_envio (datetime): Date and time it was sent.
+        usuario (Usuario): Recipient.
+
+    Example:
+        >>> from core import outbox
+        >>> outbox.process_batch()
+        Resultado(enviadas=3, reintentos=0, fallidas=0, descartadas=0)
+    """
+    TIPO_CHOICES = (
+        ('acuerdo_propuesto', 'Acuerdo propuesto'),
+        ('acuerdo_aceptado', 'Acuerdo aceptado'),
+        ('acuerdo_cancelado', 'Acuerdo cancelado'),
+        ('sesion_proxima', 'Sesion proxima'),
+    )
+    ESTADO_CHOICES = (
+        ('PENDIENTE', 'Pendiente'),
+        ('ENVIADA', 'Enviada'),
+        ('FALLIDA', 'Fallida'), # Out of attempts
+        ('DESCARTADA', 'Descartada'), # Outdated when it was due (e.g. the session was moved)
+    )
+
+    clave = models.CharField(max_length=100, unique=True)
+    tipo = models.CharField(max_length=30, choices=TIPO_CHOICES)
+    objeto_id = models.PositiveIntegerField()
+    datos = models.JSONField(default=dict, blank=True)
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='PENDIENTE')
+    intentos = models.PositiveIntegerField(default=0)
+    disponible_en = models.DateTimeField(default=timezone.now)
+    lote = models.CharField(max_length=32, blank=True)
+    error = models.TextField(blank=True)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_envio = models.DateTimeField(null=True, blank=True)
+
+    usuario = models.ForeignKey(Usuario, on_delete=models.CASCADE, related_name='notificaciones', related_query_name='notificacion')
+
+    class Meta:
+        db_table = 'notificacion'
+        verbose_name = 'notificacion'
+        verbose_name_plural = 'notificaciones'
+        indexes = [
+            models.Index(fields=['disponible_en', 'id'], condition=models.Q(estado='PENDIENTE'), name='notificacion_cola_idx'), # Claims of the worker (core.outbox), pending rows only
+            models.Index(fields=['tipo', 'objeto_id'], name='notificacion_objeto_idx'), # Dropping the reminders of moved sessions
+        ]
+
+
+class ResumenSesiones(models.Model):
+    """
+    Model for the daily session rollup of SkillSwap
+
+    Sessions of a day by skill category, so the dashboards read a few rows per day instead of grouping every
+    session. A session counts for the categories of both skills of its agreement (once if they're the same) and
+    for the row with an empty category, which holds the totals of the day. Filled by core.analytics from the
+    sessions changed since the last run (update_analytics command).
+
+    Attributes:
+        fecha (date): Day of the sessions.
+        categoria (str): Skill category ('' for every category).
+        programadas (int): Sessions of the day.
+        celebradas (int): Held sessions (at least one user attended).
+        asistencias (int): Attendances (up to 2 per session).
+        minutos (int): Minutes taught in the held sessions (from duracion_real).
+
+    Example:
+        >>> from core.analytics import sessions
+        >>> sessions(date(2025, 1, 1), date(2025, 3, 31), periodo='semana', categoria='Idioma')
+    """
+    fecha = models.DateField()
+    categoria = models.CharField(max_length=100, blank=True)
+    programadas = models.PositiveIntegerField(default=0)
+    celebradas = models.PositiveIntegerField(default=0)
+    asistencias = models.PositiveIntegerField(default=0)
+    minutos = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'resumen_sesiones'
+        verbose_name = 'resumen de sesiones'
+        verbose_name_plural = 'resumenes de sesiones'
+        constraints = [
+            models.UniqueConstraint(fields=['categoria', 'fecha'], name='unique_resumen_sesiones')
+        ] # Dashboard ranges of a category (core.analytics)
+
+
+class ResumenAcuerdos(models.Model):
+    """
+    Model for the daily agreement funnel rollup of SkillSwap
+
+    Agreements proposed on a day by skill category and current state, so the funnel (proposed, accepted, finished)
+    of a date range is read from a few rows per day. Categories are counted like in ResumenSesiones. Filled by
+    core.analytics from the agreements changed since the last run.
+
+    Attributes:
+        fecha (date): Day the agreements were proposed (in the current timezone).
+        categoria (str): Skill category ('' for every category).
+        propuestos (int): Agreements still proposed.
+        aceptados (int): Agreements accepted, not started yet.
+        en_curso (int): Agreements in progress.
+        finalizados (int): Finished agreements.
+        cancelados (int): Cancelled agreements.
+    """
+    fecha = models.DateField()
+    categoria = models.CharField(max_length=100, blank=True)
+    propuestos = models.PositiveIntegerField(default=0)
+    aceptados = models.PositiveIntegerField(default=0)
+    en_curso = models.PositiveIntegerField(default=0)
+    finalizados = models.PositiveIntegerField(default=0)
+    cancelados = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'resumen_acuerdos'
+        verbose_name = 'resumen de acuerdos'
+        verbose_name_plural = 'resumenes de acuerdos'
+        constraints = [
+            models.UniqueConstraint(fields=['categoria', 'fecha'], name='unique_resumen_acuerdos')
+        ] # Dashboard ranges of a category (core.analytics)
+
+
+class MarcaAnalitica(models.Model):
+    """
+    Model for the watermarks of the analytics rollups of SkillSwap
+
+    Up to when the changes of a source table have been rolled up (core.analytics): the next run only reads the rows
+    with a later fecha_modificacion.
+
+    Attributes:
+        tabla (str): Rollup ('sesiones' or 'acuerdos').
+        marca (datetime): Rows changed up to this date and time are rolled up.
+    """
+    tabla = models.CharField(max_length=20, unique=True)
+    marca = models.DateTimeField()
+
+    class Meta:
+        db_table = 'marca_analitica'
+        verbose_name = 'marca de analitica'
+        verbose_name_plural = 'marcas de analitica'
+
+
+class DiaPendiente(models.Model):
+    """
+    Model for the days whose rollup must be recomputed, in SkillSwap
+
+    The watermark finds the days of the rows that changed, not the day a session was moved from nor the day of a
+    deleted row: core.signals and core.scheduling record those here, and the next run of core.analytics recomputes
+    them. A day may be recorded several times; core.analytics deletes the rows it has read once the day is
+    recomputed, so a day recorded meanwhile is recomputed again.
+
+    Attributes:
+        tabla (str): Rollup ('sesiones' or 'acuerdos').
+        fecha (date): Day to recompute.
+    """
+    tabla = models.CharField(max_length=20)
+    fecha = models.DateField()
+
+    class Meta:
+        db_table = 'dia_pendiente'
+        verbose_name = 'dia pendiente'
+        verbose_name_plural = 'dias pendientes'
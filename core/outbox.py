@@ -0,0 +1,575 @@
+"""
+Transactional outbox of the notifications to the users.
+
+The changes users must hear about write one Notificacion row per recipient, in the same transaction as the change:
+
+    - acuerdo_propuesto: an agreement was proposed (to usuario_b, the author of the post it answers). core.signals
+    - acuerdo_aceptado: the proposal was accepted (to usuario_a). core.transitions, core.signals
+    - acuerdo_cancelado: the agreement was cancelled (to both users). core.transitions, core.signals
+    - sesion_proxima: a session is coming up (to both users, REMINDER_DAYS before the session at REMINDER_HOUR of
+      the server timezone). core.scheduling, core.signals
+
+Requests never wait for the network: the send_notifications worker claims the due rows in batches and sends them
+through a pluggable Sender from a thread pool. Delivery is at least once:
+
+    - Claims skip the rows other workers have locked (SELECT ... FOR UPDATE SKIP LOCKED where supported; on SQLite
+      the write transaction is serialized anyway) and lease them for LEASE_SECONDS: the rows of a worker that dies
+      mid-batch are claimed again once the lease expires.
+    - Failed deliveries are retried with exponential backoff and jitter, up to MAX_ATTEMPTS.
+    - Every row has a unique idempotency key (Notificacion.clave): an event is stored once however many times its
+      change is replayed, and senders pass the key on so the provider can drop a repeated delivery.
+
+Settings (NOTIFICATIONS): SENDER, WEBHOOK_URL, TIMEOUT, MAX_ATTEMPTS, BACKOFF_SECONDS, MAX_BACKOFF_SECONDS,
+LEASE_SECONDS, REMINDER_DAYS and REMINDER_HOUR (see DEFAULTS).
+
+Example:
+    >>> acuerdo = Acuerdo.objects.create(...)  # Writes the acuerdo_propuesto notification
+    >>> process_batch(sender=FakeSender())
+    Resultado(enviadas=1, reintentos=0, fallidas=0, descartadas=0)
+"""
+import json
+import logging
+import random
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime, time, timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.mail import EmailMessage
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Acuerdo, Notificacion, Sesion
+
+logger = logging.getLogger('skillswap.notifications')
+
+DEFAULTS = {
+    'SENDER': 'log',
+    'WEBHOOK_URL': '',
+    'TIMEOUT': 10,
+    'MAX_ATTEMPTS': 8,
+    'BACKOFF_SECONDS': 30,
+    'MAX_BACKOFF_SECONDS': 3600,
+    'LEASE_SECONDS': 300,
+    'REMINDER_DAYS': 1,
+    'REMINDER_HOUR': 9,
+}
+
+# Agreement state: notification sent when an agreement moves to it.
+EVENTOS = {
+    'ACEPTADO': 'acuerdo_aceptado',
+    'CANCELADO': 'acuerdo_cancelado',
+}
+
+
+def get_setting(nombre):
+    """
+    Returns a NOTIFICATIONS setting.
+
+    Args:
+        nombre (str): Setting key (e.g. 'SENDER').
+
+    Returns:
+        Any: Value from settings.NOTIFICATIONS or its default.
+    """
+    return getattr(settings, 'NOTIFICATIONS', {}).get(nombre, DEFAULTS[nombre])
+
+
+def _enqueue(notificaciones):
+    """
+    Writes notifications to the outbox, skipping the ones whose idempotency key is already there.
+
+    Args:
+        notificaciones (list[Notificacion]): Unsaved notifications.
+    """
+    if notificaciones:
+        Notificacion.objects.bulk_create(notificaciones, ignore_conflicts=True)
+
+
+def agreement_proposed(acuerdo):
+    """
+    Notifies usuario_b of a new proposal.
+
+    Args:
+        acuerdo (Acuerdo): Proposed agreement.
+    """
+    _enqueue([Notificacion(
+        clave=f'acuerdo_propuesto:{acuerdo.pk}:{acuerdo.usuario_b_id}',
+        tipo='acuerdo_propuesto', objeto_id=acuerdo.pk, usuario_id=acuerdo.usuario_b_id,
+    )])
+
+
+def agreements_transitioned(filas, destino):
+    """
+    Notifies the users of some agreements that moved to another state, if it's one they hear about (EVENTOS).
+
+    Accepted agreements are notified to usuario_a (who proposed them), cancelled ones to both users.
+
+    Args:
+        filas (list[tuple]): (id, usuario_a_id, usuario_b_id) of the agreements.
+        destino (str): New state.
+    """
+    tipo = EVENTOS.get(destino)
+    if tipo is None:
+        return
+
+    notificaciones = []
+    for acuerdo_id, usuario_a_id, usuario_b_id in filas:
+        for usuario_id in (usuario_a_id,) if destino == 'ACEPTADO' else (usuario_a_id, usuario_b_id):
+            notificaciones.append(Notificacion(
+                clave=f'{tipo}:{acuerdo_id}:{usuario_id}', tipo=tipo, objeto_id=acuerdo_id, usuario_id=usuario_id,
+            ))
+    _enqueue(notificaciones)
+
+
+def reminder_time(fecha):
+    """
+    Returns when the reminder of a session is due.
+
+    Args:
+        fecha (date): Session date.
+
+    Returns:
+        datetime: REMINDER_DAYS before the session, at REMINDER_HOUR (current timezone).
+    """
+    dia = fecha - timedelta(days=get_setting('REMINDER_DAYS'))
+    return timezone.make_aware(datetime.combine(dia, time(get_setting('REMINDER_HOUR'))))
+
+
+def schedule_reminders(sesiones, usuarios):
+    """
+    Writes the reminders of the active, upcoming sessions of an agreement.
+
+    Reminders already past due (e.g. a session scheduled for tomorrow afternoon) are sent right away.
+
+    Args:
+        sesiones (Iterable[Sesion]): Saved sessions of the same agreement.
+        usuarios (tuple[int, int]): (usuario_a_id, usuario_b_id) of the agreement.
+    """
+    hoy = timezone.localdate()
+    notificaciones = []
+    for sesion in sesiones:
+        if not sesion.estado or sesion.fecha < hoy:
+            continue
+        for usuario_id in usuarios:
+            notificaciones.append(Notificacion(
+                clave=f'sesion_proxima:{sesion.pk}:{sesion.fecha.isoformat()}:{usuario_id}',
+                tipo='sesion_proxima', objeto_id=sesion.pk, usuario_id=usuario_id,
+                datos={'fecha': sesion.fecha.isoformat()}, disponible_en=reminder_time(sesion.fecha),
+            ))
+    _enqueue(notificaciones)
+
+
+def cancel_reminders(sesion_ids):
+    """
+    Drops the pending reminders of some sessions (moved or deleted).
+
+    Args:
+        sesion_ids (list[int]): Session ids.
+    """
+    if sesion_ids:
+        Notificacion.objects.filter(tipo='sesion_proxima', objeto_id__in=sesion_ids, estado='PENDIENTE').delete()
+
+
+@dataclass(frozen=True)
+class Mensaje:
+    """
+    A notification ready to be sent.
+
+    Attributes:
+        clave (str): Idempotency key.
+        tipo (str): Event (choices in Notificacion.TIPO_CHOICES).
+        usuario_id (int): Recipient.
+        alias (str): Alias of the recipient.
+        email (str): Email of the recipient (may be blank).
+        asunto (str): Subject.
+        texto (str): Body.
+    """
+    clave: str
+    tipo: str
+    usuario_id: int
+    alias: str
+    email: str
+    asunto: str
+    texto: str
+
+
+class Sender(ABC):
+    """
+    Delivers messages to the users.
+
+    send() is called from the worker threads, so it mustn't use the database, and it must raise if the message
+    couldn't be delivered (the notification is retried).
+    """
+
+    @abstractmethod
+    def send(self, mensaje):
+        """
+        Args:
+            mensaje (Mensaje): Message.
+        """
+
+
+class LogSender(Sender):
+    """
+    Logs the messages (skillswap.notifications logger). For development.
+    """
+
+    def send(self, mensaje):
+        logger.info('[%s] to @%s: %s', mensaje.clave, mensaje.alias, mensaje.texto)
+
+
+class EmailSender(Sender):
+    """
+    Emails the messages through the email backend (EMAIL_BACKEND), with the key in an X-Idempotency-Key header.
+    """
+
+    def send(self, mensaje):
+        if not mensaje.email:
+            logger.warning('[%s] @%s has no email, not sent.', mensaje.clave, mensaje.alias)
+            return
+        EmailMessage(mensaje.asunto, mensaje.texto, to=[mensaje.email], headers={'X-Idempotency-Key': mensaje.clave}).send()
+
+
+class WebhookSender(Sender):
+    """
+    POSTs the messages as JSON to WEBHOOK_URL (e.g. a bot relaying them to Telegram), with an Idempotency-Key header.
+    Error responses raise, so they're retried.
+    """
+
+    def send(self, mensaje):
+        import urllib.request  # Only the send_notifications worker needs it, not every web worker.
+
+        peticion = urllib.request.Request(
+            get_setting('WEBHOOK_URL'),
+            data=json.dumps(asdict(mensaje)).encode(),
+            headers={'Content-Type': 'application/json', 'Idempotency-Key': mensaje.clave},
+        )
+        with urllib.request.urlopen(peticion, timeout=get_setting('TIMEOUT')) as respuesta:
+            respuesta.read()
+
+
+class FakeSender(Sender):
+    """
+    Keeps the messages in memory, for tests and local runs.
+
+    Like a provider that honours idempotency keys, a key delivered twice is kept once. It can fail the first
+    attempts of every message, to exercise the retries.
+
+    Attributes:
+        entregados (dict[str, Mensaje]): Delivered messages by key.
+        intentos (Counter): Delivery attempts by key.
+
+    Example:
+        >>> sender = FakeSender(fallos=1)
+        >>> process_batch(sender)  # Every message fails once
+        >>> list(sender.entregados)
+        []
+    """
+
+    def __init__(self, fallos=0):
+        """
+        Args:
+            fallos (int): Attempts of each message that fail.
+        """
+        self.fallos = fallos
+        self.entregados = {}
+        self.intentos = Counter()
+        self._lock = threading.Lock()
+
+    def send(self, mensaje):
+        with self._lock:
+            self.intentos[mensaje.clave] += 1
+            if self.intentos[mensaje.clave] <= self.fallos:
+                raise ConnectionError(f'Fake failure {self.intentos[mensaje.clave]} of {mensaje.clave}')
+            self.entregados.setdefault(mensaje.clave, mensaje)
+
+
+SENDERS = {
+    'log': LogSender,
+    'email': EmailSender,
+    'webhook': WebhookSender,
+    'fake': FakeSender,
+}
+
+
+@lru_cache(maxsize=None)
+def get_sender(nombre=None):
+    """
+    Returns a sender.
+
+    Args:
+        nombre (str | None): Name in SENDERS or dotted path of a Sender class. SENDER setting by default.
+
+    Returns:
+        Sender: Sender (the same instance on every call).
+    """
+    nombre = nombre or get_setting('SENDER')
+    return SENDERS[nombre]() if nombre in SENDERS else import_string(nombre)()
+
+
+def backoff(intentos):
+    """
+    Returns how long to wait before retrying a notification.
+
+    Exponential (BACKOFF_SECONDS, twice as long after every attempt, up to MAX_BACKOFF_SECONDS), with jitter so the
+    notifications that failed together (e.g. the provider was down) aren't retried together.
+
+    Args:
+        intentos (int): Attempts so far.
+
+    Returns:
+        timedelta: Delay.
+    """
+    segundos = min(get_setting('BACKOFF_SECONDS') * 2 ** (intentos - 1), get_setting('MAX_BACKOFF_SECONDS'))
+    return timedelta(seconds=random.uniform(segundos / 2, segundos))
+
+
+def claim(limite=100, ahora=None):
+    """
+    Claims the due notifications for this worker.
+
+    The due rows are leased with a token: until the lease expires, no other claim returns them. Where the database
+    supports it they're locked first, skipping the ones other workers have locked (SELECT ... FOR UPDATE SKIP
+    LOCKED); elsewhere (SQLite) they're leased with a single UPDATE, so the claim never holds a read lock it has to
+    upgrade halfway. The attempt is counted at claim time, so a message that kills the worker isn't retried forever.
+
+    Args:
+        limite (int): Max notifications.
+        ahora (datetime | None): Reference time (now by default).
+
+    Returns:
+        list[Notificacion]: Claimed notifications, with their recipient.
+    """
+    ahora = ahora or timezone.now()
+    lote = uuid.uuid4().hex
+    vence = ahora + timedelta(seconds=get_setting('LEASE_SECONDS'))
+    pendientes = Notificacion.objects.filter(estado='PENDIENTE', disponible_en__lte=ahora).order_by('disponible_en', 'id')
+    cambios = {'lote': lote, 'intentos': F('intentos') + 1, 'disponible_en': vence}
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(pendientes.select_for_update(skip_locked=True).values_list('id', flat=True)[:limite])
+            reclamadas = Notificacion.objects.filter(pk__in=ids).update(**cambios) if ids else 0
+    else:
+        reclamadas = Notificacion.objects.filter(pk__in=pendientes.values('id')[:limite]).update(**cambios)
+    if not reclamadas:
+        return []
+    # The lease end is the same for the whole batch, so the pending rows index finds them.
+    return list(
+        Notificacion.objects.filter(estado='PENDIENTE', disponible_en=vence, lote=lote).select_related('usuario').order_by('id')
+    )
+
+
+def _other(acuerdo, usuario_id):
+    """
+    Returns the user of an agreement that isn't the given one.
+    """
+    return acuerdo.usuario_b if acuerdo.usuario_a_id == usuario_id else acuerdo.usuario_a
+
+
+def _text(notificacion, acuerdo):
+    """
+    Returns the subject and body of a notification.
+    """
+    habilidades = f'{acuerdo.habilidad_tradea_a.nombre} for {acuerdo.habilidad_tradea_b.nombre}'
+    if notificacion.tipo == 'acuerdo_propuesto':
+        return (
+            'New SkillSwap proposal',
+            f'@{acuerdo.usuario_a.alias} proposes to trade {habilidades}: {acuerdo.semanas} weeks, '
+            f'{acuerdo.sesiones_por_semana} sessions of {acuerdo.mins_sesion} minutes per week.',
+        )
+    if notificacion.tipo == 'acuerdo_aceptado':
+        return 'Proposal accepted', f'@{acuerdo.usuario_b.alias} accepted your proposal to trade {habilidades}.'
+    if notificacion.tipo == 'acuerdo_cancelado':
+        otro = _other(acuerdo, notificacion.usuario_id)
+        return 'Agreement cancelled', f'Your agreement with @{otro.alias} to trade {habilidades} was cancelled.'
+    otro = _other(acuerdo, notificacion.usuario_id)
+    return (
+        'Upcoming session',
+        f"Reminder: your session with @{otro.alias} ({habilidades}) is on {notificacion.datos['fecha']}.",
+    )
+
+
+def render(notificaciones):
+    """
+    Builds the messages of some notifications, loading their agreements and sessions with 2 queries.
+
+    Notifications that are outdated when they're due have no message: their agreement or session was deleted, or
+    the session was moved, cancelled or belongs to an agreement that isn't going on anymore.
+
+    Args:
+        notificaciones (list[Notificacion]): Claimed notifications, with their recipient.
+
+    Returns:
+        list[Mensaje | None]: Message of each notification, None if it's outdated.
+    """
+    ids = {'acuerdo': set(), 'sesion': set()}
+    for notificacion in notificaciones:
+        ids['sesion' if notificacion.tipo == 'sesion_proxima' else 'acuerdo'].add(notificacion.objeto_id)
+    acuerdos = Acuerdo.objects.for_listing().in_bulk(ids['acuerdo']) if ids['acuerdo'] else {}
+    sesiones = Sesion.objects.with_agreement().in_bulk(ids['sesion']) if ids['sesion'] else {}
+
+    mensajes = []
+    for notificacion in notificaciones:
+        if notificacion.tipo == 'sesion_proxima':
+            sesion = sesiones.get(notificacion.objeto_id)
+            vigente = (
+                sesion is not None and sesion.estado and sesion.fecha.isoformat() == notificacion.datos.get('fecha')
+                and sesion.acuerdo.estado in ('ACEPTADO', 'EN CURSO')
+            )
+            acuerdo = sesion.acuerdo if vigente else None
+        else:
+            acuerdo = acuerdos.get(notificacion.objeto_id)
+        if acuerdo is None:
+            mensajes.append(None)
+            continue
+        asunto, texto = _text(notificacion, acuerdo)
+        usuario = notificacion.usuario
+        mensajes.append(Mensaje(notificacion.clave, notificacion.tipo, usuario.pk, usuario.alias, usuario.email, asunto, texto))
+    return mensajes
+
+
+def _deliver(sender, mensaje):
+    """
+    Sends a message, returning the exception instead of raising it.
+    """
+    try:
+        sender.send(mensaje)
+    except Exception as error:
+        return error
+    return None
+
+
+@dataclass
+class Resultado:
+    """
+    Result of process_batch().
+
+    Attributes:
+        enviadas (int): Notifications sent.
+        reintentos (int): Notifications that failed and will be retried.
+        fallidas (int): Notifications that failed their last attempt.
+        descartadas (int): Outdated notifications, not sent.
+    """
+    enviadas: int = 0
+    reintentos: int = 0
+    fallidas: int = 0
+    descartadas: int = 0
+
+    @property
+    def total(self):
+        """
+        Returns the number of notifications processed.
+
+        Returns:
+            int: Notifications claimed.
+        """
+        return self.enviadas + self.reintentos + self.fallidas + self.descartadas
+
+    def __add__(self, otro):
+        return Resultado(
+            self.enviadas + otro.enviadas, self.reintentos + otro.reintentos,
+            self.fallidas + otro.fallidas, self.descartadas + otro.descartadas,
+        )
+
+
+def _record(notificaciones, errores):
+    """
+    Stores the outcome of the deliveries of a batch.
+
+    Only rows still leased to the batch are written: if the lease expired and another worker claimed a row, that
+    worker records it.
+
+    Args:
+        notificaciones (list[Notificacion]): Claimed notifications.
+        errores (list[Exception | None | bool]): Per notification, the delivery error, None if it was sent or
+            False if it was outdated.
+
+    Returns:
+        Resultado: Counts.
+    """
+    ahora = timezone.now()
+    lote = notificaciones[0].lote
+    enviadas = [n.pk for n, error in zip(notificaciones, errores) if error is None]
+    descartadas = [n.pk for n, error in zip(notificaciones, errores) if error is False]
+    resultado = Resultado(enviadas=len(enviadas), descartadas=len(descartadas))
+
+    with transaction.atomic():
+        Notificacion.objects.filter(pk__in=enviadas, lote=lote).update(estado='ENVIADA', fecha_envio=ahora, error='')
+        Notificacion.objects.filter(pk__in=descartadas, lote=lote).update(estado='DESCARTADA')
+        for notificacion, error in zip(notificaciones, errores):
+            if error is None or error is False:
+                continue
+            logger.warning('[%s] attempt %d failed: %r', notificacion.clave, notificacion.intentos, error)
+            if notificacion.intentos >= get_setting('MAX_ATTEMPTS'):
+                cambios = {'estado': 'FALLIDA'}
+                resultado.fallidas += 1
+            else:
+                cambios = {'disponible_en': ahora + backoff(notificacion.intentos)}
+                resultado.reintentos += 1
+            Notificacion.objects.filter(pk=notificacion.pk, lote=lote).update(error=repr(error)[:1000], **cambios)
+    return resultado
+
+
+def process_batch(sender=None, limite=100, pool=None, hilos=8):
+    """
+    Claims a batch of due notifications, sends them concurrently and records the outcome.
+
+    Only the senders run in the pool threads; claiming, rendering and recording take 5 queries or so per batch in
+    the calling thread, whatever its size (plus one per failed delivery).
+
+    Args:
+        sender (Sender | None): Sender (get_sender() by default).
+        limite (int): Max notifications.
+        pool (ThreadPoolExecutor | None): Pool to send from (a new one of ``hilos`` threads by default).
+        hilos (int): Threads of the new pool.
+
+    Returns:
+        Resultado: Counts. Fewer than ``limite`` notifications means nothing else is due.
+
+    Example:
+        >>> with ThreadPoolExecutor(max_workers=16) as pool:
+        ...     while process_batch(pool=pool).total:
+        ...         pass
+    """
+    sender = sender or get_sender()
+    notificaciones = claim(limite)
+    if not notificaciones:
+        return Resultado()
+
+    mensajes = render(notificaciones)
+    enviar = [mensaje for mensaje in mensajes if mensaje is not None]
+    propio = pool is None
+    pool = pool or ThreadPoolExecutor(max_workers=hilos)
+    try:
+        errores = iter(list(pool.map(lambda mensaje: _deliver(sender, mensaje), enviar)))
+    finally:
+        if propio:
+            pool.shutdown()
+    return _record(notificaciones, [False if mensaje is None else next(errores) for mensaje in mensajes])
+
+
+def purge(dias, ahora=None):
+    """
+    Deletes the sent and outdated notifications older than some days.
+
+    Their idempotency keys go with them, so the events they reported must not be replayed after that.
+
+    Args:
+        dias (int): Days the notifications are kept.
+        ahora (datetime | None): Reference time (now by default).
+
+    Returns:
+        int: Deleted notifications.
+    """
+    limite = (ahora or timezone.now()) - timedelta(days=dias)
+    borradas, _ = Notificacion.objects.filter(estado__in=('ENVIADA', 'DESCARTADA'), fecha_creacion__lt=limite).delete()
+    return borradas
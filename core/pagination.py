@@ -0,0 +1,301 @@
+"""
+Keyset (cursor) pagination for SkillSwap.
+
+Pages are read with ``WHERE (sort_key, id) < (last_sort_key, last_id) ORDER BY sort_key, id LIMIT n`` instead of
+OFFSET, so page N costs the same as page 1 (an index range scan) and rows are never skipped or repeated when new
+rows are inserted while paging. The position is returned as an opaque cursor string.
+
+Numbered pages (the admin changelists) use EstimatedCountPaginator, which doesn't run a COUNT(*) over the whole
+table to number them.
+"""
+import base64
+import datetime
+import json
+from dataclasses import dataclass
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import Max, Q
+from django.utils.functional import cached_property
+
+from .models import Publicacion, Sesion
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """
+    JSON encoder for cursors.
+
+    Keeps the microseconds of datetimes (DjangoJSONEncoder truncates them to milliseconds, which would make the
+    cursor point to the wrong row).
+    """
+
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.date)):
+            return o.isoformat()
+        return super().default(o)
+
+
+def encode_cursor(valores):
+    """
+    Encodes the sort values of a row as an opaque cursor.
+
+    Args:
+        valores (list): Sort values (e.g. [fecha_creacion, id]).
+
+    Returns:
+        str: URL-safe cursor.
+    """
+    datos = json.dumps(valores, cls=CursorEncoder, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(datos).decode().rstrip('=')
+
+
+def decode_cursor(cursor, campos):
+    """
+    Decodes a cursor into the sort values of a row.
+
+    Args:
+        cursor (str): Cursor returned by encode_cursor().
+        campos (list[Field]): Model fields of the sort key, used to parse the values.
+
+    Returns:
+        list: Sort values.
+
+    Raises:
+        ValidationError: If the cursor is malformed.
+    """
+    try:
+        datos = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        valores = json.loads(datos)
+        if not isinstance(valores, list) or len(valores) != len(campos):
+            raise ValueError(cursor)
+        return [campo.to_python(valor) for campo, valor in zip(campos, valores)]
+    except (ValueError, TypeError, ValidationError):
+        raise ValidationError('Invalid cursor.')
+
+
+@dataclass
+class KeysetPage:
+    """
+    A page of keyset-paginated results.
+
+    Attributes:
+        resultados (list): Objects of the page.
+        siguiente (str | None): Cursor of the next page (None if it's the last one).
+    """
+    resultados: list
+    siguiente: str | None
+
+    @property
+    def hay_mas(self):
+        """
+        Returns True if there's a next page.
+
+        Returns:
+            bool: True if there's a next page.
+        """
+        return self.siguiente is not None
+
+
+class KeysetPaginator:
+    """
+    Paginates a queryset by a unique sort key.
+
+    The ordering must end with the primary key (e.g. ('-fecha_creacion', '-id')) so the key is unique, and should
+    be backed by a composite index with the same columns.
+
+    Example:
+        >>> paginador = KeysetPaginator(Publicacion.objects.filter(estado=True), ('-fecha_creacion', '-id'))
+        >>> pagina = paginador.page()
+        >>> siguiente = paginador.page(pagina.siguiente)
+    """
+
+    def __init__(self, queryset, ordering, por_pagina=20):
+        """
+        Args:
+            queryset (QuerySet): Rows to paginate.
+            ordering (tuple[str]): Sort key, ending with 'id' or '-id'.
+            por_pagina (int): Rows per page.
+        """
+        if ordering[-1].lstrip('-') != 'id':
+            raise ValueError('The ordering of a keyset paginator must end with the primary key.')
+
+        self.queryset = queryset.order_by(*ordering)
+        self.ordering = ordering
+        self.por_pagina = por_pagina
+        self.nombres = [campo.lstrip('-') for campo in ordering]
+        self.campos = [queryset.model._meta.get_field(nombre) for nombre in self.nombres]
+
+    def _after(self, valores):
+        """
+        Returns the filter of the rows that come after a sort key.
+
+        For ('-a', 'b') and (x, y) it's: a <= x AND (a < x OR (a = x AND b > y)). The redundant leading bound
+        lets the database turn it into an index range scan.
+
+        Args:
+            valores (list): Sort values of the last row of the previous page.
+
+        Returns:
+            Q: Filter.
+        """
+        condicion = Q()
+        for i, (orden, nombre) in enumerate(zip(self.ordering, self.nombres)):
+            operador = 'lt' if orden.startswith('-') else 'gt'
+            iguales = {n: v for n, v in zip(self.nombres[:i], valores[:i])}
+            condicion |= Q(**iguales, **{f'{nombre}__{operador}': valores[i]})
+
+        primero = 'lte' if self.ordering[0].startswith('-') else 'gte'
+        return Q(**{f'{self.nombres[0]}__{primero}': valores[0]}) & condicion
+
+    def page(self, cursor=None):
+        """
+        Returns the page that starts after a cursor.
+
+        Args:
+            cursor (str | None): Cursor of the page (None for the first one).
+
+        Returns:
+            KeysetPage: Page of results.
+
+        Raises:
+            ValidationError: If the cursor is malformed.
+        """
+        return self._build(list(self._slice(cursor)))
+
+    async def apage(self, cursor=None):
+        """
+        Async version of page(), for async views.
+
+        Args:
+            cursor (str | None): Cursor of the page (None for the first one).
+
+        Returns:
+            KeysetPage: Page of results.
+
+        Raises:
+            ValidationError: If the cursor is malformed.
+        """
+        return self._build([objeto async for objeto in self._slice(cursor)])
+
+    def _slice(self, cursor):
+        """
+        Returns the rows of the page after a cursor, plus one to know if there's a next page.
+        """
+        queryset = self.queryset
+        if cursor:
+            queryset = queryset.filter(self._after(decode_cursor(cursor, self.campos)))
+        return queryset[:self.por_pagina + 1]
+
+    def _build(self, resultados):
+        """
+        Builds the page from the rows returned by _slice().
+        """
+        siguiente = None
+        if len(resultados) > self.por_pagina:
+            resultados = resultados[:self.por_pagina]
+            ultimo = resultados[-1]
+            siguiente = encode_cursor([getattr(ultimo, campo.attname) for campo in self.campos])
+        return KeysetPage(resultados, siguiente)
+
+
+def posts_feed(cursor=None, por_pagina=20):
+    """
+    Returns a page of the feed of active posts, newest first.
+
+    Served by the partial (fecha_creacion, id) index of the active posts of Publicacion.
+
+    Args:
+        cursor (str | None): Cursor of the page (None for the first one).
+        por_pagina (int): Posts per page.
+
+    Returns:
+        KeysetPage: Page of Publicacion.
+    """
+    return KeysetPaginator(Publicacion.objects.for_feed(), ('-fecha_creacion', '-id'), por_pagina).page(cursor)
+
+
+async def aposts_feed(cursor=None, por_pagina=20):
+    """
+    Async version of posts_feed(), for async views.
+
+    Args:
+        cursor (str | None): Cursor of the page (None for the first one).
+        por_pagina (int): Posts per page.
+
+    Returns:
+        KeysetPage: Page of Publicacion.
+    """
+    return await KeysetPaginator(Publicacion.objects.for_feed(), ('-fecha_creacion', '-id'), por_pagina).apage(cursor)
+
+
+def session_history(acuerdo, cursor=None, por_pagina=20):
+    """
+    Returns a page of the sessions of an agreement, in chronological order.
+
+    Served by the (acuerdo, fecha, id) index of Sesion.
+
+    Args:
+        acuerdo (Acuerdo | int): Agreement (or agreement id).
+        cursor (str | None): Cursor of the page (None for the first one).
+        por_pagina (int): Sessions per page.
+
+    Returns:
+        KeysetPage: Page of Sesion.
+    """
+    return KeysetPaginator(Sesion.objects.for_agreement(acuerdo), ('fecha', 'id'), por_pagina).page(cursor)
+
+
+def estimated_count(modelo, using='default'):
+    """
+    Returns the approximate number of rows of a table, without counting them.
+
+    PostgreSQL and MySQL keep an estimate in their catalogs (updated by ANALYZE and autovacuum). Elsewhere the
+    highest primary key is used, read from the end of the primary key index.
+
+    Args:
+        modelo (type): Model.
+        using (str): Database alias.
+
+    Returns:
+        int | None: Estimated rows, or None if there's no estimate (e.g. a table never analyzed).
+    """
+    conexion = connections[using]
+    tabla = modelo._meta.db_table
+    if conexion.vendor in ('postgresql', 'mysql'):
+        with conexion.cursor() as cursor:
+            if conexion.vendor == 'postgresql':
+                cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)', [conexion.ops.quote_name(tabla)])
+            else:
+                cursor.execute('SELECT table_rows FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s', [tabla])
+            fila = cursor.fetchone()
+        estimado = fila[0] if fila else None
+    else:
+        estimado = modelo._base_manager.using(using).aggregate(maximo=Max('pk'))['maximo']
+    return estimado if estimado is not None and estimado >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Page-number paginator that doesn't count every row of big tables.
+
+    - Unfiltered lists of tables with more than ESTIMAR_DESDE rows use estimated_count() (one catalog or index
+      lookup instead of a full COUNT(*)).
+    - Filtered lists (search, filters, date hierarchy) are counted up to LIMITE rows, with
+      ``SELECT COUNT(*) FROM (... LIMIT n)``, so a broad filter stops counting early. Pages past LIMITE aren't
+      linked; narrow the filter to reach them.
+
+    Used by the admin changelists (core.admin), with show_full_result_count disabled.
+    """
+    ESTIMAR_DESDE = 10000
+    LIMITE = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimado = estimated_count(queryset.model, queryset.db)
+            if estimado is not None and estimado > self.ESTIMAR_DESDE:
+                return estimado
+        return queryset.values('pk')[:self.LIMITE].count()
@@ -0,0 +1,139 @@
+"""
+Profile preferences (Perfil.preferencias) of SkillSwap.
+
+The preferences are stored as a JSON object, described by SCHEMA: every key has a default value and the values it
+may take (a frozenset, so checks are set lookups). To add a preference, add it to SCHEMA and to Preferencias.
+
+Validated once when the profile is saved (Perfil.clean()), they're read through Preferencias, a small immutable
+typed object (perfil.prefs, or request.preferencias in views, cached per user by core.cache). Views that don't use
+them are marked with without_preferences.
+
+Example:
+    >>> validate({'theme': 'dark'})
+    >>> Preferencias.parse({'theme': 'dark'})
+    Preferencias(theme='dark', language='es')
+"""
+from dataclasses import dataclass, field
+from typing import NamedTuple
+
+from django.core.exceptions import ValidationError
+
+
+@dataclass(frozen=True)
+class Preferencia:
+    """
+    A preference key.
+
+    Attributes:
+        defecto (str): Value used when the key is missing.
+        valores (tuple[str]): Values it may take, in the order they're listed in error messages.
+        permitidos (frozenset[str]): The same values, for lookups.
+    """
+    defecto: str
+    valores: tuple
+    permitidos: frozenset = field(init=False, repr=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, 'permitidos', frozenset(self.valores))
+
+
+SCHEMA = {
+    'theme': Preferencia('light', ('dark', 'light')),
+    'language': Preferencia('es', ('es', 'en')),
+    # New preferences go here (and in Preferencias).
+}
+
+CLAVES = frozenset(SCHEMA)
+
+
+def defaults():
+    """
+    Returns the default preferences of a new profile.
+
+    Returns:
+        dict: A new dictionary (it's stored in the profile, so it must not be shared).
+    """
+    return {clave: preferencia.defecto for clave, preferencia in SCHEMA.items()}
+
+
+def validate(preferencias):
+    """
+    Checks some preferences against SCHEMA.
+
+    Missing keys are valid (they take their default value).
+
+    Args:
+        preferencias (dict | None): Perfil.preferencias.
+
+    Raises:
+        ValidationError: If it isn't an object, a key doesn't exist or a value isn't allowed.
+    """
+    if not preferencias:
+        return
+    if not isinstance(preferencias, dict):
+        raise ValidationError('The preferences must be a JSON object.')
+
+    for clave, valor in preferencias.items():
+        preferencia = SCHEMA.get(clave)
+        if preferencia is None:
+            raise ValidationError(f'The key {clave} is not valid.')
+        if not isinstance(valor, str) or valor not in preferencia.permitidos:  # Lists and objects can't be looked up.
+            opciones = ' or '.join(f"'{opcion}'" for opcion in preferencia.valores)
+            raise ValidationError(f"The {clave} must be {opciones}, not '{valor}'")
+
+
+class Preferencias(NamedTuple):
+    """
+    Typed, read-only view of the preferences of a user. One field per SCHEMA key.
+
+    Attributes:
+        theme (str): 'dark' or 'light'.
+        language (str): 'es' or 'en'.
+    """
+    theme: str = SCHEMA['theme'].defecto
+    language: str = SCHEMA['language'].defecto
+
+    @classmethod
+    def parse(cls, preferencias):
+        """
+        Builds the typed preferences from Perfil.preferencias.
+
+        Missing keys and values that aren't allowed (e.g. stored before a value was removed) take their default.
+
+        Args:
+            preferencias (dict | None): Perfil.preferencias.
+
+        Returns:
+            Preferencias: Typed preferences.
+        """
+        if not preferencias:
+            return DEFAULT
+        return cls(**{
+            clave: valor for clave, valor in preferencias.items()
+            if clave in CLAVES and isinstance(valor, str) and valor in SCHEMA[clave].permitidos
+        })
+
+
+DEFAULT = Preferencias()
+
+
+def without_preferences(vista):
+    """
+    Declares that a view doesn't use the preferences of the user.
+
+    PreferencesMiddleware then neither loads the user and their preferences nor activates their language, which saves
+    up to three queries (the session, the user and the preferences on a cold cache) per signed-in request.
+
+    Args:
+        vista (callable): View.
+
+    Returns:
+        callable: The same view.
+
+    Example:
+        >>> @without_preferences
+        ... def feed(request):
+        ...     ...
+    """
+    vista.uses_preferences = False  # Not wrapped, so async views stay async.
+    return vista
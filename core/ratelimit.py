@@ -0,0 +1,244 @@
+"""
+Rate limiting of the write paths of SkillSwap (post creation and agreement proposals).
+
+A few abusive accounts could otherwise flood the posts and agreements tables (and their indexes), slowing everyone
+down. Every action has limits per user and per client IP (RATE_LIMITS['LIMITS']), checked by check() before
+anything is written; views use the rate_limited() decorator, which answers 429 Too Many Requests.
+
+The limits are sliding window counters kept in a Django cache (RATE_LIMITS['ALIAS']): one counter per key and fixed
+window, increased with cache.incr() (atomic on Redis), and the estimate
+
+    previous window * (part of the previous window still inside the sliding window) + current window
+
+is compared with the limit. As refused attempts aren't counted, a window never counts more than the limit, so the
+previous window is only read when the current one alone is close to it: a check usually takes one incr() per key,
+and never touches the database.
+
+The cache must be shared by every worker process: with the per-process LocMemCache, each worker keeps its own
+counters and N workers let N times the limits through (the core.W001 system check warns about it outside DEBUG, see
+skillswap.settings_production).
+
+Hot keys: once a key is over its limit, this process remembers it until it may pass again and rejects it without
+going to the shared cache (LocalLRU of core.cache), so a flood from one account or address costs one dictionary
+lookup per request. IPv6 clients are limited per /64 network, which a single host usually controls whole.
+"""
+import ipaddress
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import JsonResponse
+
+from .cache import LocalLRU
+
+DEFAULTS = {
+    'ENABLED': True,
+    'ALIAS': 'default',
+    'LIMITS': {  # {action: {'usuario' | 'ip': (requests, seconds)}}
+        'publicacion': {'usuario': (10, 3600), 'ip': (30, 3600)},
+        'propuesta': {'usuario': (20, 3600), 'ip': (60, 3600)},
+    },
+    'IP_HEADER': None,  # e.g. 'HTTP_X_FORWARDED_FOR' behind a trusted proxy (its first address is the client)
+    'LOCAL_MAX_ENTRIES': 10000,
+}
+
+
+def get_setting(nombre):
+    """
+    Returns a RATE_LIMITS setting.
+
+    Args:
+        nombre (str): Setting key (e.g. 'LIMITS').
+
+    Returns:
+        Any: Value from settings.RATE_LIMITS or its default.
+    """
+    return getattr(settings, 'RATE_LIMITS', {}).get(nombre, DEFAULTS[nombre])
+
+
+class RateLimited(Exception):
+    """
+    Raised when an action is over one of its limits.
+
+    Attributes:
+        accion (str): Limited action.
+        dimension (str): Limit that was hit ('usuario' or 'ip').
+        retry_after (float): Seconds until the action may be tried again.
+    """
+
+    def __init__(self, accion, dimension, retry_after):
+        super().__init__(f"Too many requests ({accion}, per {dimension}), try again in {math.ceil(retry_after)}s.")
+        self.accion = accion
+        self.dimension = dimension
+        self.retry_after = retry_after
+
+
+_bloqueadas = LocalLRU(get_setting('LOCAL_MAX_ENTRIES'), ttl=24 * 3600)  # {key: time.time() it may pass again}
+
+
+def _retry_after(limite, segundos, anterior, actual, transcurrido):
+    """
+    Returns the seconds until one more attempt fits in a sliding window (if nothing else comes in meanwhile).
+
+    Args:
+        limite (int): Max attempts per window.
+        segundos (int): Window length.
+        anterior (int): Attempts in the previous window.
+        actual (int): Attempts in the current window.
+        transcurrido (float): Seconds since the current window started.
+    """
+    if actual + 1 > limite or not anterior:
+        return segundos - transcurrido  # Not before the next window.
+    return max(segundos * (1 - (limite - actual - 1) / anterior) - transcurrido, 0.0)
+
+
+def check(accion, usuario_id=None, ip=None, ahora=None):
+    """
+    Counts an attempt of an action, or refuses it if it's over a limit of the user or the IP.
+
+    A refused attempt isn't counted.
+
+    Args:
+        accion (str): Action (a key of RATE_LIMITS['LIMITS']).
+        usuario_id (int | None): User (not limited by user if None).
+        ip (str | None): Client IP (not limited by IP if None).
+        ahora (float | None): Current time.time() (now by default).
+
+    Raises:
+        RateLimited: If the action is over a limit.
+
+    Example:
+        >>> check('publicacion', usuario_id=usuario.pk, ip='203.0.113.7')
+    """
+    ajustes = {**DEFAULTS, **getattr(settings, 'RATE_LIMITS', {})}  # Read once: settings lookups add up here.
+    if not ajustes['ENABLED']:
+        return
+    ahora = time.time() if ahora is None else ahora
+    limites = ajustes['LIMITS'][accion]
+
+    claves = []
+    for dimension, valor in (('usuario', usuario_id), ('ip', ip)):
+        if valor is None or dimension not in limites:
+            continue
+        base = f'ratelimit:{accion}:{dimension}:{valor}'
+        hasta = _bloqueadas.get(base, 0)
+        if hasta > ahora:
+            raise RateLimited(accion, dimension, hasta - ahora)
+        limite, segundos = limites[dimension]
+        ventana, transcurrido = divmod(ahora, segundos)
+        claves.append((dimension, base, limite, segundos, transcurrido, f'{base}:{int(ventana)}', f'{base}:{int(ventana) - 1}'))
+    if not claves:
+        return
+
+    cache = caches[ajustes['ALIAS']]
+    contadas = []
+    try:
+        for dimension, base, limite, segundos, transcurrido, clave, anterior in claves:
+            actual = _increment(cache, clave, 2 * segundos)
+            contadas.append(clave)
+            peso = 1 - transcurrido / segundos  # Part of the previous window still inside the sliding one
+            if actual <= limite * (1 - peso):
+                continue  # Within the limit whatever the previous window counted (at most the limit).
+            previo = cache.get(anterior, 0)
+            if previo * peso + actual > limite:
+                espera = _retry_after(limite, segundos, previo, actual - 1, transcurrido)
+                _bloqueadas.set(base, ahora + espera)
+                raise RateLimited(accion, dimension, espera)
+    except RateLimited:
+        for clave in contadas:
+            try:
+                cache.decr(clave)
+            except ValueError:
+                pass  # Expired or evicted meanwhile: there's nothing to give back.
+        raise
+
+
+def _increment(cache, clave, timeout):
+    """
+    Increases a counter atomically, creating it if it doesn't exist.
+    """
+    try:
+        return cache.incr(clave)
+    except ValueError:
+        if cache.add(clave, 1, timeout):
+            return 1
+        return cache.incr(clave)  # Created by someone else meanwhile.
+
+
+def client_ip(request):
+    """
+    Returns the address requests of a client are limited by: its IP, or its /64 network for IPv6.
+
+    Args:
+        request (HttpRequest): Request.
+
+    Returns:
+        str | None: Address.
+    """
+    cabecera = get_setting('IP_HEADER')
+    ip = request.META.get(cabecera, '').split(',')[0].strip() if cabecera else ''
+    ip = ip or request.META.get('REMOTE_ADDR')
+    if ip and ':' in ip:
+        try:
+            return str(ipaddress.ip_network(f'{ip}/64', strict=False))
+        except ValueError:
+            return ip
+    return ip
+
+
+def reset(accion, usuario_id=None, ip=None):
+    """
+    Forgets the recent attempts of a user or an IP (e.g. after an admin cleared an account).
+
+    Args:
+        accion (str): Action.
+        usuario_id (int | None): User.
+        ip (str | None): Client IP, as client_ip() returns it.
+    """
+    ahora = time.time()
+    limites = get_setting('LIMITS')[accion]
+    claves = []
+    for dimension, valor in (('usuario', usuario_id), ('ip', ip)):
+        if valor is None or dimension not in limites:
+            continue
+        base = f'ratelimit:{accion}:{dimension}:{valor}'
+        _bloqueadas.delete(base)
+        ventana = int(ahora // limites[dimension][1])
+        claves += [f'{base}:{ventana}', f'{base}:{ventana - 1}']
+    caches[get_setting('ALIAS')].delete_many(claves)
+
+
+def rate_limited(accion):
+    """
+    Applies the limits of an action to a view, before the view runs (so before it writes anything).
+
+    Requests over a limit get a 429 JSON response with a Retry-After header.
+
+    Args:
+        accion (str): Action (a key of RATE_LIMITS['LIMITS']).
+
+    Returns:
+        callable: Decorator.
+
+    Example:
+        >>> @rate_limited('publicacion')
+        ... def create_post(request):
+        ...     ...
+    """
+    def decorador(vista):
+        @wraps(vista)
+        def envoltorio(request, *args, **kwargs):
+            usuario_id = request.user.pk if request.user.is_authenticated else None
+            try:
+                check(accion, usuario_id, client_ip(request))
+            except RateLimited as error:
+                respuesta = JsonResponse({'error': str(error)}, status=429)
+                respuesta['Retry-After'] = str(math.ceil(error.retry_after))
+                return respuesta
+            return vista(request, *args, **kwargs)
+
+        return envoltorio
+
+    return decorador
@@ -0,0 +1,365 @@
+"""
+Skill recommendations for SkillSwap ("skills you might want to learn").
+
+Two skills are similar when they go together: the same users know both (Perfil.habilidades), or they're traded for
+each other in finished agreements, which count AGREEMENT_WEIGHT times as much as a profile. With C the symmetric
+co-occurrence matrix of the skills (C[i][i] is how often skill i occurs at all), the similarity is the cosine
+
+    C[i][j] / sqrt(C[i][i] * C[j][j])
+
+build() computes the sparse matrix offline (build_recommendations command), vectorized with NumPy when it's
+installed and in pure Python otherwise (same result), and stores the TOP_K most similar skills of each skill, with
+at least MIN_COOCCURRENCES, in SimilitudHabilidad. As agreements finish, agreements_finished() adds them to the
+stored counts of their two skills and ranks the similar skills of those again; the scores other skills keep for
+them drift a little until the next build (e.g. nightly).
+
+recommend() ranks the skills similar to the ones a user knows that they don't know yet, with a single query.
+
+Settings (RECOMMENDATIONS): TOP_K, MIN_COOCCURRENCES and AGREEMENT_WEIGHT (see DEFAULTS).
+"""
+import heapq
+import importlib.util
+import math
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from itertools import chain, combinations, groupby
+from operator import itemgetter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+
+from .models import Acuerdo, Perfil, SimilitudHabilidad
+from .sqlite import serialized_write
+
+DEFAULTS = {
+    'TOP_K': 20,
+    'MIN_COOCCURRENCES': 2,
+    'AGREEMENT_WEIGHT': 3,
+}
+
+CHUNK_SIZE = 10000
+
+
+def get_setting(nombre):
+    """
+    Returns a RECOMMENDATIONS setting.
+
+    Args:
+        nombre (str): Setting key (e.g. 'TOP_K').
+
+    Returns:
+        Any: Value from settings.RECOMMENDATIONS or its default.
+    """
+    return getattr(settings, 'RECOMMENDATIONS', {}).get(nombre, DEFAULTS[nombre])
+
+
+def _profile_skills():
+    """
+    Returns the (perfil_id, habilidad_id) rows of every profile, sorted (so each profile's skills come together).
+    """
+    return (
+        Perfil.habilidades.through.objects
+        .order_by('perfil_id', 'habilidad_id')
+        .values_list('perfil_id', 'habilidad_id')
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+
+
+def _trades():
+    """
+    Returns the (habilidad_tradea_a_id, habilidad_tradea_b_id) rows of the finished agreements.
+    """
+    return (
+        Acuerdo.objects.filter(estado='FINALIZADO')
+        .exclude(habilidad_tradea_a=F('habilidad_tradea_b'))
+        .values_list('habilidad_tradea_a_id', 'habilidad_tradea_b_id')
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+
+
+def similar_python(perfiles, acuerdos, peso, k, minimo):
+    """
+    Computes the most similar skills of every skill, in pure Python.
+
+    Args:
+        perfiles (Iterable[tuple[int, int]]): (perfil_id, habilidad_id) rows, sorted.
+        acuerdos (Iterable[tuple[int, int]]): (habilidad_id, habilidad_id) of the finished agreements.
+        peso (int): Weight of an agreement.
+        k (int): Similar skills kept per skill.
+        minimo (int): Minimum co-occurrences of a pair.
+
+    Returns:
+        list[tuple]: (habilidad_id, similar_id, coocurrencias, puntuacion) rows, the diagonal included.
+    """
+    pares = Counter()
+    totales = Counter()
+    for _, grupo in groupby(perfiles, key=itemgetter(0)):
+        habilidades = [habilidad for _, habilidad in grupo]
+        totales.update(habilidades)
+        pares.update(combinations(habilidades, 2))  # Sorted, so always (lower id, higher id).
+    for a, b in acuerdos:
+        pares[min(a, b), max(a, b)] += peso
+        totales[a] += peso
+        totales[b] += peso
+
+    vecinas = defaultdict(list)
+    for (i, j), cantidad in pares.items():
+        if cantidad >= minimo:
+            puntuacion = cantidad / math.sqrt(totales[i] * totales[j])
+            vecinas[i].append((puntuacion, j, cantidad))
+            vecinas[j].append((puntuacion, i, cantidad))
+
+    filas = []
+    for i in sorted(totales):
+        filas.append((i, i, totales[i], 1.0))
+        mejores = heapq.nsmallest(k, vecinas[i], key=lambda vecina: (-vecina[0], vecina[1]))
+        filas.extend((i, j, cantidad, puntuacion) for puntuacion, j, cantidad in sorted(mejores, key=itemgetter(1)))
+    return filas
+
+
+def similar_numpy(perfiles, acuerdos, peso, k, minimo):
+    """
+    Computes the most similar skills of every skill, with NumPy. Same arguments and result as similar_python().
+
+    The pairs of skills of the same profile are found without a Python loop per profile: the rows are sorted by
+    profile, so for every offset d the rows d positions apart that belong to the same profile are a pair. The
+    pairs are summed into a sparse matrix with np.unique(), and the top-K of every row are taken with one sort.
+    """
+    import numpy as np
+
+    filas = np.fromiter(chain.from_iterable(perfiles), dtype=np.int64).reshape(-1, 2)
+    intercambios = np.fromiter(chain.from_iterable(acuerdos), dtype=np.int64).reshape(-1, 2)
+    ids = np.unique(np.concatenate([filas[:, 1], intercambios.ravel()]))
+    if not len(ids):
+        return []
+    n = len(ids)
+    perfil, habilidad = filas[:, 0], np.searchsorted(ids, filas[:, 1])
+    intercambios = np.sort(np.searchsorted(ids, intercambios), axis=1)
+
+    filas_i, filas_j = [intercambios[:, 0]], [intercambios[:, 1]]
+    pesos = [np.full(len(intercambios), peso, dtype=np.float64)]
+    for d in range(1, len(perfil)):
+        mismo = perfil[:-d] == perfil[d:]
+        if not mismo.any():
+            break  # No profile has more than d skills.
+        filas_i.append(habilidad[:-d][mismo])
+        filas_j.append(habilidad[d:][mismo])
+        pesos.append(np.ones(int(mismo.sum())))
+
+    codigos, inverso = np.unique(np.concatenate(filas_i) * n + np.concatenate(filas_j), return_inverse=True)
+    cantidades = np.bincount(inverso.ravel(), weights=np.concatenate(pesos))
+    totales = (
+        np.bincount(habilidad, minlength=n)
+        + peso * (np.bincount(intercambios[:, 0], minlength=n) + np.bincount(intercambios[:, 1], minlength=n))
+    ).astype(np.float64)
+
+    validos = cantidades >= minimo
+    i, j, cantidades = codigos[validos] // n, codigos[validos] % n, cantidades[validos]
+    fila, columna, cantidades = np.concatenate([i, j]), np.concatenate([j, i]), np.concatenate([cantidades, cantidades])
+    puntuaciones = cantidades / np.sqrt(totales[fila] * totales[columna])
+
+    orden = np.lexsort((columna, -puntuaciones, fila))
+    fila, columna, cantidades, puntuaciones = fila[orden], columna[orden], cantidades[orden], puntuaciones[orden]
+    mejores = np.arange(len(fila)) - np.searchsorted(fila, fila) < k  # Rank within the row.
+    fila, columna, cantidades, puntuaciones = fila[mejores], columna[mejores], cantidades[mejores], puntuaciones[mejores]
+
+    presentes = np.flatnonzero(totales)
+    fila = np.concatenate([presentes, fila])
+    columna = np.concatenate([presentes, columna])
+    cantidades = np.concatenate([totales[presentes], cantidades])
+    puntuaciones = np.concatenate([np.ones(len(presentes)), puntuaciones])
+    orden = np.lexsort((columna, columna != fila, fila))  # Every row: the diagonal, then its similar skills by id.
+    return list(zip(
+        ids[fila[orden]].tolist(), ids[columna[orden]].tolist(),
+        cantidades[orden].astype(np.int64).tolist(), puntuaciones[orden].tolist(),
+    ))
+
+
+BACKENDS = {
+    'numpy': similar_numpy,
+    'python': similar_python,
+}
+
+
+def default_backend():
+    """
+    Returns the backend build() uses: 'numpy' if it's installed, 'python' otherwise.
+
+    Returns:
+        str: Backend name.
+    """
+    return 'numpy' if importlib.util.find_spec('numpy') else 'python'
+
+
+def build(backend=None, batch_size=1000):
+    """
+    Rebuilds the recommendation table from the profiles and the finished agreements.
+
+    The matrix is computed before the transaction that replaces the table, so readers see the old table until then
+    (an agreement that finishes in between is counted by the next build).
+
+    Args:
+        backend (str | None): 'numpy' or 'python' (default_backend() by default).
+        batch_size (int): Rows inserted per query.
+
+    Returns:
+        dict: Backend used, number of skills and rows written.
+
+    Example:
+        >>> build()
+        {'backend': 'numpy', 'habilidades': 200, 'filas': 4200}
+    """
+    backend = backend or default_backend()
+    filas = BACKENDS[backend](
+        _profile_skills(), _trades(), get_setting('AGREEMENT_WEIGHT'), get_setting('TOP_K'), get_setting('MIN_COOCCURRENCES'),
+    )
+    with transaction.atomic():
+        SimilitudHabilidad.objects.all().delete()
+        SimilitudHabilidad.objects.bulk_create(
+            (
+                SimilitudHabilidad(habilidad_id=i, similar_id=j, coocurrencias=cantidad, puntuacion=puntuacion)
+                for i, j, cantidad, puntuacion in filas
+            ),
+            batch_size=batch_size,
+        )
+    return {'backend': backend, 'habilidades': sum(1 for fila in filas if fila[0] == fila[1]), 'filas': len(filas)}
+
+
+def _cooccurrences(i, j):
+    """
+    Counts how often two skills go together (or a skill occurs, if both are the same) from the source tables.
+
+    Args:
+        i (int): Skill id.
+        j (int): Skill id.
+
+    Returns:
+        int: Weighted co-occurrences.
+    """
+    Through = Perfil.habilidades.through
+    perfiles = Through.objects.filter(habilidad_id=i)
+    acuerdos = Acuerdo.objects.filter(estado='FINALIZADO').exclude(habilidad_tradea_a=F('habilidad_tradea_b'))
+    if i == j:
+        acuerdos = acuerdos.filter(Q(habilidad_tradea_a_id=i) | Q(habilidad_tradea_b_id=i))
+    else:
+        perfiles = perfiles.filter(perfil_id__in=Through.objects.filter(habilidad_id=j).values('perfil_id'))
+        acuerdos = acuerdos.filter(Q(habilidad_tradea_a_id=i, habilidad_tradea_b_id=j) | Q(habilidad_tradea_a_id=j, habilidad_tradea_b_id=i))
+    return perfiles.count() + get_setting('AGREEMENT_WEIGHT') * acuerdos.count()
+
+
+@serialized_write
+def agreements_finished(acuerdo_ids):
+    """
+    Adds finished agreements to the recommendation table.
+
+    The co-occurrences of their skill pairs and the occurrences of their skills are increased, and the similar
+    skills of those skills are scored and ranked again. A pair that wasn't stored (it was below the top-K) is
+    counted from the source tables, in case it now makes it. Runs in a few queries per agreement skill pair.
+
+    Args:
+        acuerdo_ids (list[int]): Agreements that have just finished.
+
+    Returns:
+        int: Skills whose similar skills were ranked again.
+    """
+    peso = get_setting('AGREEMENT_WEIGHT')
+    incrementos = Counter()
+    pares = Acuerdo.objects.filter(pk__in=acuerdo_ids, estado='FINALIZADO').values_list('habilidad_tradea_a_id', 'habilidad_tradea_b_id')
+    for a, b in pares:
+        if a != b:
+            incrementos.update({(a, b): peso, (b, a): peso, (a, a): peso, (b, b): peso})
+    if not incrementos:
+        return 0
+    habilidades = {i for i, _ in incrementos}
+
+    with transaction.atomic():
+        filas = {
+            (fila.habilidad_id, fila.similar_id): fila
+            for fila in SimilitudHabilidad.objects.select_for_update().filter(habilidad_id__in=habilidades)
+        }
+        for (i, j), incremento in incrementos.items():
+            if (i, j) in filas:
+                filas[i, j].coocurrencias += incremento
+            else:  # Counted from scratch, the agreements included.
+                filas[i, j] = SimilitudHabilidad(habilidad_id=i, similar_id=j, coocurrencias=_cooccurrences(i, j))
+
+        totales = {i: fila.coocurrencias for (i, j), fila in filas.items() if i == j}
+        faltan = {j for _, j in filas} - totales.keys()
+        totales.update(
+            SimilitudHabilidad.objects.filter(habilidad_id__in=faltan, similar_id=F('habilidad_id')).values_list('habilidad_id', 'coocurrencias')
+        )
+        totales.update((j, _cooccurrences(j, j)) for j in faltan - totales.keys())
+
+        vecinas = defaultdict(list)
+        for (i, j), fila in filas.items():
+            fila.puntuacion = fila.coocurrencias / math.sqrt(totales[i] * totales[j]) if totales[i] and totales[j] else 0.0
+            if i != j:
+                vecinas[i].append(fila)
+
+        guardar = [filas[i, i] for i in habilidades]
+        borrar = []
+        for i in habilidades:
+            ordenadas = sorted(vecinas[i], key=lambda fila: (-fila.puntuacion, fila.similar_id))
+            mejores = [fila for fila in ordenadas if fila.coocurrencias >= get_setting('MIN_COOCCURRENCES')][:get_setting('TOP_K')]
+            guardar.extend(mejores)
+            borrar.extend(fila.pk for fila in ordenadas if fila.pk is not None and fila not in mejores)
+
+        SimilitudHabilidad.objects.filter(pk__in=borrar).delete()
+        SimilitudHabilidad.objects.bulk_update([fila for fila in guardar if fila.pk is not None], ['coocurrencias', 'puntuacion'])
+        SimilitudHabilidad.objects.bulk_create([fila for fila in guardar if fila.pk is None])
+    return len(habilidades)
+
+
+@dataclass(frozen=True)
+class Recomendacion:
+    """
+    A skill recommended to a user.
+
+    Attributes:
+        habilidad_id (int): Recommended skill.
+        nombre (str): Name of the skill.
+        categoria (str): Category of the skill.
+        puntuacion (float): Sum of its similarities to the skills the user knows.
+        apoyos (int): Skills of the user it's similar to.
+    """
+    habilidad_id: int
+    nombre: str
+    categoria: str
+    puntuacion: float
+    apoyos: int
+
+
+def recommend(usuario, limit=10):
+    """
+    Returns the skills a user might want to learn: the active skills most similar to the ones they know, that they
+    don't know yet.
+
+    Uses a single query over the similar skills of the user's skills (served by the SimilitudHabilidad unique
+    index), whatever the number of users, profiles or agreements.
+
+    Args:
+        usuario (Usuario | int): User (or user id).
+        limit (int): Max number of skills.
+
+    Returns:
+        list[Recomendacion]: Skills from best to worst.
+
+    Example:
+        >>> [recomendacion.nombre for recomendacion in recommend(usuario, limit=3)]
+        ['Illustrator', 'Figma', 'Fotografía']
+    """
+    usuario_id = getattr(usuario, 'pk', usuario)
+    conocidas = Perfil.habilidades.through.objects.filter(perfil__usuario_id=usuario_id).values('habilidad_id')
+    filas = (
+        SimilitudHabilidad.objects
+        .filter(habilidad_id__in=conocidas, similar__estado=True)
+        .exclude(similar_id__in=conocidas)
+        .values('similar_id', 'similar__nombre', 'similar__categoria')
+        .annotate(total=Sum('puntuacion'), apoyos=Count('habilidad_id'))
+        .order_by('-total', 'similar_id')[:limit]
+    )
+    return [
+        Recomendacion(fila['similar_id'], fila['similar__nombre'], fila['similar__categoria'], fila['total'], fila['apoyos'])
+        for fila in filas
+    ]
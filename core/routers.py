@@ -0,0 +1,126 @@
+"""
+Database routing for SkillSwap.
+
+PrimaryReplicaRouter sends the reads of the read-mostly catalogue models (skills, posts and profiles) to the read
+replicas and everything else to the primary ('default'): writes, and every read of agreements and sessions, whose
+state transitions must never see a stale row.
+
+Replicas lag behind the primary, so a user who has just written must read from the primary for a while
+(read-your-writes). Writes to the replicated models pin the current request (or thread) to the primary, and
+core.middleware.ReplicaStickinessMiddleware keeps the following requests of the same client pinned for
+DATABASE_REPLICA_STICKY_SECONDS.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICATED_MODELS = frozenset({'core.habilidad', 'core.publicacion', 'core.perfil'})
+
+_pinned = ContextVar('pinned_to_primary', default=False)  # The current request (or thread) wrote.
+_sticky = ContextVar('sticky_to_primary', default=False)  # The client wrote in a recent request.
+
+
+def replicas():
+    """
+    Returns the aliases of the read replicas (every database but 'default').
+
+    Returns:
+        list[str]: Database aliases.
+    """
+    return [alias for alias in settings.DATABASES if alias != DEFAULT_DB_ALIAS]
+
+
+def is_pinned():
+    """
+    Returns True if the reads of the current request (or thread) go to the primary.
+
+    Returns:
+        bool: True if pinned to the primary.
+    """
+    return _pinned.get() or _sticky.get()
+
+
+def pin_to_primary():
+    """
+    Pins the reads of the current request (or thread) to the primary, as if it had written.
+    """
+    _pinned.set(True)
+
+
+@contextmanager
+def request_scope(sticky=False):
+    """
+    Scopes the pinning to the primary to a request, so it doesn't leak into the next request of the same thread.
+
+    Args:
+        sticky (bool): True if the client wrote in a recent request.
+
+    Yields:
+        callable: Function that returns True if the request wrote to a replicated model.
+    """
+    token_pinned, token_sticky = _pinned.set(False), _sticky.set(sticky)
+    try:
+        yield _pinned.get
+    finally:
+        _pinned.reset(token_pinned)
+        _sticky.reset(token_sticky)
+
+
+@contextmanager
+def use_primary():
+    """
+    Reads from the primary inside a block.
+
+    Example:
+        >>> with use_primary():
+        ...     publicacion = Publicacion.objects.get(pk=1)  # Never stale
+    """
+    token = _sticky.set(True)
+    try:
+        yield
+    finally:
+        _sticky.reset(token)
+
+
+def is_replicated(model):
+    """
+    Returns True if the reads of a model go to the replicas.
+
+    Args:
+        model (Model): Model class (the implicit through model of a many-to-many counts as its owner).
+
+    Returns:
+        bool: True if the model is read from the replicas.
+    """
+    return (model._meta.auto_created or model)._meta.label_lower in REPLICATED_MODELS
+
+
+class PrimaryReplicaRouter:
+    """
+    Routes the reads of skills, posts and profiles to a random replica, and everything else to the primary.
+
+    Reads go to the primary as well when the current request wrote one of those models (read-your-writes), or
+    inside a transaction of the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not is_replicated(model) or is_pinned():
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        aliases = replicas()
+        return random.choice(aliases) if aliases else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        if is_replicated(model):
+            pin_to_primary()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # Every database holds the same data.
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS  # Replicas are copies of the primary.
@@ -0,0 +1,309 @@
+"""
+Session scheduler for SkillSwap.
+
+Computes the whole session calendar of an agreement (Acuerdo) from its weeks, sessions per week and minutes per
+session, and the timezone and availability of both users. The calendar is validated once and persisted with
+bulk_create in a single transaction, so a 52 weeks x 7 sessions agreement takes a handful of queries. The reminders
+of the sessions (core.outbox) are written in the same transaction.
+"""
+import re
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from . import analytics, outbox
+from .models import Perfil, Sesion
+from .sqlite import serialized_write
+from .timezones import get_zone
+
+DIAS = {
+    'monday': 0, 'lunes': 0, 'mon': 0, 'lun': 0,
+    'tuesday': 1, 'martes': 1, 'tue': 1, 'tues': 1, 'mar': 1,
+    'wednesday': 2, 'miercoles': 2, 'miércoles': 2, 'wed': 2, 'mie': 2, 'mié': 2,
+    'thursday': 3, 'jueves': 3, 'thu': 3, 'thur': 3, 'thurs': 3, 'jue': 3,
+    'friday': 4, 'viernes': 4, 'fri': 4, 'vie': 4,
+    'saturday': 5, 'sabado': 5, 'sábado': 5, 'sat': 5, 'sab': 5, 'sáb': 5,
+    'sunday': 6, 'domingo': 6, 'sun': 6, 'dom': 6,
+}
+GRUPOS_DIAS = {
+    'weekend': (5, 6), 'fin de semana': (5, 6), 'fines de semana': (5, 6),
+    'weekday': (0, 1, 2, 3, 4), 'entre semana': (0, 1, 2, 3, 4),
+}
+TODOS_LOS_DIAS = frozenset(range(7))
+
+# Day names, their abbreviations ("Mon", "sáb") and groups of days ("fin de semana"), also in plural ("sábados",
+# "Mondays", "weekends").
+DIA_RE = re.compile(
+    r'\b(' + '|'.join(re.escape(nombre).replace(r'\ ', r'\s+') for nombre in [*DIAS, *GRUPOS_DIAS]) + r')s?\b',
+    re.IGNORECASE,
+)
+RANGO_RE = re.compile(r'^\s*(to|until|a|al|hasta|-|–)\s*$', re.IGNORECASE)
+
+
+def available_weekdays(disponibilidad):
+    """
+    Returns the weekdays mentioned in a free-text availability.
+
+    Understands English and Spanish day names and abbreviations, ranges such as "From Monday to Friday", "de lunes
+    a viernes" or "Mon-Fri", and groups of days such as "weekends" or "fines de semana". If no day is mentioned, the
+    user is considered available every day.
+
+    Args:
+        disponibilidad (str): Perfil.disponibilidad text.
+
+    Returns:
+        frozenset[int]: Weekdays (0 = Monday, 6 = Sunday).
+
+    Example:
+        >>> sorted(available_weekdays("From Monday to Friday, 8.00 - 22.00"))
+        [0, 1, 2, 3, 4]
+    """
+    encontrados = list(DIA_RE.finditer(disponibilidad or ''))
+    if not encontrados:
+        return TODOS_LOS_DIAS
+
+    dias = set()
+    for i, actual in enumerate(encontrados):
+        nombre = ' '.join(actual.group(1).lower().split())
+        if nombre in GRUPOS_DIAS:
+            dias.update(GRUPOS_DIAS[nombre])
+            continue
+        dia = DIAS[nombre]
+        dias.add(dia)
+
+        anterior = encontrados[i - 1] if i else None
+        if anterior and anterior.group(1).lower() in DIAS and RANGO_RE.match(disponibilidad[anterior.end():actual.start()]):
+            inicio = DIAS[anterior.group(1).lower()]
+            dias.update((inicio + offset) % 7 for offset in range((dia - inicio) % 7 + 1))
+    return frozenset(dias)
+
+
+def _perfiles(acuerdo):
+    """
+    Returns the profiles of both users of an agreement with a single query.
+
+    Args:
+        acuerdo (Acuerdo): Agreement.
+
+    Returns:
+        list[Perfil]: Existing profiles (users without one are skipped).
+    """
+    return list(
+        Perfil.objects
+        .filter(usuario_id__in=(acuerdo.usuario_a_id, acuerdo.usuario_b_id))
+        .only('usuario_id', 'zona_horaria', 'disponibilidad')
+    )
+
+
+def _first_day(perfiles):
+    """
+    Returns the first date that is today or later for both users and for the server.
+
+    Args:
+        perfiles (list[Perfil]): Profiles of the agreement's users.
+
+    Returns:
+        datetime.date: First schedulable date.
+    """
+    ahora = timezone.now()
+    zonas = {perfil.zona_horaria for perfil in perfiles} or {settings.TIME_ZONE}
+    return max([ahora.date()] + [timezone.localtime(ahora, get_zone(zona)).date() for zona in zonas])
+
+
+def _common_weekdays(perfiles):
+    """
+    Returns the weekdays in which both users are available.
+
+    Args:
+        perfiles (list[Perfil]): Profiles of the agreement's users.
+
+    Returns:
+        list[int]: Sorted weekdays.
+
+    Raises:
+        ValidationError: If the users don't share any weekday.
+    """
+    dias = set(TODOS_LOS_DIAS)
+    for perfil in perfiles:
+        dias &= available_weekdays(perfil.disponibilidad)
+
+    if not dias:
+        raise ValidationError('The users have no available weekdays in common.')
+    return sorted(dias)
+
+
+def calendar(inicio, dias, sesiones_por_semana):
+    """
+    Yields the session dates of an agreement, week after week.
+
+    Each week is the 7-day window starting at ``inicio + 7 * week``. The sessions of a week are spread evenly over
+    the available weekdays; if there are more sessions than days, some days get more than one session.
+
+    Args:
+        inicio (datetime.date): First schedulable date.
+        dias (list[int]): Sorted available weekdays (0 = Monday).
+        sesiones_por_semana (int): Sessions per week.
+
+    Yields:
+        datetime.date: Session dates, in order.
+
+    Example:
+        >>> from datetime import date
+        >>> from itertools import islice
+        >>> list(islice(calendar(date(2026, 1, 5), [0, 2, 4], 2), 4))
+        [datetime.date(2026, 1, 5), datetime.date(2026, 1, 7), datetime.date(2026, 1, 12), datetime.date(2026, 1, 14)]
+    """
+    if sesiones_por_semana < 1:
+        return
+
+    # Days of each week sorted by their offset from the start of the window.
+    offsets = sorted((dia - inicio.weekday()) % 7 for dia in dias)
+    huecos = [offsets[(i * len(offsets)) // sesiones_por_semana] for i in range(sesiones_por_semana)]
+
+    semana = inicio
+    while True:
+        for offset in huecos:
+            yield semana + timedelta(days=offset)
+        semana += timedelta(weeks=1)
+
+
+def _validate(acuerdo, sesion):
+    """
+    Validates a calendar through its first session.
+
+    Every session of a calendar shares the same values but the date, and the first one is the earliest, so
+    validating it validates the whole calendar.
+
+    Args:
+        acuerdo (Acuerdo): Agreement (must be ongoing).
+        sesion (Sesion): First session of the calendar.
+
+    Raises:
+        ValidationError: If the agreement isn't ongoing or the session values are invalid.
+    """
+    sesion.acuerdo = acuerdo  # Avoids reloading the agreement in Sesion.clean()
+    sesion.full_clean()
+
+
+@serialized_write
+def schedule_sessions(acuerdo, inicio=None, batch_size=None):
+    """
+    Creates every session of an agreement at once.
+
+    Args:
+        acuerdo (Acuerdo): Ongoing agreement ('EN CURSO') without sessions.
+        inicio (datetime.date): First schedulable date. Defaults to the first day that is today or later for both users.
+        batch_size (int): Rows inserted per query (database default if None).
+
+    Returns:
+        list[Sesion]: Created sessions.
+
+    Raises:
+        ValidationError: If the agreement isn't ongoing, already has sessions or its calendar is invalid.
+
+    Example:
+        >>> acuerdo.estado = 'EN CURSO'
+        >>> sesiones = schedule_sessions(acuerdo)
+        >>> len(sesiones) == acuerdo.semanas * acuerdo.sesiones_por_semana
+        True
+    """
+    perfiles = _perfiles(acuerdo)
+    inicio = inicio or _first_day(perfiles)
+    total = acuerdo.semanas * acuerdo.sesiones_por_semana
+
+    fechas = islice(calendar(inicio, _common_weekdays(perfiles), acuerdo.sesiones_por_semana), total)
+    sesiones = [
+        Sesion(
+            fecha=fecha,
+            duracion_real=acuerdo.mins_sesion,
+            resumen=f'Session {numero}/{total}',
+            estado=True,
+            acuerdo=acuerdo,
+        )
+        for numero, fecha in enumerate(fechas, start=1)
+    ]
+    if not sesiones:
+        return []
+
+    _validate(acuerdo, sesiones[0])
+
+    with transaction.atomic():
+        if Sesion.objects.filter(acuerdo=acuerdo).exists():
+            raise ValidationError('The agreement already has sessions, reschedule them instead.')
+        creadas = Sesion.objects.bulk_create(sesiones, batch_size=batch_size)
+        outbox.schedule_reminders(creadas, (acuerdo.usuario_a_id, acuerdo.usuario_b_id))
+        return creadas
+
+
+@serialized_write
+def reschedule_sessions(acuerdo, inicio=None, batch_size=None):
+    """
+    Moves the remaining sessions of an agreement to a new calendar.
+
+    Completed sessions (sessions before today or sessions someone attended) are kept as they are. Remaining sessions are
+    updated in place, and sessions are created or deleted only if the number of pending sessions changed
+    (e.g. the agreement got more weeks).
+
+    Args:
+        acuerdo (Acuerdo): Ongoing agreement ('EN CURSO').
+        inicio (datetime.date): First schedulable date. Defaults to the first day that is today or later for both users.
+        batch_size (int): Rows written per query (database default if None).
+
+    Returns:
+        dict: Number of sessions 'updated', 'created' and 'deleted'.
+
+    Raises:
+        ValidationError: If the agreement isn't ongoing or its calendar is invalid.
+    """
+    perfiles = _perfiles(acuerdo)
+    inicio = inicio or _first_day(perfiles)
+    total = acuerdo.semanas * acuerdo.sesiones_por_semana
+
+    with transaction.atomic():
+        sesiones = list(
+            Sesion.objects
+            .select_for_update()
+            .filter(acuerdo=acuerdo)
+            .only('id', 'fecha', 'estado', 'asistencia_user_a', 'asistencia_user_b')
+            .order_by('fecha', 'id')
+        )
+        hoy = timezone.localdate()  # Not inicio: the unattended sessions between today and inicio are moved too.
+        completadas = sum(1 for s in sesiones if s.fecha < hoy or s.asistencia_user_a or s.asistencia_user_b)
+        pendientes = [s for s in sesiones if not (s.fecha < hoy or s.asistencia_user_a or s.asistencia_user_b)]
+
+        fechas = list(islice(calendar(inicio, _common_weekdays(perfiles), acuerdo.sesiones_por_semana), max(total - completadas, 0)))
+        if fechas:
+            _validate(acuerdo, Sesion(fecha=fechas[0], duracion_real=acuerdo.mins_sesion, resumen='-', estado=True))
+
+        actualizar = pendientes[:len(fechas)]
+        analytics.mark_stale('sesiones', [sesion.fecha for sesion in actualizar])  # bulk_update() sends no signals.
+        for numero, (sesion, fecha) in enumerate(zip(actualizar, fechas), start=completadas + 1):
+            sesion.fecha = fecha
+            sesion.resumen = f'Session {numero}/{total}'
+            sesion.fecha_modificacion = timezone.now()  # bulk_update() skips auto_now.
+        Sesion.objects.bulk_update(actualizar, ['fecha', 'resumen', 'fecha_modificacion'], batch_size=batch_size)
+
+        nuevas = [
+            Sesion(
+                fecha=fecha,
+                duracion_real=acuerdo.mins_sesion,
+                resumen=f'Session {numero}/{total}',
+                estado=True,
+                acuerdo=acuerdo,
+            )
+            for numero, fecha in enumerate(fechas[len(actualizar):], start=completadas + len(actualizar) + 1)
+        ]
+        Sesion.objects.bulk_create(nuevas, batch_size=batch_size)
+
+        outbox.cancel_reminders([sesion.pk for sesion in actualizar])
+        outbox.schedule_reminders(actualizar + nuevas, (acuerdo.usuario_a_id, acuerdo.usuario_b_id))
+
+        sobrantes = [s.pk for s in pendientes[len(fechas):]]
+        if sobrantes:
+            Sesion.objects.filter(pk__in=sobrantes).delete()
+
+    return {'updated': len(actualizar), 'created': len(nuevas), 'deleted': len(sobrantes)}
@@ -0,0 +1,517 @@
+"""
+Full-text search for SkillSwap.
+
+Searches post descriptions (Publicacion.descripcion) and profile bios (Perfil.biografia). Texts are tokenized and
+stemmed in Python (Spanish or English, from Perfil.preferencias['language']) and stored in a pluggable index backend:
+
+    - SQLiteFTSBackend: SQLite FTS5 virtual table, ranked with bm25.
+    - InvertedIndexBackend: pure-Python posting lists stored in TerminoBusqueda, works on any database.
+
+The backend is chosen with the SEARCH_BACKEND setting ('fts5', 'python' or None to use FTS5 when the database is
+SQLite). The index is updated by core.signals when posts and profiles are saved or deleted.
+"""
+import re
+import unicodedata
+from abc import ABC, abstractmethod
+from collections import Counter
+from dataclasses import dataclass
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.db.models import Count, Exists, OuterRef, Sum
+from django.db.models.expressions import RawSQL
+
+from .models import Perfil, Publicacion, TerminoBusqueda
+from .preferences import Preferencias
+
+IDIOMAS = ('es', 'en')
+
+STOPWORDS = frozenset((
+    # es
+    'a', 'al', 'con', 'de', 'del', 'el', 'en', 'es', 'la', 'las', 'lo', 'los', 'me', 'mi', 'para', 'por', 'que',
+    'se', 'sin', 'su', 'un', 'una', 'uno', 'y', 'o', 'yo', 'soy',
+    # en
+    'an', 'and', 'are', 'as', 'at', 'be', 'for', 'from', 'i', 'im', 'in', 'is', 'it', 'my', 'of', 'on', 'or',
+    'the', 'to', 'with',
+))
+
+SUFIJOS = {
+    'es': (
+        'amientos', 'imientos', 'amiento', 'imiento', 'aciones', 'uciones', 'adoras', 'adores', 'ancias', 'amente',
+        'idades', 'acion', 'ucion', 'adora', 'ador', 'ancia', 'mente', 'idad', 'ismos', 'istas', 'ismo', 'ista',
+        'ando', 'iendo', 'ados', 'idos', 'adas', 'idas', 'ado', 'ido', 'ada', 'ida', 'ar', 'er', 'ir', 'es', 'os',
+        'as', 's', 'o', 'a', 'e',
+    ),
+    'en': (
+        'ational', 'fulness', 'iveness', 'ization', 'ations', 'ation', 'ments', 'ment', 'ness', 'ings', 'ing',
+        'edly', 'ers', 'ies', 'ied', 'ed', 'er', 'ly', 'es', 's',
+    ),
+}
+MIN_RAIZ = 3
+
+PALABRA_RE = re.compile(r'\w+')
+
+
+def normalize(texto):
+    """
+    Lowercases a text and removes its accents.
+
+    Args:
+        texto (str): Text.
+
+    Returns:
+        str: Normalized text.
+
+    Example:
+        >>> normalize("Inglés Avanzado")
+        'ingles avanzado'
+    """
+    descompuesto = unicodedata.normalize('NFKD', texto.lower())
+    return ''.join(c for c in descompuesto if not unicodedata.combining(c))
+
+
+@lru_cache(maxsize=50000)
+def stem(palabra, idioma='es'):
+    """
+    Returns the stem of a normalized word.
+
+    Light suffix-stripping stemmer: removes the longest known suffix as long as the stem keeps at least MIN_RAIZ
+    letters. The stem is always a prefix of the word, which also allows prefix searches.
+
+    Args:
+        palabra (str): Normalized word.
+        idioma (str): 'es' or 'en'.
+
+    Returns:
+        str: Stem.
+
+    Example:
+        >>> stem('programacion'), stem('teaching', 'en')
+        ('program', 'teach')
+    """
+    for sufijo in SUFIJOS.get(idioma, SUFIJOS['es']):
+        if palabra.endswith(sufijo) and len(palabra) - len(sufijo) >= MIN_RAIZ:
+            return palabra[:-len(sufijo)]
+    return palabra
+
+
+def tokenize(texto, idioma='es'):
+    """
+    Splits a text into stemmed terms, skipping stopwords.
+
+    Args:
+        texto (str): Text.
+        idioma (str): 'es' or 'en'.
+
+    Returns:
+        list[str]: Stemmed terms, in order.
+
+    Example:
+        >>> tokenize("Busco profesor de inglés para conversación")
+        ['busc', 'profesor', 'ingl', 'convers']
+    """
+    return [
+        stem(palabra, idioma)
+        for palabra in PALABRA_RE.findall(normalize(texto or ''))
+        if palabra not in STOPWORDS
+    ]
+
+
+def query_terms(consulta):
+    """
+    Returns the terms to look for in a query.
+
+    Documents are stemmed in their author's language, so every query word is stemmed in both languages. The
+    last word is matched as a prefix, so partial words work while typing.
+
+    Args:
+        consulta (str): Query typed by the user.
+
+    Returns:
+        tuple: (terms, prefixes) as sets of stems.
+
+    Example:
+        >>> query_terms("profesores ingl")
+        ({'profesor'}, {'ingl'})
+    """
+    palabras = [palabra for palabra in PALABRA_RE.findall(normalize(consulta or '')) if palabra not in STOPWORDS]
+    terminos = {stem(palabra, idioma) for palabra in palabras[:-1] for idioma in IDIOMAS}
+    prefijos = {stem(palabra, idioma) for palabra in palabras[-1:] for idioma in IDIOMAS}
+    return terminos, prefijos
+
+
+class SearchBackend(ABC):
+    """
+    Base class for the search index backends.
+
+    Documents are identified by their type ('publicacion' or 'perfil') and object id.
+    """
+
+    def index(self, tipo, objeto_id, texto, idioma='es'):
+        """
+        Adds or replaces a document in the index.
+
+        Args:
+            tipo (str): Document type.
+            objeto_id (int): Post or profile id.
+            texto (str): Text to index.
+            idioma (str): Language used to stem the text.
+        """
+        self.bulk_index(tipo, [(objeto_id, texto, idioma)])
+
+    @abstractmethod
+    def bulk_index(self, tipo, documentos):
+        """
+        Adds or replaces many documents of the same type.
+
+        Args:
+            tipo (str): Document type.
+            documentos (iterable): (objeto_id, texto, idioma) tuples.
+        """
+
+    @abstractmethod
+    def remove(self, tipo, objeto_id):
+        """
+        Removes a document from the index.
+
+        Args:
+            tipo (str): Document type.
+            objeto_id (int): Post or profile id.
+        """
+
+    @abstractmethod
+    def clear(self, tipo):
+        """
+        Removes every document of a type from the index.
+
+        Args:
+            tipo (str): Document type.
+        """
+
+    @abstractmethod
+    def search(self, tipo, consulta, queryset, offset=0, limit=20):
+        """
+        Returns the best matching documents of a type, most relevant first.
+
+        The queryset is checked per match with a correlated EXISTS, so the cost depends on the number of matches
+        and not on the size of the table.
+
+        Args:
+            tipo (str): Document type.
+            consulta (str): Query typed by the user.
+            queryset (QuerySet): Documents that can be returned (e.g. filtered by skill).
+            offset (int): Results to skip.
+            limit (int): Max number of results.
+
+        Returns:
+            list[tuple]: (objeto_id, score) tuples.
+        """
+
+
+class SQLiteFTSBackend(SearchBackend):
+    """
+    Search backend on an SQLite FTS5 virtual table.
+
+    The rowid of a document is ``objeto_id * 2 + type``, so documents are replaced and deleted by rowid.
+    """
+    TABLA = 'busqueda_fts'
+    TIPOS = {'publicacion': 0, 'perfil': 1}
+
+    def __init__(self):
+        self._bases_de_datos = set()  # Databases where the table already exists.
+
+    def ensure_table(self, conexion=connection):
+        """
+        Creates the virtual table if the database doesn't have it yet.
+
+        A table created inside a transaction isn't remembered, as a rollback drops it again.
+
+        Args:
+            conexion (BaseDatabaseWrapper): Database connection.
+        """
+        nombre = conexion.settings_dict['NAME']
+        if nombre in self._bases_de_datos:
+            return
+        with conexion.cursor() as cursor:
+            cursor.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.TABLA} USING fts5(terminos, tokenize='unicode61')")
+        if not conexion.in_atomic_block:
+            self._bases_de_datos.add(nombre)
+
+    def _cursor(self):
+        self.ensure_table()
+        return connection.cursor()
+
+    def _rowid(self, tipo, objeto_id):
+        return objeto_id * 2 + self.TIPOS[tipo]
+
+    def bulk_index(self, tipo, documentos):
+        filas = [(self._rowid(tipo, objeto_id), ' '.join(tokenize(texto, idioma))) for objeto_id, texto, idioma in documentos]
+        with transaction.atomic(), self._cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {self.TABLA} WHERE rowid = %s', [(rowid,) for rowid, _ in filas])
+            cursor.executemany(f'INSERT INTO {self.TABLA} (rowid, terminos) VALUES (%s, %s)', filas)
+
+    def remove(self, tipo, objeto_id):
+        with self._cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.TABLA} WHERE rowid = %s', [self._rowid(tipo, objeto_id)])
+
+    def clear(self, tipo):
+        with self._cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.TABLA} WHERE (rowid & 1) = %s', [self.TIPOS[tipo]])
+
+    def search(self, tipo, consulta, queryset, offset=0, limit=20):
+        terminos, prefijos = query_terms(consulta)
+        expresion = ' OR '.join([f'"{t}"' for t in sorted(terminos)] + [f'"{p}"*' for p in sorted(prefijos)])
+        if not expresion:
+            return []
+
+        permitido = queryset.filter(pk=RawSQL(f'{self.TABLA}.rowid >> 1', ())).values('pk')
+        permitido_sql, permitido_params = permitido.query.sql_with_params()
+        sql = (
+            f'SELECT rowid >> 1, -rank FROM {self.TABLA} '
+            f'WHERE {self.TABLA} MATCH %s AND (rowid & 1) = %s AND EXISTS ({permitido_sql}) '
+            f'ORDER BY rank LIMIT %s OFFSET %s'
+        )
+        with self._cursor() as cursor:
+            cursor.execute(sql, [expresion, self.TIPOS[tipo], *permitido_params, limit, offset])
+            return cursor.fetchall()
+
+
+class InvertedIndexBackend(SearchBackend):
+    """
+    Pure-Python search backend on the TerminoBusqueda table.
+
+    Documents are ranked by the number of distinct query terms they contain, then by how often they contain them.
+    """
+
+    def bulk_index(self, tipo, documentos, batch_size=1000):
+        documentos = list(documentos)
+        filas = [
+            TerminoBusqueda(tipo=tipo, objeto_id=objeto_id, termino=termino[:50], frecuencia=frecuencia)
+            for objeto_id, texto, idioma in documentos
+            for termino, frecuencia in Counter(tokenize(texto, idioma)).items()
+        ]
+        with transaction.atomic():
+            TerminoBusqueda.objects.filter(tipo=tipo, objeto_id__in=[documento[0] for documento in documentos]).delete()
+            TerminoBusqueda.objects.bulk_create(filas, batch_size=batch_size)
+
+    def remove(self, tipo, objeto_id):
+        TerminoBusqueda.objects.filter(tipo=tipo, objeto_id=objeto_id).delete()
+
+    def clear(self, tipo):
+        TerminoBusqueda.objects.filter(tipo=tipo).delete()
+
+    def search(self, tipo, consulta, queryset, offset=0, limit=20):
+        terminos, prefijos = query_terms(consulta)
+        if not terminos and not prefijos:
+            return []
+
+        # Prefixes are expanded to the indexed terms they match (one index range scan each), so the main query is
+        # a plain IN over the (tipo, termino) index.
+        terminos = set(terminos)
+        for prefijo in prefijos:
+            terminos.update(
+                TerminoBusqueda.objects
+                .filter(tipo=tipo, termino__gte=prefijo, termino__lt=prefijo + '\uffff')
+                .values_list('termino', flat=True)
+                .distinct()
+            )
+
+        filas = (
+            TerminoBusqueda.objects
+            .filter(Exists(queryset.filter(pk=OuterRef('objeto_id'))), tipo=tipo, termino__in=terminos)
+            .values('objeto_id')
+            .annotate(coincidencias=Count('termino', distinct=True), frecuencia=Sum('frecuencia'))
+            .order_by('-coincidencias', '-frecuencia', 'objeto_id')
+        )[offset:offset + limit]
+        return [(fila['objeto_id'], fila['coincidencias'] + fila['frecuencia'] / 1000) for fila in filas]
+
+
+BACKENDS = {
+    'fts5': SQLiteFTSBackend,
+    'python': InvertedIndexBackend,
+}
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    """
+    Returns the configured search backend.
+
+    Returns:
+        SearchBackend: SEARCH_BACKEND setting, or FTS5 on SQLite and the pure-Python index elsewhere.
+    """
+    nombre = getattr(settings, 'SEARCH_BACKEND', None) or ('fts5' if connection.vendor == 'sqlite' else 'python')
+    return BACKENDS[nombre]()
+
+
+def create_table(using=DEFAULT_DB_ALIAS):
+    """
+    Creates the FTS5 table of the search index, when it's the configured backend and the database is SQLite.
+
+    Called after migrate (core.signals), so the table is committed before any request or test transaction uses it.
+
+    Args:
+        using (str): Database alias.
+    """
+    backend = get_backend()
+    if isinstance(backend, SQLiteFTSBackend) and connections[using].vendor == 'sqlite':
+        backend.ensure_table(connections[using])
+
+
+def language_of(preferencias):
+    """
+    Returns the language used to stem the texts of a user.
+
+    Args:
+        preferencias (dict | None): Perfil.preferencias of the user.
+
+    Returns:
+        str: 'es' or 'en'.
+    """
+    idioma = Preferencias.parse(preferencias).language
+    return idioma if idioma in IDIOMAS else 'es'
+
+
+@dataclass
+class Pagina:
+    """
+    A page of search results.
+
+    Attributes:
+        resultados (list): Matching objects, most relevant first. Each one has a ``puntuacion`` attribute.
+        numero (int): Page number (starting at 1).
+        hay_mas (bool): True if there's a next page.
+    """
+    resultados: list
+    numero: int
+    hay_mas: bool
+
+
+def _page(tipo, consulta, queryset, pagina, por_pagina):
+    """
+    Runs a search restricted to a queryset and loads the matching objects of a page.
+
+    Args:
+        tipo (str): Document type.
+        consulta (str): Query typed by the user.
+        queryset (QuerySet): Objects that can be returned.
+        pagina (int): Page number (starting at 1).
+        por_pagina (int): Results per page.
+
+    Returns:
+        Pagina: Page of results.
+    """
+    pagina = max(pagina, 1)
+    filas = get_backend().search(tipo, consulta, queryset, (pagina - 1) * por_pagina, por_pagina + 1)
+    puntuaciones = dict(filas[:por_pagina])
+
+    objetos = queryset.in_bulk(list(puntuaciones))
+    resultados = []
+    for objeto_id, puntuacion in puntuaciones.items():
+        objeto = objetos.get(objeto_id)
+        if objeto is not None:  # Deleted after the search
+            objeto.puntuacion = puntuacion
+            resultados.append(objeto)
+    return Pagina(resultados, pagina, len(filas) > por_pagina)
+
+
+def search_posts(consulta, habilidades=None, categoria=None, tipo=None, pagina=1, por_pagina=20):
+    """
+    Searches the active posts by their description.
+
+    Args:
+        consulta (str): Query typed by the user.
+        habilidades (list[int]): Only posts of these skills.
+        categoria (str): Only posts of skills of this category.
+        tipo (str): Only posts of this type ('OFREZCO' or 'BUSCO').
+        pagina (int): Page number (starting at 1).
+        por_pagina (int): Results per page.
+
+    Returns:
+        Pagina: Page of Publicacion, most relevant first.
+
+    Example:
+        >>> pagina = search_posts("clases de ingles", categoria="Idioma")
+        >>> [publicacion.descripcion for publicacion in pagina.resultados]
+    """
+    publicaciones = Publicacion.objects.active().filter(habilidad__estado=True).with_relations()
+    if habilidades:
+        publicaciones = publicaciones.filter(habilidad_id__in=habilidades)
+    if categoria:
+        publicaciones = publicaciones.filter(habilidad__categoria=categoria)
+    if tipo:
+        publicaciones = publicaciones.filter(tipo=tipo)
+    return _page('publicacion', consulta, publicaciones, pagina, por_pagina)
+
+
+def search_profiles(consulta, habilidades=None, pagina=1, por_pagina=20):
+    """
+    Searches the profiles of active users by their bio.
+
+    Args:
+        consulta (str): Query typed by the user.
+        habilidades (list[int]): Only profiles that have one of these skills.
+        pagina (int): Page number (starting at 1).
+        por_pagina (int): Results per page.
+
+    Returns:
+        Pagina: Page of Perfil, most relevant first.
+    """
+    perfiles = Perfil.objects.filter(usuario__is_active=True).with_user()
+    if habilidades:
+        perfiles = perfiles.filter(id__in=Perfil.habilidades.through.objects.filter(habilidad_id__in=habilidades).values('perfil_id'))
+    return _page('perfil', consulta, perfiles, pagina, por_pagina)
+
+
+def index_post(publicacion):
+    """
+    Indexes (or reindexes) a post in the language of its author.
+
+    Args:
+        publicacion (Publicacion): Post.
+    """
+    preferencias = Perfil.objects.filter(usuario_id=publicacion.autor_id).values_list('preferencias', flat=True).first()
+    get_backend().index('publicacion', publicacion.pk, publicacion.descripcion, language_of(preferencias))
+
+
+def index_profile(perfil):
+    """
+    Indexes (or reindexes) the bio of a profile in the language of the user.
+
+    Args:
+        perfil (Perfil): Profile.
+    """
+    get_backend().index('perfil', perfil.pk, perfil.biografia, language_of(perfil.preferencias))
+
+
+def rebuild(chunk_size=2000):
+    """
+    Rebuilds the whole search index from the posts and profiles.
+
+    Args:
+        chunk_size (int): Documents indexed per batch.
+
+    Returns:
+        int: Number of documents indexed.
+    """
+    backend = get_backend()
+    fuentes = (
+        ('publicacion', Publicacion.objects.values_list('id', 'descripcion', 'autor__perfil__preferencias')),
+        ('perfil', Perfil.objects.values_list('id', 'biografia', 'preferencias')),
+    )
+
+    total = 0
+    for tipo, filas in fuentes:
+        backend.clear(tipo)
+        lote = []
+        for objeto_id, texto, preferencias in filas.iterator(chunk_size=chunk_size):
+            lote.append((objeto_id, texto, language_of(preferencias)))
+            if len(lote) >= chunk_size:
+                backend.bulk_index(tipo, lote)
+                total += len(lote)
+                lote = []
+        if lote:
+            backend.bulk_index(tipo, lote)
+            total += len(lote)
+    return total
@@ -0,0 +1,465 @@
+"""
+Signal receivers for the core app.
+
+Keeps the precomputed tables of SkillSwap (the matchmaking index, the user counters, the search index and the
+availability intervals) in sync
+with the models they are built from, and invalidates the cached values (core.cache) built from them. Writes the
+notifications of proposals, agreements that change state and upcoming sessions to the outbox (core.outbox), in the
+transaction of the change, adds finished agreements to the skill recommendations (core.recommendations) and records
+the days the analytics rollups can't find by watermark (core.analytics). It also tunes new SQLite connections
+(core.sqlite) and creates the search table after migrate. They're connected in CoreConfig.ready().
+"""
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_migrate, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import analytics, availability, cache, matching, outbox, recommendations, search, sqlite, stats
+from .models import Acuerdo, Habilidad, IntervaloDisponibilidad, Perfil, Publicacion, Sesion, Usuario
+from .transitions import acuerdo_transitioned
+
+CAMPOS_INDICE = frozenset({'autor', 'autor_id', 'habilidad', 'habilidad_id', 'tipo'})  # Key of IndicePublicacion.
+
+
+@receiver(connection_created, dispatch_uid='sqlite_connection_created')
+def sqlite_connection_created(sender, connection, **kwargs):
+    """
+    Applies the SQLite pragmas to every new connection (only with SQLITE_TUNED).
+
+    Args:
+        sender (type): Database wrapper class.
+        connection (BaseDatabaseWrapper): New database connection.
+    """
+    sqlite.configure_connection(connection)
+
+
+@receiver(post_migrate, dispatch_uid='search_post_migrate')
+def search_post_migrate(sender, using, **kwargs):
+    """
+    Creates the FTS5 table of the search index once core is migrated (SQLite only).
+
+    Args:
+        sender (AppConfig): Migrated app.
+        using (str): Database alias.
+    """
+    if sender.name == 'core':
+        search.create_table(using)
+
+
+@receiver(pre_save, sender=Publicacion, dispatch_uid='publicacion_indice_pre_save')
+def publicacion_pre_save(sender, instance, update_fields=None, **kwargs):
+    """
+    Remembers the index key of a post before it's updated.
+
+    If the author, skill or type changes, the old index row must be refreshed too. Saves whose update_fields leave
+    them out can't change it, so they skip the query.
+
+    Args:
+        sender (type): Publicacion model.
+        instance (Publicacion): Post being saved.
+        update_fields (frozenset | None): Fields being saved (None for all of them).
+    """
+    instance._indice_anterior = None
+    if instance.pk is None or (update_fields is not None and not update_fields & CAMPOS_INDICE):
+        return
+
+    anterior = Publicacion.objects.filter(pk=instance.pk).values_list('autor_id', 'habilidad_id', 'tipo').first()
+    instance._indice_anterior = anterior
+
+
+@receiver(post_save, sender=Publicacion, dispatch_uid='publicacion_indice_post_save')
+def publicacion_post_save(sender, instance, raw=False, **kwargs):
+    """
+    Updates the matchmaking and search indexes after a post is saved.
+
+    Args:
+        sender (type): Publicacion model.
+        instance (Publicacion): Saved post.
+        raw (bool): True when loading fixtures (the index is rebuilt afterwards).
+    """
+    if raw:
+        return
+
+    actual = (instance.autor_id, instance.habilidad_id, instance.tipo)
+    anterior = getattr(instance, '_indice_anterior', None)
+
+    matching.refresh_entry(*actual)
+    if anterior and anterior != actual:
+        matching.refresh_entry(*anterior)
+
+    search.index_post(instance)
+
+
+@receiver(post_delete, sender=Publicacion, dispatch_uid='publicacion_indice_post_delete')
+def publicacion_post_delete(sender, instance, **kwargs):
+    """
+    Updates the matchmaking and search indexes after a post is deleted.
+
+    Args:
+        sender (type): Publicacion model.
+        instance (Publicacion): Deleted post.
+    """
+    matching.refresh_entry(instance.autor_id, instance.habilidad_id, instance.tipo)
+    search.get_backend().remove('publicacion', instance.pk)
+
+
+@receiver(pre_save, sender=Acuerdo, dispatch_uid='acuerdo_stats_pre_save')
+def acuerdo_pre_save(sender, instance, **kwargs):
+    """
+    Remembers what an agreement contributed to the user counters, and its state, before it's updated.
+
+    Args:
+        sender (type): Acuerdo model.
+        instance (Acuerdo): Agreement being saved.
+    """
+    anterior = None
+    if instance.pk is not None:
+        anterior = Acuerdo.objects.filter(pk=instance.pk).values_list('usuario_a_id', 'usuario_b_id', 'estado').first()
+    instance._stats_anteriores = stats.acuerdo_contribution(*anterior) if anterior else {}
+    instance._estado_anterior = anterior[2] if anterior else None
+
+
+@receiver(post_save, sender=Acuerdo, dispatch_uid='acuerdo_stats_post_save')
+def acuerdo_post_save(sender, instance, raw=False, **kwargs):
+    """
+    Updates the user counters after an agreement is saved (e.g. when it's finished).
+
+    Args:
+        sender (type): Acuerdo model.
+        instance (Acuerdo): Saved agreement.
+        raw (bool): True when loading fixtures (the counters are rebuilt afterwards).
+    """
+    if raw:
+        return
+
+    actual = stats.acuerdo_contribution(instance.usuario_a_id, instance.usuario_b_id, instance.estado)
+    stats.apply_delta(getattr(instance, '_stats_anteriores', {}), actual)
+
+
+@receiver(post_save, sender=Acuerdo, dispatch_uid='acuerdo_outbox_post_save')
+def acuerdo_outbox_post_save(sender, instance, created=False, raw=False, **kwargs):
+    """
+    Notifies a new proposal, or an agreement whose state was changed with save() instead of core.transitions.
+
+    Args:
+        sender (type): Acuerdo model.
+        instance (Acuerdo): Saved agreement.
+        created (bool): True if the agreement is new.
+        raw (bool): True when loading fixtures (nothing happened, nobody is notified).
+    """
+    if raw:
+        return
+
+    if created:
+        if instance.estado == 'PROPUESTO':
+            outbox.agreement_proposed(instance)
+    elif instance.estado != getattr(instance, '_estado_anterior', instance.estado):
+        outbox.agreements_transitioned([(instance.pk, instance.usuario_a_id, instance.usuario_b_id)], instance.estado)
+
+
+@receiver(post_save, sender=Acuerdo, dispatch_uid='acuerdo_recommendations_post_save')
+def acuerdo_recommendations_post_save(sender, instance, created=False, raw=False, **kwargs):
+    """
+    Adds an agreement finished with save() instead of core.transitions to the skill recommendations, after commit.
+
+    Args:
+        sender (type): Acuerdo model.
+        instance (Acuerdo): Saved agreement.
+        created (bool): True if the agreement is new.
+        raw (bool): True when loading fixtures (the table is rebuilt afterwards).
+    """
+    if raw or instance.estado != 'FINALIZADO':
+        return
+    if created or getattr(instance, '_estado_anterior', 'FINALIZADO') != 'FINALIZADO':
+        transaction.on_commit(lambda: recommendations.agreements_finished([instance.pk]))
+
+
+@receiver(acuerdo_transitioned, dispatch_uid='acuerdo_recommendations_transitioned')
+def acuerdo_recommendations_transitioned(sender, acuerdo_ids, origen, destino, **kwargs):
+    """
+    Adds the agreements finished by core.transitions to the skill recommendations (sent after commit).
+
+    Args:
+        sender (type): Acuerdo model.
+        acuerdo_ids (list[int]): Agreements that changed state.
+        origen (str): Previous state.
+        destino (str): New state.
+    """
+    if destino == 'FINALIZADO':
+        recommendations.agreements_finished(acuerdo_ids)
+
+
+@receiver(post_delete, sender=Acuerdo, dispatch_uid='acuerdo_stats_post_delete')
+def acuerdo_post_delete(sender, instance, **kwargs):
+    """
+    Updates the user counters after an agreement is deleted.
+
+    Args:
+        sender (type): Acuerdo model.
+        instance (Acuerdo): Deleted agreement.
+    """
+    anterior = stats.acuerdo_contribution(instance.usuario_a_id, instance.usuario_b_id, instance.estado)
+    stats.apply_delta(anterior, {})
+
+
+@receiver(post_delete, sender=Acuerdo, dispatch_uid='acuerdo_analytics_post_delete')
+def acuerdo_analytics_post_delete(sender, instance, **kwargs):
+    """
+    Marks the day a deleted agreement was proposed for the next analytics rollup (its row is gone, so the watermark
+    can't find it).
+
+    Args:
+        sender (type): Acuerdo model.
+        instance (Acuerdo): Deleted agreement.
+    """
+    analytics.mark_stale('acuerdos', [timezone.localdate(instance.fecha_creacion)])
+
+
+def _sesion_usuarios(instance):
+    """
+    Returns the users of the agreement of a session, without loading the agreement if it isn't cached.
+
+    Args:
+        instance (Sesion): Session.
+
+    Returns:
+        tuple: (usuario_a_id, usuario_b_id)
+    """
+    if Sesion.acuerdo.is_cached(instance):
+        return instance.acuerdo.usuario_a_id, instance.acuerdo.usuario_b_id
+    return Acuerdo.objects.filter(pk=instance.acuerdo_id).values_list('usuario_a_id', 'usuario_b_id').get()
+
+
+@receiver(pre_save, sender=Sesion, dispatch_uid='sesion_stats_pre_save')
+def sesion_pre_save(sender, instance, **kwargs):
+    """
+    Remembers what a session contributed to the user counters, and its date and state, before it's updated.
+
+    Args:
+        sender (type): Sesion model.
+        instance (Sesion): Session being saved.
+    """
+    anterior = None
+    if instance.pk is not None:
+        anterior = Sesion.objects.filter(pk=instance.pk).values_list(
+            'acuerdo__usuario_a_id', 'acuerdo__usuario_b_id', 'asistencia_user_a', 'asistencia_user_b', 'duracion_real',
+            'fecha', 'estado',
+        ).first()
+    instance._stats_anteriores = stats.sesion_contribution(*anterior[:5]) if anterior else {}
+    instance._recordatorio_anterior = anterior[5:] if anterior else None
+
+
+@receiver(post_save, sender=Sesion, dispatch_uid='sesion_stats_post_save')
+def sesion_post_save(sender, instance, raw=False, **kwargs):
+    """
+    Updates the user counters after a session is saved (e.g. when the attendance is recorded).
+
+    Args:
+        sender (type): Sesion model.
+        instance (Sesion): Saved session.
+        raw (bool): True when loading fixtures (the counters are rebuilt afterwards).
+    """
+    if raw:
+        return
+
+    anterior = getattr(instance, '_stats_anteriores', {})
+    if not anterior and not (instance.asistencia_user_a or instance.asistencia_user_b):
+        return  # Nothing to count, skips looking up the agreement.
+
+    actual = stats.sesion_contribution(
+        *_sesion_usuarios(instance), instance.asistencia_user_a, instance.asistencia_user_b, instance.duracion_real
+    )
+    stats.apply_delta(anterior, actual)
+
+
+@receiver(post_save, sender=Sesion, dispatch_uid='sesion_outbox_post_save')
+def sesion_outbox_post_save(sender, instance, created=False, raw=False, **kwargs):
+    """
+    Writes the reminders of a new session, or replaces them when the session is moved, cancelled or reactivated.
+
+    Args:
+        sender (type): Sesion model.
+        instance (Sesion): Saved session.
+        created (bool): True if the session is new.
+        raw (bool): True when loading fixtures.
+    """
+    if raw or (not created and getattr(instance, '_recordatorio_anterior', None) == (instance.fecha, instance.estado)):
+        return
+
+    if not created:
+        outbox.cancel_reminders([instance.pk])
+    if instance.estado:
+        outbox.schedule_reminders([instance], _sesion_usuarios(instance))
+
+
+@receiver(post_delete, sender=Sesion, dispatch_uid='sesion_outbox_post_delete')
+def sesion_outbox_post_delete(sender, instance, **kwargs):
+    """
+    Drops the pending reminders of a deleted session.
+
+    Args:
+        sender (type): Sesion model.
+        instance (Sesion): Deleted session.
+    """
+    outbox.cancel_reminders([instance.pk])
+
+
+@receiver(post_save, sender=Sesion, dispatch_uid='sesion_analytics_post_save')
+def sesion_analytics_post_save(sender, instance, created=False, raw=False, **kwargs):
+    """
+    Marks the day a session was moved away from for the next analytics rollup (the watermark only finds its new day).
+
+    Args:
+        sender (type): Sesion model.
+        instance (Sesion): Saved session.
+        created (bool): True if the session is new.
+        raw (bool): True when loading fixtures (the rollups are backfilled afterwards).
+    """
+    anterior = getattr(instance, '_recordatorio_anterior', None)  # (fecha, estado), set by sesion_pre_save
+    if not raw and not created and anterior and anterior[0] != instance.fecha:
+        analytics.mark_stale('sesiones', [anterior[0]])
+
+
+@receiver(post_delete, sender=Sesion, dispatch_uid='sesion_analytics_post_delete')
+def sesion_analytics_post_delete(sender, instance, **kwargs):
+    """
+    Marks the day of a deleted session for the next analytics rollup.
+
+    Args:
+        sender (type): Sesion model.
+        instance (Sesion): Deleted session.
+    """
+    analytics.mark_stale('sesiones', [instance.fecha])
+
+
+@receiver(post_delete, sender=Sesion, dispatch_uid='sesion_stats_post_delete')
+def sesion_post_delete(sender, instance, **kwargs):
+    """
+    Updates the user counters after a session is deleted.
+
+    Args:
+        sender (type): Sesion model.
+        instance (Sesion): Deleted session.
+    """
+    if not (instance.asistencia_user_a or instance.asistencia_user_b):
+        return
+
+    anterior = stats.sesion_contribution(
+        *_sesion_usuarios(instance), instance.asistencia_user_a, instance.asistencia_user_b, instance.duracion_real
+    )
+    stats.apply_delta(anterior, {})
+
+
+@receiver(post_save, sender=Perfil, dispatch_uid='perfil_search_post_save')
+def perfil_post_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    Reindexes the bio and the availability of a profile and invalidates its cached bundle after it's saved.
+
+    Args:
+        sender (type): Perfil model.
+        instance (Perfil): Saved profile.
+        raw (bool): True when loading fixtures (the indexes are rebuilt afterwards).
+        update_fields (frozenset | None): Fields saved, None if all of them were.
+    """
+    if not raw:
+        search.index_profile(instance)
+        if update_fields is None or {'disponibilidad', 'zona_horaria'} & update_fields:
+            availability.sync(instance)
+    transaction.on_commit(lambda: cache.invalidate_profiles([instance.usuario_id]))
+
+
+@receiver(post_delete, sender=Perfil, dispatch_uid='perfil_search_post_delete')
+def perfil_post_delete(sender, instance, **kwargs):
+    """
+    Removes a profile from the search and availability indexes and the cache after it's deleted.
+
+    Args:
+        sender (type): Perfil model.
+        instance (Perfil): Deleted profile.
+    """
+    search.get_backend().remove('perfil', instance.pk)
+    IntervaloDisponibilidad.objects.filter(usuario_id=instance.usuario_id).delete()
+    transaction.on_commit(lambda: cache.invalidate_profiles([instance.usuario_id]))
+
+
+@receiver(post_save, sender=Usuario, dispatch_uid='usuario_cache_post_save')
+def usuario_post_save(sender, instance, **kwargs):
+    """
+    Invalidates the cached profile bundle of a user after it's saved (e.g. name or alias change).
+
+    Args:
+        sender (type): Usuario model.
+        instance (Usuario): Saved user.
+    """
+    transaction.on_commit(lambda: cache.invalidate_profiles([instance.pk]))
+
+
+def _usuarios_con_habilidad(habilidad_id):
+    """
+    Returns the ids of the users whose profile has a skill.
+
+    Args:
+        habilidad_id (int): Skill id.
+
+    Returns:
+        list[int]: User ids.
+    """
+    return list(Perfil.objects.filter(habilidades=habilidad_id).values_list('usuario_id', flat=True))
+
+
+@receiver(post_save, sender=Habilidad, dispatch_uid='habilidad_cache_post_save')
+def habilidad_post_save(sender, instance, created=False, **kwargs):
+    """
+    Invalidates the skill catalogue, and the profile bundles that show the skill, after a skill is saved.
+
+    Args:
+        sender (type): Habilidad model.
+        instance (Habilidad): Saved skill.
+        created (bool): True if the skill is new (no profile has it yet).
+    """
+    usuarios = [] if created else _usuarios_con_habilidad(instance.pk)
+    transaction.on_commit(lambda: (cache.invalidate_catalogue(), cache.invalidate_profiles(usuarios)))
+
+
+@receiver(pre_delete, sender=Habilidad, dispatch_uid='habilidad_cache_pre_delete')
+def habilidad_pre_delete(sender, instance, **kwargs):
+    """
+    Invalidates the skill catalogue, and the profile bundles that show the skill, when a skill is deleted.
+
+    The profiles are looked up before the deletion, while they are still linked to the skill.
+
+    Args:
+        sender (type): Habilidad model.
+        instance (Habilidad): Skill being deleted.
+    """
+    usuarios = _usuarios_con_habilidad(instance.pk)
+    transaction.on_commit(lambda: (cache.invalidate_catalogue(), cache.invalidate_profiles(usuarios)))
+
+
+@receiver(m2m_changed, sender=Perfil.habilidades.through, dispatch_uid='perfil_habilidades_cache_m2m_changed')
+def perfil_habilidades_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Invalidates the cached profile bundles whose skills changed.
+
+    Handles both directions: ``perfil.habilidades.add(...)`` and ``habilidad.perfil.add(...)``.
+
+    Args:
+        sender (type): Perfil.habilidades through model.
+        instance (Perfil | Habilidad): Changed side of the relation.
+        action (str): m2m_changed action.
+        reverse (bool): True if the change was made from the Habilidad side.
+        pk_set (set[int] | None): Added/removed ids of the other side.
+    """
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            transaction.on_commit(lambda: cache.invalidate_profiles([instance.usuario_id]))
+        return
+
+    if action in ('post_add', 'post_remove'):
+        usuarios = list(Perfil.objects.filter(pk__in=pk_set).values_list('usuario_id', flat=True))
+    elif action == 'pre_clear':
+        usuarios = _usuarios_con_habilidad(instance.pk)  # After the clear they're gone.
+    else:
+        return
+    transaction.on_commit(lambda: cache.invalidate_profiles(usuarios))
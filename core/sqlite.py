@@ -0,0 +1,212 @@
+"""
+SQLite tuning for single-node deployments.
+
+With the default rollback journal, readers block writers and concurrent write transactions fail with "database is
+locked" when two of them try to upgrade their read lock at the same time. With SQLITE_TUNED:
+
+    - Every new connection gets SQLITE_PRAGMAS: WAL (readers never block the writer), synchronous=NORMAL (no fsync
+      per commit in WAL mode), a bigger page cache, memory-mapped reads and a busy timeout.
+    - Transactions start with BEGIN IMMEDIATE, so they take the write lock up front and wait for it (busy_timeout)
+      instead of failing halfway.
+
+With SQLITE_WRITE_QUEUE, the functions decorated with serialized_write() are run by a single writer thread, which
+commits them in groups. Writers never contend for the lock and many small writes share one commit. Only these write
+paths go through the queue: the objects created by the API views (save_instance()), the session scheduler, the
+agreement transitions, the importer and the recommendations rebuild. Every other write (the admin, management
+commands, a Model.save() called anywhere else) commits in its own thread, with BEGIN IMMEDIATE and busy_timeout.
+"""
+import contextvars
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, router, transaction
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+}
+
+
+def configure_connection(connection):
+    """
+    Applies the SQLite pragmas to a new connection (connected to the connection_created signal in core.signals).
+
+    Args:
+        connection (BaseDatabaseWrapper): New database connection.
+    """
+    if connection.vendor != 'sqlite' or not getattr(settings, 'SQLITE_TUNED', False):
+        return
+
+    for pragma, valor in getattr(settings, 'SQLITE_PRAGMAS', DEFAULT_PRAGMAS).items():
+        connection.connection.execute(f'PRAGMA {pragma} = {valor}')
+    if connection.transaction_mode is None:
+        connection.transaction_mode = 'IMMEDIATE'
+
+
+class WriteQueue:
+    """
+    Runs write functions one after another in a single writer thread.
+
+    The functions waiting in the queue are run in groups of up to ``batch_size`` inside one transaction (group
+    commit), each in its own savepoint so a failing one doesn't roll back the others. Callers get the result (or
+    the exception) once the transaction has been committed.
+
+    Example:
+        >>> cola = WriteQueue()
+        >>> cola.submit(Publicacion.objects.create, tipo='OFREZCO', ...).result()
+    """
+
+    def __init__(self, alias=DEFAULT_DB_ALIAS, batch_size=64):
+        """
+        Args:
+            alias (str): Database the functions write to.
+            batch_size (int): Max functions committed together.
+        """
+        self.alias = alias
+        self.batch_size = batch_size
+        self._cola = queue.SimpleQueue()
+        self._hilo = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def in_writer(self):
+        """
+        Returns True if the current thread is the writer thread.
+
+        Returns:
+            bool: True inside the writer thread.
+        """
+        return self._hilo is threading.current_thread()
+
+    def _start(self):
+        """
+        Starts the writer thread (again, after a fork: threads don't survive it).
+        """
+        with self._lock:
+            if self._hilo is None or self._pid != os.getpid():
+                self._cola = queue.SimpleQueue()
+                self._pid = os.getpid()
+                self._hilo = threading.Thread(target=self._run, name='sqlite-writer', daemon=True)
+                self._hilo.start()
+
+    def submit(self, funcion, *args, **kwargs):
+        """
+        Queues a write function.
+
+        Args:
+            funcion (callable): Function that writes to the database.
+            *args, **kwargs: Arguments of the function.
+
+        Returns:
+            Future: Future with the result of the function, set once it has been committed.
+        """
+        if self._hilo is None or self._pid != os.getpid():
+            self._start()
+        futuro = Future()
+        self._cola.put((futuro, funcion, args, kwargs))
+        return futuro
+
+    def _run(self):
+        while True:
+            lote = [self._cola.get()]
+            while len(lote) < self.batch_size:
+                try:
+                    lote.append(self._cola.get_nowait())
+                except queue.Empty:
+                    break
+            self._commit(lote)
+
+    def _commit(self, lote):
+        """
+        Runs a group of write functions in one transaction.
+
+        Args:
+            lote (list[tuple]): (future, function, args, kwargs) tuples.
+        """
+        resultados = []
+        try:
+            with transaction.atomic(using=self.alias):
+                for futuro, funcion, args, kwargs in lote:
+                    if not futuro.set_running_or_notify_cancel():
+                        continue
+                    try:
+                        with transaction.atomic(using=self.alias):
+                            resultados.append((futuro, funcion(*args, **kwargs)))
+                    except Exception as error:
+                        futuro.set_exception(error)
+        except Exception as error:  # The commit failed, so every function did.
+            for futuro, _ in resultados:
+                futuro.set_exception(error)
+        else:
+            for futuro, resultado in resultados:
+                futuro.set_result(resultado)
+
+
+write_queue = WriteQueue()
+
+_SIN_VALOR = object()
+
+
+def serialized_write(funcion):
+    """
+    Runs a write function in the writer thread when SQLITE_WRITE_QUEUE is on.
+
+    It's run directly (in the calling thread) when the queue is off, inside the writer thread itself and inside a
+    transaction, whose atomicity the writer thread couldn't join. In the writer thread it runs in a copy of the
+    caller's context, and the context variables it sets are copied back, so the pinning to the primary of
+    core.routers works as if it had run in the calling thread.
+
+    Args:
+        funcion (callable): Function that writes to the database.
+
+    Returns:
+        callable: Function that blocks until the write has been committed and returns its result.
+
+    Example:
+        >>> @serialized_write
+        ... def crear_sesion(acuerdo, fecha):
+        ...     return Sesion.objects.create(acuerdo=acuerdo, fecha=fecha)
+    """
+    @wraps(funcion)
+    def envoltorio(*args, **kwargs):
+        if (
+            not getattr(settings, 'SQLITE_WRITE_QUEUE', False)
+            or connections[write_queue.alias].vendor != 'sqlite'
+            or write_queue.in_writer
+            or connections[write_queue.alias].in_atomic_block
+        ):
+            return funcion(*args, **kwargs)
+        contexto = contextvars.copy_context()
+        try:
+            return write_queue.submit(contexto.run, funcion, *args, **kwargs).result()
+        finally:
+            for variable, valor in contexto.items():
+                if variable.get(_SIN_VALOR) is not valor:
+                    variable.set(valor)
+
+    return envoltorio
+
+
+@serialized_write
+def save_instance(instancia):
+    """
+    Saves a model instance, through the writer thread when SQLITE_WRITE_QUEUE is on.
+
+    It's saved in its own savepoint, so an IntegrityError (e.g. a unique value taken meanwhile) leaves the caller's
+    transaction usable.
+
+    Args:
+        instancia (Model): Validated instance (e.g. a new post of core.views).
+
+    Returns:
+        Model: The saved instance.
+    """
+    with transaction.atomic(using=router.db_for_write(type(instancia), instance=instancia)):
+        instancia.save()
+    return instancia
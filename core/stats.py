@@ -0,0 +1,197 @@
+"""
+Per-user activity counters for SkillSwap.
+
+Keeps EstadisticasUsuario up to date. Every session and agreement "contributes" some amounts to the counters of its
+users; when one of them is saved or deleted, the difference between the old and the new contribution is applied with
+atomic F() increments. rebuild() recomputes every counter from scratch to repair drift.
+"""
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connections, transaction
+from django.db.models import Count, F, Q, Sum
+
+from .models import Acuerdo, EstadisticasUsuario, Sesion, Usuario
+
+CAMPOS = ('acuerdos_finalizados', 'sesiones', 'asistencias', 'minutos_impartidos')
+
+
+def acuerdo_contribution(usuario_a_id, usuario_b_id, estado):
+    """
+    Returns what an agreement adds to the counters of its users.
+
+    Args:
+        usuario_a_id (int): User A.
+        usuario_b_id (int): User B.
+        estado (str): Agreement status.
+
+    Returns:
+        dict[tuple, int]: {(usuario_id, field): amount}
+    """
+    if estado != 'FINALIZADO':
+        return {}
+    return {(usuario_a_id, 'acuerdos_finalizados'): 1, (usuario_b_id, 'acuerdos_finalizados'): 1}
+
+
+def sesion_contribution(usuario_a_id, usuario_b_id, asistencia_user_a, asistencia_user_b, duracion_real):
+    """
+    Returns what a session adds to the counters of its users.
+
+    A session only counts once it has been held (at least one user attended it).
+
+    Args:
+        usuario_a_id (int): User A of the agreement.
+        usuario_b_id (int): User B of the agreement.
+        asistencia_user_a (bool): Did the user A attend?
+        asistencia_user_b (bool): Did the user B attend?
+        duracion_real (int): Minutes of actual session duration.
+
+    Returns:
+        dict[tuple, int]: {(usuario_id, field): amount}
+    """
+    if not (asistencia_user_a or asistencia_user_b):
+        return {}
+
+    contribucion = Counter()
+    for usuario_id, asistencia in ((usuario_a_id, asistencia_user_a), (usuario_b_id, asistencia_user_b)):
+        contribucion[usuario_id, 'sesiones'] += 1
+        if asistencia:
+            contribucion[usuario_id, 'asistencias'] += 1
+            contribucion[usuario_id, 'minutos_impartidos'] += duracion_real
+    return dict(contribucion)
+
+
+def apply_delta(anterior, actual):
+    """
+    Applies the difference between two contributions to the counters.
+
+    Users with the same changes share a single UPDATE with F() increments, so concurrent saves never lose updates
+    and bulk changes (e.g. finishing thousands of agreements) take a few queries. Counters are created on the fly for
+    users that don't have them yet.
+
+    Args:
+        anterior (dict[tuple, int]): Contribution before the change.
+        actual (dict[tuple, int]): Contribution after the change.
+    """
+    delta = Counter(actual)
+    delta.subtract(anterior)
+
+    por_usuario = {}
+    for (usuario_id, campo), cantidad in delta.items():
+        if cantidad:
+            por_usuario.setdefault(usuario_id, {})[campo] = cantidad
+
+    grupos = {}
+    for usuario_id, cantidades in por_usuario.items():
+        grupos.setdefault(tuple(sorted(cantidades.items())), []).append(usuario_id)
+
+    for cantidades, usuarios in grupos.items():
+        cambios = {campo: F(campo) + cantidad for campo, cantidad in cantidades}
+        with transaction.atomic():
+            completo = EstadisticasUsuario.objects.filter(usuario_id__in=usuarios).update(**cambios) == len(usuarios)
+            # Some users have no counters yet, and the UPDATE can't tell which ones it missed (other transactions may
+            # create them meanwhile): it's rolled back and retried for every user once all the counters exist.
+            transaction.set_rollback(not completo)
+        if not completo:
+            EstadisticasUsuario.objects.bulk_create([EstadisticasUsuario(usuario_id=usuario_id) for usuario_id in usuarios], ignore_conflicts=True)
+            EstadisticasUsuario.objects.filter(usuario_id__in=usuarios).update(**cambios)
+
+
+def get_stats(usuario):
+    """
+    Returns the counters of a user with a single primary-key lookup.
+
+    Args:
+        usuario (Usuario | int): User (or user id).
+
+    Returns:
+        EstadisticasUsuario: Counters of the user (unsaved and empty if there are none yet).
+
+    Example:
+        >>> get_stats(usuario).horas_impartidas
+        12.5
+    """
+    usuario_id = getattr(usuario, 'pk', usuario)
+    return EstadisticasUsuario.objects.filter(pk=usuario_id).first() or EstadisticasUsuario(usuario_id=usuario_id)
+
+
+def _rebuild_range(desde, hasta):
+    """
+    Recomputes the counters of the users with desde <= id < hasta.
+
+    Args:
+        desde (int): First user id (inclusive).
+        hasta (int): Last user id (exclusive).
+
+    Returns:
+        int: Number of users written.
+    """
+    try:
+        contadores = {pk: Counter() for pk in Usuario.objects.filter(pk__gte=desde, pk__lt=hasta).values_list('pk', flat=True)}
+
+        for lado in ('a', 'b'):
+            usuario = f'usuario_{lado}_id'
+            asistencia = Q(**{f'asistencia_user_{lado}': True})
+
+            acuerdos = (
+                Acuerdo.objects
+                .filter(estado='FINALIZADO', **{f'{usuario}__gte': desde, f'{usuario}__lt': hasta})
+                .values(usuario)
+                .annotate(total=Count('id'))
+                .order_by()
+            )
+            for fila in acuerdos:
+                contadores[fila[usuario]]['acuerdos_finalizados'] += fila['total']
+
+            sesiones = (
+                Sesion.objects
+                .filter(Q(asistencia_user_a=True) | Q(asistencia_user_b=True))
+                .filter(**{f'acuerdo__{usuario}__gte': desde, f'acuerdo__{usuario}__lt': hasta})
+                .values(f'acuerdo__{usuario}')
+                .annotate(
+                    sesiones=Count('id'),
+                    asistencias=Count('id', filter=asistencia),
+                    minutos_impartidos=Sum('duracion_real', filter=asistencia),
+                )
+                .order_by()
+            )
+            for fila in sesiones:
+                contador = contadores[fila[f'acuerdo__{usuario}']]
+                for campo in ('sesiones', 'asistencias', 'minutos_impartidos'):
+                    contador[campo] += fila[campo] or 0
+
+        filas = [
+            EstadisticasUsuario(usuario_id=pk, **{campo: contador[campo] for campo in CAMPOS})
+            for pk, contador in contadores.items()
+        ]
+        with transaction.atomic():
+            EstadisticasUsuario.objects.bulk_create(
+                filas, update_conflicts=True, unique_fields=['usuario'], update_fields=list(CAMPOS)
+            )
+        return len(filas)
+    finally:
+        connections.close_all()  # Each worker thread has its own connections.
+
+
+def rebuild(chunk_size=10000, workers=4):
+    """
+    Rebuilds the counters of every user from scratch.
+
+    Users are split into id ranges of ``chunk_size`` that are recomputed in parallel, each one with a few grouped
+    queries and a bulk upsert.
+
+    Args:
+        chunk_size (int): Users per range.
+        workers (int): Ranges processed at the same time.
+
+    Returns:
+        int: Number of users written.
+    """
+    limites = Usuario.objects.order_by('pk').values_list('pk', flat=True)
+    primero, ultimo = limites.first(), limites.last()
+    if primero is None:
+        return 0
+
+    rangos = [(desde, desde + chunk_size) for desde in range(primero, ultimo + 1, chunk_size)]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return sum(pool.map(lambda rango: _rebuild_range(*rango), rangos))
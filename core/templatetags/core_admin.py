@@ -0,0 +1,94 @@
+"""
+Template tags of the core admin (core.admin).
+
+indexed_date_hierarchy replaces Django's date_hierarchy in the changelists of core. Django lists the years, months
+or days that have rows with a ``SELECT DISTINCT <date truncated>``, which reads every row of the period (the whole
+table on the first page). Here the first and last dates are read from the ends of the date index (MIN and MAX), and
+the periods in between are listed without reading the rows, so a period may lead to an empty page.
+
+The template engine imports the tag libraries of every installed app when it starts, admin or not, so the admin is
+only imported when a tag is used: workers without the admin (skillswap.settings_production) never load it.
+"""
+import datetime
+
+from django import template
+from django.db.models import Max, Min
+from django.utils import timezone
+
+register = template.Library()
+
+
+class IndexedDates:
+    """
+    Stand-in for the changelist queryset in date_hierarchy(): answers its aggregate() and dates()/datetimes() calls
+    with two index lookups, shared by both calls.
+    """
+
+    def __init__(self, queryset):
+        self.queryset = queryset
+        self._limites = {}
+
+    def _bounds(self, campo):
+        """
+        Returns the first and last values of a date field, with a MIN and a MAX query (each one an index seek).
+        """
+        if campo not in self._limites:
+            primero = self.queryset.aggregate(valor=Min(campo))['valor']
+            ultimo = self.queryset.aggregate(valor=Max(campo))['valor'] if primero is not None else None
+            if isinstance(primero, datetime.datetime) and timezone.is_aware(primero):
+                primero, ultimo = timezone.localtime(primero), timezone.localtime(ultimo)
+            self._limites[campo] = (primero, ultimo)
+        return self._limites[campo]
+
+    def aggregate(self, first, last):
+        return dict(zip(('first', 'last'), self._bounds(first.get_source_expressions()[0].name)))
+
+    def dates(self, campo, tipo):
+        primero, ultimo = self._bounds(campo)
+        if primero is None:
+            return []
+
+        periodos = []
+        actual = datetime.date(primero.year, primero.month if tipo != 'year' else 1, primero.day if tipo == 'day' else 1)
+        ultimo = datetime.date(ultimo.year, ultimo.month, ultimo.day)
+        while actual <= ultimo:
+            periodos.append(actual)
+            if tipo == 'year':
+                actual = actual.replace(year=actual.year + 1)
+            elif tipo == 'month':
+                actual = (actual.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+            else:
+                actual += datetime.timedelta(days=1)
+        return periodos
+
+    def datetimes(self, campo, tipo):
+        return [datetime.datetime(dia.year, dia.month, dia.day) for dia in self.dates(campo, tipo)]
+
+
+class _IndexedChangeList:
+    """
+    A ChangeList whose queryset is wrapped in IndexedDates.
+    """
+
+    def __init__(self, cl):
+        self._cl = cl
+        self.queryset = IndexedDates(cl.queryset)
+
+    def __getattr__(self, nombre):
+        return getattr(self._cl, nombre)
+
+
+def indexed_date_hierarchy(cl):
+    """
+    date_hierarchy() of Django, over the index of the date field.
+    """
+    from django.contrib.admin.templatetags.admin_list import date_hierarchy
+
+    return date_hierarchy(_IndexedChangeList(cl))
+
+
+@register.tag(name='indexed_date_hierarchy')
+def indexed_date_hierarchy_tag(parser, token):
+    from django.contrib.admin.templatetags.base import InclusionAdminNode
+
+    return InclusionAdminNode(parser, token, func=indexed_date_hierarchy, template_name='date_hierarchy.html', takes_context=False)
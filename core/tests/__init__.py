@@ -0,0 +1,7 @@
+"""
+Tests of the core app.
+
+They need the test settings (core.Usuario as the user model, see skillswap.settings_test):
+
+    python manage.py test core --settings=skillswap.settings_test
+"""
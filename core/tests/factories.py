@@ -0,0 +1,65 @@
+"""
+Builders of the test data shared by the core tests.
+"""
+from datetime import timedelta
+
+from django.utils import timezone
+
+from core.models import Acuerdo, Habilidad, Perfil, Publicacion, Sesion, Usuario
+
+
+def create_user(i, **kwargs):
+    """
+    Creates user number i, with a profile.
+
+    Returns:
+        Usuario: The user.
+    """
+    usuario = Usuario.objects.create(
+        username=f'usuario{i}', nombre=f'Usuario {i}', alias=f'u{i}', email=f'u{i}@example.com', **kwargs,
+    )
+    Perfil.objects.create(usuario=usuario, biografia='Bio', disponibilidad='Lunes a viernes 18:00-21:00')
+    return usuario
+
+
+def create_skill(i, categoria='Idiomas'):
+    """
+    Creates skill number i.
+
+    Returns:
+        Habilidad: The skill.
+    """
+    return Habilidad.objects.create(nombre=f'Habilidad {i}', categoria=categoria)
+
+
+def create_post(autor, habilidad, tipo='OFREZCO'):
+    """
+    Creates an active post.
+
+    Returns:
+        Publicacion: The post.
+    """
+    return Publicacion.objects.create(tipo=tipo, descripcion=f'Clases de {habilidad.nombre}', autor=autor, habilidad=habilidad)
+
+
+def create_agreement(usuario_a, usuario_b, habilidad_a, habilidad_b, estado='PROPUESTO'):
+    """
+    Creates an agreement between two users.
+
+    Returns:
+        Acuerdo: The agreement.
+    """
+    return Acuerdo.objects.create(
+        usuario_a=usuario_a, usuario_b=usuario_b, habilidad_tradea_a=habilidad_a, habilidad_tradea_b=habilidad_b,
+        condiciones='Una sesión por semana', estado=estado,
+    )
+
+
+def create_session(acuerdo, dias=7, activa=True):
+    """
+    Creates a session of an agreement, some days from today.
+
+    Returns:
+        Sesion: The session.
+    """
+    return Sesion.objects.create(acuerdo=acuerdo, fecha=timezone.localdate() + timedelta(days=dias), resumen='Sesión', estado=activa)
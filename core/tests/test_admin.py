@@ -0,0 +1,87 @@
+"""
+Query counts of the admin changelists (core.admin.ScalableAdminMixin).
+"""
+from django.contrib import admin
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core import cache
+from core.models import Acuerdo, Habilidad, Perfil, Publicacion, Sesion, Usuario
+
+from .factories import create_agreement, create_post, create_session, create_skill, create_user
+
+
+@override_settings(INSTRUMENTATION={'ENABLED': True, 'SERVER_TIMING': False, 'STRICT_BUDGETS': True, 'SLOW_REQUEST_MS': 500})
+class ChangelistQueriesTests(TestCase):
+    """
+    Every changelist takes a fixed number of queries, within its budget, however many rows the page shows.
+    """
+    # Session, user and preferences (cold cache), the estimate and the bounded count (small tables), and the page.
+    # The date hierarchy adds two.
+    CONSULTAS = {Habilidad: 6, Usuario: 6, Perfil: 6, Publicacion: 8, Acuerdo: 8, Sesion: 8}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = create_user(99, is_staff=True, is_superuser=True)
+        cls.usuarios = [create_user(i) for i in range(10)]
+        cls.habilidades = [create_skill(i) for i in range(5)]
+        for i, usuario in enumerate(cls.usuarios):
+            create_post(usuario, cls.habilidades[i % 5])
+            acuerdo = create_agreement(usuario, cls.usuarios[(i + 1) % 10], cls.habilidades[i % 5], cls.habilidades[(i + 1) % 5])
+            create_session(acuerdo, dias=i)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def changelist(self, model, consultas, **parametros):
+        cache.cache.local.clear()  # The preferences of the user on a cold cache, as the budgets count them.
+        cache.cache.shared.clear()
+        url = reverse(f'admin:core_{model._meta.model_name}_changelist')
+        with self.assertNumQueries(consultas):
+            respuesta = self.client.get(url, parametros)
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta.context['cl']
+
+    def test_every_registered_changelist(self):
+        modelos = [model for model in admin.site._registry if model._meta.app_label == 'core']
+        self.assertCountEqual(modelos, self.CONSULTAS)
+        for model, consultas in self.CONSULTAS.items():
+            with self.subTest(model=model.__name__):
+                cl = self.changelist(model, consultas)
+                self.assertLessEqual(consultas, admin.site._registry[model].changelist_query_budget)
+                self.assertEqual(cl.result_count, model.objects.count())
+
+    def test_does_not_grow_with_the_rows(self):
+        for i in range(10, 40):
+            usuario = create_user(i)
+            acuerdo = create_agreement(usuario, self.usuarios[0], self.habilidades[0], self.habilidades[1])
+            create_post(usuario, self.habilidades[1])
+            create_session(acuerdo)
+        for model, consultas in self.CONSULTAS.items():
+            with self.subTest(model=model.__name__):
+                self.changelist(model, consultas)
+
+    def test_date_hierarchy(self):
+        hoy = timezone.localdate()
+        for model, campo in ((Publicacion, 'fecha_creacion'), (Acuerdo, 'fecha_creacion'), (Sesion, 'fecha')):
+            self.changelist(model, self.CONSULTAS[model])
+            # A drilldown is a filter: counted without the estimate.
+            for nivel in ({f'{campo}__year': hoy.year}, {f'{campo}__year': hoy.year, f'{campo}__month': hoy.month}):
+                with self.subTest(model=model.__name__, nivel=nivel):
+                    cl = self.changelist(model, self.CONSULTAS[model] - 1, **nivel)
+                    self.assertEqual(cl.result_count, model.objects.filter(**nivel).count())
+
+    def test_search(self):
+        # Filtered, so counted without the estimate.
+        busquedas = (
+            (Habilidad, 'hab', 5, 5),
+            (Usuario, 'u1', 5, 1),
+            (Usuario, 'usuario', 5, 11),  # The capitalized term matches every name.
+            (Perfil, 'u2', 5, 1),
+            (Publicacion, 'clases', 8, 10),  # Plus the full-text search.
+        )
+        for model, termino, consultas, encontrados in busquedas:
+            with self.subTest(model=model.__name__, termino=termino):
+                cl = self.changelist(model, consultas, q=termino)
+                self.assertEqual(cl.result_count, encontrados)
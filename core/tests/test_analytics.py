@@ -0,0 +1,137 @@
+"""
+Tests of the analytics rollups (core.analytics): incremental updates from the watermark and the pending days,
+backfills, and the dashboard series.
+"""
+from datetime import timedelta
+
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from core import analytics
+from core.models import DiaPendiente, MarcaAnalitica, ResumenAcuerdos, ResumenSesiones, Sesion
+
+from .factories import create_agreement, create_session, create_skill, create_user
+
+
+def rollup(modelo, categoria=''):
+    """
+    Returns the rollup rows of a category as {day: row}.
+    """
+    return {fila.fecha: fila for fila in modelo.objects.filter(categoria=categoria)}
+
+
+def create_data():
+    """
+    Creates an ongoing agreement between a language and a music skill, with three sessions (one held) on two days.
+
+    Returns:
+        Acuerdo: The agreement.
+    """
+    a, b = create_user(0), create_user(1)
+    acuerdo = create_agreement(a, b, create_skill(0), create_skill(1, categoria='Música'), estado='EN CURSO')
+    create_session(acuerdo, dias=1)
+    create_session(acuerdo, dias=1)
+    sesion = create_session(acuerdo, dias=2)
+    sesion.asistencia_user_a, sesion.duracion_real = True, 45
+    sesion.save()
+    return acuerdo
+
+
+@override_settings(ANALYTICS={'LAG_SECONDS': 60})
+class UpdateTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.acuerdo = create_data()
+        cls.hoy = timezone.localdate()
+        cls.inicio = timezone.now() - timedelta(hours=1)  # Before every row.
+        for tabla in analytics.ROLLUPS:
+            MarcaAnalitica.objects.create(tabla=tabla, marca=cls.inicio)
+
+    def update(self):
+        return analytics.update(ahora=timezone.now() + timedelta(seconds=60))  # Lag included: up to now.
+
+    def test_rolls_up_the_changed_rows_once(self):
+        self.assertEqual(self.update(), {'sesiones': 2, 'acuerdos': 1})
+
+        sesiones = rollup(ResumenSesiones)
+        manana, pasado = self.hoy + timedelta(days=1), self.hoy + timedelta(days=2)
+        self.assertEqual(sesiones[manana].programadas, 2)
+        self.assertEqual((sesiones[pasado].celebradas, sesiones[pasado].asistencias, sesiones[pasado].minutos), (1, 1, 45))
+        self.assertEqual(set(rollup(ResumenSesiones, 'Música')), {manana, pasado})
+        self.assertEqual(rollup(ResumenAcuerdos)[self.hoy].en_curso, 1)
+
+        self.assertEqual(self.update(), {'sesiones': 0, 'acuerdos': 0})  # Nothing changed since.
+
+    def test_the_watermark_stays_behind_the_clock(self):
+        ahora = timezone.now() + timedelta(seconds=60)
+        analytics.update(ahora=ahora)
+        self.assertEqual(MarcaAnalitica.objects.get(tabla='sesiones').marca, ahora - timedelta(seconds=60))
+
+        # Changed 30 seconds before the run by a transaction that was still open: after the watermark, so not missed.
+        sesion = Sesion.objects.filter(fecha=self.hoy + timedelta(days=1)).first()
+        Sesion.objects.filter(pk=sesion.pk).update(asistencia_user_b=True, fecha_modificacion=ahora - timedelta(seconds=30))
+        self.assertEqual(analytics.update(ahora=ahora), {'sesiones': 0, 'acuerdos': 0})  # Within the lag: not yet.
+        self.assertEqual(analytics.update(ahora=ahora + timedelta(seconds=60)), {'sesiones': 1, 'acuerdos': 0})
+        self.assertEqual(rollup(ResumenSesiones)[self.hoy + timedelta(days=1)].celebradas, 1)
+
+    def test_days_left_by_moved_and_deleted_sessions(self):
+        self.update()
+        manana, pasado, lejos = (self.hoy + timedelta(days=dias) for dias in (1, 2, 10))
+
+        sesion = Sesion.objects.filter(fecha=pasado).get()
+        sesion.fecha = lejos
+        sesion.save()
+        Sesion.objects.filter(fecha=manana).first().delete()
+        self.assertEqual(sorted(DiaPendiente.objects.values_list('fecha', flat=True)), [manana, pasado])
+
+        self.assertEqual(self.update()['sesiones'], 3)
+        sesiones = rollup(ResumenSesiones)
+        self.assertEqual(set(sesiones), {manana, lejos})
+        self.assertEqual((sesiones[manana].programadas, sesiones[lejos].minutos), (1, 45))
+        self.assertFalse(DiaPendiente.objects.exists())
+
+    def test_series(self):
+        self.update()
+        manana = self.hoy + timedelta(days=1)
+
+        puntos = analytics.sessions(self.hoy, self.hoy + timedelta(days=7))
+        self.assertEqual([(punto.inicio, punto.programadas) for punto in puntos], [(manana, 2), (manana + timedelta(days=1), 1)])
+        meses = analytics.sessions(self.hoy, self.hoy + timedelta(days=30), 'mes', categoria='Idiomas')
+        self.assertEqual((sum(punto.programadas for punto in meses), sum(punto.asistencias for punto in meses)), (3, 1))
+        self.assertEqual(sum(punto.tasa_asistencia for punto in analytics.sessions(manana, manana)), 0.0)
+
+        [punto] = analytics.agreements(self.hoy, self.hoy, 'semana')
+        self.assertEqual((punto.total, punto.en_curso, punto.conversion), (1, 1, 0.0))
+        self.assertEqual(analytics.agreements(self.hoy, self.hoy, categoria='Cocina'), [])
+        with self.assertRaises(ValueError):
+            analytics.sessions(self.hoy, self.hoy, 'año')
+
+
+@override_settings(ANALYTICS={'LAG_SECONDS': 0, 'BATCH_DAYS': 1, 'WORKERS': 1})
+class BackfillTests(TransactionTestCase):
+    # Committed rows: backfill() recomputes each partition in a worker thread, with its own connection.
+
+    def setUp(self):
+        self.acuerdo = create_data()
+        self.hoy = timezone.localdate()
+
+    def test_full_backfill_sets_the_watermark(self):
+        viejo = ResumenSesiones.objects.create(fecha=self.hoy - timedelta(days=400), programadas=9)
+        ahora = timezone.now()
+
+        self.assertEqual(analytics.backfill(ahora=ahora), {'sesiones': 2, 'acuerdos': 1})
+        self.assertEqual(set(rollup(ResumenSesiones)), {self.hoy + timedelta(days=1), self.hoy + timedelta(days=2)})
+        self.assertFalse(ResumenSesiones.objects.filter(pk=viejo.pk).exists())  # Outside the history.
+        self.assertEqual(dict(MarcaAnalitica.objects.values_list('tabla', 'marca')), {'sesiones': ahora, 'acuerdos': ahora})
+
+    def test_first_update_backfills(self):
+        self.assertEqual(analytics.update(), {'sesiones': 2, 'acuerdos': 1})
+        self.assertEqual(MarcaAnalitica.objects.count(), 2)
+        self.assertEqual(rollup(ResumenSesiones)[self.hoy + timedelta(days=1)].programadas, 2)
+
+    def test_range_backfill_leaves_the_watermark_alone(self):
+        manana = self.hoy + timedelta(days=1)
+        self.assertEqual(analytics.backfill(['sesiones'], desde=manana, hasta=manana), {'sesiones': 1})
+        self.assertEqual(set(rollup(ResumenSesiones)), {manana})
+        self.assertFalse(MarcaAnalitica.objects.exists())
@@ -0,0 +1,100 @@
+"""
+Tests of the availability parser and interval index (core.availability), and of the matches filtered by it.
+"""
+from django.test import SimpleTestCase, TestCase
+
+from core import availability
+from core.matching import find_matches
+from core.scheduling import available_weekdays
+
+from .factories import create_post, create_skill, create_user
+
+LABORABLES = (0, 1, 2, 3, 4)
+
+# (text, weekdays, (first minute, last minute) of each of them)
+TEXTOS = [
+    ('From Monday to Friday, 8.00 - 22.00', LABORABLES, (480, 1320)),
+    ('De lunes a viernes 9-17', LABORABLES, (540, 1020)),
+    ('Mon-Fri 9-17', LABORABLES, (540, 1020)),
+    ('lun a vie 9:00-17:00', LABORABLES, (540, 1020)),
+    ('Weekdays 9am to 5pm', LABORABLES, (540, 1020)),
+    ('entre semana 9-17', LABORABLES, (540, 1020)),
+    ('weekends 10am to 2pm', (5, 6), (600, 840)),
+    ('fines de semana 10-14', (5, 6), (600, 840)),
+    ('Fin de semana, 10h a 14h', (5, 6), (600, 840)),
+    ('Sat & Sun 10-14', (5, 6), (600, 840)),
+    ('sáb y dom de 10 a 14', (5, 6), (600, 840)),
+    ('Tue, Thu 7pm-9pm', (1, 3), (1140, 1260)),
+    ('mar y jue 19-21', (1, 3), (1140, 1260)),
+    ('lun, mié y vie 18:00-20:00', (0, 2, 4), (1080, 1200)),
+    ('Fri-Mon 20-22', (4, 5, 6, 0), (1200, 1320)),
+    ('Sábados', (5,), (0, 1440)),
+    ('22:00-02:00', range(7), (1320, 1560)),
+    ('Cuando sea', range(7), (0, 1440)),
+]
+
+
+class ParseTests(SimpleTestCase):
+
+    def test_texts(self):
+        for texto, dias, (desde, hasta) in TEXTOS:
+            with self.subTest(texto=texto):
+                self.assertEqual(available_weekdays(texto), frozenset(dias))
+                self.assertEqual(availability.parse(texto), sorted((dia, desde, hasta) for dia in dias))
+
+    def test_rules_with_their_own_times(self):
+        self.assertEqual(
+            availability.parse('Mon-Fri 18-21, weekends 10am to 2pm'),
+            [(dia, 1080, 1260) for dia in LABORABLES] + [(5, 600, 840), (6, 600, 840)],
+        )
+        self.assertEqual(availability.parse('9-17 de lunes a miércoles'), [(dia, 540, 1020) for dia in (0, 1, 2)])
+
+    def test_words_that_only_contain_a_day_name(self):
+        self.assertEqual(available_weekdays('Mondays, Sundays and the summer months'), frozenset({0, 6}))
+        self.assertEqual(available_weekdays('mañanas y tardes'), frozenset(range(7)))
+
+
+class OverlapTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.habilidad = create_skill(0)
+        cls.usuarios = {}
+        for i, (nombre, disponibilidad, zona_horaria) in enumerate([
+            ('fin_de_semana', 'weekends 10am to 2pm', 'UTC'),
+            ('una_hora', 'fines de semana 13-15', 'UTC'),
+            ('laborables', 'Mon-Fri 9-17', 'UTC'),
+            ('tokio', 'Sunday 19-21', 'Asia/Tokyo'),  # Sunday 10:00-12:00 UTC
+            ('domingo_noche', 'Sunday 22:00-02:00', 'UTC'),
+            ('lunes', 'Monday 0-3', 'UTC'),
+        ]):
+            usuario = create_user(i)
+            perfil = usuario.perfil
+            perfil.disponibilidad, perfil.zona_horaria = disponibilidad, zona_horaria
+            perfil.save()
+            create_post(usuario, cls.habilidad, tipo='OFREZCO' if nombre == 'fin_de_semana' else 'BUSCO')
+            cls.usuarios[nombre] = usuario
+
+    def ids(self, *nombres):
+        return {self.usuarios[nombre].pk for nombre in nombres}
+
+    def test_overlapping_users(self):
+        usuario = self.usuarios['fin_de_semana']
+        for minutos, esperados in ((60, ('una_hora', 'tokio')), (90, ('tokio',)), (121, ())):
+            with self.subTest(minutos=minutos):
+                self.assertEqual(set(availability.overlapping_users(usuario, minutos)), self.ids(*esperados))
+
+    def test_overlaps_across_the_end_of_the_week(self):
+        domingo, lunes = self.usuarios['domingo_noche'], self.usuarios['lunes']
+        self.assertEqual(availability.overlap(domingo, lunes), 120)
+        self.assertEqual(set(availability.overlapping_users(domingo, 120)), self.ids('lunes'))
+        self.assertEqual(set(availability.overlapping_users(lunes, 120)), self.ids('domingo_noche'))
+
+    def test_matches_filtered_by_availability(self):
+        usuario = self.usuarios['fin_de_semana']
+        todos = {match.usuario_id for match in find_matches(usuario)}
+        self.assertEqual(todos, self.ids('una_hora', 'laborables', 'tokio', 'domingo_noche', 'lunes'))
+
+        for minutos, esperados in ((60, ('una_hora', 'tokio')), (90, ('tokio',)), (180, ())):
+            with self.subTest(minutos=minutos):
+                self.assertEqual({match.usuario_id for match in find_matches(usuario, minutos=minutos)}, self.ids(*esperados))
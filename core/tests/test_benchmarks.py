@@ -0,0 +1,74 @@
+"""
+Tests of the benchmark helpers: deterministic data (benchmarks.generators) and the regression check of the suite
+(benchmarks.suite.compare).
+"""
+from django.test import SimpleTestCase, TestCase
+
+from benchmarks.generators import Escala, populate, posts, users
+from benchmarks.suite import compare
+from core.models import Acuerdo, Habilidad, Perfil, Publicacion, Usuario
+
+
+def fields(instancias, *campos):
+    return [tuple(getattr(instancia, campo) for campo in campos) for instancia in instancias]
+
+
+class GeneratorsTests(TestCase):
+
+    def test_same_seed_same_rows(self):
+        escala = Escala.from_rows(300)
+        self.assertEqual(fields(users(escala, 0), 'alias', 'is_active'), fields(users(escala, 0), 'alias', 'is_active'))
+        campos = ('tipo', 'descripcion', 'estado', 'autor_id', 'habilidad_id')
+        self.assertEqual(fields(posts(escala, 0, [1, 2, 3], [4, 5]), *campos), fields(posts(escala, 0, [1, 2, 3], [4, 5]), *campos))
+        self.assertNotEqual(fields(posts(escala, 0, [1, 2, 3], [4, 5]), *campos), fields(posts(escala, 1, [1, 2, 3], [4, 5]), *campos))
+
+    def test_populate(self):
+        escala = Escala.from_rows(300)
+        creadas = populate(escala, seed=0, indexes=False)  # The rebuilds use worker threads: not in a test transaction.
+
+        self.assertEqual(escala, Escala(usuarios=30, publicaciones=90, acuerdos=30))
+        self.assertEqual(
+            (creadas['usuario'], creadas['perfil'], creadas['publicacion'], creadas['acuerdo']),
+            (Usuario.objects.count(), Perfil.objects.count(), Publicacion.objects.count(), Acuerdo.objects.count()),
+        )
+        self.assertEqual(creadas['publicacion'], 90)
+        self.assertEqual(
+            list(Publicacion.objects.order_by('id').values_list('descripcion', flat=True)),
+            [publicacion.descripcion for publicacion in posts(
+                escala, 0, list(Usuario.objects.order_by('id').values_list('id', flat=True)),
+                list(Habilidad.objects.order_by('id').values_list('id', flat=True)),
+            )],
+        )
+
+
+class CompareTests(SimpleTestCase):
+
+    def results(self, **escenarios):
+        return {
+            'meta': {'rows': 1000, 'seed': 0, 'database': 'sqlite'},
+            'scenarios': {
+                nombre: {'p95': p95, 'queries': consultas, 'peak_kb': 100.0}
+                for nombre, (p95, consultas) in escenarios.items()
+            },
+        }
+
+    def test_regressions_and_improvements(self):
+        base = self.results(feed=(10.0, 1), profile=(20.0, 5), lento=(0.2, 1), borrado=(1.0, 1))
+        nuevo = self.results(feed=(13.0, 1), profile=(10.0, 5), lento=(0.4, 2))
+
+        informe = compare(base, nuevo, umbral=0.15, umbral_memoria=0.5, margen_ms=1.0)
+
+        self.assertEqual([fila['scenario'] for fila in informe['regressions']], ['feed', 'lento'])  # lento: one more query.
+        self.assertEqual([fila['scenario'] for fila in informe['improvements']], ['profile'])
+        self.assertEqual(informe['missing'], ['borrado'])
+        self.assertEqual(informe['warnings'], [])
+
+    def test_noise_below_the_margin_is_ignored(self):
+        informe = compare(self.results(feed=(0.5, 1)), self.results(feed=(0.9, 1)), umbral=0.15, umbral_memoria=0.5, margen_ms=1.0)
+        self.assertEqual(informe['regressions'], [])
+
+    def test_different_data_is_warned(self):
+        nuevo = self.results(feed=(10.0, 1))
+        nuevo['meta']['rows'] = 5000
+        informe = compare(self.results(feed=(10.0, 1)), nuevo, umbral=0.15, umbral_memoria=0.5, margen_ms=1.0)
+        self.assertEqual(informe['warnings'], ['Different rows: 1000 vs 5000'])
@@ -0,0 +1,115 @@
+"""
+Tests of the read-through cache (core.cache): both tiers, the invalidation tombstones, the invalidations sent by the
+signals and the check of the shared cache.
+"""
+from django.core.cache import caches
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from core import cache, checks
+from core.cache import TieredCache
+from core.models import Habilidad
+
+from .factories import create_skill, create_user
+
+
+class TieredCacheTests(TestCase):
+
+    def setUp(self):
+        caches['default'].clear()
+        self.cache = TieredCache(alias='default', timeout=60, max_entries=10, ttl=60, invalidation_ttl=60)
+        self.cargas = []
+
+    def load(self, valor):
+        def cargar():
+            self.cargas.append(valor)
+            return valor
+        return cargar
+
+    def test_tiers(self):
+        self.assertEqual(self.cache.get_or_load('clave', self.load(1)), 1)
+        self.assertEqual(self.cache.get_or_load('clave', self.load(2)), 1)  # Local.
+        self.cache.local.clear()
+        self.assertEqual(self.cache.get_or_load('clave', self.load(3)), 1)  # Shared.
+        self.assertEqual(self.cache.get_or_load('nada', self.load(None)), None)
+        self.assertEqual(self.cache.get_or_load('nada', self.load(4)), None)  # None is cached too.
+
+        self.assertEqual(self.cargas, [1, None])
+        contadores = self.cache.counters()
+        self.assertEqual((contadores['local_hits'], contadores['shared_hits'], contadores['misses']), (2, 1, 2))
+        self.assertEqual(contadores['hit_ratio'], 3 / 5)
+
+    def test_invalidated_keys_are_loaded_but_not_cached_while_the_tombstone_lasts(self):
+        self.cache.get_or_load('clave', self.load('viejo'))
+        self.cache.invalidate('clave')
+
+        self.assertEqual(self.cache.get_or_load('clave', self.load('nuevo')), 'nuevo')
+        self.assertEqual(self.cache.get_or_load('clave', self.load('nuevo')), 'nuevo')
+        self.assertEqual(self.cargas, ['viejo', 'nuevo', 'nuevo'])
+
+        caches['default'].delete('clave')  # The tombstone expires.
+        self.cache.get_or_load('clave', self.load('nuevo'))
+        self.assertEqual(self.cache.get_or_load('clave', self.load('otro')), 'nuevo')
+
+    def test_a_load_that_read_before_the_change_is_not_cached(self):
+        def cargar():
+            valor = self.load('viejo')()
+            self.cache.invalidate('clave')  # The change is committed while the value is being built.
+            return valor
+
+        self.assertEqual(self.cache.get_or_load('clave', cargar), 'viejo')
+        caches['default'].delete('clave')
+        self.assertEqual(self.cache.get_or_load('clave', self.load('nuevo')), 'nuevo')
+
+
+class InvalidationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = create_user(0)
+        cls.habilidad = create_skill(0)
+
+    def setUp(self):
+        cache.cache.local.clear()
+        cache.cache.shared.clear()
+
+    def test_catalogue(self):
+        self.assertEqual(cache.skill_catalogue(), {'Idiomas': [{'id': self.habilidad.pk, 'nombre': 'Habilidad 0'}]})
+        with self.captureOnCommitCallbacks(execute=True):
+            Habilidad.objects.create(nombre='Alemán', categoria='Idiomas')
+
+        with self.assertNumQueries(1):
+            catalogo = cache.skill_catalogue()
+        self.assertEqual([habilidad['nombre'] for habilidad in catalogo['Idiomas']], ['Alemán', 'Habilidad 0'])
+
+    def test_profile_bundle_and_preferences(self):
+        self.assertEqual(cache.profile_bundle(self.usuario.pk)['perfil']['biografia'], 'Bio')
+        self.assertEqual(cache.preferences(self.usuario.pk).language, 'es')
+        with self.assertNumQueries(0):
+            cache.profile_bundle(self.usuario.pk)
+            cache.preferences(self.usuario.pk)
+
+        perfil = self.usuario.perfil
+        perfil.biografia = 'Nueva bio'
+        perfil.preferencias = {'language': 'en'}
+        with self.captureOnCommitCallbacks(execute=True):
+            perfil.save()
+
+        self.assertEqual(cache.profile_bundle(self.usuario.pk)['perfil']['biografia'], 'Nueva bio')
+        self.assertEqual(cache.preferences(self.usuario.pk).language, 'en')
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+
+    def test_local_memory_cache_outside_development(self):
+        with override_settings(DEBUG=True):
+            self.assertEqual(checks.check_shared_caches(None), [])
+        with override_settings(DEBUG=False):
+            avisos = checks.check_shared_caches(None)
+        self.assertEqual([(aviso.id, aviso.obj) for aviso in avisos], [('core.W001', 'CORE_CACHE'), ('core.W001', 'RATE_LIMITS')])
+
+        compartida = {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'skillswap_cache'}
+        configuracion = {'default': {'BACKEND': checks.LOCMEM}, 'shared': compartida}
+        with override_settings(DEBUG=False, CACHES=configuracion, CORE_CACHE={'ALIAS': 'shared'}):
+            self.assertEqual([aviso.obj for aviso in checks.check_shared_caches(None)], ['RATE_LIMITS'])
+        with override_settings(DEBUG=False, CACHES=configuracion, CORE_CACHE={'ALIAS': 'shared'}, RATE_LIMITS={'ALIAS': 'shared'}):
+            self.assertEqual(checks.check_shared_caches(None), [])
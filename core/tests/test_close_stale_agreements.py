@@ -0,0 +1,61 @@
+"""
+Tests of the close_stale_agreements command: both phases, the reference date and the dry runs.
+"""
+from datetime import date, datetime, timedelta
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from core.models import Acuerdo, Sesion
+
+from .factories import create_agreement, create_session, create_skill, create_user
+
+
+class CloseStaleAgreementsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.a, cls.b = [create_user(i) for i in range(2)]
+        cls.habilidades = [create_skill(i) for i in range(4)]
+        cls.propuesta = create_agreement(cls.a, cls.b, *cls.habilidades[:2])
+        cls.en_curso = create_agreement(cls.a, cls.b, *cls.habilidades[2:], estado='EN CURSO')
+        create_session(cls.en_curso)
+        # Proposed on 2026-01-01 at noon, with its only session on 2026-02-15.
+        creada = timezone.make_aware(datetime(2026, 1, 1, 12))
+        Acuerdo.objects.filter(pk=cls.propuesta.pk).update(fecha_creacion=creada)
+        Sesion.objects.filter(acuerdo=cls.en_curso).update(fecha=date(2026, 2, 15))
+
+    def run_command(self, *args):
+        salida = StringIO()
+        call_command('close_stale_agreements', *args, stdout=salida)
+        return salida.getvalue()
+
+    def states(self):
+        return [Acuerdo.objects.get(pk=acuerdo.pk).estado for acuerdo in (self.propuesta, self.en_curso)]
+
+    def test_today_is_the_reference_of_both_phases(self):
+        self.run_command('--today', '2026-01-31')  # 29 days and 12 hours after the proposal.
+        self.assertEqual(self.states(), ['PROPUESTO', 'EN CURSO'])
+
+        self.run_command('--today', '2026-02-15')
+        self.assertEqual(self.states(), ['CANCELADO', 'EN CURSO'])
+
+        salida = self.run_command('--today', '2026-02-16')
+        self.assertEqual(self.states(), ['CANCELADO', 'FINALIZADO'])
+        self.assertIn('expire: 0, finalize: 1', salida)
+
+    def test_proposal_days_and_dry_run(self):
+        salida = self.run_command('--today', '2026-01-10', '--proposal-days', '7', '--dry-run')
+        self.assertIn('expire: 1, finalize: 0', salida)
+        self.assertEqual(self.states(), ['PROPUESTO', 'EN CURSO'])
+
+    def test_without_today_it_runs_now(self):
+        Acuerdo.objects.filter(pk=self.propuesta.pk).update(fecha_creacion=timezone.now() - timedelta(days=30, minutes=1))
+        self.run_command('--phases', 'expire')
+        self.assertEqual(self.states(), ['CANCELADO', 'EN CURSO'])
+
+    def test_invalid_date(self):
+        with self.assertRaisesMessage(CommandError, 'Invalid date: 31/01/2026'):
+            self.run_command('--today', '31/01/2026')
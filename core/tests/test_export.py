@@ -0,0 +1,95 @@
+"""
+Tests of the streaming export (core.export): both formats, compression, incremental exports, the admin view and the
+export_data command.
+"""
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.http import StreamingHttpResponse
+from django.test import TestCase
+from django.utils import timezone
+
+from core import export
+from core.models import Publicacion
+
+from .factories import create_post, create_skill, create_user
+
+
+class ExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = create_user(0)
+        cls.habilidad = create_skill(0)
+        cls.publicaciones = [create_post(cls.usuario, cls.habilidad) for _ in range(30)]
+        Publicacion.objects.filter(pk=cls.publicaciones[0].pk).update(descripcion='Clases, con "comillas"\ny saltos')
+
+    def lines(self, bloques):
+        return b''.join(bloques).decode().splitlines(keepends=True)
+
+    def test_jsonl(self):
+        filas = [json.loads(linea) for linea in self.lines(export.export('publicaciones'))]
+        self.assertEqual([fila['id'] for fila in filas], [publicacion.pk for publicacion in self.publicaciones])
+        self.assertEqual(list(filas[0]), list(export.DATASETS['publicaciones'].campos))
+        self.assertEqual((filas[0]['descripcion'], filas[0]['autor__alias']), ('Clases, con "comillas"\ny saltos', 'u0'))
+
+    def test_csv_round_trip(self):
+        filas = list(csv.DictReader(io.StringIO(b''.join(export.export('publicaciones', 'csv')).decode())))
+        self.assertEqual(len(filas), 30)
+        self.assertEqual(filas[0]['descripcion'], 'Clases, con "comillas"\ny saltos')
+        self.assertEqual(filas[1]['estado'], 'True')
+
+    def test_gzip(self):
+        comprimido = b''.join(export.export('publicaciones', 'jsonl', comprimir=True))
+        self.assertEqual(gzip.decompress(comprimido), b''.join(export.export('publicaciones', 'jsonl')))
+
+    def test_streams_fixed_size_blocks(self):
+        with mock.patch.object(export, 'BLOQUE', 1024):
+            bloques = export.export('publicaciones', chunk_size=7)
+            self.assertNotIsInstance(bloques, (list, tuple))
+            tamanos = [len(bloque) for bloque in bloques]
+        self.assertGreater(len(tamanos), 3)
+        self.assertTrue(all(1024 <= tamano < 2048 for tamano in tamanos[:-1]))
+
+    def test_incremental(self):
+        desde = timezone.now() + timedelta(seconds=1)
+        Publicacion.objects.filter(pk=self.publicaciones[3].pk).update(fecha_modificacion=desde + timedelta(seconds=1))
+        filas = [json.loads(linea) for linea in self.lines(export.export('publicaciones', desde=desde))]
+        self.assertEqual([fila['id'] for fila in filas], [self.publicaciones[3].pk])
+
+    def test_invalid_arguments(self):
+        for llamada in (lambda: export.export('contrasenas'), lambda: export.export('publicaciones', 'xml'),
+                        lambda: export.parse_since('ayer')):
+            with self.assertRaises(ValidationError):
+                llamada()
+        self.assertEqual(export.parse_since('2026-03-01').isoformat(), '2026-03-01T00:00:00+01:00')
+
+    def test_admin_view(self):
+        self.client.force_login(create_user(1, is_staff=True))
+        respuesta = self.client.get('/api/exportar/publicaciones/', {'format': 'csv', 'gzip': '1'})
+
+        self.assertIsInstance(respuesta, StreamingHttpResponse)
+        self.assertEqual(respuesta['Content-Type'], 'application/gzip')
+        self.assertEqual(respuesta['Content-Disposition'], 'attachment; filename="publicaciones.csv.gz"')
+        contenido = gzip.decompress(b''.join(respuesta.streaming_content)).decode()
+        self.assertEqual(len(list(csv.DictReader(io.StringIO(contenido)))), 30)
+
+        self.assertEqual(self.client.get('/api/exportar/contrasenas/').status_code, 400)
+        self.assertEqual(self.client.get('/api/exportar/publicaciones/', {'since': 'ayer'}).status_code, 400)
+
+    def test_command(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            call_command('export_data', 'usuarios', 'publicaciones', '--output-dir', directorio, stdout=io.StringIO())
+            self.assertEqual(sorted(os.listdir(directorio)), ['publicaciones.jsonl', 'usuarios.jsonl'])
+            with open(os.path.join(directorio, 'usuarios.jsonl')) as fichero:
+                usuario = json.loads(fichero.readline())
+        self.assertEqual(usuario['username'], 'usuario0')
+        self.assertNotIn('password', usuario)
@@ -0,0 +1,75 @@
+"""
+Tests of the bulk importers (core.importer).
+"""
+from django.test import SimpleTestCase, TestCase
+
+from core.importer import Importer, PostImporter, SkillImporter
+from core.models import Habilidad, IndicePublicacion, Publicacion
+
+from .factories import create_post, create_skill, create_user
+
+
+class ImporterTests(SimpleTestCase):
+
+    def test_importers_must_implement_every_step(self):
+        class Incompleto(Importer):
+            def clean_row(self, fila):
+                return fila
+
+        with self.assertRaises(TypeError):
+            Incompleto()
+
+
+class PostImporterTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuarios = [create_user(i) for i in range(3)]
+        cls.habilidades = [create_skill(i) for i in range(3)]
+        create_post(cls.usuarios[2], cls.habilidades[2])
+
+    def load(self, filas):
+        importer = PostImporter()
+        return list(importer.run(enumerate(filas, start=2)))
+
+    def test_refreshes_only_the_index_rows_of_the_imported_posts(self):
+        ajena = IndicePublicacion.objects.get(usuario=self.usuarios[2])
+        IndicePublicacion.objects.filter(pk=ajena.pk).update(total=7)  # Drift a full rebuild would fix.
+
+        lotes = self.load([
+            {'tipo': 'OFREZCO', 'descripcion': 'Clases', 'autor': 'u0', 'habilidad': 'Habilidad 0'},
+            {'tipo': 'OFREZCO', 'descripcion': 'Más clases', 'autor': 'u0', 'habilidad': 'Habilidad 0'},
+            {'tipo': 'BUSCO', 'descripcion': 'Busco', 'autor': 'u1', 'habilidad': 'Habilidad 1', 'estado': 'false'},
+        ])
+
+        self.assertEqual(lotes[0].creadas, 3)
+        self.assertEqual(
+            set(IndicePublicacion.objects.values_list('usuario_id', 'habilidad_id', 'tipo', 'total')),
+            {(self.usuarios[0].pk, self.habilidades[0].pk, 'OFREZCO', 2), (self.usuarios[2].pk, self.habilidades[2].pk, 'OFREZCO', 7)},
+        )
+
+    def test_csv_booleans(self):
+        filas = [
+            {'tipo': 'OFREZCO', 'descripcion': valor, 'autor': 'u0', 'habilidad': 'Habilidad 0', 'estado': valor}
+            for valor in ('true', 'TRUE', 'True', '1', 'false', 'FALSE', 'no', '0')
+        ]
+        lotes = self.load(filas)
+
+        self.assertEqual(lotes[0].errores, [])
+        estados = dict(Publicacion.objects.filter(autor=self.usuarios[0]).values_list('descripcion', 'estado'))
+        self.assertEqual(estados, {'true': True, 'TRUE': True, 'True': True, '1': True, 'false': False, 'FALSE': False, 'no': False, '0': False})
+
+    def test_invalid_boolean(self):
+        lotes = self.load([{'tipo': 'OFREZCO', 'descripcion': 'Clases', 'autor': 'u0', 'habilidad': 'Habilidad 0', 'estado': 'quizás'}])
+
+        self.assertEqual([error['linea'] for error in lotes[0].errores], [2])
+        self.assertIn('estado', lotes[0].errores[0]['errores'])
+
+
+class SkillImporterTests(TestCase):
+
+    def test_csv_booleans(self):
+        lotes = list(SkillImporter().run([(2, {'nombre': 'Guitarra', 'estado': 'FALSE'}), (3, {'nombre': 'Piano', 'estado': 'yes'})]))
+
+        self.assertEqual(lotes[0].creadas, 2)
+        self.assertEqual(dict(Habilidad.objects.values_list('nombre', 'estado')), {'Guitarra': False, 'Piano': True})
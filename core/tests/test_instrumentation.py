@@ -0,0 +1,97 @@
+"""
+Tests of the query instrumentation (core.instrumentation and QueryInstrumentationMiddleware).
+"""
+import json
+
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from core.instrumentation import QueryBudgetExceeded, fingerprint, query_budget, track_queries
+from core.middleware import QueryInstrumentationMiddleware
+from core.models import Habilidad
+
+from .factories import create_skill
+
+INSTRUMENTATION = {'ENABLED': True, 'SERVER_TIMING': True, 'STRICT_BUDGETS': False, 'SLOW_REQUEST_MS': 500}
+
+
+class TrackQueriesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.habilidades = [create_skill(i) for i in range(3)]
+
+    def test_fingerprint(self):
+        self.assertEqual(
+            fingerprint('SELECT * FROM "usuario" WHERE "id" IN (%s, %s, %s) AND alias = \'pepe\'  LIMIT 21'),
+            'SELECT * FROM "usuario" WHERE "id" IN (...) AND alias = ? LIMIT ?',
+        )
+
+    def test_counts_and_repeated_shapes(self):
+        with track_queries() as tracker:
+            for habilidad in self.habilidades:
+                Habilidad.objects.get(pk=habilidad.pk)
+            Habilidad.objects.get(pk=self.habilidades[0].pk)
+            Habilidad.objects.count()
+
+        self.assertEqual(tracker.count, 5)
+        self.assertEqual([veces for _, veces in tracker.duplicates], [4])
+        self.assertEqual(tracker.exact_duplicates, 1)
+        self.assertGreater(tracker.wall_time, 0)
+
+    def test_budget(self):
+        with track_queries(budget=1):
+            Habilidad.objects.count()
+
+        with self.assertRaisesMessage(QueryBudgetExceeded, 'lista ran 2 queries, its budget is 1'):
+            with track_queries(budget=1, label='lista'):
+                Habilidad.objects.count()
+                Habilidad.objects.count()
+
+
+@override_settings(INSTRUMENTATION=INSTRUMENTATION)
+class QueryInstrumentationMiddlewareTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        create_skill(0)
+
+    def call(self, consultas, presupuesto=None):
+        @query_budget(presupuesto)
+        def view(request):
+            for _ in range(consultas):
+                Habilidad.objects.count()
+            return HttpResponse()
+
+        def get_response(request):
+            middleware.process_view(request, view, (), {})
+            return view(request)
+
+        middleware = QueryInstrumentationMiddleware(get_response)
+        return middleware(RequestFactory().get('/habilidades/'))
+
+    def test_server_timing_and_log(self):
+        with self.assertLogs('skillswap.instrumentation', 'INFO') as logs:
+            respuesta = self.call(2, presupuesto=2)
+
+        self.assertRegex(respuesta['Server-Timing'], r'^db;dur=[\d.]+;desc="2 queries", app;dur=[\d.]+$')
+        self.assertEqual(logs.records[0].levelname, 'INFO')
+        registro = json.loads(logs.records[0].getMessage())
+        self.assertEqual((registro['path'], registro['queries'], registro['budget']), ('/habilidades/', 2, 2))
+
+    def test_over_budget_is_logged_as_a_warning(self):
+        with self.assertLogs('skillswap.instrumentation', 'INFO') as logs:
+            self.call(3, presupuesto=1)
+        self.assertEqual(logs.records[0].levelname, 'WARNING')
+        self.assertEqual(json.loads(logs.records[0].getMessage())['duplicates'][0]['count'], 3)
+
+    @override_settings(INSTRUMENTATION={**INSTRUMENTATION, 'STRICT_BUDGETS': True})
+    def test_strict_budgets_raise(self):
+        self.call(1, presupuesto=1)
+        self.call(5)  # No budget.
+        with self.assertRaises(QueryBudgetExceeded), self.assertLogs('skillswap.instrumentation', 'WARNING'):
+            self.call(2, presupuesto=1)
+
+    @override_settings(INSTRUMENTATION={**INSTRUMENTATION, 'ENABLED': False})
+    def test_disabled(self):
+        self.assertNotIn('Server-Timing', self.call(1))
@@ -0,0 +1,88 @@
+"""
+Query counts of the loading profiles of core.managers.
+"""
+from django.test import TestCase
+
+from core.models import Acuerdo, Perfil, Publicacion, Sesion
+
+from .factories import create_agreement, create_post, create_session, create_skill, create_user
+
+
+class LoadingProfilesTests(TestCase):
+    """
+    Every loading profile takes a fixed number of queries, however many rows the page has.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuarios = [create_user(i) for i in range(10)]
+        cls.habilidades = [create_skill(i) for i in range(5)]
+        for i, usuario in enumerate(cls.usuarios):
+            usuario.perfil.habilidades.set(cls.habilidades[:i % 5 + 1])
+            create_post(usuario, cls.habilidades[i % 5])
+        for i in range(50):
+            acuerdo = create_agreement(
+                cls.usuarios[i % 10], cls.usuarios[(i + 1 + i // 10) % 10], cls.habilidades[i % 5], cls.habilidades[(i + 1) % 5],
+            )
+            create_session(acuerdo, dias=7, activa=True)
+            create_session(acuerdo, dias=14, activa=False)
+
+    def test_for_feed(self):
+        with self.assertNumQueries(1):
+            tarjetas = [
+                (publicacion.descripcion, publicacion.autor.alias, publicacion.habilidad.nombre)
+                for publicacion in Publicacion.objects.for_feed()[:50]
+            ]
+        self.assertEqual(len(tarjetas), 10)
+
+    def test_for_agreement_detail(self):
+        with self.assertNumQueries(3):
+            acuerdo = Acuerdo.objects.for_agreement_detail().get(pk=Acuerdo.objects.values_list('pk', flat=True)[:1])
+            acuerdo.usuario_a.perfil.biografia, acuerdo.usuario_b.perfil.biografia
+            acuerdo.habilidad_tradea_a.nombre, acuerdo.habilidad_tradea_b.nombre
+            sesiones = list(acuerdo.sesiones.all())
+        self.assertEqual(len(sesiones), 2)
+        self.assertEqual([sesion.estado for sesion in acuerdo.sesiones_activas], [True])
+
+    def test_with_sessions(self):
+        with self.assertNumQueries(2):
+            sesiones = [len(acuerdo.sesiones.all()) for acuerdo in Acuerdo.objects.with_sessions()]
+        self.assertEqual(sesiones, [2] * 50)
+
+    def test_with_active_sessions(self):
+        with self.assertNumQueries(2):
+            activas = [acuerdo.sesiones_activas for acuerdo in Acuerdo.objects.with_sessions(activas=True)]
+        self.assertTrue(all(len(sesiones) == 1 and sesiones[0].estado for sesiones in activas))
+
+    def test_page_of_50_agreements(self):
+        def page():
+            return [
+                (
+                    acuerdo.usuario_a.alias, acuerdo.usuario_b.alias,
+                    acuerdo.habilidad_tradea_a.nombre, acuerdo.habilidad_tradea_b.nombre,
+                    [sesion.fecha for sesion in acuerdo.sesiones_activas],
+                )
+                for acuerdo in Acuerdo.objects.for_listing().with_sessions(activas=True).order_by('pk')[:50]
+            ]
+
+        with self.assertNumQueries(2):
+            self.assertEqual(len(page()), 50)
+
+        # Twice the sessions, same queries.
+        for acuerdo in Acuerdo.objects.all():
+            create_session(acuerdo, dias=21, activa=True)
+        with self.assertNumQueries(2):
+            self.assertTrue(all(len(fila[4]) == 2 for fila in page()))
+
+    def test_for_profile_page(self):
+        with self.assertNumQueries(2):
+            habilidades = [
+                (perfil.usuario.alias, [habilidad.nombre for habilidad in perfil.habilidades.all()])
+                for perfil in Perfil.objects.for_profile_page()
+            ]
+        self.assertEqual(sorted(len(nombres) for _, nombres in habilidades), [1, 1, 2, 2, 3, 3, 4, 4, 5, 5])
+
+    def test_sessions_with_agreement(self):
+        with self.assertNumQueries(1):
+            for sesion in Sesion.objects.with_agreement()[:50]:
+                sesion.acuerdo.usuario_a.alias, sesion.acuerdo.habilidad_tradea_b.nombre
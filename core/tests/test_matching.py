@@ -0,0 +1,109 @@
+"""
+Tests of the matchmaking engine (core.matching): the IndicePublicacion inverted index kept by the signals, and the
+ranking of the matches.
+"""
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from core import matching
+from core.matching import Match, find_matches
+from core.models import IndicePublicacion, Publicacion
+
+from .factories import create_post, create_skill, create_user
+
+
+def index():
+    return set(IndicePublicacion.objects.values_list('usuario_id', 'habilidad_id', 'tipo', 'total'))
+
+
+class IndexTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = create_user(0)
+        cls.habilidades = [create_skill(i) for i in range(2)]
+
+    def test_follows_the_posts(self):
+        h0, h1 = self.habilidades
+        primera = create_post(self.usuario, h0)
+        create_post(self.usuario, h0)
+        self.assertEqual(index(), {(self.usuario.pk, h0.pk, 'OFREZCO', 2)})
+
+        # A changed key refreshes the old row and the new one.
+        primera.habilidad = h1
+        primera.tipo = 'BUSCO'
+        primera.save()
+        self.assertEqual(index(), {(self.usuario.pk, h0.pk, 'OFREZCO', 1), (self.usuario.pk, h1.pk, 'BUSCO', 1)})
+
+        primera.estado = False
+        primera.save(update_fields=['estado'])
+        self.assertEqual(index(), {(self.usuario.pk, h0.pk, 'OFREZCO', 1)})
+
+        Publicacion.objects.filter(autor=self.usuario).delete()
+        self.assertEqual(index(), set())
+
+    def test_saves_that_cant_move_the_key_skip_the_old_key(self):
+        publicacion = create_post(self.usuario, self.habilidades[0])
+        consultas = {}
+        for campos in (None, ['descripcion']):
+            with CaptureQueriesContext(connection) as capturadas:
+                publicacion.save(update_fields=campos)
+            consultas[campos and tuple(campos)] = len(capturadas)
+
+        self.assertEqual(consultas[None] - consultas[('descripcion',)], 1)
+        self.assertIsNone(publicacion._indice_anterior)
+
+    def test_rebuild(self):
+        for habilidad in self.habilidades:
+            create_post(self.usuario, habilidad, tipo='BUSCO')
+        antes = index()
+        IndicePublicacion.objects.all().delete()
+
+        self.assertEqual(matching.rebuild_index(), 2)
+        self.assertEqual(index(), antes)
+
+
+class FindMatchesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        h = [create_skill(i) for i in range(5)]
+        publicaciones = [
+            # The user offers h0 and h2 and searches for h1 and h3.
+            (0, [h[0], h[2]], [h[1], h[3]]),
+            (1, [h[1]], [h[0]]),                # Two-way: 1000 + 2.
+            (2, [h[1], h[3]], []),              # One-way, two skills: 2.
+            (3, [h[1], h[3]], [h[0], h[2]]),    # Two-way, two skills: 2000 + 4.
+            (4, [], [h[0]]),                    # One-way: 1.
+            (5, [h[1]], [h[0]]),                # Same as 1: ranked by id.
+            (6, [h[4]], [h[4]]),                # Nothing in common.
+            (7, [h[1]], [h[0]]),                # Inactive.
+        ]
+        cls.usuarios = {}
+        for i, ofrece, busca in publicaciones:
+            cls.usuarios[i] = create_user(i, is_active=i != 7)
+            for habilidad in ofrece:
+                create_post(cls.usuarios[i], habilidad, tipo='OFREZCO')
+            for habilidad in busca:
+                create_post(cls.usuarios[i], habilidad, tipo='BUSCO')
+
+    def test_ranking(self):
+        u = {i: usuario.pk for i, usuario in self.usuarios.items()}
+        with self.assertNumQueries(2):
+            matches = find_matches(self.usuarios[0])
+
+        self.assertEqual(matches, [
+            Match(u[3], 2, 2), Match(u[1], 1, 1), Match(u[5], 1, 1), Match(u[2], 2, 0), Match(u[4], 0, 1),
+        ])
+        self.assertEqual([match.puntuacion for match in matches], [2004, 1002, 1002, 2, 1])
+        self.assertEqual([match.mutuo for match in matches], [True, True, True, False, False])
+
+    def test_limit(self):
+        matches = find_matches(self.usuarios[0].pk, limit=2)
+        self.assertEqual([match.usuario_id for match in matches], [self.usuarios[3].pk, self.usuarios[1].pk])
+
+    def test_users_without_posts(self):
+        usuario = create_user(8)
+        with self.assertNumQueries(1):
+            self.assertEqual(find_matches(usuario), [])
@@ -0,0 +1,71 @@
+"""
+Tests of PreferencesMiddleware: the queries it adds to signed-in requests and the language it activates.
+"""
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import translation
+
+from core import cache
+from core.middleware import PreferencesMiddleware
+from core.models import Perfil
+from core.preferences import DEFAULT, without_preferences
+
+from .factories import create_post, create_skill, create_user
+
+
+@override_settings(INSTRUMENTATION={'ENABLED': True, 'SERVER_TIMING': False, 'STRICT_BUDGETS': True, 'SLOW_REQUEST_MS': 500})
+class PreferencesMiddlewareTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = create_user(0)
+        create_post(cls.usuario, create_skill(0))
+        Perfil.objects.filter(usuario=cls.usuario).update(preferencias={'theme': 'dark', 'language': 'en'})
+
+    def setUp(self):
+        cache.cache.local.clear()
+        cache.cache.shared.clear()
+        self.client.force_login(self.usuario)
+
+    def test_signed_in_public_reads_stay_within_their_budgets(self):
+        recomendaciones = f'/api/perfiles/{self.usuario.pk}/recomendaciones/'
+        for url, consultas in (('/api/feed/', 1), ('/api/habilidades/', 1), (recomendaciones, 1)):
+            with self.subTest(url=url), self.assertNumQueries(consultas):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_signed_in_profile_takes_the_queries_of_an_anonymous_one(self):
+        url = f'/api/perfiles/{self.usuario.pk}/'
+        with self.assertNumQueries(5):
+            self.assertEqual(self.client.get(url).status_code, 200)
+        self.client.logout()
+        cache.cache.local.clear()
+        cache.cache.shared.clear()
+        with self.assertNumQueries(5):
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_activates_the_language_of_the_user(self):
+        vistos = []
+
+        def view(request):
+            vistos.append((translation.get_language(), request.preferencias.theme))
+            return HttpResponse()
+
+        middleware = PreferencesMiddleware(lambda request: middleware.process_view(request, view, (), {}) or view(request))
+        request = RequestFactory().get('/')
+        request.user = self.usuario
+        with translation.override('es'):
+            middleware(request)
+            self.assertEqual(translation.get_language(), 'es')
+
+        self.assertEqual(vistos, [('en', 'dark')])
+
+    def test_views_without_preferences_load_nothing(self):
+        vista = without_preferences(lambda request: HttpResponse(translation.get_language()))
+        middleware = PreferencesMiddleware(lambda request: middleware.process_view(request, vista, (), {}) or vista(request))
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+
+        with translation.override('es'), self.assertNumQueries(0):
+            self.assertEqual(middleware(request).content, b'es')
+        self.assertEqual(request.preferencias, DEFAULT)
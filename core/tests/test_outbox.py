@@ -0,0 +1,130 @@
+"""
+Tests of the notification outbox (core.outbox): transactional writes, retries, idempotency keys and outdated
+reminders.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core import outbox
+from core.models import Notificacion, Sesion
+from core.outbox import FakeSender, process_batch
+
+from .factories import create_agreement, create_session, create_skill, create_user
+
+
+class OutboxTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuarios = [create_user(i) for i in range(2)]
+        cls.habilidades = [create_skill(i) for i in range(2)]
+
+    def propose(self):
+        return create_agreement(*self.usuarios, *self.habilidades)
+
+    def make_due(self):
+        Notificacion.objects.filter(estado='PENDIENTE').update(disponible_en=timezone.now() - timedelta(seconds=1))
+
+    def test_rolled_back_changes_leave_no_notification(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.propose()
+            self.assertEqual(Notificacion.objects.count(), 1)
+            raise RuntimeError('Rolled back')
+
+        self.assertFalse(Notificacion.objects.exists())
+        self.assertEqual(process_batch(FakeSender(fallos=1), hilos=2), outbox.Resultado())
+
+    def test_failed_delivery_is_retried_with_backoff(self):
+        acuerdo = self.propose()
+        sender = FakeSender(fallos=1)
+
+        antes = timezone.now()
+        self.assertEqual(process_batch(sender, hilos=2), outbox.Resultado(reintentos=1))
+        notificacion = Notificacion.objects.get()
+        self.assertEqual((notificacion.estado, notificacion.intentos), ('PENDIENTE', 1))
+        self.assertIn('Fake failure 1', notificacion.error)
+        espera = outbox.get_setting('BACKOFF_SECONDS')
+        self.assertGreaterEqual(notificacion.disponible_en, antes + timedelta(seconds=espera / 2))
+        self.assertLessEqual(notificacion.disponible_en, timezone.now() + timedelta(seconds=espera))
+
+        # Not due again until the backoff is over.
+        self.assertEqual(process_batch(sender, hilos=2).total, 0)
+
+        self.make_due()
+        self.assertEqual(process_batch(sender, hilos=2), outbox.Resultado(enviadas=1))
+        notificacion.refresh_from_db()
+        self.assertEqual((notificacion.estado, notificacion.intentos, notificacion.error), ('ENVIADA', 2, ''))
+        self.assertEqual(list(sender.entregados), [f'acuerdo_propuesto:{acuerdo.pk}:{self.usuarios[1].pk}'])
+
+    @override_settings(NOTIFICATIONS={'MAX_ATTEMPTS': 3})
+    def test_fails_after_max_attempts(self):
+        self.propose()
+        sender = FakeSender(fallos=10)
+
+        resultados = []
+        for _ in range(4):
+            resultados.append(process_batch(sender, hilos=2))
+            self.make_due()
+
+        self.assertEqual(resultados, [outbox.Resultado(reintentos=1)] * 2 + [outbox.Resultado(fallidas=1), outbox.Resultado()])
+        notificacion = Notificacion.objects.get()
+        self.assertEqual((notificacion.estado, notificacion.intentos), ('FALLIDA', 3))
+        self.assertEqual(sender.entregados, {})
+
+    def test_backoff_grows_with_the_attempts(self):
+        espera = outbox.get_setting('BACKOFF_SECONDS')
+        for intentos in (1, 2, 3):
+            with self.subTest(intentos=intentos):
+                retraso = outbox.backoff(intentos).total_seconds()
+                self.assertGreaterEqual(retraso, espera * 2 ** (intentos - 1) / 2)
+                self.assertLessEqual(retraso, espera * 2 ** (intentos - 1))
+        self.assertLessEqual(outbox.backoff(50).total_seconds(), outbox.get_setting('MAX_BACKOFF_SECONDS'))
+
+    def test_duplicate_keys_are_stored_and_delivered_once(self):
+        acuerdo = self.propose()
+        outbox.agreement_proposed(acuerdo)  # The same event, replayed.
+        fila = (acuerdo.pk, acuerdo.usuario_a_id, acuerdo.usuario_b_id)
+        outbox.agreements_transitioned([fila], 'CANCELADO')
+        outbox.agreements_transitioned([fila], 'CANCELADO')
+
+        self.assertEqual(Notificacion.objects.filter(tipo='acuerdo_propuesto').count(), 1)
+        self.assertEqual(Notificacion.objects.filter(tipo='acuerdo_cancelado').count(), 2)  # One per user.
+
+        sender = FakeSender(fallos=1)
+        self.assertEqual(process_batch(sender, hilos=2), outbox.Resultado(reintentos=3))
+        self.make_due()
+        self.assertEqual(process_batch(sender, hilos=2), outbox.Resultado(enviadas=3))
+        # Sent again (e.g. a worker died before recording them): the provider gets the same keys and keeps one each.
+        Notificacion.objects.update(estado='PENDIENTE', disponible_en=timezone.now())
+        self.assertEqual(process_batch(sender, hilos=2), outbox.Resultado(enviadas=3))
+        self.assertEqual(len(sender.entregados), 3)
+        self.assertEqual(set(sender.intentos.values()), {3})
+
+    def test_reminder_of_a_moved_session_is_discarded(self):
+        acuerdo = create_agreement(*self.usuarios, *self.habilidades, estado='ACEPTADO')
+        sesion = create_session(acuerdo, dias=0)  # Today, so its reminder is due.
+        self.assertEqual(Notificacion.objects.filter(tipo='sesion_proxima').count(), 2)
+
+        # A bulk update skips the signals that would replace the reminders.
+        Sesion.objects.filter(pk=sesion.pk).update(fecha=sesion.fecha + timedelta(days=3))
+        sender = FakeSender(fallos=1)
+
+        self.assertEqual(process_batch(sender, hilos=2), outbox.Resultado(descartadas=2))
+        self.assertEqual(set(Notificacion.objects.values_list('estado', flat=True)), {'DESCARTADA'})
+        self.assertEqual(sender.intentos, {})
+
+    def test_moving_a_session_replaces_its_reminders(self):
+        acuerdo = create_agreement(*self.usuarios, *self.habilidades, estado='ACEPTADO')
+        sesion = create_session(acuerdo, dias=5)
+        sesion.fecha += timedelta(days=2)
+        sesion.save()
+
+        fechas = set(Notificacion.objects.filter(tipo='sesion_proxima').values_list('datos__fecha', flat=True))
+        self.assertEqual(fechas, {sesion.fecha.isoformat()})
+
+    def test_senders_must_implement_send(self):
+        with self.assertRaises(TypeError):
+            type('Incompleto', (outbox.Sender,), {})()
@@ -0,0 +1,110 @@
+"""
+Tests of the keyset pagination (core.pagination): cursors, ties on the sort key, rows inserted while paging, and the
+estimated counts of the admin changelists.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from asgiref.sync import async_to_sync
+from django.core.exceptions import ValidationError
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from core.models import Publicacion, Sesion, Usuario
+from core.pagination import (
+    EstimatedCountPaginator, KeysetPaginator, decode_cursor, encode_cursor, posts_feed, session_history,
+)
+
+from .factories import create_agreement, create_post, create_session, create_skill, create_user
+
+
+class CursorTests(SimpleTestCase):
+
+    def test_round_trip_keeps_the_microseconds(self):
+        campos = [Publicacion._meta.get_field('fecha_creacion'), Publicacion._meta.get_field('id')]
+        valores = [datetime(2026, 3, 1, 10, 30, 15, 123456, tzinfo=dt_timezone.utc), 42]
+        self.assertEqual(decode_cursor(encode_cursor(valores), campos), valores)
+
+    def test_malformed_cursors(self):
+        campos = [Publicacion._meta.get_field('id')]
+        for cursor in ('', 'no-es-base64!', encode_cursor([1, 2]), encode_cursor({'id': 1}), encode_cursor(['x'])):
+            with self.subTest(cursor=cursor), self.assertRaisesMessage(ValidationError, 'Invalid cursor.'):
+                decode_cursor(cursor, campos)
+
+    def test_ordering_must_end_with_the_primary_key(self):
+        with self.assertRaises(ValueError):
+            KeysetPaginator(Publicacion.objects.all(), ('-fecha_creacion',))
+
+
+class KeysetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuarios = [create_user(i) for i in range(2)]
+        cls.habilidades = [create_skill(i) for i in range(2)]
+        cls.publicaciones = [create_post(cls.usuarios[i % 2], cls.habilidades[i % 2]) for i in range(7)]
+        # Ties on fecha_creacion: only the id tells them apart.
+        ahora = timezone.now()
+        Publicacion.objects.filter(pk__in=[p.pk for p in cls.publicaciones[:4]]).update(fecha_creacion=ahora)
+        Publicacion.objects.filter(pk__in=[p.pk for p in cls.publicaciones[4:]]).update(fecha_creacion=ahora - timedelta(days=1))
+        Publicacion.objects.filter(pk=cls.publicaciones[5].pk).update(estado=False)
+
+    def pages(self, leer):
+        vistas, cursor = [], None
+        while True:
+            pagina = leer(cursor)
+            vistas.append([objeto.pk for objeto in pagina.resultados])
+            if not pagina.hay_mas:
+                return vistas
+            cursor = pagina.siguiente
+
+    def test_feed(self):
+        esperadas = list(Publicacion.objects.filter(estado=True).order_by('-fecha_creacion', '-id').values_list('pk', flat=True))
+        with self.assertNumQueries(3):  # One per page: the extra row read tells if there's a next one.
+            vistas = self.pages(lambda cursor: posts_feed(cursor, por_pagina=2))
+
+        self.assertEqual(vistas, [esperadas[0:2], esperadas[2:4], esperadas[4:6]])
+
+    def test_new_rows_while_paging_are_neither_skipped_nor_repeated(self):
+        esperadas = list(Publicacion.objects.filter(estado=True).order_by('-fecha_creacion', '-id').values_list('pk', flat=True))
+        primera = posts_feed(por_pagina=3)
+        create_post(self.usuarios[0], self.habilidades[0])  # Newer than every row of the feed: it would shift OFFSET.
+        resto = self.pages(lambda cursor: posts_feed(cursor or primera.siguiente, por_pagina=3))
+
+        self.assertEqual([publicacion.pk for publicacion in primera.resultados] + sum(resto, []), esperadas)
+
+    def test_async_pages(self):
+        paginador = KeysetPaginator(Usuario.objects.all(), ('alias', 'id'), por_pagina=1)
+        pagina = async_to_sync(paginador.apage)()
+        self.assertEqual([usuario.alias for usuario in pagina.resultados], ['u0'])
+        siguiente = async_to_sync(paginador.apage)(pagina.siguiente)
+        self.assertEqual(([usuario.alias for usuario in siguiente.resultados], siguiente.hay_mas), (['u1'], False))
+
+    def test_session_history(self):
+        acuerdo = create_agreement(*self.usuarios, *self.habilidades, estado='EN CURSO')
+        for dias in (3, 1, 1, 2, 1):
+            create_session(acuerdo, dias=dias)
+        otro = create_agreement(self.usuarios[1], self.usuarios[0], *self.habilidades, estado='EN CURSO')
+        create_session(otro, dias=0)
+
+        vistas = self.pages(lambda cursor: session_history(acuerdo, cursor, por_pagina=2))
+        self.assertEqual(sum(vistas, []), list(Sesion.objects.filter(acuerdo=acuerdo).order_by('fecha', 'id').values_list('pk', flat=True)))
+        self.assertEqual(len(vistas), 3)
+
+
+class EstimatedCountTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(5):
+            create_user(i)
+
+    def test_estimate_only_for_big_unfiltered_tables(self):
+        class Paginador(EstimatedCountPaginator):
+            ESTIMAR_DESDE = 3
+            LIMITE = 2
+
+        Usuario.objects.filter(pk=Usuario.objects.order_by('pk').first().pk).delete()
+        maximo = Usuario.objects.order_by('-pk').first().pk
+        self.assertEqual(Paginador(Usuario.objects.all(), 10).count, maximo)  # The highest id, not the rows.
+        self.assertEqual(Paginador(Usuario.objects.filter(is_active=True), 10).count, 2)  # Counted up to LIMITE.
+        self.assertEqual(EstimatedCountPaginator(Usuario.objects.all(), 10).count, 4)  # Small: counted.
@@ -0,0 +1,24 @@
+"""
+Tests of the profile preferences (core.preferences).
+"""
+from django.core.exceptions import ValidationError
+from django.test import SimpleTestCase
+
+from core.models import Perfil
+from core.preferences import DEFAULT, Preferencias, validate
+
+
+class PreferencesTests(SimpleTestCase):
+
+    def test_valid(self):
+        validate({'theme': 'dark', 'language': 'en'})
+        self.assertEqual(Preferencias.parse({'theme': 'dark'}), Preferencias(theme='dark', language='es'))
+
+    def test_values_that_are_not_strings_are_invalid(self):
+        for valor in (['dark'], {'modo': 'dark'}, 1, None):
+            with self.subTest(valor=valor), self.assertRaises(ValidationError):
+                Perfil(preferencias={'theme': valor}).clean()
+
+    def test_parse_falls_back_to_the_default(self):
+        self.assertEqual(Preferencias.parse({'theme': ['dark'], 'language': {'es': True}}), DEFAULT)
+        self.assertEqual(Preferencias.parse({'theme': 'gray', 'language': 'en', 'otra': 1}), Preferencias(language='en'))
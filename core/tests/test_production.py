@@ -0,0 +1,103 @@
+"""
+Tests of the production setup: the staff-only API views, the lean production settings and the preloading of the
+entry points (skillswap.preload).
+"""
+import gc
+import json
+import os
+import subprocess
+import sys
+from unittest import mock
+
+from django.conf import settings
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+
+from skillswap import preload
+
+from .factories import create_user
+
+
+class StaffRequiredTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = create_user(0)
+        cls.staff = create_user(1, is_staff=True)
+        cls.inactivo = create_user(2, is_staff=True, is_active=False)
+
+    def test_staff_only_views(self):
+        for url in ('/api/exportar/habilidades/', '/api/analitica/sesiones/'):
+            with self.subTest(url=url):
+                self.client.logout()
+                respuesta = self.client.get(url)
+                self.assertEqual((respuesta.status_code, respuesta.json()), (401, {'error': 'Sign in as staff.'}))
+
+                self.client.force_login(self.usuario)
+                respuesta = self.client.get(url)
+                self.assertEqual((respuesta.status_code, respuesta.json()), (403, {'error': 'Staff only.'}))
+
+        self.client.force_login(self.staff)
+        self.assertEqual(self.client.get('/api/analitica/sesiones/').json(), {'resultados': []})
+        self.assertEqual(self.client.get('/api/exportar/usuarios/').status_code, 200)
+
+    def test_inactive_staff(self):
+        self.client.force_login(self.inactivo)
+        self.assertEqual(self.client.get('/api/analitica/sesiones/').status_code, 401)  # Not signed in by the backend.
+
+
+class PreloadTests(SimpleTestCase):
+    databases = {'default'}
+
+    def test_loads_with_the_collector_off_and_freezes(self):
+        estados = []
+
+        def get_application():
+            estados.append(gc.isenabled())
+            return 'aplicacion'
+
+        with mock.patch.object(gc, 'freeze') as freeze:
+            self.assertEqual(preload.preload(get_application), 'aplicacion')
+        self.assertEqual(estados, [False])
+        self.assertTrue(gc.isenabled())
+        freeze.assert_called_once_with()
+
+    def test_warm_up_doesnt_query_and_closes_the_connections(self):
+        with CaptureQueriesContext(connection) as consultas, mock.patch('django.db.connections.close_all') as close_all:
+            preload.warm_up()
+        self.assertEqual(len(consultas), 0)
+        close_all.assert_called_once_with()
+
+
+class ProductionSettingsTests(SimpleTestCase):
+
+    def settings_of(self, **entorno):
+        """
+        Returns some settings of skillswap.settings_production, loaded in a new interpreter with some environment.
+        """
+        codigo = (
+            'import json, django; from django.conf import settings; from django.urls import get_resolver; django.setup(); '
+            'print(json.dumps({"apps": settings.INSTALLED_APPS, "middleware": settings.MIDDLEWARE, "debug": settings.DEBUG, '
+            '"caches": {alias: c["BACKEND"] for alias, c in settings.CACHES.items()}, '
+            '"alias": [settings.CORE_CACHE["ALIAS"], settings.RATE_LIMITS["ALIAS"]], '
+            '"urls": [str(p.pattern) for p in get_resolver().url_patterns]}))'
+        )
+        entorno = {**os.environ, 'DJANGO_SETTINGS_MODULE': 'skillswap.settings_production', 'DJANGO_ADMIN': '0', **entorno}
+        entorno.pop('REDIS_URL', None)
+        salida = subprocess.run([sys.executable, '-c', codigo], env=entorno, cwd=settings.BASE_DIR, capture_output=True, text=True, check=True)
+        return json.loads(salida.stdout)
+
+    def test_lean_workers(self):
+        ajustes = self.settings_of()
+        self.assertFalse(ajustes['debug'])
+        self.assertFalse({'django.contrib.admin', 'django.contrib.messages', 'django.contrib.staticfiles'} & set(ajustes['apps']))
+        self.assertNotIn('django.contrib.messages.middleware.MessageMiddleware', ajustes['middleware'])
+        self.assertEqual(ajustes['urls'], ['api/'])
+        self.assertEqual(ajustes['caches']['shared'], 'django.core.cache.backends.db.DatabaseCache')
+        self.assertEqual(ajustes['alias'], ['shared', 'shared'])
+
+    def test_admin_workers(self):
+        ajustes = self.settings_of(DJANGO_ADMIN='1')
+        self.assertLessEqual({'django.contrib.admin', 'django.contrib.messages', 'django.contrib.staticfiles'}, set(ajustes['apps']))
+        self.assertEqual(ajustes['urls'], ['admin/', 'api/'])
@@ -0,0 +1,145 @@
+"""
+Tests of the rate limits of the write paths (core.ratelimit), on the local memory cache.
+"""
+import json
+from unittest import mock
+
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from core import ratelimit
+from core.models import Acuerdo, Publicacion
+from core.ratelimit import RateLimited, check
+
+from .factories import create_skill, create_user
+
+LIMITES = {
+    'publicacion': {'usuario': (10, 60), 'ip': (20, 60)},
+    'propuesta': {'usuario': (1, 3600), 'ip': (60, 3600)},
+}
+
+T0 = 60 * 1000.0  # Start of a window of every limit.
+
+
+@override_settings(RATE_LIMITS={'ENABLED': True, 'ALIAS': 'default', 'LIMITS': LIMITES})
+class RateLimitTests(TestCase):
+
+    def setUp(self):
+        ratelimit._bloqueadas.clear()
+        caches['default'].clear()
+
+    def attempts(self, veces, ahora, usuario_id=1, ip='203.0.113.7'):
+        for _ in range(veces):
+            check('publicacion', usuario_id, ip, ahora=ahora)
+
+    def test_allowed_up_to_the_limit(self):
+        self.attempts(10, T0 + 5)
+
+        with self.assertRaises(RateLimited) as contexto:
+            check('publicacion', 1, '203.0.113.7', ahora=T0 + 5)
+        self.assertEqual(contexto.exception.dimension, 'usuario')
+        self.assertEqual(contexto.exception.retry_after, 55)  # Not before the next window.
+
+        check('publicacion', 2, '203.0.113.8', ahora=T0 + 5)  # Other users and addresses aren't affected.
+
+    def test_sliding_window(self):
+        self.attempts(10, T0)
+
+        # A quarter into the next window, the previous one still weighs 3/4: 7.5 + 2 fits, 7.5 + 3 doesn't.
+        self.attempts(2, T0 + 75)
+        with self.assertRaises(RateLimited) as contexto:
+            check('publicacion', 1, '203.0.113.7', ahora=T0 + 75)
+        self.assertAlmostEqual(contexto.exception.retry_after, 3)
+
+        # Three seconds later it weighs 7: one more fits.
+        check('publicacion', 1, '203.0.113.7', ahora=T0 + 78)
+        with self.assertRaises(RateLimited):
+            check('publicacion', 1, '203.0.113.7', ahora=T0 + 78)
+
+        # Once their window has slid out, the old attempts are gone.
+        self.attempts(10, T0 + 180)
+
+    def test_refused_attempts_are_not_counted(self):
+        self.attempts(10, T0)
+        for _ in range(5):
+            with self.assertRaises(RateLimited):
+                check('publicacion', 1, '203.0.113.7', ahora=T0 + 1)
+        self.assertEqual(caches['default'].get(f'ratelimit:publicacion:usuario:1:{int(T0 // 60)}'), 10)
+
+        # Refused by the IP limit: the attempt isn't counted for the user either.
+        for usuario_id in range(2, 12):
+            check('publicacion', usuario_id, '198.51.100.1', ahora=T0 + 1)
+        self.attempts(10, T0 + 1, usuario_id=20, ip='198.51.100.1')
+        with self.assertRaises(RateLimited) as contexto:
+            check('publicacion', 21, '198.51.100.1', ahora=T0 + 1)
+        self.assertEqual(contexto.exception.dimension, 'ip')
+        self.assertEqual(caches['default'].get(f'ratelimit:publicacion:usuario:21:{int(T0 // 60)}', 0), 0)
+
+    def test_hot_keys_are_refused_locally(self):
+        self.attempts(10, T0)
+        with self.assertRaises(RateLimited):
+            check('publicacion', 1, '203.0.113.7', ahora=T0 + 30)
+
+        # Until it may pass again, the key is refused without reading the shared cache.
+        caches['default'].clear()
+        with self.assertRaises(RateLimited) as contexto:
+            check('publicacion', 1, '203.0.113.7', ahora=T0 + 50)
+        self.assertEqual(contexto.exception.retry_after, 10)
+        self.assertIsNone(caches['default'].get(f'ratelimit:publicacion:usuario:1:{int(T0 // 60)}'))
+
+        check('publicacion', 1, '203.0.113.7', ahora=T0 + 60)
+
+    def test_counters_gone_before_being_given_back(self):
+        for usuario_id in range(20):
+            check('publicacion', usuario_id, '198.51.100.1', ahora=T0 + 1)
+
+        # Refused by the IP limit after counting the user's attempt, whose counter expired or was evicted meanwhile.
+        with mock.patch.object(type(caches['default']), 'decr', side_effect=ValueError('Key not found')):
+            with self.assertRaises(RateLimited):
+                check('publicacion', 99, '198.51.100.1', ahora=T0 + 1)
+
+    def test_ipv6_clients_are_limited_per_network(self):
+        self.assertEqual(ratelimit.client_ip(type('Peticion', (), {'META': {'REMOTE_ADDR': '2001:db8::1'}})), '2001:db8::/64')
+
+
+@override_settings(RATE_LIMITS={'ENABLED': True, 'ALIAS': 'default', 'LIMITS': LIMITES})
+class RateLimitedViewsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuarios = [create_user(i) for i in range(2)]
+        cls.habilidades = [create_skill(i) for i in range(2)]
+        cls.usuarios[0].perfil.habilidades.add(cls.habilidades[0])
+
+    def setUp(self):
+        ratelimit._bloqueadas.clear()
+        caches['default'].clear()
+        self.client.force_login(self.usuarios[0])
+
+    def post(self, url, datos):
+        return self.client.post(url, json.dumps(datos), content_type='application/json')
+
+    def assertRefusedWithoutWriting(self, url, datos, model):
+        antes = model.objects.count()
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.post(url, datos)
+        self.assertEqual(respuesta.status_code, 429)
+        self.assertGreater(int(respuesta['Retry-After']), 0)
+        self.assertEqual(model.objects.count(), antes)
+        self.assertFalse([consulta for consulta in consultas if consulta['sql'].startswith(('INSERT', 'UPDATE'))])
+
+    def test_post_creation(self):
+        datos = {'tipo': 'OFREZCO', 'descripcion': 'Clases', 'habilidad': self.habilidades[0].pk}
+        for _ in range(10):
+            self.assertEqual(self.post('/api/publicaciones/', datos).status_code, 201)
+        self.assertRefusedWithoutWriting('/api/publicaciones/', datos, Publicacion)
+
+    def test_agreement_proposals(self):
+        datos = {
+            'usuario': self.usuarios[1].pk, 'habilidad_tradea_a': self.habilidades[0].pk,
+            'habilidad_tradea_b': self.habilidades[1].pk, 'condiciones': 'Una sesión por semana',
+        }
+        self.assertEqual(self.post('/api/acuerdos/', datos).status_code, 201)
+        self.assertRefusedWithoutWriting('/api/acuerdos/', {**datos, 'habilidad_tradea_b': self.habilidades[0].pk}, Acuerdo)
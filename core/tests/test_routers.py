@@ -0,0 +1,72 @@
+"""
+Tests of core.routers and ReplicaStickinessMiddleware, with two SQLite databases as primary and replica.
+"""
+from django.http import HttpResponse
+from django.test import RequestFactory, TransactionTestCase, override_settings
+
+from core.middleware import ReplicaStickinessMiddleware
+from core.models import Acuerdo, Habilidad, Perfil, Publicacion, Sesion, Usuario
+from core.routers import use_primary
+
+
+class PrimaryReplicaRouterTests(TransactionTestCase):
+    """
+    A TransactionTestCase: inside a transaction of the primary (every TestCase test) all reads go to the primary.
+
+    The router is on in each test only, as the flush of the databases after the test would skip the replica with it.
+    """
+    databases = {'default', 'replica1'}
+
+    def setUp(self):
+        self.enterContext(override_settings(DATABASE_ROUTERS=['core.routers.PrimaryReplicaRouter']))
+        # Rows only the replica has (the skill is bulk created: its signal would write to the primary).
+        self.usuario = Usuario.objects.using('replica1').create(username='replica', nombre='Réplica', alias='replica', email='r@example.com')
+        Habilidad.objects.using('replica1').bulk_create([Habilidad(nombre='Solo en la réplica')])
+
+    def test_catalogue_reads_go_to_the_replica(self):
+        for model in (Habilidad, Publicacion, Perfil):
+            self.assertEqual(model.objects.all().db, 'replica1', model.__name__)
+        self.assertTrue(Habilidad.objects.filter(nombre='Solo en la réplica').exists())
+
+    def test_agreements_and_sessions_go_to_the_primary(self):
+        for model in (Acuerdo, Sesion, Usuario):
+            self.assertEqual(model.objects.all().db, 'default', model.__name__)
+        self.assertFalse(Usuario.objects.filter(username='replica').exists())
+
+    def test_writes_go_to_the_primary_and_pin_the_reads(self):
+        Habilidad.objects.create(nombre='Nueva')
+        self.assertEqual(Habilidad.objects.all().db, 'default')
+        self.assertTrue(Habilidad.objects.filter(nombre='Nueva').exists())
+        self.assertFalse(Habilidad.objects.using('replica1').filter(nombre='Nueva').exists())
+
+    def test_use_primary(self):
+        with use_primary():
+            self.assertEqual(Habilidad.objects.all().db, 'default')
+        self.assertEqual(Habilidad.objects.all().db, 'replica1')
+
+    def test_stickiness_after_a_write(self):
+        leidas = []
+
+        def view(request):
+            if request.method == 'POST':
+                Habilidad.objects.create(nombre='Escrita')
+            leidas.append(Habilidad.objects.all().db)
+            return HttpResponse()
+
+        middleware = ReplicaStickinessMiddleware(view)
+        factory = RequestFactory()
+
+        respuesta = middleware(factory.get('/'))
+        self.assertNotIn(ReplicaStickinessMiddleware.cookie_name, respuesta.cookies)
+
+        respuesta = middleware(factory.post('/'))
+        cookie = respuesta.cookies[ReplicaStickinessMiddleware.cookie_name]
+        self.assertEqual(cookie['max-age'], 5)
+
+        # The next request of the same client still reads from the primary, another client from the replica.
+        peticion = factory.get('/')
+        peticion.COOKIES[ReplicaStickinessMiddleware.cookie_name] = cookie.value
+        middleware(peticion)
+        middleware(factory.get('/'))
+
+        self.assertEqual(leidas, ['replica1', 'default', 'default', 'replica1'])
@@ -0,0 +1,64 @@
+"""
+Tests of the session scheduler (core.scheduling): whole calendars in a few queries, and rescheduling that keeps the
+completed sessions.
+"""
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from core.models import Perfil, Sesion
+from core.scheduling import reschedule_sessions, schedule_sessions
+
+from .factories import create_agreement, create_skill, create_user
+
+
+class SchedulingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuarios = [create_user(i) for i in range(2)]
+        cls.habilidades = [create_skill(i) for i in range(2)]
+        Perfil.objects.update(disponibilidad='18:00-21:00')  # No weekday mentioned: every day.
+
+    def setUp(self):
+        self.hoy = timezone.localdate()
+        self.acuerdo = create_agreement(*self.usuarios, *self.habilidades, estado='EN CURSO')
+        self.acuerdo.semanas, self.acuerdo.sesiones_por_semana = 52, 7
+        self.acuerdo.save()
+
+    def test_a_year_of_daily_sessions(self):
+        # Profiles, agreement check, savepoint, existing sessions, 3 batches of sessions, 9 of reminders and release.
+        with self.assertNumQueries(17):
+            sesiones = schedule_sessions(self.acuerdo, inicio=self.hoy)
+
+        self.assertEqual(len(sesiones), 364)
+        self.assertEqual(Sesion.objects.filter(acuerdo=self.acuerdo).count(), 364)
+        self.assertEqual([sesion.fecha for sesion in sesiones], [self.hoy + timedelta(days=i) for i in range(364)])
+
+    def test_reschedule_keeps_only_the_completed_sessions(self):
+        schedule_sessions(self.acuerdo, inicio=self.hoy)
+        sesiones = list(Sesion.objects.filter(acuerdo=self.acuerdo).order_by('fecha'))
+        # Attended: completed. Before today: completed. From today on and unattended: pending, however close.
+        Sesion.objects.filter(pk=sesiones[3].pk).update(asistencia_user_a=True)
+        Sesion.objects.filter(pk=sesiones[-1].pk).update(fecha=self.hoy - timedelta(days=1))
+
+        inicio = self.hoy + timedelta(days=10)
+        # Profiles, savepoint, sessions, agreement check, stale days, 2 updates, old reminders, 9 batches and release.
+        with self.assertNumQueries(18):
+            resultado = reschedule_sessions(self.acuerdo, inicio=inicio)
+
+        self.assertEqual(resultado, {'updated': 362, 'created': 0, 'deleted': 0})
+        fechas = list(Sesion.objects.filter(acuerdo=self.acuerdo).order_by('fecha').values_list('fecha', flat=True))
+        self.assertEqual(fechas[:2], [self.hoy - timedelta(days=1), self.hoy + timedelta(days=3)])
+        self.assertEqual(fechas[2:], [inicio + timedelta(days=i) for i in range(362)])
+        self.assertEqual(Sesion.objects.get(pk=sesiones[0].pk).resumen, 'Session 3/364')
+
+    def test_reschedule_adds_and_removes_sessions(self):
+        schedule_sessions(self.acuerdo, inicio=self.hoy)
+
+        self.acuerdo.semanas = 53
+        self.assertEqual(reschedule_sessions(self.acuerdo), {'updated': 364, 'created': 7, 'deleted': 0})
+        self.acuerdo.semanas = 1
+        self.assertEqual(reschedule_sessions(self.acuerdo), {'updated': 7, 'created': 0, 'deleted': 364})
+        self.assertEqual(Sesion.objects.filter(acuerdo=self.acuerdo).count(), 7)
@@ -0,0 +1,112 @@
+"""
+Tests of the full-text search (core.search): the stemmer, and both index backends kept by the signals.
+"""
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from core import search
+from core.models import Perfil, Publicacion
+
+from .factories import create_skill, create_user
+
+
+class TokenizeTests(SimpleTestCase):
+
+    def test_tokenize(self):
+        self.assertEqual(search.tokenize('Busco profesor de inglés para conversación'), ['busc', 'profesor', 'ingl', 'convers'])
+        self.assertEqual(search.tokenize('Teaching the programmers', 'en'), ['teach', 'programm'])
+        self.assertEqual(search.tokenize(None), [])
+
+    def test_query_terms(self):
+        self.assertEqual(search.query_terms('profesores ingl'), ({'profesor'}, {'ingl'}))
+        self.assertEqual(search.query_terms('de la'), (set(), set()))
+
+    def test_backends_must_implement_every_operation(self):
+        class Incompleto(search.SearchBackend):
+            def bulk_index(self, tipo, documentos):
+                pass
+
+        with self.assertRaises(TypeError):
+            Incompleto()
+
+
+class BackendTests:
+    """
+    Search tests run on each backend (SEARCH_BACKEND of the subclass).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        search.get_backend.cache_clear()  # Indexed by the backend of this class from here on.
+        cls.addClassCleanup(search.get_backend.cache_clear)
+        ingles, guitarra = create_skill(0), create_skill(1, categoria='Música')
+        cls.usuarios = [create_user(i) for i in range(3)]
+        Perfil.objects.filter(usuario=cls.usuarios[2]).update(preferencias={'language': 'en'})
+
+        textos = (
+            (0, ingles, 'Clases de inglés para conversación'),
+            (0, ingles, 'Inglés avanzado y gramática'),
+            (1, guitarra, 'Clases de guitarra española'),
+            (2, ingles, 'English conversation classes'),
+        )
+        cls.publicaciones = [
+            Publicacion.objects.create(tipo='OFREZCO', descripcion=texto, autor=cls.usuarios[i], habilidad=habilidad)
+            for i, habilidad, texto in textos
+        ]
+        perfil = cls.usuarios[1].perfil
+        perfil.biografia = 'Profesora de guitarra y piano'
+        perfil.save()
+
+    def ids(self, pagina):
+        return [objeto.pk for objeto in pagina.resultados]
+
+    def test_ranking(self):
+        p = self.publicaciones
+        # Both terms first. "conversation", stemmed in English for its author, shares the stem of "conversación".
+        encontradas = self.ids(search.search_posts('conversación ingles'))
+        self.assertEqual((encontradas[0], set(encontradas[1:])), (p[0].pk, {p[1].pk, p[3].pk}))
+        self.assertEqual(set(self.ids(search.search_posts('clases'))), {p[0].pk, p[2].pk, p[3].pk})
+
+    def test_prefix_while_typing(self):
+        self.assertEqual(self.ids(search.search_posts('guita')), [self.publicaciones[2].pk])
+
+    def test_filters(self):
+        p = self.publicaciones
+        self.assertEqual(self.ids(search.search_posts('clases', categoria='Música')), [p[2].pk])
+        Publicacion.objects.filter(pk=p[0].pk).update(estado=False)
+        self.assertNotIn(p[0].pk, self.ids(search.search_posts('clases')))
+
+    def test_pages(self):
+        primera = search.search_posts('clases', por_pagina=2)
+        segunda = search.search_posts('clases', pagina=2, por_pagina=2)
+        self.assertEqual((len(primera.resultados), primera.hay_mas), (2, True))
+        self.assertEqual((len(segunda.resultados), segunda.hay_mas), (1, False))
+        self.assertFalse(set(self.ids(primera)) & set(self.ids(segunda)))
+
+    def test_index_follows_the_changes(self):
+        publicacion = self.publicaciones[2]
+        publicacion.descripcion = 'Clases de ukelele'
+        publicacion.save()
+        self.assertEqual(self.ids(search.search_posts('guitarra')), [])
+        self.assertEqual(self.ids(search.search_posts('ukelele')), [publicacion.pk])
+
+        publicacion.delete()
+        self.assertEqual(self.ids(search.search_posts('ukelele')), [])
+
+    def test_profiles(self):
+        self.assertEqual(self.ids(search.search_profiles('piano')), [self.usuarios[1].perfil.pk])
+
+    def test_rebuild(self):
+        search.get_backend().clear('publicacion')
+        self.assertEqual(self.ids(search.search_posts('guitarra')), [])
+        self.assertEqual(search.rebuild(chunk_size=2), 4 + 3)  # Posts and profiles.
+        self.assertEqual(self.ids(search.search_posts('guitarra')), [self.publicaciones[2].pk])
+
+
+@override_settings(SEARCH_BACKEND='fts5')
+class SQLiteFTSBackendTests(BackendTests, TestCase):
+    pass
+
+
+@override_settings(SEARCH_BACKEND='python')
+class InvertedIndexBackendTests(BackendTests, TestCase):
+    pass
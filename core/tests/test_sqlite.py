@@ -0,0 +1,69 @@
+"""
+Tests of the SQLite write queue (core.sqlite): group commit in the writer thread, errors, the caller's context and
+the writes of the API views.
+"""
+import threading
+from unittest import mock
+
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+
+from core import routers
+from core.models import Habilidad
+from core.sqlite import WriteQueue, save_instance, serialized_write
+
+
+def writer_name():
+    return threading.current_thread().name
+
+
+class WriteQueueTests(SimpleTestCase):
+    databases = {'default'}
+
+    def test_a_failing_function_doesnt_roll_back_the_others(self):
+        cola = WriteQueue()
+
+        def fallar():
+            raise ValueError('Fallo')
+
+        futuros = [cola.submit(writer_name), cola.submit(fallar), cola.submit(lambda: 42)]
+
+        self.assertEqual(futuros[0].result(), 'sqlite-writer')
+        with self.assertRaisesMessage(ValueError, 'Fallo'):
+            futuros[1].result()
+        self.assertEqual(futuros[2].result(), 42)
+
+
+@serialized_write
+def pin_and_report():
+    routers.pin_to_primary()
+    return writer_name(), routers.is_pinned()
+
+
+@override_settings(SQLITE_WRITE_QUEUE=True)
+class SerializedWriteTests(TransactionTestCase):
+
+    def test_runs_in_the_writer_thread_with_the_callers_context(self):
+        with routers.request_scope(sticky=True):
+            self.assertEqual(pin_and_report(), ('sqlite-writer', True))
+
+        with routers.request_scope() as escribio:
+            self.assertFalse(escribio())
+            pin_and_report()
+            self.assertTrue(escribio())  # The pinning set in the writer thread is the caller's.
+
+    @override_settings(SQLITE_WRITE_QUEUE=False)
+    def test_runs_in_the_calling_thread_when_the_queue_is_off(self):
+        self.assertEqual(pin_and_report()[0], threading.current_thread().name)
+
+    def test_saves_through_the_queue(self):
+        hilos, guardar = [], Habilidad.save
+
+        def save(instancia, *args, **kwargs):
+            hilos.append(writer_name())
+            return guardar(instancia, *args, **kwargs)
+
+        with mock.patch.object(Habilidad, 'save', save):
+            habilidad = save_instance(Habilidad(nombre='Python', categoria='Software'))
+
+        self.assertEqual(hilos, ['sqlite-writer'])
+        self.assertEqual(Habilidad.objects.get().pk, habilidad.pk)  # Committed.
@@ -0,0 +1,87 @@
+"""
+Tests of the per-user activity counters (core.stats), kept by the signals and rebuilt from scratch.
+"""
+from django.test import TestCase
+
+from core import stats
+from core.models import EstadisticasUsuario
+
+from .factories import create_agreement, create_session, create_skill, create_user
+
+
+def counters(usuario):
+    estadisticas = stats.get_stats(usuario)
+    return tuple(getattr(estadisticas, campo) for campo in stats.CAMPOS)
+
+
+class StatsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.a, cls.b = [create_user(i) for i in range(2)]
+        cls.habilidades = [create_skill(i) for i in range(2)]
+
+    def setUp(self):
+        self.acuerdo = create_agreement(self.a, self.b, *self.habilidades, estado='EN CURSO')
+
+    def test_finished_agreements(self):
+        self.acuerdo.estado = 'FINALIZADO'
+        self.acuerdo.save()
+        self.assertEqual((counters(self.a), counters(self.b)), ((1, 0, 0, 0), (1, 0, 0, 0)))
+
+        self.acuerdo.save()  # Saved again without changes: counted once.
+        self.assertEqual(counters(self.a), (1, 0, 0, 0))
+
+        self.acuerdo.delete()
+        self.assertEqual((counters(self.a), counters(self.b)), ((0, 0, 0, 0), (0, 0, 0, 0)))
+
+    def test_held_sessions(self):
+        sesion = create_session(self.acuerdo)
+        self.assertFalse(EstadisticasUsuario.objects.exists())  # Not held yet.
+
+        sesion.asistencia_user_a = True
+        sesion.duracion_real = 90
+        sesion.save()
+        self.assertEqual((counters(self.a), counters(self.b)), ((0, 1, 1, 90), (0, 1, 0, 0)))
+        self.assertEqual(stats.get_stats(self.a).horas_impartidas, 1.5)
+        self.assertEqual(stats.get_stats(self.b).tasa_asistencia, 0)
+
+        sesion.asistencia_user_b = True
+        sesion.save()
+        self.assertEqual((counters(self.a), counters(self.b)), ((0, 1, 1, 90), (0, 1, 1, 90)))
+
+        sesion.delete()
+        self.assertEqual((counters(self.a), counters(self.b)), ((0, 0, 0, 0), (0, 0, 0, 0)))
+
+    def test_users_without_counters(self):
+        with self.assertNumQueries(1):
+            estadisticas = stats.get_stats(self.a.pk)
+        self.assertTrue(estadisticas._state.adding)  # Not saved: no row is written until something counts.
+        self.assertEqual((counters(self.a), estadisticas.tasa_asistencia), ((0, 0, 0, 0), 1.0))
+
+    def test_rebuild_repairs_drift(self):
+        sesion = create_session(self.acuerdo)
+        sesion.asistencia_user_a = sesion.asistencia_user_b = True
+        sesion.save()
+        self.acuerdo.estado = 'FINALIZADO'
+        self.acuerdo.save()
+        esperados = (counters(self.a), counters(self.b))
+        EstadisticasUsuario.objects.filter(pk=self.a.pk).update(sesiones=40, minutos_impartidos=0)
+        EstadisticasUsuario.objects.filter(pk=self.b.pk).delete()
+
+        # A single range, in this thread: the workers of rebuild() have their own connections, outside the test
+        # transaction.
+        self.assertEqual(stats._rebuild_range(self.a.pk, self.b.pk + 1), 2)
+        self.assertEqual((counters(self.a), counters(self.b)), esperados)
+
+    def test_delta_for_users_with_and_without_counters(self):
+        c = create_user(2)
+        EstadisticasUsuario.objects.create(usuario=self.a, acuerdos_finalizados=2)
+        EstadisticasUsuario.objects.create(usuario=c)
+        delta = {(usuario.pk, 'acuerdos_finalizados'): 1 for usuario in (self.a, self.b, c)}
+
+        stats.apply_delta({}, delta)  # One UPDATE for the three: two rows exist, one is missing.
+        self.assertEqual([counters(usuario)[0] for usuario in (self.a, self.b, c)], [3, 1, 1])
+
+        stats.apply_delta(delta, {})
+        self.assertEqual([counters(usuario)[0] for usuario in (self.a, self.b, c)], [2, 0, 0])
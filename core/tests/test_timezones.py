@@ -0,0 +1,49 @@
+"""
+Tests of the timezone registry (core.timezones) and the lazy choices of Perfil.zona_horaria.
+"""
+from datetime import datetime, timezone as dt_timezone
+
+from django.core.exceptions import ValidationError
+from django.test import SimpleTestCase
+
+from core import timezones
+from core.models import Perfil
+
+
+class TimezonesTests(SimpleTestCase):
+
+    def test_choices_are_sorted_and_built_once(self):
+        choices = timezones.timezone_choices()
+        self.assertIs(timezones.timezone_choices(), choices)
+        self.assertEqual([valor for valor, _ in choices], sorted(timezones.available_timezones()))
+        self.assertIn(('Europe/Madrid', 'Europe/Madrid'), choices)
+
+    def test_is_valid_timezone(self):
+        self.assertTrue(timezones.is_valid_timezone('Europe/Madrid'))
+        self.assertFalse(timezones.is_valid_timezone('Mars/Olympus_Mons'))
+        self.assertFalse(timezones.is_valid_timezone(''))
+
+    def test_zones_are_cached(self):
+        self.assertIs(timezones.get_zone('America/Bogota'), timezones.get_zone('America/Bogota'))
+
+    def test_to_local(self):
+        valor = datetime(2025, 7, 1, 12, 0, tzinfo=dt_timezone.utc)
+        local = timezones.to_local(valor, 'Europe/Madrid')
+        self.assertEqual((local.hour, local.utcoffset().total_seconds()), (14, 7200))
+        self.assertEqual(local, valor)
+
+
+class TimeZoneFieldTests(SimpleTestCase):
+
+    def setUp(self):
+        self.campo = Perfil._meta.get_field('zona_horaria')
+
+    def test_choices_are_lazy(self):
+        self.assertEqual(self.campo.choices, list(timezones.timezone_choices()))
+
+    def test_validate(self):
+        self.campo.validate('Europe/Madrid', None)
+        for valor, codigo in (('Mars/Olympus_Mons', 'invalid_choice'), ('', 'blank'), (None, 'null')):
+            with self.subTest(valor=valor), self.assertRaises(ValidationError) as contexto:
+                self.campo.validate(valor, None)
+            self.assertEqual(contexto.exception.code, codigo)
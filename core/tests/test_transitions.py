@@ -0,0 +1,74 @@
+"""
+Tests of the agreement state machine (core.transitions): conditional UPDATEs that only one of two concurrent
+transitions can win, and the counters and notifications that follow them once.
+"""
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+
+from core import stats, transitions
+from core.models import Acuerdo, Notificacion
+
+from .factories import create_agreement, create_session, create_skill, create_user
+
+
+class TransitionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.a, cls.b = [create_user(i) for i in range(2)]
+        cls.habilidades = [create_skill(i) for i in range(5)]
+
+    def agreement(self, estado, i=1):
+        # Only one active agreement per users and skills (unique_acuerdo_activo): i picks the skill taught back.
+        return create_agreement(self.a, self.b, self.habilidades[0], self.habilidades[i], estado=estado)
+
+    def test_a_second_transition_from_the_same_state_is_refused(self):
+        acuerdo = self.agreement('EN CURSO')
+        # Two clicks that saw the agreement ongoing: one finishes it, the other one tries to cancel it.
+        visto_1, visto_2 = Acuerdo.objects.get(pk=acuerdo.pk), Acuerdo.objects.get(pk=acuerdo.pk)
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.assertTrue(transitions.finish(visto_1))
+            self.assertFalse(transitions.cancel(visto_2))
+            self.assertFalse(transitions.finish(acuerdo.pk, origen='EN CURSO'))
+        self.assertEqual(len(callbacks), 1)  # acuerdo_transitioned, once.
+
+        acuerdo.refresh_from_db()
+        self.assertEqual((acuerdo.estado, visto_1.estado, visto_2.estado), ('FINALIZADO', 'FINALIZADO', 'EN CURSO'))
+        self.assertEqual((stats.get_stats(self.a).acuerdos_finalizados, stats.get_stats(self.b).acuerdos_finalizados), (1, 1))
+
+    def test_a_cancellation_is_notified_once(self):
+        acuerdo = self.agreement('ACEPTADO')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(transitions.cancel(acuerdo.pk))
+            self.assertFalse(transitions.cancel(acuerdo.pk, origen='ACEPTADO'))
+        self.assertEqual(Notificacion.objects.filter(tipo='acuerdo_cancelado').count(), 2)  # One per user.
+
+    def test_transitions_by_id(self):
+        acuerdo = self.agreement('PROPUESTO')
+        self.assertTrue(transitions.accept(acuerdo.pk))
+        self.assertTrue(transitions.cancel(acuerdo.pk))  # From any allowed state.
+        self.assertFalse(transitions.cancel(acuerdo.pk))
+        self.assertEqual(Acuerdo.objects.get(pk=acuerdo.pk).estado, 'CANCELADO')
+
+    def test_forbidden_transitions(self):
+        acuerdo = self.agreement('PROPUESTO')
+        with self.assertRaises(ValidationError):
+            transitions.finish(acuerdo)
+        with self.assertRaises(ValidationError):
+            transitions.transition(acuerdo.pk, 'INVENTADO')
+        self.assertFalse(transitions.finish(acuerdo.pk))  # No allowed source state.
+        self.assertEqual(transitions.sources('CANCELADO'), ('PROPUESTO', 'ACEPTADO', 'EN CURSO'))
+
+    def test_bulk_transition_skips_the_moved_ones(self):
+        pasadas = [self.agreement('EN CURSO', i) for i in range(1, 4)]
+        for acuerdo in pasadas:
+            create_session(acuerdo, dias=-1)
+        futura = self.agreement('EN CURSO', 4)
+        create_session(futura, dias=1)
+        transitions.cancel(pasadas[0])
+
+        self.assertEqual(transitions.finalize_completed(), 2)
+        self.assertEqual(transitions.finalize_completed(), 0)
+        self.assertEqual(stats.get_stats(self.a).acuerdos_finalizados, 2)
+        self.assertEqual(Acuerdo.objects.get(pk=futura.pk).estado, 'EN CURSO')
@@ -0,0 +1,132 @@
+"""
+Tests of the JSON API (core.views): the async read views, run through the async test client, and the validation of
+the write views.
+"""
+import asyncio
+import json
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import TestCase
+
+from core import cache, ratelimit, views
+from core.models import Acuerdo, Publicacion
+
+from .factories import create_agreement, create_post, create_session, create_skill, create_user
+
+
+class AsyncViewsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuarios = [create_user(i) for i in range(3)]
+        cls.habilidades = [create_skill(i) for i in range(2)]
+        cls.publicaciones = [create_post(cls.usuarios[i % 2], cls.habilidades[i % 2]) for i in range(5)]
+        cls.acuerdo = create_agreement(*cls.usuarios[:2], *cls.habilidades, estado='EN CURSO')
+        create_session(cls.acuerdo, dias=1)
+        create_session(cls.acuerdo, dias=8, activa=False)
+
+    def setUp(self):
+        cache.cache.local.clear()
+        cache.cache.shared.clear()
+
+    def test_the_read_views_are_async(self):
+        for vista in (views.feed, views.skill_catalogue, views.profile, views.skill_recommendations, views.agreement_detail):
+            with self.subTest(vista=vista.__name__):
+                self.assertTrue(asyncio.iscoroutinefunction(vista))
+
+    async def test_feed(self):
+        respuesta = await self.async_client.get('/api/feed/', {'limit': 3})
+        datos = respuesta.json()
+        self.assertEqual([publicacion['id'] for publicacion in datos['resultados']], [p.pk for p in self.publicaciones[:1:-1]])
+
+        siguiente = (await self.async_client.get('/api/feed/', {'limit': 3, 'cursor': datos['siguiente']})).json()
+        self.assertEqual([publicacion['id'] for publicacion in siguiente['resultados']], [p.pk for p in self.publicaciones[1::-1]])
+        self.assertIsNone(siguiente['siguiente'])
+
+        self.assertEqual((await self.async_client.get('/api/feed/', {'cursor': 'roto'})).status_code, 400)
+        self.assertEqual((await self.async_client.post('/api/feed/')).status_code, 405)
+
+    async def test_skill_catalogue(self):
+        respuesta = await self.async_client.get('/api/habilidades/')
+        self.assertEqual([habilidad['nombre'] for habilidad in respuesta.json()['categorias']['Idiomas']], ['Habilidad 0', 'Habilidad 1'])
+
+    async def test_profile(self):
+        usuario = self.usuarios[0]
+        datos = (await self.async_client.get(f'/api/perfiles/{usuario.pk}/')).json()
+        self.assertEqual(datos['total_publicaciones'], 3)
+        self.assertEqual([publicacion['id'] for publicacion in datos['publicaciones']], [p.pk for p in self.publicaciones[::-2]])
+        self.assertEqual(datos['estadisticas']['acuerdos_finalizados'], 0)  # No counters yet.
+
+        self.assertEqual((await self.async_client.get('/api/perfiles/999/')).status_code, 404)
+
+    async def test_agreement_detail_only_for_its_users(self):
+        url = f'/api/acuerdos/{self.acuerdo.pk}/'
+        self.assertEqual((await self.async_client.get(url)).status_code, 404)
+
+        await self.async_client.aforce_login(self.usuarios[2])
+        self.assertEqual((await self.async_client.get(url)).status_code, 404)
+
+        await self.async_client.aforce_login(self.usuarios[1])
+        datos = (await self.async_client.get(url)).json()
+        self.assertEqual([usuario['id'] for usuario in datos['usuarios']], [u.pk for u in self.usuarios[:2]])
+        self.assertEqual((len(datos['sesiones']), datos['sesiones_activas']), (2, 1))
+
+
+class WriteViewsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuarios = [create_user(i) for i in range(2)]
+        cls.habilidades = [create_skill(i) for i in range(3)]
+        cls.usuarios[0].perfil.habilidades.add(cls.habilidades[0])
+        create_post(cls.usuarios[0], cls.habilidades[2])  # Offered in a post.
+
+    def setUp(self):
+        ratelimit._bloqueadas.clear()
+        caches['default'].clear()
+        self.client.force_login(self.usuarios[0])
+
+    def post(self, url, datos):
+        return self.client.post(url, json.dumps(datos), content_type='application/json')
+
+    def proposal(self, **cambios):
+        return {
+            'usuario': self.usuarios[1].pk, 'habilidad_tradea_a': self.habilidades[0].pk,
+            'habilidad_tradea_b': self.habilidades[1].pk, 'condiciones': 'Una sesión por semana', **cambios,
+        }
+
+    def test_create_post(self):
+        datos = {'tipo': 'BUSCO', 'descripcion': 'Clases de guitarra', 'habilidad': self.habilidades[1].pk}
+        respuesta = self.post('/api/publicaciones/', datos)
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual(Publicacion.objects.get(pk=respuesta.json()['id']).descripcion, 'Clases de guitarra')
+
+        for descripcion in (['Clases'], {'texto': 'Clases'}, 42):
+            with self.subTest(descripcion=descripcion):
+                respuesta = self.post('/api/publicaciones/', {**datos, 'descripcion': descripcion})
+                self.assertEqual(respuesta.status_code, 400)
+                self.assertEqual(respuesta.json()['errores'], {'descripcion': ['It must be a string.']})
+        self.assertEqual(self.post('/api/publicaciones/', [datos]).json(), {'error': 'The body must be a JSON object.'})
+        self.assertEqual(Publicacion.objects.filter(autor=self.usuarios[0]).count(), 2)
+
+    def test_proposals_only_teach_skills_of_the_proposer(self):
+        self.assertEqual(self.post('/api/acuerdos/', self.proposal()).status_code, 201)  # In the profile.
+        self.assertEqual(self.post('/api/acuerdos/', self.proposal(habilidad_tradea_a=self.habilidades[2].pk)).status_code, 201)
+
+        ajena = self.proposal(habilidad_tradea_a=self.habilidades[1].pk, habilidad_tradea_b=self.habilidades[0].pk)
+        respuesta = self.post('/api/acuerdos/', ajena)
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('habilidad_tradea_a', respuesta.json()['errores'])
+        self.assertEqual(self.post('/api/acuerdos/', self.proposal(condiciones=None)).json()['errores'], {'condiciones': ['It must be a string.']})
+        self.assertEqual(Acuerdo.objects.count(), 2)
+
+    def test_a_proposal_made_meanwhile_is_a_conflict(self):
+        self.assertEqual(self.post('/api/acuerdos/', self.proposal()).status_code, 201)
+        self.assertEqual(self.post('/api/acuerdos/', self.proposal()).status_code, 400)  # Seen by full_clean().
+
+        # Both requests passed full_clean() before either one saved: the database refuses the second one.
+        with mock.patch.object(Acuerdo, 'validate_constraints'):
+            respuesta = self.post('/api/acuerdos/', self.proposal())
+        self.assertEqual(respuesta.status_code, 409)
+        self.assertEqual(Acuerdo.objects.count(), 1)  # And the request's transaction is still usable.
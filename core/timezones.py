@@ -0,0 +1,137 @@
+"""
+Timezone registry for SkillSwap.
+
+Builds the list of available timezones once, on first use, and caches the ZoneInfo objects so converting dates to
+a user's local time never hits the tzdata files on disk more than once per process.
+"""
+import zoneinfo
+from functools import lru_cache
+
+from django.core.exceptions import ValidationError
+from django.db import models
+from django.utils import timezone
+
+
+@lru_cache(maxsize=None)
+def available_timezones():
+    """
+    Returns the set of available timezone keys.
+
+    zoneinfo.available_timezones() walks the whole tzdata tree, so it's only called once per process.
+
+    Returns:
+        frozenset: Available timezone keys.
+
+    Example:
+        >>> 'Europe/Madrid' in available_timezones()
+        True
+    """
+    return frozenset(zoneinfo.available_timezones())
+
+
+@lru_cache(maxsize=None)
+def timezone_choices():
+    """
+    Returns a list of available timezones
+
+    Gives a list of available timezones, sorted and cached after the first call.
+    You can see the list of available timezones here: https://en.wikipedia.org/wiki/List_of_tz_database_time_zones
+
+    Returns:
+        tuple: List of available timezones as (value, label) choices
+
+    Example:
+    >>> timezone_choices()
+    """
+    return tuple((tz, tz) for tz in sorted(available_timezones()))
+
+
+def is_valid_timezone(key):
+    """
+    Checks if a timezone key exists.
+
+    Args:
+        key (str): Timezone key (e.g. "Europe/Madrid").
+
+    Returns:
+        bool: True if the timezone exists.
+
+    Example:
+        >>> is_valid_timezone("Europe/Madrid")
+        True
+        >>> is_valid_timezone("Mars/Olympus_Mons")
+        False
+    """
+    return key in available_timezones()
+
+
+@lru_cache(maxsize=None)
+def get_zone(key):
+    """
+    Returns the ZoneInfo object of a timezone.
+
+    ZoneInfo only keeps a few zones strongly cached, so this keeps every zone used by the process alive.
+
+    Args:
+        key (str): Timezone key (e.g. "Europe/Madrid").
+
+    Returns:
+        zoneinfo.ZoneInfo: Timezone object.
+
+    Raises:
+        zoneinfo.ZoneInfoNotFoundError: If the timezone doesn't exist.
+    """
+    return zoneinfo.ZoneInfo(key)
+
+
+def to_local(value, key):
+    """
+    Converts an aware datetime to the local time of a timezone.
+
+    Args:
+        value (datetime.datetime): Aware datetime.
+        key (str): Timezone key (e.g. Perfil.zona_horaria).
+
+    Returns:
+        datetime.datetime: Datetime in the given timezone.
+
+    Example:
+        >>> from django.utils import timezone
+        >>> to_local(timezone.now(), perfil.zona_horaria)
+    """
+    return timezone.localtime(value, get_zone(key))
+
+
+class TimeZoneField(models.CharField):
+    """
+    CharField that stores a timezone key.
+
+    Its choices are computed lazily (they aren't built when core.models is imported) and values are validated with
+    a set lookup instead of scanning the ~600 choices.
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('max_length', 100)
+        kwargs.setdefault('choices', timezone_choices)
+        super().__init__(*args, **kwargs)
+
+    def validate(self, value, model_instance):
+        """
+        Validates the value of the field.
+
+        Same checks as Field.validate(), but the choices check is a set lookup.
+
+        Raises:
+            ValidationError: If the timezone doesn't exist or the field is empty when it can't be.
+        """
+        if not self.editable:
+            return
+
+        if value not in self.empty_values and not is_valid_timezone(value):
+            raise ValidationError(self.error_messages['invalid_choice'], code='invalid_choice', params={'value': value})
+
+        if value is None and not self.null:
+            raise ValidationError(self.error_messages['null'], code='null')
+
+        if not self.blank and value in self.empty_values:
+            raise ValidationError(self.error_messages['blank'], code='blank')
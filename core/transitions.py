@@ -0,0 +1,319 @@
+"""
+State machine of the agreements (Acuerdo.estado).
+
+    PROPUESTO -> ACEPTADO -> EN CURSO -> FINALIZADO
+        \\            \\           \\
+         +------------+-----------+-> CANCELADO
+
+Every transition is a single conditional ``UPDATE ... SET estado = <new> WHERE id = ... AND estado = <expected>``,
+so concurrent clicks (e.g. accept and cancel at the same time) can never both win: the first UPDATE changes the row
+and the second one matches nothing and returns False. Nothing else of the row is written but fecha_modificacion.
+
+The notifications of the users (core.outbox) are written in the same transaction. After it commits,
+acuerdo_transitioned is sent once per group of agreements that moved together.
+
+Example:
+    >>> accept(acuerdo)
+    True
+    >>> cancel(acuerdo)  # Someone else already accepted and finished it
+    False
+"""
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.dispatch import Signal
+from django.utils import timezone
+
+from . import outbox, stats
+from .models import Acuerdo, Sesion
+from .sqlite import serialized_write
+
+TRANSITIONS = {
+    'PROPUESTO': ('ACEPTADO', 'CANCELADO'),
+    'ACEPTADO': ('EN CURSO', 'CANCELADO'),
+    'EN CURSO': ('FINALIZADO', 'CANCELADO'),
+    'FINALIZADO': (),
+    'CANCELADO': (),
+}
+
+# Sent (after commit) when agreements change state. Arguments: acuerdo_ids (list[int]), origen (str), destino (str).
+acuerdo_transitioned = Signal()
+
+
+def sources(destino):
+    """
+    Returns the states an agreement can move to a state from.
+
+    Args:
+        destino (str): Target state.
+
+    Returns:
+        tuple[str]: Source states.
+
+    Raises:
+        ValidationError: If the state doesn't exist.
+
+    Example:
+        >>> sources('CANCELADO')
+        ('PROPUESTO', 'ACEPTADO', 'EN CURSO')
+    """
+    if destino not in TRANSITIONS:
+        raise ValidationError(f"The agreement status '{destino}' doesn't exist.")
+    return tuple(origen for origen, destinos in TRANSITIONS.items() if destino in destinos)
+
+
+def can_transition(origen, destino):
+    """
+    Returns True if an agreement can move from a state to another.
+
+    Args:
+        origen (str): Current state.
+        destino (str): Target state.
+
+    Returns:
+        bool: True if the transition is allowed.
+    """
+    return destino in TRANSITIONS.get(origen, ())
+
+
+def _finished(filas):
+    """
+    Adds the finished agreements to the counters of their users.
+
+    Conditional UPDATEs don't send pre_save/post_save, so core.signals can't do it.
+
+    Args:
+        filas (list[tuple]): (id, usuario_a_id, usuario_b_id) of the finished agreements.
+    """
+    contribucion = {}
+    for _, usuario_a_id, usuario_b_id in filas:
+        for clave, cantidad in stats.acuerdo_contribution(usuario_a_id, usuario_b_id, 'FINALIZADO').items():
+            contribucion[clave] = contribucion.get(clave, 0) + cantidad
+    stats.apply_delta({}, contribucion)
+
+
+def _send(acuerdo_ids, origen, destino):
+    """
+    Sends acuerdo_transitioned after the current transaction commits.
+    """
+    transaction.on_commit(lambda: acuerdo_transitioned.send(sender=Acuerdo, acuerdo_ids=acuerdo_ids, origen=origen, destino=destino))
+
+
+@serialized_write
+def transition(acuerdo, destino, origen=None):
+    """
+    Moves an agreement to another state, if nobody has moved it first.
+
+    The transition only happens if the row is still in the expected state: ``origen``, or the state of the instance
+    (optimistic concurrency). With an id and no ``origen`` it happens from any allowed source state. The instance,
+    if given, is updated.
+
+    Args:
+        acuerdo (Acuerdo | int): Agreement (or agreement id).
+        destino (str): Target state.
+        origen (str | None): Expected current state (e.g. the one the user saw when clicking).
+
+    Returns:
+        bool: True if the agreement changed state, False if it was no longer in an expected state.
+
+    Raises:
+        ValidationError: If the expected state can't move to ``destino``.
+    """
+    if origen is None and isinstance(acuerdo, Acuerdo):
+        origen = acuerdo.estado
+    if origen is not None and not can_transition(origen, destino):
+        raise ValidationError(f"An agreement can't go from '{origen}' to '{destino}'.")
+    origenes = (origen,) if origen else sources(destino)
+
+    pk = getattr(acuerdo, 'pk', acuerdo)
+    with transaction.atomic():
+        if isinstance(acuerdo, Acuerdo):
+            fila = (pk, acuerdo.usuario_a_id, acuerdo.usuario_b_id, origen)
+        else:
+            fila = (  # The users are needed for the counters, and the state to know which one to expect.
+                Acuerdo.objects.select_for_update()
+                .filter(pk=pk, estado__in=origenes)
+                .values_list('id', 'usuario_a_id', 'usuario_b_id', 'estado')
+                .first()
+            )
+        if fila is None or not Acuerdo.objects.filter(pk=pk, estado=fila[3]).update(estado=destino, fecha_modificacion=timezone.now()):
+            return False
+
+        if destino == 'FINALIZADO':
+            _finished([fila[:3]])
+        outbox.agreements_transitioned([fila[:3]], destino)
+        _send([pk], fila[3], destino)
+
+    if isinstance(acuerdo, Acuerdo):
+        acuerdo.estado = destino
+    return True
+
+
+def accept(acuerdo, origen=None):
+    """
+    Accepts a proposed agreement. See transition().
+    """
+    return transition(acuerdo, 'ACEPTADO', origen)
+
+
+def start(acuerdo, origen=None):
+    """
+    Starts an accepted agreement. See transition().
+    """
+    return transition(acuerdo, 'EN CURSO', origen)
+
+
+def finish(acuerdo, origen=None):
+    """
+    Finishes an ongoing agreement. See transition().
+    """
+    return transition(acuerdo, 'FINALIZADO', origen)
+
+
+def cancel(acuerdo, origen=None):
+    """
+    Cancels an agreement that hasn't finished. See transition().
+    """
+    return transition(acuerdo, 'CANCELADO', origen)
+
+
+@serialized_write
+def bulk_transition(acuerdos, destino):
+    """
+    Moves every agreement of a queryset that is in an allowed source state to another state.
+
+    The rows are locked (SELECT ... FOR UPDATE where supported) and moved with one conditional UPDATE per source
+    state, so agreements moved concurrently by someone else are skipped, not overwritten.
+
+    Args:
+        acuerdos (QuerySet): Agreements to move.
+        destino (str): Target state.
+
+    Returns:
+        int: Number of agreements that changed state.
+
+    Example:
+        >>> bulk_transition(Acuerdo.objects.for_user(usuario).active(), 'CANCELADO')
+        3
+    """
+    origenes = sources(destino)
+    with transaction.atomic():
+        filas = list(
+            acuerdos.filter(estado__in=origenes).select_for_update().order_by('pk')
+            .values_list('id', 'usuario_a_id', 'usuario_b_id', 'estado')
+        )
+        movidas = []
+        for origen in origenes:
+            grupo = [fila for fila in filas if fila[3] == origen]
+            ids = [fila[0] for fila in grupo]
+            if ids and Acuerdo.objects.filter(pk__in=ids, estado=origen).update(estado=destino, fecha_modificacion=timezone.now()):
+                movidas.extend(grupo)
+                _send(ids, origen, destino)
+
+        if destino == 'FINALIZADO':
+            _finished([fila[:3] for fila in movidas])
+        outbox.agreements_transitioned([fila[:3] for fila in movidas], destino)
+    return len(movidas)
+
+
+def completed(hoy=None):
+    """
+    Returns the ongoing agreements whose last session has already passed.
+
+    Args:
+        hoy (date | None): Reference date (today by default).
+
+    Returns:
+        QuerySet: Agreements with sessions and none of them today or later.
+    """
+    hoy = hoy or timezone.localdate()
+    return (
+        Acuerdo.objects.filter(estado='EN CURSO')
+        .filter(Exists(Sesion.objects.filter(acuerdo=OuterRef('pk'))))
+        .exclude(Exists(Sesion.objects.filter(acuerdo=OuterRef('pk'), fecha__gte=hoy)))
+    )
+
+
+def finalize_completed(hoy=None):
+    """
+    Finishes every ongoing agreement whose last session has already passed.
+
+    Args:
+        hoy (date | None): Reference date (today by default).
+
+    Returns:
+        int: Number of finished agreements.
+    """
+    return bulk_transition(completed(hoy), 'FINALIZADO')
+
+
+def stale_proposals(dias, ahora=None):
+    """
+    Returns the proposals that have been waiting for an answer for too long.
+
+    Args:
+        dias (int): Days a proposal may wait.
+        ahora (datetime | None): Reference time (now by default).
+
+    Returns:
+        QuerySet: Proposed agreements created more than ``dias`` days ago.
+    """
+    ahora = ahora or timezone.now()
+    return Acuerdo.objects.filter(estado='PROPUESTO', fecha_creacion__lt=ahora - timedelta(days=dias))
+
+
+@dataclass
+class Lote:
+    """
+    Result of a chunk of transition_in_chunks().
+
+    Attributes:
+        ultimo_id (int): Last agreement id scanned (where the next chunk starts).
+        revisados (int): Agreements scanned.
+        cambiados (int): Agreements that changed state (or would, in a dry run).
+    """
+    ultimo_id: int
+    revisados: int
+    cambiados: int
+
+
+def transition_in_chunks(acuerdos, origen, destino, chunk_size=1000, desde=0, dry_run=False):
+    """
+    Moves the agreements of a queryset to another state, a chunk of ids at a time.
+
+    Every agreement in ``origen`` is scanned in id order (keyset, served by the (estado, id) index), ``chunk_size``
+    ids per query; the ones of each chunk that match ``acuerdos`` are moved with bulk_transition(), in a short
+    transaction of their own. Memory and lock time stay constant, whatever the number of rows.
+
+    Args:
+        acuerdos (QuerySet): Agreements to move (e.g. completed()).
+        origen (str): Current state of the agreements.
+        destino (str): Target state.
+        chunk_size (int): Agreements scanned per chunk.
+        desde (int): Start after this agreement id (to resume an interrupted run).
+        dry_run (bool): Only count the agreements that would change state.
+
+    Yields:
+        Lote: Result of each chunk.
+
+    Example:
+        >>> for lote in transition_in_chunks(completed(), 'EN CURSO', 'FINALIZADO'):
+        ...     print(lote.ultimo_id, lote.cambiados)
+    """
+    if not can_transition(origen, destino):
+        raise ValidationError(f"An agreement can't go from '{origen}' to '{destino}'.")
+
+    ultimo_id = desde
+    while True:
+        ids = list(
+            Acuerdo.objects.filter(estado=origen, pk__gt=ultimo_id).order_by('pk').values_list('pk', flat=True)[:chunk_size]
+        )
+        if not ids:
+            return
+        lote = acuerdos.filter(pk__in=ids, estado=origen)
+        cambiados = lote.count() if dry_run else bulk_transition(lote, destino)
+        ultimo_id = ids[-1]
+        yield Lote(ultimo_id, len(ids), cambiados)
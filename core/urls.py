@@ -0,0 +1,17 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'core'
+
+urlpatterns = [
+    path('feed/', views.feed, name='feed'),
+    path('habilidades/', views.skill_catalogue, name='skill_catalogue'),
+    path('perfiles/<int:usuario_id>/', views.profile, name='profile'),
+    path('perfiles/<int:usuario_id>/recomendaciones/', views.skill_recommendations, name='skill_recommendations'),
+    path('publicaciones/', views.create_post, name='create_post'),
+    path('acuerdos/', views.propose_agreement, name='propose_agreement'),
+    path('acuerdos/<int:pk>/', views.agreement_detail, name='agreement_detail'),
+    path('exportar/<str:nombre>/', views.export_dataset, name='export_dataset'),
+    path('analitica/<str:nombre>/', views.analytics_series, name='analytics_series'),
+]
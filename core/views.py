@@ -1,3 +1,412 @@
-from django.shortcuts import render
+"""
+JSON API of SkillSwap.
 
-# Create your views here.
+The hot read paths (feed, skill catalogue, profile, skill recommendations and agreement detail) are async views,
+served without blocking a worker per request when the project runs under skillswap.asgi. They use the async ORM, and
+gather the independent reads of a page with asyncio.gather() instead of running them one after another.
+
+The data export for admins (export_dataset) is a sync view that streams its file row by row (core.export), and the
+dashboard series (analytics_series) are read from the rollups of core.analytics.
+
+The public read paths don't use the preferences of the user (without_preferences), so signed-in requests take the
+same queries as anonymous ones.
+
+Creating posts and proposing agreements (create_post, propose_agreement) are sync views, rate limited per user and
+IP before anything is validated or written (core.ratelimit). Their writes go through the SQLite write queue when it's
+on (core.sqlite).
+"""
+import asyncio
+import json
+from dataclasses import asdict
+from datetime import timedelta
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError
+from django.db.models import Q
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.views.decorators.http import require_GET, require_POST
+
+from . import analytics, cache, export, recommendations
+from .instrumentation import query_budget
+from .models import Acuerdo, EstadisticasUsuario, Habilidad, Publicacion
+from .ratelimit import rate_limited
+from .pagination import aposts_feed
+from .preferences import without_preferences
+from .sqlite import save_instance
+
+MAX_POR_PAGINA = 100
+
+
+def serialize_post(publicacion):
+    """
+    Returns a post (loaded with Publicacion.objects.for_feed()) as a dictionary.
+
+    Args:
+        publicacion (Publicacion): Post with its author and skill.
+
+    Returns:
+        dict: JSON-serializable post.
+    """
+    return {
+        'id': publicacion.pk,
+        'tipo': publicacion.tipo,
+        'descripcion': publicacion.descripcion,
+        'fecha_creacion': publicacion.fecha_creacion.isoformat(),
+        'autor': {'id': publicacion.autor.pk, 'nombre': publicacion.autor.nombre, 'alias': publicacion.autor.alias},
+        'habilidad': {'id': publicacion.habilidad.pk, 'nombre': publicacion.habilidad.nombre, 'categoria': publicacion.habilidad.categoria},
+    }
+
+
+def serialize_stats(estadisticas):
+    """
+    Returns the counters of a user as a dictionary.
+
+    Args:
+        estadisticas (EstadisticasUsuario): Counters of the user.
+
+    Returns:
+        dict: JSON-serializable counters.
+    """
+    return {
+        'acuerdos_finalizados': estadisticas.acuerdos_finalizados,
+        'sesiones': estadisticas.sesiones,
+        'asistencias': estadisticas.asistencias,
+        'tasa_asistencia': estadisticas.tasa_asistencia,
+        'horas_impartidas': estadisticas.horas_impartidas,
+    }
+
+
+def _por_pagina(request, defecto=20):
+    """
+    Returns the page size asked for in the query string (?limit=), between 1 and MAX_POR_PAGINA.
+    """
+    try:
+        return max(1, min(int(request.GET.get('limit', defecto)), MAX_POR_PAGINA))
+    except ValueError:
+        return defecto
+
+
+@require_GET
+@query_budget(1)
+@without_preferences
+async def feed(request):
+    """
+    Returns a page of the feed of active posts, newest first (?cursor=...&limit=...).
+    """
+    try:
+        pagina = await aposts_feed(request.GET.get('cursor'), _por_pagina(request))
+    except ValidationError as error:
+        return JsonResponse({'error': error.messages[0]}, status=400)
+
+    return JsonResponse({
+        'resultados': [serialize_post(publicacion) for publicacion in pagina.resultados],
+        'siguiente': pagina.siguiente,
+    })
+
+
+@require_GET
+@query_budget(1)
+@without_preferences
+async def skill_catalogue(request):
+    """
+    Returns the active skills grouped by category (served from core.cache).
+    """
+    return JsonResponse({'categorias': await sync_to_async(cache.skill_catalogue)()})
+
+
+async def _recent_posts(usuario_id, limite=5):
+    """
+    Returns the newest active posts of a user.
+    """
+    publicaciones = Publicacion.objects.for_feed().by_author(usuario_id).order_by('-fecha_creacion', '-id')[:limite]
+    return [publicacion async for publicacion in publicaciones]
+
+
+@require_GET
+@query_budget(6)
+@without_preferences
+async def profile(request, usuario_id):
+    """
+    Returns the profile of a user with their counters, number of active posts and newest posts.
+
+    The four reads are independent, so they're gathered together.
+    """
+    perfil, estadisticas, total_publicaciones, recientes = await asyncio.gather(
+        sync_to_async(cache.profile_bundle)(usuario_id),
+        EstadisticasUsuario.objects.filter(pk=usuario_id).afirst(),
+        Publicacion.objects.active().by_author(usuario_id).acount(),
+        _recent_posts(usuario_id),
+    )
+    if perfil is None:
+        raise Http404('This user has no profile.')
+
+    return JsonResponse({
+        **perfil,
+        'estadisticas': serialize_stats(estadisticas or EstadisticasUsuario(usuario_id=usuario_id)),
+        'total_publicaciones': total_publicaciones,
+        'publicaciones': [serialize_post(publicacion) for publicacion in recientes],
+    })
+
+
+@require_GET
+@query_budget(1)
+@without_preferences
+async def skill_recommendations(request, usuario_id):
+    """
+    Returns the skills a user might want to learn, best first (?limit=..., 10 by default), from core.recommendations.
+    """
+    resultados = await sync_to_async(recommendations.recommend)(usuario_id, _por_pagina(request, 10))
+    return JsonResponse({
+        'resultados': [
+            {
+                'habilidad': {'id': recomendacion.habilidad_id, 'nombre': recomendacion.nombre, 'categoria': recomendacion.categoria},
+                'puntuacion': recomendacion.puntuacion,
+                'apoyos': recomendacion.apoyos,
+            }
+            for recomendacion in resultados
+        ],
+    })
+
+
+def _datos(request):
+    """
+    Returns the JSON object in the body of a request.
+
+    Raises:
+        ValidationError: If the body isn't a JSON object.
+    """
+    try:
+        datos = json.loads(request.body)
+    except ValueError:
+        datos = None
+    if not isinstance(datos, dict):
+        raise ValidationError('The body must be a JSON object.')
+    return datos
+
+
+def _texts(datos, *campos):
+    """
+    Returns some text fields of a JSON object ('' for the missing ones).
+
+    Raises:
+        ValidationError: If one of them isn't a string (the model would store its repr, e.g. "['x']").
+    """
+    errores = {campo: ['It must be a string.'] for campo in campos if not isinstance(datos.get(campo, ''), str)}
+    if errores:
+        raise ValidationError(errores)
+    return [datos.get(campo, '') for campo in campos]
+
+
+def _invalid(error):
+    """
+    Returns the 400 response of a ValidationError of a write view.
+    """
+    errores = error.message_dict if hasattr(error, 'error_dict') else {'__all__': error.messages}
+    return JsonResponse({'error': 'Invalid data.', 'errores': errores}, status=400)
+
+
+def _create(instancia, *validadores):
+    """
+    Validates and saves a new object of a write view.
+
+    Answers 400 with the errors if it isn't valid, and 409 if a row written meanwhile by another request took one of
+    its unique values (full_clean() checks them, but both requests may pass it before either one saves).
+
+    Args:
+        instancia (Model): New object.
+        validadores (callable): Extra checks of the cleaned object, which raise ValidationError.
+    """
+    try:
+        instancia.full_clean()
+        for validador in validadores:
+            validador(instancia)
+    except ValidationError as error:
+        return _invalid(error)
+    try:
+        save_instance(instancia)
+    except IntegrityError:
+        return JsonResponse({'error': 'It conflicts with one created meanwhile.'}, status=409)
+    return JsonResponse({'id': instancia.pk}, status=201)
+
+
+@require_POST
+@rate_limited('publicacion')
+def create_post(request):
+    """
+    Creates a post of the signed-in user from a JSON object: tipo, descripcion and habilidad (id).
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Sign in to post.'}, status=401)
+    try:
+        datos = _datos(request)
+    except ValidationError as error:
+        return JsonResponse({'error': error.messages[0]}, status=400)
+    try:
+        tipo, descripcion = _texts(datos, 'tipo', 'descripcion')
+    except ValidationError as error:
+        return _invalid(error)
+    return _create(Publicacion(tipo=tipo, descripcion=descripcion, habilidad_id=datos.get('habilidad'), autor=request.user))
+
+
+def _own_skill(acuerdo):
+    """
+    Checks that the skill the proposer teaches in an agreement is theirs: in their profile or offered in their posts.
+    """
+    suya = Habilidad.objects.filter(
+        Q(perfil__usuario=acuerdo.usuario_a_id) | Q(indice__usuario=acuerdo.usuario_a_id, indice__tipo='OFREZCO'),
+        pk=acuerdo.habilidad_tradea_a_id,
+    )
+    if not suya.exists():
+        raise ValidationError({'habilidad_tradea_a': ['It must be one of your skills (in your profile or your posts).']})
+
+
+@require_POST
+@rate_limited('propuesta')
+def propose_agreement(request):
+    """
+    Proposes an agreement from the signed-in user to another one, from a JSON object: usuario (id of the other
+    user), habilidad_tradea_a (skill of the signed-in user), habilidad_tradea_b, condiciones and optionally semanas,
+    mins_sesion and sesiones_por_semana.
+
+    Answers 409 if the same agreement was proposed meanwhile (unique_acuerdo_activo).
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Sign in to propose agreements.'}, status=401)
+    try:
+        datos = _datos(request)
+    except ValidationError as error:
+        return JsonResponse({'error': error.messages[0]}, status=400)
+    try:
+        [condiciones] = _texts(datos, 'condiciones')
+    except ValidationError as error:
+        return _invalid(error)
+    opcionales = {campo: datos[campo] for campo in ('semanas', 'mins_sesion', 'sesiones_por_semana') if campo in datos}
+    acuerdo = Acuerdo(
+        usuario_a=request.user, usuario_b_id=datos.get('usuario'), habilidad_tradea_a_id=datos.get('habilidad_tradea_a'),
+        habilidad_tradea_b_id=datos.get('habilidad_tradea_b'), condiciones=condiciones, estado='PROPUESTO', **opcionales,
+    )
+    return _create(acuerdo, _own_skill)
+
+
+@require_GET
+@query_budget(6)  # 5, plus the preferences of the user on a cold cache (PreferencesMiddleware)
+async def agreement_detail(request, pk):
+    """
+    Returns an agreement with its users, skills and sessions. Only its users can see it.
+    """
+    usuario = await request.auser()
+    if not usuario.is_authenticated:
+        raise Http404('Agreement not found.')
+
+    acuerdo = await Acuerdo.objects.for_agreement_detail().for_user(usuario.pk).filter(pk=pk).afirst()
+    if acuerdo is None:
+        raise Http404('Agreement not found.')
+
+    return JsonResponse({
+        'id': acuerdo.pk,
+        'estado': acuerdo.estado,
+        'semanas': acuerdo.semanas,
+        'mins_sesion': acuerdo.mins_sesion,
+        'sesiones_por_semana': acuerdo.sesiones_por_semana,
+        'condiciones': acuerdo.condiciones,
+        'usuarios': [
+            {'id': miembro.pk, 'nombre': miembro.nombre, 'alias': miembro.alias, 'habilidad': {'id': habilidad.pk, 'nombre': habilidad.nombre}}
+            for miembro, habilidad in ((acuerdo.usuario_a, acuerdo.habilidad_tradea_a), (acuerdo.usuario_b, acuerdo.habilidad_tradea_b))
+        ],
+        'sesiones': [
+            {
+                'id': sesion.pk,
+                'fecha': sesion.fecha.isoformat(),
+                'resumen': sesion.resumen,
+                'duracion_real': sesion.duracion_real,
+                'asistencia_user_a': sesion.asistencia_user_a,
+                'asistencia_user_b': sesion.asistencia_user_b,
+                'estado': sesion.estado,
+            }
+            for sesion in acuerdo.sesiones.all()
+        ],
+        'sesiones_activas': len(acuerdo.sesiones_activas),
+    })
+
+
+def staff_required(vista):
+    """
+    Lets only active staff users through to a view: 401 for anonymous users, 403 for the rest.
+
+    Like the admin's staff_member_required, but answering JSON instead of redirecting to the admin login, so the API
+    doesn't need the admin (it's optional, see skillswap.settings_production).
+    """
+    @wraps(vista)
+    def envoltorio(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': 'Sign in as staff.'}, status=401)
+        if not (request.user.is_active and request.user.is_staff):
+            return JsonResponse({'error': 'Staff only.'}, status=403)
+        return vista(request, *args, **kwargs)
+
+    return envoltorio
+
+
+@require_GET
+@staff_required
+def export_dataset(request, nombre):
+    """
+    Streams a dataset (see core.export.DATASETS) as a file download, for admins.
+
+    Query string: ?format=csv|jsonl (jsonl by default), ?since=<ISO date or date and time> for an incremental export
+    and ?gzip=1 to compress it.
+    """
+    formato = request.GET.get('format', 'jsonl')
+    comprimir = request.GET.get('gzip') == '1'
+    try:
+        desde = export.parse_since(request.GET['since']) if request.GET.get('since') else None
+        bloques = export.export(nombre, formato, desde, comprimir)
+    except ValidationError as error:
+        return JsonResponse({'error': error.messages[0]}, status=400)
+
+    respuesta = StreamingHttpResponse(
+        bloques, content_type='application/gzip' if comprimir else f'{export.FORMATOS[formato]}; charset=utf-8',
+    )
+    respuesta['Content-Disposition'] = f'attachment; filename="{export.filename(nombre, formato, comprimir)}"'
+    return respuesta
+
+
+SERIES = {
+    'sesiones': (analytics.sessions, ('tasa_asistencia',)),
+    'acuerdos': (analytics.agreements, ('total', 'conversion')),
+}
+
+
+@require_GET
+@staff_required
+@query_budget(4)  # The session, the user, their preferences (cold cache) and the rollup
+def analytics_series(request, nombre):
+    """
+    Returns a dashboard series of the analytics rollups ('sesiones' or 'acuerdos'), for admins.
+
+    Query string: ?desde=...&hasta=... (ISO dates, the last 30 days by default), ?periodo=dia|semana|mes (dia by
+    default) and ?categoria=... (every category by default).
+    """
+    if nombre not in SERIES:
+        raise Http404('Unknown series.')
+    serie, calculados = SERIES[nombre]
+
+    try:
+        hasta = parse_date(request.GET['hasta']) if request.GET.get('hasta') else timezone.localdate()
+        desde = parse_date(request.GET['desde']) if request.GET.get('desde') else hasta and hasta - timedelta(days=29)
+        if desde is None or hasta is None:
+            raise ValueError('Invalid date, use YYYY-MM-DD.')
+        puntos = serie(desde, hasta, request.GET.get('periodo', 'dia'), request.GET.get('categoria', ''))
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+
+    return JsonResponse({
+        'resultados': [
+            {**asdict(punto), 'inicio': punto.inicio.isoformat(), **{campo: getattr(punto, campo) for campo in calculados}}
+            for punto in puntos
+        ],
+    })
@@ -1,7 +1,9 @@
 """
 ASGI config for skillswap project.
 
-It exposes the ASGI callable as a module-level variable named ``application``.
+It exposes the ASGI callable as a module-level variable named ``application``. It's loaded and warmed up with
+skillswap.preload, so a preforking server that loads it before forking (gunicorn --preload) shares it with every
+worker copy-on-write.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
@@ -11,6 +13,8 @@ import os
 
 from django.core.asgi import get_asgi_application
 
+from skillswap.preload import preload
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'skillswap.settings')
 
-application = get_asgi_application()
+application = preload(get_asgi_application)
@@ -0,0 +1,79 @@
+"""
+Preloading of the skillswap application before the server forks its workers.
+
+With a preforking server loading the application in the master (gunicorn --preload), the workers are forked from a
+process that already imported Django, the project and its URLconf, and share those pages with it copy-on-write
+instead of each worker importing (and holding) its own copy. Two things keep the pages shared:
+
+    - warm_up() builds, once and before forking, the state every worker would otherwise build lazily on its first
+      requests (URL resolver, views, template engines and tag libraries, translation catalogues, model metadata,
+      the timezone registry), so it's in the shared pages instead of being built, and copied, in every worker.
+    - The garbage collector is off while loading (the full collections it runs as the objects pile up are pure
+      overhead at startup), and then every object loaded is frozen (gc.freeze()): the collections of the workers
+      skip them, so they don't write to, and unshare, every page holding an object.
+
+Nothing that can't cross a fork is created: database connections are closed and no thread (e.g. the SQLite writer of
+core.sqlite) or cache client is started. Without preloading, every worker runs the same steps when it imports the
+entry point, which still moves the warm-up off the first requests.
+
+Example:
+    gunicorn --preload --workers 8 skillswap.wsgi
+    gunicorn --preload --workers 8 --worker-class uvicorn.workers.UvicornWorker skillswap.asgi
+"""
+
+import gc
+
+
+def warm_up():
+    """
+    Builds the per-process state that is otherwise built on the first requests.
+
+    It doesn't touch the database (and closes any connection left open), so it's safe before forking.
+    """
+    from django.apps import apps
+    from django.conf import settings
+    from django.db import connections
+    from django.template import engines
+    from django.urls import get_resolver
+    from django.utils import translation
+
+    from core import preferences, timezones
+
+    get_resolver().reverse_dict  # Imports the URLconf and every view, and builds the resolver.
+    engines.all()  # Template engines, with their tag libraries.
+
+    # Translation catalogues of the languages users can choose (PreferencesMiddleware activates them per request).
+    for language in {settings.LANGUAGE_CODE, *preferences.SCHEMA['language'].valores}:
+        translation.activate(language)
+    translation.deactivate()
+
+    for model in apps.get_models():
+        model._meta.get_fields()  # Cached per model after the first call.
+
+    timezones.available_timezones()
+    timezones.get_zone(settings.TIME_ZONE)
+
+    connections.close_all()
+
+
+def preload(get_application):
+    """
+    Loads the application, warms it up and freezes what was loaded, for the workers to share it.
+
+    Args:
+        get_application (callable): get_wsgi_application or get_asgi_application.
+
+    Returns:
+        callable: WSGI or ASGI application.
+    """
+    activado = gc.isenabled()
+    gc.disable()
+    try:
+        application = get_application()
+        warm_up()
+    finally:
+        if activado:
+            gc.enable()
+    gc.collect()
+    gc.freeze()
+    return application
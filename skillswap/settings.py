@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -41,11 +42,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.QueryInstrumentationMiddleware',
+    'core.middleware.ReplicaStickinessMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.PreferencesMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -74,13 +78,81 @@ WSGI_APPLICATION = 'skillswap.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# Configured from the environment. SQLite by default; set DB_ENGINE=postgresql in production:
+#   DB_NAME, DB_USER, DB_PASSWORD, DB_HOST, DB_PORT: connection to the primary.
+#   DB_REPLICA_HOSTS: comma-separated hosts of the read replicas (aliases replica1, replica2...), see core.routers.
+#   DB_CONN_MAX_AGE: seconds a connection is kept open between requests (persistent connections).
+#   DB_POOL_MAX_SIZE: size of the psycopg connection pool of each process (0 disables it; it needs psycopg[pool]).
+
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite3')
+DB_POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', 0))
+
+
+def postgresql(host):
+    """
+    Returns the settings of a PostgreSQL database.
+
+    Args:
+        host (str): Database host.
+
+    Returns:
+        dict: Database settings.
+    """
+    database = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ.get('DB_NAME', 'skillswap'),
+        'USER': os.environ.get('DB_USER', 'skillswap'),
+        'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+        'HOST': host,
+        'PORT': os.environ.get('DB_PORT', '5432'),
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {},
+    }
+    if DB_POOL_MAX_SIZE:
+        database['CONN_MAX_AGE'] = 0  # The pool keeps the connections, Django mustn't.
+        database['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+            'max_size': DB_POOL_MAX_SIZE,
+            'timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        }
+    return database
+
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {'default': postgresql(os.environ.get('DB_HOST', 'localhost'))}
+    replica_hosts = [host.strip() for host in os.environ.get('DB_REPLICA_HOSTS', '').split(',') if host.strip()]
+    for i, host in enumerate(replica_hosts, start=1):
+        DATABASES[f'replica{i}'] = {**postgresql(host), 'TEST': {'MIRROR': 'default'}}
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME', BASE_DIR / 'db.sqlite3'),
+        }
     }
+
+DATABASE_ROUTERS = ['core.routers.PrimaryReplicaRouter']
+
+# SQLite tuning for single-node deployments (core.sqlite)
+#   DB_SQLITE_TUNED=1: WAL and the pragmas below on every new connection, and write transactions that start with
+#   BEGIN IMMEDIATE (they wait for the write lock instead of failing with "database is locked").
+#   DB_SQLITE_WRITE_QUEUE=1: serialized_write() functions are committed in groups by a single writer thread.
+
+SQLITE_TUNED = os.environ.get('DB_SQLITE_TUNED', '0') == '1'
+SQLITE_WRITE_QUEUE = os.environ.get('DB_SQLITE_WRITE_QUEUE', '0') == '1'
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,  # Milliseconds waiting for a lock.
+    'cache_size': -65536,  # 64 MiB of page cache per connection.
+    'mmap_size': 268435456,  # 256 MiB of memory-mapped reads.
+    'temp_store': 'MEMORY',
 }
 
+# Seconds a client keeps reading from the primary after writing, while the replicas catch up.
+DATABASE_REPLICA_STICKY_SECONDS = 5
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -117,3 +189,124 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/6.0/howto/static-files/
 
 STATIC_URL = 'static/'
+
+
+# Full-text search (core.search)
+# 'fts5' (SQLite FTS5), 'python' (pure-Python inverted index) or None to use FTS5 when the database is SQLite.
+
+SEARCH_BACKEND = None
+
+
+# Cache
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+
+# Read-through cache of the skill catalogue and profile bundles (core.cache).
+# ALIAS is the shared tier; the local tier is an in-process LRU whose values live LOCAL_TTL seconds. LocMemCache is
+# per process, so invalidations only reach every worker with a shared backend (settings_production).
+# Invalidated keys can't be cached again for INVALIDATION_TTL seconds (longer than any load).
+
+CORE_CACHE = {
+    'ALIAS': 'default',
+    'TIMEOUT': 300,
+    'LOCAL_MAX_ENTRIES': 1024,
+    'LOCAL_TTL': 2,
+    'INVALIDATION_TTL': 10,
+}
+
+
+# Skill recommendations (core.recommendations), rebuilt by the build_recommendations command.
+# TOP_K similar skills are kept per skill, if they go together at least MIN_COOCCURRENCES times; a finished agreement
+# counts AGREEMENT_WEIGHT times as much as two skills in the same profile.
+
+RECOMMENDATIONS = {
+    'TOP_K': 20,
+    'MIN_COOCCURRENCES': 2,
+    'AGREEMENT_WEIGHT': 3,
+}
+
+
+# Rate limits of the write paths (core.ratelimit), counted in the cache ALIAS. It must be shared by every worker, or
+# each one counts apart: this LocMemCache is only right for a single process (settings_production uses 'shared').
+# LIMITS: {action: {'usuario' | 'ip': (requests, seconds)}}. IP_HEADER: e.g. 'HTTP_X_FORWARDED_FOR' behind a proxy.
+
+RATE_LIMITS = {
+    'ENABLED': True,
+    'ALIAS': 'default',
+    'LIMITS': {
+        'publicacion': {'usuario': (10, 3600), 'ip': (30, 3600)},
+        'propuesta': {'usuario': (20, 3600), 'ip': (60, 3600)},
+    },
+    'IP_HEADER': None,
+}
+
+# Analytics rollups for the dashboards (core.analytics), updated by the update_analytics command.
+# Rows changed in the last LAG_SECONDS are left for the next run (transactions still open); backfills recompute
+# BATCH_DAYS days per partition, WORKERS partitions at a time.
+
+ANALYTICS = {
+    'LAG_SECONDS': 60,
+    'BATCH_DAYS': 31,
+    'WORKERS': 4,
+}
+
+
+# Notifications to the users (core.outbox)
+# Written to the outbox in the transaction of the change, sent by the send_notifications worker.
+#   SENDER: 'log', 'email' (EMAIL_BACKEND), 'webhook' (POST to WEBHOOK_URL), 'fake' or the dotted path of a class.
+#   Failed deliveries are retried after BACKOFF_SECONDS, twice as long each time, up to MAX_ATTEMPTS.
+#   Session reminders are due REMINDER_DAYS before the session, at REMINDER_HOUR (TIME_ZONE).
+
+NOTIFICATIONS = {
+    'SENDER': os.environ.get('NOTIFICATIONS_SENDER', 'log'),
+    'WEBHOOK_URL': os.environ.get('NOTIFICATIONS_WEBHOOK_URL', ''),
+    'TIMEOUT': 10,
+    'MAX_ATTEMPTS': 8,
+    'BACKOFF_SECONDS': 30,
+    'MAX_BACKOFF_SECONDS': 3600,
+    'LEASE_SECONDS': 300,  # A claimed notification is claimed again after this, if its worker died.
+    'REMINDER_DAYS': 1,
+    'REMINDER_HOUR': 9,
+}
+
+
+# Query-count and latency instrumentation (core.middleware.QueryInstrumentationMiddleware)
+# STRICT_BUDGETS raises QueryBudgetExceeded when a view goes over its query budget instead of logging a warning.
+
+INSTRUMENTATION = {
+    'ENABLED': True,
+    'SERVER_TIMING': DEBUG,
+    'STRICT_BUDGETS': DEBUG,
+    'SLOW_REQUEST_MS': 500,
+}
+
+
+# Logging
+# https://docs.djangoproject.com/en/6.0/topics/logging/
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'skillswap.instrumentation': {
+            'handlers': ['console'],
+            'level': 'INFO' if DEBUG else 'WARNING',
+            'propagate': False,
+        },
+        'skillswap.notifications': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
@@ -0,0 +1,22 @@
+"""
+Benchmark settings for skillswap project.
+
+Everything in skillswap.settings, including the databases configured from the environment (DB_ENGINE,
+DB_SQLITE_TUNED...), plus what the throwaway databases of the benchmarks need (see benchmarks.common.test_database):
+
+    - core.Usuario is the user model.
+    - core has no migrations yet, so its tables are created from the models (MIGRATION_MODULES).
+    - A fast password hasher, as the generators create many users.
+
+The benchmarks use it unless DJANGO_SETTINGS_MODULE is set.
+"""
+
+from .settings import *  # noqa: F401, F403
+
+AUTH_USER_MODEL = 'core.Usuario'
+
+MIGRATION_MODULES = {'core': None}
+
+DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
@@ -0,0 +1,91 @@
+"""
+Lean production settings for skillswap project.
+
+Everything in skillswap.settings, minus what an API worker doesn't need, so workers start faster and use less memory:
+
+    - DEBUG off (and the instrumentation and logging that followed it).
+    - The admin (and, with it, the messages framework and the static files app) only if DJANGO_ADMIN=1. The admin
+      pulls the forms, the admin templates and their template tags into every worker; run it in its own small pool of
+      workers (DJANGO_ADMIN=1) and collectstatic with these settings and DJANGO_ADMIN=1.
+    - The messages framework only if DJANGO_MESSAGES=1 (or the admin is on, it needs it).
+    - Templates compiled once per process (cached loader) and no per-request context processors beyond the request
+      and the user.
+    - A cache shared by every worker for core.cache and the rate limit counters (core.ratelimit): Redis if REDIS_URL
+      is set (it needs the redis package), otherwise the database (run ``manage.py createcachetable`` once). Only
+      Redis increments the counters atomically; on the database, concurrent requests may miss a few attempts.
+
+Use it with DJANGO_SETTINGS_MODULE=skillswap.settings_production, and the preloading entry points of skillswap.wsgi
+and skillswap.asgi (see skillswap.preload).
+"""
+
+import os
+
+from .settings import *  # noqa: F401, F403
+from .settings import (
+    CORE_CACHE, INSTALLED_APPS, INSTRUMENTATION, LOGGING, MIDDLEWARE, RATE_LIMITS, SECRET_KEY, TEMPLATES,
+)
+
+DEBUG = False
+
+SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY', SECRET_KEY)
+
+ALLOWED_HOSTS = [host.strip() for host in os.environ.get('DJANGO_ALLOWED_HOSTS', '').split(',') if host.strip()]
+
+ADMIN_ENABLED = os.environ.get('DJANGO_ADMIN', '0') == '1'
+MESSAGES_ENABLED = ADMIN_ENABLED or os.environ.get('DJANGO_MESSAGES', '0') == '1'
+
+OPTIONAL_APPS = {
+    'django.contrib.admin': ADMIN_ENABLED,
+    'django.contrib.staticfiles': ADMIN_ENABLED,  # Only collectstatic uses it, and only the admin has static files.
+    'django.contrib.messages': MESSAGES_ENABLED,
+}
+INSTALLED_APPS = [app for app in INSTALLED_APPS if OPTIONAL_APPS.get(app, True)]
+
+MIDDLEWARE = [
+    middleware for middleware in MIDDLEWARE
+    if MESSAGES_ENABLED or middleware != 'django.contrib.messages.middleware.MessageMiddleware'
+]
+
+TEMPLATES = [
+    {
+        **TEMPLATES[0],
+        'APP_DIRS': False,  # The loaders are given below.
+        'OPTIONS': {
+            'context_processors': [
+                context_processor for context_processor in TEMPLATES[0]['OPTIONS']['context_processors']
+                if MESSAGES_ENABLED or context_processor != 'django.contrib.messages.context_processors.messages'
+            ],
+            'debug': False,
+            'loaders': [
+                (
+                    'django.template.loaders.cached.Loader',
+                    ['django.template.loaders.filesystem.Loader', 'django.template.loaders.app_directories.Loader'],
+                ),
+            ],
+        },
+    },
+]
+
+# Every worker must see the same cached values, invalidations and rate limit counters: LocMemCache is per process.
+if os.environ.get('REDIS_URL'):
+    SHARED_CACHE = {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': os.environ['REDIS_URL']}
+else:
+    SHARED_CACHE = {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'skillswap_cache'}
+
+CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'shared': SHARED_CACHE,
+}
+
+CORE_CACHE = {**CORE_CACHE, 'ALIAS': 'shared'}
+RATE_LIMITS = {**RATE_LIMITS, 'ALIAS': 'shared'}
+
+INSTRUMENTATION = {**INSTRUMENTATION, 'SERVER_TIMING': False, 'STRICT_BUDGETS': False}
+
+LOGGING = {
+    **LOGGING,
+    'loggers': {
+        **LOGGING['loggers'],
+        'skillswap.instrumentation': {**LOGGING['loggers']['skillswap.instrumentation'], 'level': 'WARNING'},
+    },
+}
@@ -0,0 +1,44 @@
+"""
+Test settings for skillswap project.
+
+Everything in skillswap.settings, plus what the test database needs:
+
+    - core.Usuario is the user model.
+    - core has no migrations yet, so its tables are created from the models (MIGRATION_MODULES).
+    - Two SQLite databases, standing in for the primary and a read replica (core.tests.test_routers). The router is
+      only on in the tests that use both, so the rest only touch 'default'.
+    - A fast password hasher, as tests create many users.
+    - Only the warnings of the request metrics, and none of the notification retries, are logged.
+    - The per-process LocMemCache is fine for the caches that are shared by every worker in production.
+
+Usage:
+    python manage.py test core --settings=skillswap.settings_test
+"""
+
+from .settings import *  # noqa: F401, F403
+
+AUTH_USER_MODEL = 'core.Usuario'
+
+MIGRATION_MODULES = {'core': None}
+
+DATABASES = {
+    'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': BASE_DIR / 'test_primary.sqlite3'},  # noqa: F405
+    'replica1': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': BASE_DIR / 'test_replica.sqlite3'},  # noqa: F405
+}
+DATABASE_ROUTERS = []
+
+DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+SILENCED_SYSTEM_CHECKS = ['core.W001']  # Tests run with DEBUG off and a single process.
+
+# Quiet test runs: the per-request metrics (INFO) and the retries of the outbox tests (WARNING) aren't logged.
+LOGGING = {
+    **LOGGING,  # noqa: F405
+    'loggers': {
+        **LOGGING['loggers'],  # noqa: F405
+        'skillswap.instrumentation': {**LOGGING['loggers']['skillswap.instrumentation'], 'level': 'WARNING'},  # noqa: F405
+        'skillswap.notifications': {**LOGGING['loggers']['skillswap.notifications'], 'level': 'CRITICAL'},  # noqa: F405
+    },
+}
@@ -1,7 +1,9 @@
 """
 WSGI config for skillswap project.
 
-It exposes the WSGI callable as a module-level variable named ``application``.
+It exposes the WSGI callable as a module-level variable named ``application``. It's loaded and warmed up with
+skillswap.preload, so a preforking server that loads it before forking (gunicorn --preload) shares it with every
+worker copy-on-write.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/wsgi/
@@ -11,6 +13,8 @@ import os
 
 from django.core.wsgi import get_wsgi_application
 
+from skillswap.preload import preload
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'skillswap.settings')
 
-application = get_wsgi_application()
+application = preload(get_wsgi_application)